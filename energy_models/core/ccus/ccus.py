@@ -15,10 +15,10 @@ See the License for the specific language governing permissions and
 limitations under the License.
 '''
 
-import autograd.numpy as np
+import numpy as np
 import pandas as pd
-from autograd import jacobian
 
+from energy_models.core.fingerprint import compute_inputs_fingerprint
 from energy_models.core.stream_type.carbon_models.carbon import Carbon
 from energy_models.core.stream_type.carbon_models.carbon_capture import CarbonCapture
 from energy_models.glossaryenergy import GlossaryEnergy
@@ -51,6 +51,9 @@ class CCUS:
         self.year_end = None
         self.years = None
         self.co2_for_food = None
+        # storage limited by capture and its derivatives, cached with the fingerprint of the inputs they come from
+        self.storage_limited_fingerprint = None
+        self.storage_limited = None
 
         self.inputs_dict = {}
         self.outputs_dict = {}
@@ -77,24 +80,9 @@ class CCUS:
     def compute_co2_emissions(self):
         self.compute_carbon_storage_capacity()
 
-        carbon_capture_from_energy_mix_gt = self.inputs_dict['carbon_capture_from_energy_mix'][f'{GlossaryEnergy.carbon_capture} from energy mix (Gt)'].values
-        co2_emissions_needed_by_energy_mix_gt = self.inputs_dict['co2_emissions_needed_by_energy_mix'][f'{GlossaryEnergy.carbon_capture} needed by energy mix (Gt)'].values
-        co2_for_food_mt = self.co2_for_food[f'{GlossaryEnergy.carbon_capture} for food (Mt)'].values
-
-        # production of CCS technos are in Mt
-        carbon_capture_prod_mt = self.inputs_dict[f"{GlossaryEnergy.carbon_capture}.{GlossaryEnergy.EnergyProductionValue}"][GlossaryEnergy.carbon_capture].values
-        carbon_storage_prod_mt = self.inputs_dict[f"{GlossaryEnergy.carbon_storage}.{GlossaryEnergy.EnergyProductionValue}"][GlossaryEnergy.carbon_storage].values
-        scaling_factor_energy_prod = self.inputs_dict['scaling_factor_energy_production']
-
         # Outputs are in Gt (for automatic differentiation purpose : coupling output var is in Gt)
-        carbon_capture_to_be_stored_gt, carbon_storage_limited_by_capture_gt, carbon_storage_gt, carbon_capture_from_cc_technos_gt = compute_carbon_storage_limited_by_capture_gt(
-            carbon_capture_prod_mt=carbon_capture_prod_mt,
-            carbon_storage_prod_mt=carbon_storage_prod_mt,
-            carbon_capture_from_energy_mix_gt=carbon_capture_from_energy_mix_gt,
-            co2_emissions_needed_by_energy_mix_gt=co2_emissions_needed_by_energy_mix_gt,
-            co2_for_food_mt=co2_for_food_mt,
-            scaling_factor_energy_prod=scaling_factor_energy_prod
-        )
+        carbon_capture_to_be_stored_gt, carbon_storage_limited_by_capture_gt, carbon_storage_gt, carbon_capture_from_cc_technos_gt = \
+            self.compute_storage_limited_by_capture()[0]
 
         self.outputs_dict['co2_emissions_ccus'] = pd.DataFrame({
             GlossaryEnergy.Years: self.years,
@@ -124,31 +112,44 @@ class CCUS:
             'ccs_price_per_tCO2': ccs_price
         })
 
+    def get_storage_limited_by_capture_inputs(self):
+        '''
+        Inputs of compute_carbon_storage_limited_by_capture_gt_and_der
+        '''
+        return {
+            # production of CCS technos are in Mt
+            'carbon_capture_prod_mt': self.inputs_dict[f"{GlossaryEnergy.carbon_capture}.{GlossaryEnergy.EnergyProductionValue}"][GlossaryEnergy.carbon_capture].values,
+            'carbon_storage_prod_mt': self.inputs_dict[f"{GlossaryEnergy.carbon_storage}.{GlossaryEnergy.EnergyProductionValue}"][GlossaryEnergy.carbon_storage].values,
+            'carbon_capture_from_energy_mix_gt': self.inputs_dict['carbon_capture_from_energy_mix'][f'{GlossaryEnergy.carbon_capture} from energy mix (Gt)'].values,
+            'co2_emissions_needed_by_energy_mix_gt': self.inputs_dict['co2_emissions_needed_by_energy_mix'][f'{GlossaryEnergy.carbon_capture} needed by energy mix (Gt)'].values,
+            'co2_for_food_mt': self.co2_for_food[f'{GlossaryEnergy.carbon_capture} for food (Mt)'].values,
+            'scaling_factor_energy_prod': self.inputs_dict['scaling_factor_energy_production'],
+        }
+
+    def compute_storage_limited_by_capture(self):
+        '''
+        Storage limited by capture and its derivatives, evaluated once for a set of inputs :
+        the compute and the gradient of the same point read the cached result
+        '''
+        kernel_inputs = self.get_storage_limited_by_capture_inputs()
+        fingerprint = compute_inputs_fingerprint([kernel_inputs])
+        if fingerprint != self.storage_limited_fingerprint:
+            self.storage_limited = compute_carbon_storage_limited_by_capture_gt_and_der(**kernel_inputs)
+            self.storage_limited_fingerprint = fingerprint
+        return self.storage_limited
+
     def grad_co2_emissions_ccus_Gt(self):
-        carbon_capture_from_energy_mix_gt = self.inputs_dict['carbon_capture_from_energy_mix'][f'{GlossaryEnergy.carbon_capture} from energy mix (Gt)'].values
-        co2_emissions_needed_by_energy_mix_gt = self.inputs_dict['co2_emissions_needed_by_energy_mix'][f'{GlossaryEnergy.carbon_capture} needed by energy mix (Gt)'].values
-        co2_for_food_mt = self.co2_for_food[f'{GlossaryEnergy.carbon_capture} for food (Mt)'].values
-
-        # production of CCS technos are in Mt
-        carbon_capture_prod_mt = self.inputs_dict[f"{GlossaryEnergy.carbon_capture}.{GlossaryEnergy.EnergyProductionValue}"][GlossaryEnergy.carbon_capture].values
-        carbon_storage_prod_mt = self.inputs_dict[f"{GlossaryEnergy.carbon_storage}.{GlossaryEnergy.EnergyProductionValue}"][GlossaryEnergy.carbon_storage].values
-        scaling_factor_energy_prod = self.inputs_dict['scaling_factor_energy_production']
-
-        jac_carbon_capture_from_cc_prod, jac_carbon_capture_from_cs_prod, jac_carbon_capture_from_energy_mix, jac_co2_emissions_needed_by_energy_mix =\
-            compute_carbon_storage_limited_by_capture_gt_der(
-            carbon_capture_prod_mt=carbon_capture_prod_mt,
-            carbon_storage_prod_mt=carbon_storage_prod_mt,
-            carbon_capture_from_energy_mix_gt=carbon_capture_from_energy_mix_gt,
-            co2_emissions_needed_by_energy_mix_gt=co2_emissions_needed_by_energy_mix_gt,
-            co2_for_food_mt=co2_for_food_mt,
-            scaling_factor_energy_prod=scaling_factor_energy_prod
-        )
+        '''
+        Gradients of the carbon storage limited by capture, as the vectors of their diagonal
+        '''
+        storage_limited_der = self.compute_storage_limited_by_capture()[1]
+
         # input_name : (column_name, grad value)
         out = {
-            'carbon_capture_from_energy_mix': [(f'{GlossaryEnergy.carbon_capture} from energy mix (Gt)', jac_carbon_capture_from_energy_mix)],
-            'co2_emissions_needed_by_energy_mix': [(f'{GlossaryEnergy.carbon_capture} needed by energy mix (Gt)', jac_co2_emissions_needed_by_energy_mix)],
-            f'{GlossaryEnergy.carbon_storage}.{GlossaryEnergy.EnergyProductionValue}': [(GlossaryEnergy.carbon_storage, jac_carbon_capture_from_cs_prod)],
-            f'{GlossaryEnergy.carbon_capture}.{GlossaryEnergy.EnergyProductionValue}': [(GlossaryEnergy.carbon_capture, jac_carbon_capture_from_cc_prod)]
+            'carbon_capture_from_energy_mix': [(f'{GlossaryEnergy.carbon_capture} from energy mix (Gt)', storage_limited_der['carbon_capture_from_energy_mix_gt'])],
+            'co2_emissions_needed_by_energy_mix': [(f'{GlossaryEnergy.carbon_capture} needed by energy mix (Gt)', storage_limited_der['co2_emissions_needed_by_energy_mix_gt'])],
+            f'{GlossaryEnergy.carbon_storage}.{GlossaryEnergy.EnergyProductionValue}': [(GlossaryEnergy.carbon_storage, storage_limited_der['carbon_storage_prod_mt'])],
+            f'{GlossaryEnergy.carbon_capture}.{GlossaryEnergy.EnergyProductionValue}': [(GlossaryEnergy.carbon_capture, storage_limited_der['carbon_capture_prod_mt'])]
         }
 
         return out
@@ -166,21 +167,12 @@ def compute_carbon_storage_limited_by_capture_gt(
     The carbon stored by invest is limited by the carbon to stored
     All outputs are in Gt because the output coupling variable is in Gt
     '''
-
-    carbon_capture_from_cc_technos_mt = carbon_capture_prod_mt
-
-    carbon_capture_to_be_stored_mt = (
-            carbon_capture_from_cc_technos_mt * scaling_factor_energy_prod +
-            carbon_capture_from_energy_mix_gt * 1e3 -
-            0 * co2_emissions_needed_by_energy_mix_gt * 1e3 -
-            0 * co2_for_food_mt
-    )
-
-    carbon_storage_limited_by_capture_mt = np.minimum(carbon_capture_to_be_stored_mt, carbon_storage_prod_mt * scaling_factor_energy_prod)
-    return carbon_capture_to_be_stored_mt / 1e3, carbon_storage_limited_by_capture_mt / 1e3, carbon_storage_prod_mt / 1e3, carbon_capture_from_cc_technos_mt / 1e3
+    return compute_carbon_storage_limited_by_capture_gt_and_der(
+        carbon_capture_prod_mt, carbon_storage_prod_mt, carbon_capture_from_energy_mix_gt,
+        co2_emissions_needed_by_energy_mix_gt, co2_for_food_mt, scaling_factor_energy_prod)[0]
 
 
-def compute_carbon_storage_limited_by_capture_gt_der(
+def compute_carbon_storage_limited_by_capture_gt_and_der(
         carbon_capture_prod_mt: np.ndarray,
         carbon_storage_prod_mt: np.ndarray,
         carbon_capture_from_energy_mix_gt: np.ndarray,
@@ -188,16 +180,37 @@ def compute_carbon_storage_limited_by_capture_gt_der(
         co2_for_food_mt: np.ndarray,
         scaling_factor_energy_prod: float,
         ):
-    args = (carbon_capture_prod_mt,
-            carbon_storage_prod_mt,
-            carbon_capture_from_energy_mix_gt,
-            co2_emissions_needed_by_energy_mix_gt,
-            co2_for_food_mt,
-            scaling_factor_energy_prod)
-
-    jac_carbon_capture_from_cc_prod = jacobian(lambda *args: compute_carbon_storage_limited_by_capture_gt(*args)[1], 0)
-    jac_carbon_capture_from_cs_prod = jacobian(lambda *args: compute_carbon_storage_limited_by_capture_gt(*args)[1], 1)
-    jac_carbon_capture_from_energy_mix = jacobian(lambda *args: compute_carbon_storage_limited_by_capture_gt(*args)[1], 2)
-    jac_co2_emissions_needed_by_energy_mix = jacobian(lambda *args: compute_carbon_storage_limited_by_capture_gt(*args)[1], 3)
-
-    return jac_carbon_capture_from_cc_prod(*args), jac_carbon_capture_from_cs_prod(*args), jac_carbon_capture_from_energy_mix(*args), jac_co2_emissions_needed_by_energy_mix(*args)
\ No newline at end of file
+    '''
+    Outputs of compute_carbon_storage_limited_by_capture_gt and derivatives of the carbon storage limited by capture
+    wrt each input, computed in one pass
+    The derivatives are diagonal and given as the vectors of their diagonal,
+    when the carbon to be stored is equal to the storage the derivative of the minimum is split between both
+    :return: tuple of outputs, dict {input name: diagonal of the derivative}
+    '''
+    carbon_capture_from_cc_technos_mt = carbon_capture_prod_mt
+
+    carbon_capture_to_be_stored_mt = (
+            carbon_capture_from_cc_technos_mt * scaling_factor_energy_prod +
+            carbon_capture_from_energy_mix_gt * 1e3 -
+            0 * co2_emissions_needed_by_energy_mix_gt * 1e3 -
+            0 * co2_for_food_mt
+    )
+    carbon_storage_mt = carbon_storage_prod_mt * scaling_factor_energy_prod
+
+    carbon_storage_limited_by_capture_mt = np.minimum(carbon_capture_to_be_stored_mt, carbon_storage_mt)
+    outputs = (carbon_capture_to_be_stored_mt / 1e3, carbon_storage_limited_by_capture_mt / 1e3,
+               carbon_storage_prod_mt / 1e3, carbon_capture_from_cc_technos_mt / 1e3)
+
+    # share of the derivative of the minimum going to the carbon to be stored and to the storage
+    is_equal = carbon_capture_to_be_stored_mt == carbon_storage_mt
+    d_to_be_stored = (carbon_capture_to_be_stored_mt == carbon_storage_limited_by_capture_mt) / (1.0 + is_equal)
+    d_storage = (carbon_storage_mt == carbon_storage_limited_by_capture_mt) / (1.0 + is_equal)
+
+    storage_limited_der = {
+        'carbon_capture_prod_mt': d_to_be_stored * scaling_factor_energy_prod / 1e3,
+        'carbon_storage_prod_mt': d_storage * scaling_factor_energy_prod / 1e3,
+        'carbon_capture_from_energy_mix_gt': d_to_be_stored,
+        'co2_emissions_needed_by_energy_mix_gt': d_to_be_stored * 0.,
+        'co2_for_food_mt': d_to_be_stored * 0.,
+    }
+    return outputs, storage_limited_der
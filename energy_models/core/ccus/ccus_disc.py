@@ -29,11 +29,16 @@ from sostrades_core.tools.post_processing.charts.two_axes_instanciated_chart imp
 )
 
 from energy_models.core.ccus.ccus import CCUS
+from energy_models.core.discipline_instrumentation import InstrumentedDisciplineMixin
+from energy_models.core.jacobian_blocks import (
+    DiagonalJacobianBlock,
+    VectorJacobianProductMixin,
+)
 from energy_models.core.stream_type.carbon_models.carbon_capture import CarbonCapture
 from energy_models.glossaryenergy import GlossaryEnergy
 
 
-class CCUS_Discipline(SoSWrapp):
+class CCUS_Discipline(VectorJacobianProductMixin, InstrumentedDisciplineMixin, SoSWrapp):
     # ontology information
     _ontology_data = {
         'label': 'Carbon Capture and Storage Model',
@@ -148,7 +153,7 @@ class CCUS_Discipline(SoSWrapp):
                 self.set_partial_derivative_for_other_types(
                     ('co2_emissions_ccus_Gt', f'{GlossaryEnergy.carbon_storage} Limited by capture (Gt)'),
                     (input_var, column),
-                    grad_value)
+                    DiagonalJacobianBlock(grad_value))
 
         if GlossaryEnergy.carbon_capture in self.ccs_list:
             self.set_partial_derivative_for_other_types(
@@ -0,0 +1,116 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+from typing import NamedTuple
+
+from energy_models.core.fingerprint import compute_inputs_fingerprint
+
+# key of the filter selecting the charts of a discipline
+CHARTS_FILTER_KEY = 'charts'
+
+
+class ChartDeclaration(NamedTuple):
+    """
+    Post-processing chart of a discipline :
+        - name is the value of the charts filter requesting the chart, None for a chart always built
+        - build_method is the name of the discipline method building the chart,
+          called with the selected values of filter_keys and returning a chart, a list of charts or None
+        - dependencies are the inputs the chart is built from, in addition to the outputs of the discipline
+    """
+    name: str
+    build_method: str
+    dependencies: tuple = ()
+    filter_keys: tuple = ()
+
+
+class ChartRegistry:
+    """
+    Charts of a discipline class, declared in the order they are displayed
+    """
+
+    def __init__(self, declarations=()):
+        self.declarations = list(declarations)
+
+    def extend(self, declarations):
+        '''
+        Registry of a subclass, with the charts of this registry followed by declarations
+        '''
+        return ChartRegistry(self.declarations + list(declarations))
+
+
+class LazyChartsMixin:
+    """
+    Disciplines with their post-processing charts declared in chart_registry :
+        - the data of a chart is only computed when the chart is requested through the charts filter
+        - the built charts are cached until the outputs of the discipline, the dependencies of the chart
+          or its filter values change
+    """
+    chart_registry = ChartRegistry()
+    charts_cache = None
+
+    def get_lazy_charts(self, filters=None, default_filter_values=None):
+        '''
+        Charts of the registry requested by the filters
+        :param default_filter_values: dict {filter key: selected values} used for the filters not given
+        '''
+        filter_values = {CHARTS_FILTER_KEY: []}
+        filter_values.update(default_filter_values or {})
+        if filters is not None:
+            for chart_filter in filters:
+                filter_values[chart_filter.filter_key] = chart_filter.selected_values
+        if self.charts_cache is None:
+            self.charts_cache = {}
+
+        outputs_fingerprint = None
+        instanciated_charts = []
+        for declaration in self.chart_registry.declarations:
+            if declaration.name is not None and declaration.name not in filter_values[CHARTS_FILTER_KEY]:
+                continue
+            if outputs_fingerprint is None:
+                outputs_fingerprint = compute_inputs_fingerprint([self.get_sosdisc_outputs()])
+            build_arguments = [filter_values.get(filter_key) for filter_key in declaration.filter_keys]
+            cache_key = (declaration.build_method, repr(build_arguments))
+            fingerprint = (outputs_fingerprint, self.get_chart_dependencies_fingerprint(declaration.dependencies))
+            cached = self.charts_cache.get(cache_key)
+            if cached is None or cached[0] != fingerprint:
+                cached = (fingerprint, self.build_charts(declaration, build_arguments))
+                self.charts_cache[cache_key] = cached
+            instanciated_charts.extend(cached[1])
+        return instanciated_charts
+
+    def get_chart_dependencies_fingerprint(self, dependencies):
+        '''
+        Fingerprint of the inputs a chart is built from, the inputs missing in the discipline are ignored
+        '''
+        if not dependencies:
+            return None
+        data_in = self.get_data_in()
+        return compute_inputs_fingerprint([{dependency: self.get_sosdisc_inputs(dependency)
+                                            for dependency in dependencies if dependency in data_in}])
+
+    def build_charts(self, declaration, build_arguments):
+        '''
+        Charts built by the method of a declaration, as a list without None
+        '''
+        new_charts = getattr(self, declaration.build_method)(*build_arguments)
+        if not isinstance(new_charts, list):
+            new_charts = [new_charts]
+        return [new_chart for new_chart in new_charts if new_chart is not None]
+
+    def clear_charts_cache(self):
+        '''
+        Remove all cached charts
+        '''
+        self.charts_cache = None
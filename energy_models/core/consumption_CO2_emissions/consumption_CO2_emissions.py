@@ -18,6 +18,12 @@ limitations under the License.
 import numpy as np
 import pandas as pd
 
+from energy_models.core.gradient_registry import (
+    CO2_PER_USE,
+    CONSUMPTION,
+    PRODUCTION,
+    GradientRegistry,
+)
 from energy_models.core.stream_type.base_stream import BaseStream
 from energy_models.core.stream_type.carbon_models.carbon import Carbon
 from energy_models.core.stream_type.carbon_models.carbon_capture import CarbonCapture
@@ -223,7 +229,7 @@ class ConsumptionCO2Emissions(BaseStream):
         co2_production = pd.DataFrame({GlossaryEnergy.Years: self.years})
         co2_consumption = pd.DataFrame({GlossaryEnergy.Years: self.years})
 
-        dtot_CO2_emissions = {}
+        dtot_CO2_emissions = GradientRegistry()
         # Do not loop over carbon capture and carbon storage which will be
         # handled differently
         for energy in self.energy_list:
@@ -242,16 +248,15 @@ class ConsumptionCO2Emissions(BaseStream):
             net_prod = net_production[
                 f'production {energy} ({GlossaryEnergy.energy_unit})'].values
 
-            dtot_CO2_emissions[f'Total CO2 by use (Gt) vs {energy}#co2_per_use'] = np.maximum(
-                0, net_prod)
+            dtot_CO2_emissions.add('Total CO2 by use (Gt)', energy, CO2_PER_USE, np.maximum(0, net_prod))
 
             # Specific case when net prod is equal to zero
             # if we increase the prod of an energy the net prod will react
             # however if we decrease the cons it does nothing
             net_prod_sign = net_prod.copy()
             net_prod_sign[net_prod_sign == 0] = 1
-            dtot_CO2_emissions[f'Total CO2 by use (Gt) vs {energy}#prod'] = self.co2_per_use[energy].values * \
-                                                                            np.maximum(0, np.sign(net_prod_sign))
+            dtot_CO2_emissions.add('Total CO2 by use (Gt)', energy, PRODUCTION,
+                                   self.co2_per_use[energy].values * np.maximum(0, np.sign(net_prod_sign)))
 
         for energy in self.ccs_list:
             for col, production in self.sub_production_dict[energy].items():
@@ -270,9 +275,9 @@ class ConsumptionCO2Emissions(BaseStream):
             f' {GlossaryEnergy.carbon_capture} ({GlossaryEnergy.mass_unit})', '') for key in energy_producing_carbon_capture]
         if len(energy_producing_carbon_capture_list) != 0:
             for energy1 in energy_producing_carbon_capture_list:
-                dtot_CO2_emissions[
-                    f'{GlossaryEnergy.carbon_capture} from energy mix (Gt) vs {energy1}#{GlossaryEnergy.carbon_capture} ({GlossaryEnergy.mass_unit})#prod'] = np.ones(
-                    len_years)
+                dtot_CO2_emissions.add(
+                    f'{GlossaryEnergy.carbon_capture} from energy mix (Gt)', energy1, PRODUCTION, np.ones(len_years),
+                    column=f'{GlossaryEnergy.carbon_capture} ({GlossaryEnergy.mass_unit})')
         #             self.total_co2_emissions[f'{GlossaryEnergy.carbon_capture} from energy mix (Mt)'] = energy_producing_carbon_capture.sum(
         #                 axis=1).values
         #         else:
@@ -289,8 +294,9 @@ class ConsumptionCO2Emissions(BaseStream):
             f' {GlossaryEnergy.carbon_capture} ({GlossaryEnergy.mass_unit})', '') for key in energy_producing_co2]
         if len(energy_producing_co2_list) != 0:
             for energy1 in energy_producing_co2_list:
-                dtot_CO2_emissions[
-                    f'{GlossaryEnergy.carbon_capture} from energy mix (Gt) vs {energy1}#{GlossaryEnergy.carbon_capture} ({GlossaryEnergy.mass_unit})#prod'] = np.ones(len_years)
+                dtot_CO2_emissions.add(
+                    f'{GlossaryEnergy.carbon_capture} from energy mix (Gt)', energy1, PRODUCTION, np.ones(len_years),
+                    column=f'{GlossaryEnergy.carbon_capture} ({GlossaryEnergy.mass_unit})')
 
         #             self.total_co2_emissions[f'{GlossaryEnergy.carbon_capture} from energy mix (Mt)'] = energy_producing_co2.sum(
         #                 axis=1).values
@@ -308,8 +314,9 @@ class ConsumptionCO2Emissions(BaseStream):
             f' {GlossaryEnergy.carbon_capture} ({GlossaryEnergy.mass_unit})', '') for key in energy_removing_co2]
         if len(energy_removing_co2_list) != 0:
             for energy1 in energy_removing_co2_list:
-                dtot_CO2_emissions[
-                    f'{GlossaryEnergy.carbon_capture} removed by energy mix (Gt) vs {energy1}#{GlossaryEnergy.carbon_capture} ({GlossaryEnergy.mass_unit})#cons'] = np.ones(len_years)
+                dtot_CO2_emissions.add(
+                    f'{GlossaryEnergy.carbon_capture} removed by energy mix (Gt)', energy1, CONSUMPTION, np.ones(len_years),
+                    column=f'{GlossaryEnergy.carbon_capture} ({GlossaryEnergy.mass_unit})')
         #             self.total_co2_emissions[f'{GlossaryEnergy.carbon_capture} removed by energy mix (Mt)'] = energy_removing_co2.sum(
         #                 axis=1).values
         #         else:
@@ -327,9 +334,9 @@ class ConsumptionCO2Emissions(BaseStream):
             if col.endswith(f'{CarbonCapture.flue_gas_name} ({GlossaryEnergy.mass_unit})'):
                 energy1 = col.replace(
                     f' {CarbonCapture.flue_gas_name} ({GlossaryEnergy.mass_unit})', '')
-                dtot_CO2_emissions[
-                    f'Total {CarbonCapture.flue_gas_name} (Gt) vs {energy1}#{CarbonCapture.flue_gas_name} ({GlossaryEnergy.mass_unit})#prod'] = np.ones(
-                    len_years)
+                dtot_CO2_emissions.add(
+                    f'Total {CarbonCapture.flue_gas_name} (Gt)', energy1, PRODUCTION, np.ones(len_years),
+                    column=f'{CarbonCapture.flue_gas_name} ({GlossaryEnergy.mass_unit})')
 
         return dtot_CO2_emissions
 
@@ -344,7 +351,7 @@ class ConsumptionCO2Emissions(BaseStream):
         co2_production = pd.DataFrame({GlossaryEnergy.Years: self.years})
         co2_consumption = pd.DataFrame({GlossaryEnergy.Years: self.years})
 
-        dtot_CO2_emissions = {}
+        dtot_CO2_emissions = GradientRegistry()
         # Do not loop over carbon capture and carbon storage which will be
         # handled differently
         for energy in self.energy_list:
@@ -371,8 +378,9 @@ class ConsumptionCO2Emissions(BaseStream):
             f' {GlossaryEnergy.carbon_capture} ({GlossaryEnergy.mass_unit})', '') for key in energy_removing_co2]
         if len(energy_removing_co2_list) != 0:
             for energy1 in energy_removing_co2_list:
-                dtot_CO2_emissions[
-                    f'{GlossaryEnergy.carbon_capture} removed by energy mix (Gt) vs {energy1}#{GlossaryEnergy.carbon_capture} ({GlossaryEnergy.mass_unit})#cons'] = np.ones(len_years)
+                dtot_CO2_emissions.add(
+                    f'{GlossaryEnergy.carbon_capture} removed by energy mix (Gt)', energy1, CONSUMPTION, np.ones(len_years),
+                    column=f'{GlossaryEnergy.carbon_capture} ({GlossaryEnergy.mass_unit})')
         #             self.total_co2_emissions[f'{GlossaryEnergy.carbon_capture} removed by energy mix (Mt)'] = energy_removing_co2.sum(
         #                 axis=1).values
         #         else:
@@ -16,7 +16,6 @@ limitations under the License.
 '''
 import logging
 
-import numpy as np
 from climateeconomics.core.core_witness.climateeco_discipline import (
     ClimateEcoDiscipline,
 )
@@ -35,6 +34,8 @@ from energy_models.core.consumption_CO2_emissions.consumption_CO2_emissions impo
     ConsumptionCO2Emissions,
 )
 from energy_models.core.energy_mix.energy_mix import EnergyMix
+from energy_models.core.gradient_registry import PRODUCTION, get_consumer_ns_streams
+from energy_models.core.jacobian_blocks import DiagonalJacobianBlock, to_jacobian_value
 from energy_models.core.stream_type.energy_models.biomass_dry import BiomassDry
 from energy_models.glossaryenergy import GlossaryEnergy
 
@@ -215,8 +216,6 @@ class ConsumptionCO2EmissionsDiscipline(SoSWrapp):
     def compute_sos_jacobian(self):
         inputs_dict = self.get_sosdisc_inputs()
         outputs_dict = self.get_sosdisc_outputs()
-        years = np.arange(inputs_dict[GlossaryEnergy.YearStart],
-                          inputs_dict[GlossaryEnergy.YearEnd] + 1)
         energy_list = inputs_dict[GlossaryEnergy.energy_list]
         ccs_list = inputs_dict[GlossaryEnergy.ccs_list]
         scaling_factor_energy_production = inputs_dict['scaling_factor_energy_production']
@@ -232,112 +231,54 @@ class ConsumptionCO2EmissionsDiscipline(SoSWrapp):
         dtot_co2_emissions_sources = self.model.compute_grad_CO2_emissions_sources(
             energy_production_detailed)
 
-        for key, value in dtot_co2_emissions_sources.items():
-            co2_emission_column = key.split(' vs ')[0]
-            energy_prod_info = key.split(' vs ')[1]
-            energy = energy_prod_info.split('#')[0]
-            last_part_key = energy_prod_info.split('#')[1]
-            if co2_emission_column in CO2_emissions_by_use_sources.columns and energy in energy_list:
-                ns_energy = energy
-                if energy == BiomassDry.name:
-                    ns_energy = AgricultureMixDiscipline.name
-                if last_part_key == 'prod':
-                    if 'Total CO2 by use' in co2_emission_column:
-                        self.set_partial_derivative_for_other_types(
-                            ('CO2_emissions_by_use_sources',
-                             co2_emission_column),
-                            (GlossaryEnergy.StreamProductionDetailedValue, f'production {energy} ({GlossaryEnergy.energy_unit})'),
-                            np.identity(len(years)) * value / 1e3)
-                    else:
-                        self.set_partial_derivative_for_other_types(
-                            ('CO2_emissions_by_use_sources',
-                             co2_emission_column), (f'{ns_energy}.{GlossaryEnergy.EnergyProductionValue}', energy),
-                            np.identity(len(years)) * scaling_factor_energy_production * value / 1e3)
-                elif last_part_key == 'cons':
-                    for energy_df in energy_list:
-                        list_columnsenergycons = list(
-                            inputs_dict[f'{energy_df}.{GlossaryEnergy.StreamConsumptionValue}'].columns)
-                        if f'{energy} ({GlossaryEnergy.energy_unit})' in list_columnsenergycons:
-                            self.set_partial_derivative_for_other_types(
-                                ('CO2_emissions_by_use_sources', co2_emission_column), (
-                                    f'{energy_df}.{GlossaryEnergy.StreamConsumptionValue}', f'{energy} ({GlossaryEnergy.energy_unit})'),
-                                np.identity(len(years)) * scaling_factor_energy_consumption * value / 1e3)
-                elif last_part_key == 'co2_per_use':
-                    self.set_partial_derivative_for_other_types(
-                        ('CO2_emissions_by_use_sources',
-                         co2_emission_column), (f'{ns_energy}.{GlossaryEnergy.CO2PerUse}', GlossaryEnergy.CO2PerUse),
-                        np.identity(len(years)) * value / 1e3)
-
-                else:
-                    very_last_part_key = energy_prod_info.split('#')[2]
-                    if very_last_part_key == 'prod':
-                        self.set_partial_derivative_for_other_types(
-                            ('CO2_emissions_by_use_sources', co2_emission_column), (
-                                f'{ns_energy}.{GlossaryEnergy.EnergyProductionValue}', last_part_key),
-                            np.identity(len(years)) * scaling_factor_energy_production * value / 1e3)
-                    elif very_last_part_key == 'cons':
-                        self.set_partial_derivative_for_other_types(
-                            ('CO2_emissions_by_use_sources', co2_emission_column), (
-                                f'{ns_energy}.{GlossaryEnergy.StreamConsumptionValue}', last_part_key),
-                            np.identity(len(years)) * scaling_factor_energy_production * value / 1e3)
-
-            # gradient for carbone capture and storage technos producing co2
-            elif co2_emission_column in CO2_emissions_by_use_sources.columns and energy in ccs_list:
-                ns_energy = energy
-                if last_part_key not in ['co2_per_use', 'cons', 'prod']:
-                    very_last_part_key = energy_prod_info.split('#')[2]
-                    if very_last_part_key == 'prod':
-                        self.set_partial_derivative_for_other_types(
-                            ('CO2_emissions_by_use_sources', co2_emission_column), (
-                                f'{ns_energy}.{GlossaryEnergy.EnergyProductionValue}', last_part_key),
-                            np.identity(len(years)) * scaling_factor_energy_production * value / 1e3)
+        # namespaces of the stream inputs and of the streams consuming each energy, computed once for all gradients
+        ns_streams = {energy: energy for energy in energy_list + ccs_list}
+        if BiomassDry.name in energy_list:
+            ns_streams[BiomassDry.name] = AgricultureMixDiscipline.name
+        consumer_ns_streams = get_consumer_ns_streams(
+            {energy: inputs_dict[f'{energy}.{GlossaryEnergy.StreamConsumptionValue}'] for energy in energy_list},
+            lambda energy: energy)
+
+        # gradients of carbon capture and storage technos producing co2 are only wrt their production columns
+        self.set_partial_derivatives_co2_emissions(
+            'CO2_emissions_by_use_sources', CO2_emissions_by_use_sources.columns, dtot_co2_emissions_sources,
+            ns_streams, consumer_ns_streams, scaling_factor_energy_production, scaling_factor_energy_consumption,
+            column_only_streams=set(ccs_list) - set(energy_list))
 
         # ------------------------------------#
         # -- CO2 emissions sinks gradients--#
         # ------------------------------------#
         dtot_co2_emissions_sinks = self.model.compute_grad_CO2_emissions_sinks()
 
-        for key, value in dtot_co2_emissions_sinks.items():
-            co2_emission_column = key.split(' vs ')[0]
-            energy_prod_info = key.split(' vs ')[1]
-            energy = energy_prod_info.split('#')[0]
-            last_part_key = energy_prod_info.split('#')[1]
-            if co2_emission_column in CO2_emissions_by_use_sinks.columns and energy in energy_list:
-                ns_energy = energy
-                if energy == BiomassDry.name:
-                    ns_energy = AgricultureMixDiscipline.name
-                if last_part_key == 'prod':
-                    self.set_partial_derivative_for_other_types(
-                        ('CO2_emissions_by_use_sinks',
-                         co2_emission_column), (f'{ns_energy}.{GlossaryEnergy.EnergyProductionValue}', energy),
-                        np.identity(len(years)) * scaling_factor_energy_production * value / 1e3)
-                elif last_part_key == 'cons':
-                    for energy_df in energy_list:
-                        list_columnsenergycons = list(
-                            inputs_dict[f'{energy_df}.{GlossaryEnergy.StreamConsumptionValue}'].columns)
-                        if f'{energy} ({GlossaryEnergy.energy_unit})' in list_columnsenergycons:
-                            self.set_partial_derivative_for_other_types(
-                                ('CO2_emissions_by_use_sinks', co2_emission_column), (
-                                    f'{energy_df}.{GlossaryEnergy.StreamConsumptionValue}', f'{energy} ({GlossaryEnergy.energy_unit})'),
-                                np.identity(len(years)) * scaling_factor_energy_consumption * value / 1e3)
-                elif last_part_key == 'co2_per_use':
-                    self.set_partial_derivative_for_other_types(
-                        ('CO2_emissions_by_use_sinks',
-                         co2_emission_column), (f'{ns_energy}.{GlossaryEnergy.CO2PerUse}', GlossaryEnergy.CO2PerUse),
-                        np.identity(len(years)) * value / 1e3)
-
-                else:
-                    very_last_part_key = energy_prod_info.split('#')[2]
-                    if very_last_part_key == 'prod':
-                        self.set_partial_derivative_for_other_types(
-                            ('CO2_emissions_by_use_sinks', co2_emission_column), (
-                                f'{ns_energy}.{GlossaryEnergy.EnergyProductionValue}', last_part_key),
-                            np.identity(len(years)) * scaling_factor_energy_production * value / 1e3)
-                    elif very_last_part_key == 'cons':
-                        self.set_partial_derivative_for_other_types(
-                            ('CO2_emissions_by_use_sinks', co2_emission_column), (
-                                f'{ns_energy}.{GlossaryEnergy.StreamConsumptionValue}', last_part_key),
-                            np.identity(len(years)) * scaling_factor_energy_production * value / 1e3)
+        self.set_partial_derivatives_co2_emissions(
+            'CO2_emissions_by_use_sinks', CO2_emissions_by_use_sinks.columns, dtot_co2_emissions_sinks,
+            {energy: ns_streams[energy] for energy in energy_list}, consumer_ns_streams,
+            scaling_factor_energy_production, scaling_factor_energy_consumption)
+
+    def set_partial_derivatives_co2_emissions(self, co2_variable, co2_emissions_columns, gradient_registry,
+                                              ns_streams, consumer_ns_streams, scaling_factor_energy_production,
+                                              scaling_factor_energy_consumption, column_only_streams=()):
+        '''
+        Set the gradients of the registry for the columns of co2_variable
+        :param ns_streams: dict {stream: namespace of its inputs} of the streams whose gradients are set
+        :param column_only_streams: streams with only their gradients wrt a production column set
+        '''
+        for key, diagonal in gradient_registry.items():
+            if key.output not in co2_emissions_columns or key.stream not in ns_streams:
+                continue
+            if key.stream in column_only_streams and (key.column is None or key.input != PRODUCTION):
+                continue
+            if key.input == PRODUCTION and key.column is None and 'Total CO2 by use' in key.output:
+                self.set_partial_derivative_for_other_types(
+                    (co2_variable, key.output),
+                    (GlossaryEnergy.StreamProductionDetailedValue, f'production {key.stream} ({GlossaryEnergy.energy_unit})'),
+                    to_jacobian_value(DiagonalJacobianBlock(diagonal / 1e3)))
+                continue
+            for x_key_column, block in gradient_registry.get_input_blocks(
+                    key, ns_streams[key.stream], consumer_ns_streams, scaling_factor_energy_production,
+                    scaling_factor_energy_consumption):
+                self.set_partial_derivative_for_other_types(
+                    (co2_variable, key.output), x_key_column, to_jacobian_value(block))
 
     def get_chart_filter_list(self):
 
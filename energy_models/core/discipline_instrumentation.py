@@ -0,0 +1,216 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+import atexit
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+
+import pandas as pd
+
+# '1' to record wall times and allocations, 'time' to record wall times only
+INSTRUMENTATION_ENV_VAR = 'ENERGY_MODELS_INSTRUMENTATION'
+# csv or json file where the summary is exported at exit
+INSTRUMENTATION_FILE_ENV_VAR = 'ENERGY_MODELS_INSTRUMENTATION_FILE'
+
+# discipline methods instrumented for each phase
+INSTRUMENTED_PHASES = {'setup_sos_disciplines': 'configure',
+                       'run': 'run',
+                       'compute_sos_jacobian': 'compute_sos_jacobian',
+                       'get_chart_filter_list': 'post_processing',
+                       'get_post_processing_list': 'post_processing'}
+
+SUMMARY_COLUMNS = ['discipline', 'class', 'phase', 'calls', 'total_time_s', 'mean_time_s', 'max_time_s',
+                   'peak_allocated_bytes']
+
+
+class DisciplineInstrumentation:
+    """
+    Wall time, call count and peak allocated bytes (tracemalloc) of the disciplines, per discipline and per phase
+    Disabled by default, the recording costs a flag check per call when disabled
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.trace_allocations = False
+        self.started_tracemalloc = False
+        self.records = {}
+        # peak memory of the phases in progress, phases of a discipline can call other instrumented phases
+        self.allocation_stack = []
+        # recording enabled by the discipline_instrumentation input of a study, disabled when it is set to False
+        self.enabled_by_input = False
+        self.export_registered = False
+
+    def enable(self, trace_allocations=True):
+        '''
+        Start recording, tracemalloc is started if allocations are traced (it slows down the execution)
+        '''
+        self.enabled = True
+        self.trace_allocations = trace_allocations
+        if trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracemalloc = True
+
+    def disable(self):
+        '''
+        Stop recording, the records are kept until reset
+        '''
+        self.enabled = False
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+            self.started_tracemalloc = False
+        self.allocation_stack = []
+        self.enabled_by_input = False
+
+    def set_enabled_by_input(self, enabled):
+        '''
+        Follow the discipline_instrumentation input of a study : the recording is enabled when the input is True
+        and disabled when it goes back to False, a recording enabled otherwise (environment variable, benchmarks)
+        is not disabled by the input
+        '''
+        if enabled and not self.enabled:
+            self.enable()
+            self.enabled_by_input = True
+            self.register_export_at_exit()
+        elif not enabled and self.enabled_by_input:
+            self.disable()
+
+    def reset(self):
+        '''
+        Remove all records
+        '''
+        self.records = {}
+
+    @contextmanager
+    def record(self, discipline_name, class_name, phase):
+        '''
+        Record the wall time and the peak allocated bytes of the phase of a discipline
+        '''
+        if not self.enabled:
+            yield
+            return
+        trace_allocations = self.trace_allocations and tracemalloc.is_tracing()
+        if trace_allocations:
+            if self.allocation_stack:
+                self.allocation_stack[-1]['inner_peak'] = max(self.allocation_stack[-1]['inner_peak'],
+                                                              tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            start_memory = tracemalloc.get_traced_memory()[0]
+            self.allocation_stack.append({'inner_peak': start_memory})
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_time = time.perf_counter() - start_time
+            peak_bytes = 0
+            if trace_allocations and self.allocation_stack:
+                peak_memory = max(tracemalloc.get_traced_memory()[1], self.allocation_stack.pop()['inner_peak'])
+                peak_bytes = peak_memory - start_memory
+                if self.allocation_stack:
+                    self.allocation_stack[-1]['inner_peak'] = max(self.allocation_stack[-1]['inner_peak'],
+                                                                  peak_memory)
+            record = self.records.setdefault((discipline_name, class_name, phase), [0, 0.0, 0.0, 0])
+            record[0] += 1
+            record[1] += elapsed_time
+            record[2] = max(record[2], elapsed_time)
+            record[3] = max(record[3], peak_bytes)
+
+    def get_summary(self):
+        '''
+        Summary dataframe of the records, one line per discipline and phase sorted by decreasing total time
+        '''
+        rows = [[discipline_name, class_name, phase, calls, total_time, total_time / calls, max_time, peak_bytes]
+                for (discipline_name, class_name, phase), (calls, total_time, max_time, peak_bytes)
+                in self.records.items()]
+        summary = pd.DataFrame(rows, columns=SUMMARY_COLUMNS)
+        return summary.sort_values('total_time_s', ascending=False, ignore_index=True)
+
+    def export_summary(self, file_path):
+        '''
+        Export the summary in a csv file, or in a json file (list of records) if file_path ends with .json
+        '''
+        summary = self.get_summary()
+        if str(file_path).endswith('.json'):
+            with open(file_path, 'w') as summary_file:
+                json.dump(summary.to_dict(orient='records'), summary_file, indent=1)
+        else:
+            summary.to_csv(file_path, index=False)
+
+
+    def export_summary_at_exit(self):
+        '''
+        Export the summary in the file given by the ENERGY_MODELS_INSTRUMENTATION_FILE environment variable, if any
+        '''
+        file_path = os.environ.get(INSTRUMENTATION_FILE_ENV_VAR)
+        if file_path and self.records:
+            self.export_summary(file_path)
+
+    def register_export_at_exit(self):
+        '''
+        Register the export of the summary at exit, once, when the recording is enabled by the environment variable
+        or by the discipline_instrumentation input
+        '''
+        if not self.export_registered:
+            atexit.register(self.export_summary_at_exit)
+            self.export_registered = True
+
+
+discipline_instrumentation = DisciplineInstrumentation()
+
+
+def instrument_phase(method, phase):
+    '''
+    Wrap a discipline method to record it as phase, calls of the same phase made by a super() call are not recorded
+    '''
+
+    @wraps(method)
+    def instrumented_method(self, *args, **kwargs):
+        if not discipline_instrumentation.enabled:
+            return method(self, *args, **kwargs)
+        running_phases = self.__dict__.setdefault('_running_instrumented_phases', set())
+        if phase in running_phases:
+            return method(self, *args, **kwargs)
+        running_phases.add(phase)
+        try:
+            with discipline_instrumentation.record(getattr(self, 'sos_name', type(self).__name__),
+                                                   type(self).__name__, phase):
+                return method(self, *args, **kwargs)
+        finally:
+            running_phases.discard(phase)
+
+    instrumented_method.instrumented_phase = phase
+    return instrumented_method
+
+
+class InstrumentedDisciplineMixin:
+    """
+    Disciplines with their configure, run, jacobian and post-processing phases recorded
+    by discipline_instrumentation when it is enabled
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for method_name, phase in INSTRUMENTED_PHASES.items():
+            method = cls.__dict__.get(method_name)
+            if method is not None and not hasattr(method, 'instrumented_phase'):
+                setattr(cls, method_name, instrument_phase(method, phase))
+
+
+if os.environ.get(INSTRUMENTATION_ENV_VAR, '0').lower() not in ['', '0', 'false']:
+    discipline_instrumentation.enable(trace_allocations=os.environ[INSTRUMENTATION_ENV_VAR].lower() != 'time')
+    discipline_instrumentation.register_export_at_exit()
@@ -23,6 +23,12 @@ from climateeconomics.sos_wrapping.sos_wrapping_agriculture.agriculture.agricult
     AgricultureMixDiscipline,
 )
 
+from energy_models.core.gradient_registry import (
+    CO2_PER_USE,
+    CONSUMPTION,
+    PRODUCTION,
+    GradientRegistry,
+)
 from energy_models.core.stream_type.base_stream import BaseStream
 from energy_models.core.stream_type.carbon_models.carbon import Carbon
 from energy_models.core.stream_type.carbon_models.carbon_capture import CarbonCapture
@@ -63,7 +69,12 @@ class EnergyGHGEmissions(BaseStream):
         self.CO2_sources = None
         self.CO2_sinks = None
         self.ghg_production_dict = None
-        self.CO2_consumption = None
+        self.ghg_per_use = None
+        self.ghg_by_use = None
+        self.ghg_direct_production = None
+        self.ghg_total = None
+        self.ghg_production_columns = None
+        self.co2_consumption_columns = None
         self.ghg_sources = None
         self.ghg_total_emissions = None
         self.gwp_emissions = None
@@ -128,6 +139,11 @@ class EnergyGHGEmissions(BaseStream):
 
         self.co2_emissions_ccus_Gt = inputs_dict['co2_emissions_ccus_Gt']
 
+        # GHG emitted per use of each energy (ghg x energy x year)
+        self.ghg_per_use = np.array([self.ghg_per_use_dict[ghg][self.energy_list].values.T
+                                     for ghg in self.GHG_TYPE_LIST]).reshape(
+            len(self.GHG_TYPE_LIST), len(self.energy_list), len(self.years))
+
         self.init_dataframe_dict()
 
     def init_dataframe_dict(self):
@@ -136,7 +152,6 @@ class EnergyGHGEmissions(BaseStream):
         self.CO2_sinks = pd.DataFrame({GlossaryEnergy.Years: self.years})
         self.ghg_production_dict = {ghg: pd.DataFrame(
             {GlossaryEnergy.Years: self.years}) for ghg in self.GHG_TYPE_LIST}
-        self.CO2_consumption = pd.DataFrame({GlossaryEnergy.Years: self.years})
         self.ghg_sources = pd.DataFrame({GlossaryEnergy.Years: self.years})
         self.ghg_total_emissions = pd.DataFrame({GlossaryEnergy.Years: self.years})
         self.gwp_emissions = pd.DataFrame({GlossaryEnergy.Years: self.years})
@@ -144,90 +159,108 @@ class EnergyGHGEmissions(BaseStream):
     def compute_ghg_emissions(self):
         '''
         Compute GHG total emissions
+        The emissions of all GHG are stacked in (ghg x stream x year) arrays,
+        the output dataframes are built once at the end of the computation
         '''
-
-        # Aggregate CO2 production and consumption columns from sub_production
-        # and sub_consumption df
-        for energy in self.energy_list:
-            self.aggregate_all_ghg_emissions_in_energy(energy)
-            self.compute_ghg_emissions_by_use(energy)
-
-        for ccs_name in self.ccs_list:
-            self.aggregate_all_ghg_emissions_in_energy(ccs_name)
-
-        self.sum_ghg_emissions_by_use()
+        self.stack_ghg_emissions()
         self.compute_other_co2_emissions()
         self.update_emissions_in_gt()
         self.compute_total_ghg_emissions()
         self.compute_gwp()
+        self.build_ghg_production_dict()
 
-    def sum_ghg_emissions_by_use(self):
-        '''Total CO2 by use 
-        which is the sum of all CO2 emissions emitted by use of net energy production
+    def get_net_production(self, net_production):
         '''
-        for ghg in self.GHG_TYPE_LIST:
-            self.ghg_sources[f'Total {ghg} by use {self.ghg_input_unit}'] = self.ghg_production_dict[ghg][[
-                col for col in self.ghg_production_dict[ghg] if
-                col.endswith(f'{ghg} by use {self.ghg_input_unit}')]].sum(axis=1)
+        Net production of the energies (energy x year)
+        '''
+        return net_production[[f'production {energy} ({GlossaryEnergy.energy_unit})'
+                               for energy in self.energy_list]].values.T
 
-    def compute_other_co2_emissions(self):
-        ''' CO2 from energy mix    
-         CO2 expelled by energy mix technologies during the process 
-         i.e. for machinery or tractors 
+    def stack_ghg_emissions(self):
         '''
-        energy_producing_co2 = self.ghg_production_dict[GlossaryEnergy.CO2][[
-            col for col in self.ghg_production_dict[GlossaryEnergy.CO2] if col.endswith(f'{GlossaryEnergy.carbon_capture} {self.ghg_input_unit}')]]
-        energy_producing_co2_list = [key.replace(
-            f' {GlossaryEnergy.carbon_capture} {self.ghg_input_unit}', '') for key in energy_producing_co2]
-        if len(energy_producing_co2_list) != 0:
-            self.CO2_sources[f'{GlossaryEnergy.carbon_capture} from energy mix {self.ghg_input_unit}'] = energy_producing_co2.sum(
-                axis=1).values
-        else:
-            self.CO2_sources[
-                f'{GlossaryEnergy.carbon_capture} from energy mix {self.ghg_input_unit}'] = 0.0
+        Stack the emissions of the energies and ccs streams :
+            - ghg_by_use (ghg x energy x year) : GHG emitted by use of the net energy production,
+            if the net energy is negative the emissions by use are equal to zero
+            - ghg_direct_production (ghg x stream x year) : GHG produced by the technos of each stream
+        and gather the columns of CO2_list produced and consumed by each stream
+        '''
+        streams = self.energy_list + self.ccs_list
+        ghg_columns = {f'{ghg} {self.ghg_input_unit}': ighg for ighg, ghg in enumerate(self.GHG_TYPE_LIST)}
+
+        self.ghg_by_use = self.ghg_per_use * np.maximum(
+            0.0, self.get_net_production(self.energy_production_detailed))[np.newaxis]
+        # the buffer keeps the dtype of the productions to propagate complex steps
+        self.ghg_direct_production = np.zeros(
+            (len(self.GHG_TYPE_LIST), len(streams), len(self.years)),
+            dtype=np.result_type(self.ghg_by_use, *[self.sub_production_dict[stream].values for stream in streams]))
+
+        # columns of the ghg_production_dict dataframes in their output order
+        self.ghg_production_columns = {ghg: {} for ghg in self.GHG_TYPE_LIST}
+        self.co2_consumption_columns = {}
+        for istream, stream in enumerate(streams):
+            # gather all production columns with a GHG name in it
+            for col, production in self.sub_production_dict[stream].items():
+                if col in self.CO2_list:
+                    self.ghg_production_columns[GlossaryEnergy.CO2][f'{stream} {col}'] = production.values
+                elif col in ghg_columns:
+                    ighg = ghg_columns[col]
+                    self.ghg_direct_production[ighg, istream] = production.values
+                    self.ghg_production_columns[self.GHG_TYPE_LIST[ighg]][f'{stream} {col}'] = \
+                        self.ghg_direct_production[ighg, istream]
+            # gather all consumption columns with a CO2 name in it
+            # other green house gases are not consumed in energy mix for now
+            if stream in self.sub_consumption_dict:
+                for col, consumption in self.sub_consumption_dict[stream].items():
+                    if col in self.CO2_list:
+                        self.co2_consumption_columns[f'{stream} {col}'] = consumption.values
+            if istream < len(self.energy_list):
+                for ighg, ghg in enumerate(self.GHG_TYPE_LIST):
+                    self.ghg_production_columns[ghg][f'{stream} {ghg} by use {self.ghg_input_unit}'] = \
+                        self.ghg_by_use[ighg, istream]
+
+        # Total GHG by use which is the sum of all GHG emissions emitted by use of net energy production
+        self.ghg_sources = pd.DataFrame(
+            {GlossaryEnergy.Years: self.years,
+             **{f'Total {ghg} by use {self.ghg_input_unit}': ghg_by_use
+                for ghg, ghg_by_use in zip(self.GHG_TYPE_LIST, self.ghg_by_use.sum(axis=1))}})
+
+    def sum_co2_columns(self, co2_columns, suffix):
+        '''
+        Sum of the CO2 columns ending with suffix, 0.0 if there is none
+        '''
+        values = [value for col, value in co2_columns.items() if col.endswith(suffix)]
+        if len(values) != 0:
+            return np.sum(values, axis=0)
+        return 0.0
 
-        ''' CARBON CAPTURE from energy mix
+    def compute_other_co2_emissions(self):
+        '''
+        CARBON CAPTURE from energy mix
         Total carbon capture from energy mix if the technology offers carbon_capture
          Ex : upgrading biogas technology is the same as Amine Scrubbing but
          on a different gas (biogas for upgrading biogas and flue gas for
          Amien scrubbing)
-        '''
-        energy_producing_carbon_capture = self.ghg_production_dict[GlossaryEnergy.CO2][[
-            col for col in self.ghg_production_dict[GlossaryEnergy.CO2] if
-            col.endswith(f'{GlossaryEnergy.carbon_capture} {self.ghg_input_unit}')]]
-        energy_producing_carbon_capture_list = [key.replace(
-            f' {GlossaryEnergy.carbon_capture} {self.ghg_input_unit}', '') for key in energy_producing_carbon_capture]
-        if len(energy_producing_carbon_capture_list) != 0:
-            self.CO2_sources[
-                f'{GlossaryEnergy.carbon_capture} from energy mix {self.ghg_input_unit}'] = energy_producing_carbon_capture.sum(
-                axis=1).values
-        else:
-            self.CO2_sources[
-                f'{GlossaryEnergy.carbon_capture} from energy mix {self.ghg_input_unit}'] = 0.0
-
-        ''' CO2 removed by energy mix
-         CO2 removed by energy mix technologies during the process 
+        CO2 removed by energy mix
+         CO2 removed by energy mix technologies during the process
          i.e. biomass processes as managed wood or crop energy
-        '''
-        energy_removing_co2 = self.CO2_consumption[[
-            col for col in self.CO2_consumption if col.endswith(f'{GlossaryEnergy.carbon_capture} {self.ghg_input_unit}')]]
-        energy_removing_co2_list = [key.replace(
-            f' {GlossaryEnergy.carbon_capture} {self.ghg_input_unit}', '') for key in energy_removing_co2]
-        if len(energy_removing_co2_list) != 0:
-            self.CO2_sinks[f'{GlossaryEnergy.carbon_capture} removed by energy mix {self.ghg_input_unit}'] = energy_removing_co2.sum(
-                axis=1).values
-        else:
-            self.CO2_sinks[
-                f'{GlossaryEnergy.carbon_capture} removed by energy mix {self.ghg_input_unit}'] = 0.0
-
-        ''' Total C02 from Flue gas 
+        Total C02 from Flue gas
             sum of all production of flue gas
             it could be equal to carbon capture from CC technos if enough investment but not sure
         '''
-        self.CO2_sources[f'Total {CarbonCapture.flue_gas_name} {self.ghg_input_unit}'] = \
-        self.ghg_production_dict[GlossaryEnergy.CO2][[
-            col for col in self.ghg_production_dict[GlossaryEnergy.CO2] if
-            col.endswith(f'{CarbonCapture.flue_gas_name} {self.ghg_input_unit}')]].sum(axis=1)
+        co2_production_columns = self.ghg_production_columns[GlossaryEnergy.CO2]
+        carbon_capture_suffix = f'{GlossaryEnergy.carbon_capture} {self.ghg_input_unit}'
+        flue_gas_production = self.sum_co2_columns(co2_production_columns,
+                                                   f'{CarbonCapture.flue_gas_name} {self.ghg_input_unit}')
+        self.CO2_sources = pd.DataFrame(
+            {GlossaryEnergy.Years: self.years,
+             f'{GlossaryEnergy.carbon_capture} from energy mix {self.ghg_input_unit}':
+                 self.sum_co2_columns(co2_production_columns, carbon_capture_suffix),
+             f'Total {CarbonCapture.flue_gas_name} {self.ghg_input_unit}':
+                 np.zeros(len(self.years)) + flue_gas_production})
+        self.CO2_sinks = pd.DataFrame(
+            {GlossaryEnergy.Years: self.years,
+             f'{GlossaryEnergy.carbon_capture} removed by energy mix {self.ghg_input_unit}':
+                 self.sum_co2_columns(self.co2_consumption_columns, carbon_capture_suffix)})
 
     def update_emissions_in_gt(self):
         # update values to Gt
@@ -248,95 +281,62 @@ class EnergyGHGEmissions(BaseStream):
 
         return self.CO2_sources_Gt, self.CO2_sinks_Gt
 
-    def aggregate_all_ghg_emissions_in_energy(self, energy):
-
-        if energy in self.sub_production_dict:
-            # gather all production columns with a CO2 name in it
-            for col, production in self.sub_production_dict[energy].items():
-                if col in self.CO2_list:
-                    self.ghg_production_dict[GlossaryEnergy.CO2][f'{energy} {col}'] = production.values
-                else:
-                    for ghg in self.GHG_TYPE_LIST:
-                        if col == f'{ghg} {self.ghg_input_unit}':
-                            self.ghg_production_dict[ghg][f'{energy} {col}'] = production.values
-        # gather all consumption columns with a CO2 name in it
-        # other green house gases are not consumed in energy mix for now
-        if energy in self.sub_consumption_dict:
-            for col, consumption in self.sub_consumption_dict[energy].items():
-                if col in self.CO2_list:
-                    self.CO2_consumption[f'{energy} {col}'] = consumption.values
-
-    # , co2_emissions):
-
-    def compute_ghg_emissions_by_use(self, energy):
-        # Compute the CO2 emitted during the use of the net energy
-        # If net energy is negative, CO2 by use is equals to zero
-        for ghg in self.GHG_TYPE_LIST:
-            if energy in self.ghg_per_use_dict[ghg]:
-                self.ghg_production_dict[ghg][f'{energy} {ghg} by use {self.ghg_input_unit}'] = \
-                self.ghg_per_use_dict[ghg][energy] * np.maximum(
-                    0.0, self.energy_production_detailed[f'production {energy} ({GlossaryEnergy.energy_unit})'].values)
-
     def compute_total_ghg_emissions(self):
         """
-        Compute total GHG emissions
+        Compute total GHG emissions (ghg x year) in Gt
+        The CO2 emissions are the sources and the emissions by use minus the sinks,
+        the other GHG emissions are their production and emissions by use
         """
-
-        # drop years column in new dataframe
-        co2_sources_wo_years = self.CO2_sources_Gt.drop(
-            GlossaryEnergy.Years, axis=1)
-
         # sum all co2 sources using the wo years dataframe
-        sum_sources = co2_sources_wo_years.sum(axis=1).values
-
-        # get unique column in serie format
-        limited_by_capture_wo_years = self.co2_emissions_ccus_Gt.drop(
-            GlossaryEnergy.Years, axis=1).iloc[:, 0].values
-        needed_by_energy_mix_wo_years = self.co2_emissions_needed_by_energy_mix.drop(
-            GlossaryEnergy.Years, axis=1).iloc[:, 0].values
-        sinks_df = self.CO2_sinks_Gt.drop(
-            GlossaryEnergy.Years, axis=1).iloc[:, 0].values
+        sum_sources = self.CO2_sources_Gt.drop(GlossaryEnergy.Years, axis=1).values.sum(axis=1)
 
-        sum_sinks = limited_by_capture_wo_years + \
-                    needed_by_energy_mix_wo_years + sinks_df
+        # get unique column of each sink
+        sum_sinks = np.sum([df.drop(GlossaryEnergy.Years, axis=1).iloc[:, 0].values
+                            for df in [self.co2_emissions_ccus_Gt, self.co2_emissions_needed_by_energy_mix,
+                                       self.CO2_sinks_Gt]], axis=0)
 
-        total_CO2_emissions = sum_sources + \
-                              self.ghg_sources[f'Total CO2 by use {self.ghg_input_unit}'].values / \
-                              1e3 - sum_sinks
+        ico2 = self.GHG_TYPE_LIST.index(GlossaryEnergy.CO2)
+        total_co2 = sum_sources + self.ghg_by_use[ico2].sum(axis=0) / 1e3 - sum_sinks
+        self.ghg_total = ((self.ghg_direct_production.sum(axis=1) + self.ghg_by_use.sum(axis=1)) / 1e3).astype(
+            np.result_type(self.ghg_direct_production, total_co2), copy=False)
+        self.ghg_total[ico2] = total_co2
 
-        total_n2O_emissions = self.ghg_production_dict['N2O'].drop(
-            GlossaryEnergy.Years, axis=1).sum(axis=1).values
-
-        total_ch4_emissions = self.ghg_production_dict['CH4'].drop(
-            GlossaryEnergy.Years, axis=1).sum(axis=1).values
-
-        self.ghg_total_emissions['Total CO2 emissions'] = total_CO2_emissions
-        self.ghg_total_emissions['Total N2O emissions'] = total_n2O_emissions / 1e3
-        self.ghg_total_emissions['Total CH4 emissions'] = total_ch4_emissions / 1e3
+        self.ghg_total_emissions = pd.DataFrame(
+            {GlossaryEnergy.Years: self.years,
+             **{GlossaryCore.insertGHGTotalEmissions.format(ghg): self.ghg_total[self.GHG_TYPE_LIST.index(ghg)]
+                for ghg in [GlossaryEnergy.CO2, 'N2O', 'CH4']}})
 
     def compute_gwp(self):
+        '''
+        Global warming potential at 20 and 100 years of the total emissions of each GHG
+        '''
+        gwp_20 = np.array([self.gwp_20[ghg] for ghg in self.GHG_TYPE_LIST])[:, np.newaxis] * self.ghg_total
+        gwp_100 = np.array([self.gwp_100[ghg] for ghg in self.GHG_TYPE_LIST])[:, np.newaxis] * self.ghg_total
+        gwp_columns = {GlossaryEnergy.Years: self.years}
+        for ighg, ghg in enumerate(self.GHG_TYPE_LIST):
+            gwp_columns[f'{ghg}_20'] = gwp_20[ighg]
+            gwp_columns[f'{ghg}_100'] = gwp_100[ighg]
+        self.gwp_emissions = pd.DataFrame(gwp_columns)
+
+    def build_ghg_production_dict(self):
+        '''
+        GHG emissions of each stream, one dataframe per GHG
+        '''
+        self.ghg_production_dict = {ghg: pd.DataFrame({GlossaryEnergy.Years: self.years,
+                                                       **self.ghg_production_columns[ghg]})
+                                    for ghg in self.GHG_TYPE_LIST}
 
-        for ghg in self.GHG_TYPE_LIST:
-            self.gwp_emissions[f'{ghg}_20'] = self.ghg_total_emissions[GlossaryCore.insertGHGTotalEmissions.format(ghg)] * self.gwp_20[ghg]
-            self.gwp_emissions[f'{ghg}_100'] = self.ghg_total_emissions[GlossaryCore.insertGHGTotalEmissions.format(ghg)] * self.gwp_100[ghg]
-
-    def compute_grad_total_co2_emissions(self, net_production):
-
-        dtot_CO2_emissions = {}
-        for energy in self.energy_list:
-            net_prod = net_production[
-                f'production {energy} ({GlossaryEnergy.energy_unit})'].values
+    def compute_grad_total_ghg_emissions(self, net_production):
+        '''
+        Gradient of the total emissions of each GHG wrt the net production of each energy (ghg x energy x year)
+        '''
+        net_prod = self.get_net_production(net_production)
 
-            # Specific case when net prod is equal to zero
-            # if we increase the prod of an energy the net prod will react
-            # however if we decrease the cons it does nothing
-            net_prod_sign = net_prod.copy()
-            net_prod_sign[net_prod_sign == 0] = 1
-            for ghg in self.GHG_TYPE_LIST:
-                dtot_CO2_emissions[f'Total {ghg} emissions vs prod{energy}'] = self.ghg_per_use_dict[ghg][
-                                                                                   energy].values * \
-                                                                               np.maximum(0, np.sign(net_prod_sign))
-        return dtot_CO2_emissions
+        # Specific case when net prod is equal to zero
+        # if we increase the prod of an energy the net prod will react
+        # however if we decrease the cons it does nothing
+        net_prod_sign = np.where(net_prod == 0, 1, net_prod)
+        return self.ghg_per_use * np.maximum(0, np.sign(net_prod_sign))[np.newaxis]
 
     def compute_grad_CO2_emissions_sources(self, net_production):
         '''
@@ -348,7 +348,7 @@ class EnergyGHGEmissions(BaseStream):
         co2_production = pd.DataFrame({GlossaryEnergy.Years: self.years})
         co2_consumption = pd.DataFrame({GlossaryEnergy.Years: self.years})
 
-        dtot_CO2_emissions = {}
+        dtot_CO2_emissions = GradientRegistry()
         # Do not loop over carbon capture and carbon storage which will be
         # handled differently
         for energy in self.energy_list:
@@ -367,8 +367,7 @@ class EnergyGHGEmissions(BaseStream):
             net_prod = net_production[
                 f'production {energy} ({GlossaryEnergy.energy_unit})'].values
 
-            dtot_CO2_emissions[f'Total CO2 by use (Gt) vs {energy}#co2_per_use'] = np.maximum(
-                0, net_prod)
+            dtot_CO2_emissions.add('Total CO2 by use (Gt)', energy, CO2_PER_USE, np.maximum(0, net_prod))
 
             # Specific case when net prod is equal to zero
             # if we increase the prod of an energy the net prod will react
@@ -376,9 +375,8 @@ class EnergyGHGEmissions(BaseStream):
             net_prod_sign = net_prod.copy()
             net_prod_sign[net_prod_sign == 0] = 1
             for ghg in self.GHG_TYPE_LIST:
-                dtot_CO2_emissions[f'Total {ghg} by use (Gt) vs {energy}#prod'] = self.ghg_per_use_dict[ghg][
-                                                                                      energy].values * \
-                                                                                  np.maximum(0, np.sign(net_prod_sign))
+                dtot_CO2_emissions.add(f'Total {ghg} by use (Gt)', energy, PRODUCTION,
+                                       self.ghg_per_use_dict[ghg][energy].values * np.maximum(0, np.sign(net_prod_sign)))
 
         for energy in self.ccs_list:
             for col, production in self.sub_production_dict[energy].items():
@@ -396,9 +394,9 @@ class EnergyGHGEmissions(BaseStream):
             f' {GlossaryEnergy.carbon_capture} {self.ghg_input_unit}', '') for key in energy_producing_carbon_capture]
         if len(energy_producing_carbon_capture_list) != 0:
             for energy1 in energy_producing_carbon_capture_list:
-                dtot_CO2_emissions[
-                    f'{GlossaryEnergy.carbon_capture} from energy mix (Mt) vs {energy1}#{GlossaryEnergy.carbon_capture} {self.ghg_input_unit}#prod'] = np.ones(
-                    len_years)
+                dtot_CO2_emissions.add(
+                    f'{GlossaryEnergy.carbon_capture} from energy mix (Mt)', energy1, PRODUCTION, np.ones(len_years),
+                    column=f'{GlossaryEnergy.carbon_capture} {self.ghg_input_unit}')
         #             self.total_co2_emissions[f'{GlossaryEnergy.carbon_capture} from energy mix {self.ghg_input_unit}'] = energy_producing_carbon_capture.sum(
         #                 axis=1).values
         #         else:
@@ -415,9 +413,9 @@ class EnergyGHGEmissions(BaseStream):
             f' {GlossaryEnergy.carbon_capture} {self.ghg_input_unit}', '') for key in energy_producing_co2]
         if len(energy_producing_co2_list) != 0:
             for energy1 in energy_producing_co2_list:
-                dtot_CO2_emissions[
-                    f'{GlossaryEnergy.carbon_capture} from energy mix (Mt) vs {energy1}#{GlossaryEnergy.carbon_capture} {self.ghg_input_unit}#prod'] = np.ones(
-                    len_years)
+                dtot_CO2_emissions.add(
+                    f'{GlossaryEnergy.carbon_capture} from energy mix (Mt)', energy1, PRODUCTION, np.ones(len_years),
+                    column=f'{GlossaryEnergy.carbon_capture} {self.ghg_input_unit}')
 
         #             self.total_co2_emissions[f'{GlossaryEnergy.carbon_capture} from energy mix {self.ghg_input_unit}'] = energy_producing_co2.sum(
         #                 axis=1).values
@@ -435,9 +433,9 @@ class EnergyGHGEmissions(BaseStream):
             f' {GlossaryEnergy.carbon_capture} {self.ghg_input_unit}', '') for key in energy_removing_co2]
         if len(energy_removing_co2_list) != 0:
             for energy1 in energy_removing_co2_list:
-                dtot_CO2_emissions[
-                    f'{GlossaryEnergy.carbon_capture} removed by energy mix (Mt) vs {energy1}#{GlossaryEnergy.carbon_capture} {self.ghg_input_unit}#cons'] = np.ones(
-                    len_years)
+                dtot_CO2_emissions.add(
+                    f'{GlossaryEnergy.carbon_capture} removed by energy mix (Mt)', energy1, CONSUMPTION, np.ones(len_years),
+                    column=f'{GlossaryEnergy.carbon_capture} {self.ghg_input_unit}')
         #             self.total_co2_emissions[f'{GlossaryEnergy.carbon_capture} removed by energy mix {self.ghg_input_unit}'] = energy_removing_co2.sum(
         #                 axis=1).values
         #         else:
@@ -456,9 +454,9 @@ class EnergyGHGEmissions(BaseStream):
             if col.endswith(f'{CarbonCapture.flue_gas_name} {self.ghg_input_unit}'):
                 energy1 = col.replace(
                     f' {CarbonCapture.flue_gas_name} {self.ghg_input_unit}', '')
-                dtot_CO2_emissions[
-                    f'Total {CarbonCapture.flue_gas_name} ({GlossaryEnergy.mass_unit}) vs {energy1}#{CarbonCapture.flue_gas_name} {self.ghg_input_unit}#prod'] = np.ones(
-                    len_years)
+                dtot_CO2_emissions.add(
+                    f'Total {CarbonCapture.flue_gas_name} ({GlossaryEnergy.mass_unit})', energy1, PRODUCTION, np.ones(len_years),
+                    column=f'{CarbonCapture.flue_gas_name} {self.ghg_input_unit}')
 
         return dtot_CO2_emissions
 
@@ -473,7 +471,7 @@ class EnergyGHGEmissions(BaseStream):
         co2_production = pd.DataFrame({GlossaryEnergy.Years: self.years})
         co2_consumption = pd.DataFrame({GlossaryEnergy.Years: self.years})
 
-        dtot_CO2_emissions = {}
+        dtot_CO2_emissions = GradientRegistry()
         # Do not loop over carbon capture and carbon storage which will be
         # handled differently
         for energy in self.energy_list:
@@ -500,8 +498,8 @@ class EnergyGHGEmissions(BaseStream):
             f' {GlossaryEnergy.carbon_capture} {self.ghg_input_unit}', '') for key in energy_removing_co2]
         if len(energy_removing_co2_list) != 0:
             for energy1 in energy_removing_co2_list:
-                dtot_CO2_emissions[
-                    f'{GlossaryEnergy.carbon_capture} removed by energy mix (Mt) vs {energy1}#{GlossaryEnergy.carbon_capture} {self.ghg_input_unit}#cons'] = np.ones(
-                    len_years)
+                dtot_CO2_emissions.add(
+                    f'{GlossaryEnergy.carbon_capture} removed by energy mix (Mt)', energy1, CONSUMPTION, np.ones(len_years),
+                    column=f'{GlossaryEnergy.carbon_capture} {self.ghg_input_unit}')
 
         return dtot_CO2_emissions
@@ -36,15 +36,26 @@ from sostrades_core.tools.post_processing.charts.two_axes_instanciated_chart imp
 )
 
 from energy_models.core.ccus.ccus import CCUS
+from energy_models.core.discipline_instrumentation import InstrumentedDisciplineMixin
 from energy_models.core.energy_ghg_emissions.energy_ghg_emissions import (
     EnergyGHGEmissions,
 )
 from energy_models.core.energy_mix.energy_mix import EnergyMix
+from energy_models.core.gradient_registry import (
+    CO2_PER_USE,
+    PRODUCTION,
+    GradientKey,
+    get_consumer_ns_streams,
+)
+from energy_models.core.jacobian_blocks import (
+    DiagonalJacobianBlock,
+    VectorJacobianProductMixin,
+)
 from energy_models.core.stream_type.energy_models.biomass_dry import BiomassDry
 from energy_models.glossaryenergy import GlossaryEnergy
 
 
-class EnergyGHGEmissionsDiscipline(SoSWrapp):
+class EnergyGHGEmissionsDiscipline(VectorJacobianProductMixin, InstrumentedDisciplineMixin, SoSWrapp):
     # ontology information
     _ontology_data = {
         'label': 'Energy GHG emissions Model',
@@ -225,104 +236,41 @@ class EnergyGHGEmissionsDiscipline(SoSWrapp):
         dtot_co2_emissions_sources = self.model.compute_grad_CO2_emissions_sources(
             energy_production_detailed)
 
-        for key, value in dtot_co2_emissions_sources.items():
-            co2_emission_column = key.split(' vs ')[0]
-            energy_prod_info = key.split(' vs ')[1]
-            energy = energy_prod_info.split('#')[0]
-            last_part_key = energy_prod_info.split('#')[1]
-            if co2_emission_column in CO2_emissions_sources.columns and energy in energy_list:
-                ns_energy = energy
-                if energy == BiomassDry.name:
-                    ns_energy = AgricultureMixDiscipline.name
-                if last_part_key == 'prod':
-                    if 'Total CO2 by use' in co2_emission_column:
-                        self.set_partial_derivative_for_other_types(
-                            ('CO2_emissions_sources', co2_emission_column),
-                            (GlossaryEnergy.StreamProductionDetailedValue, f'production {energy} ({GlossaryEnergy.energy_unit})'),
-                            np.identity(len(years)) * value / 1e3)
-                    else:
-                        self.set_partial_derivative_for_other_types(
-                            ('CO2_emissions_sources', co2_emission_column),
-                            (f'{ns_energy}.{GlossaryEnergy.EnergyProductionValue}', energy),
-                            np.identity(len(years)) * scaling_factor_energy_production * value / 1e3)
-                elif last_part_key == 'cons':
-                    for energy_df in energy_list:
-                        list_columnsenergycons = list(
-                            inputs_dict[f'{energy_df}.{GlossaryEnergy.StreamConsumptionValue}'].columns)
-                        if f'{energy} ({GlossaryEnergy.energy_unit})' in list_columnsenergycons:
-                            self.set_partial_derivative_for_other_types(
-                                ('CO2_emissions_sources', co2_emission_column),
-                                (f'{energy_df}.{GlossaryEnergy.StreamConsumptionValue}', f'{energy} ({GlossaryEnergy.energy_unit})'),
-                                np.identity(len(years)) * scaling_factor_energy_consumption * value / 1e3)
-
-                else:
-                    very_last_part_key = energy_prod_info.split('#')[2]
-                    if very_last_part_key == 'prod':
-                        self.set_partial_derivative_for_other_types(
-                            ('CO2_emissions_sources', co2_emission_column),
-                            (f'{ns_energy}.{GlossaryEnergy.EnergyProductionValue}', last_part_key),
-                            np.identity(len(years)) * scaling_factor_energy_production * value / 1e3)
-                        self.set_partial_derivative_for_other_types(
-                            ('GHG_total_energy_emissions', 'Total CO2 emissions'),
-                            (f'{ns_energy}.{GlossaryEnergy.EnergyProductionValue}', last_part_key),
-                            np.identity(len(years)) * scaling_factor_energy_production * value / 1e3)
-                    elif very_last_part_key == 'cons':
-                        self.set_partial_derivative_for_other_types(
-                            ('CO2_emissions_sources', co2_emission_column),
-                            (f'{ns_energy}.{GlossaryEnergy.StreamConsumptionValue}', last_part_key),
-                            np.identity(len(years)) * scaling_factor_energy_production * value / 1e3)
-                        self.set_partial_derivative_for_other_types(
-                            ('GHG_total_energy_emissions', 'Total CO2 emissions'),
-                            (f'{ns_energy}.{GlossaryEnergy.StreamConsumptionValue}', last_part_key),
-                            np.identity(len(years)) * scaling_factor_energy_production * value / 1e3)
-
-            elif co2_emission_column in CO2_emissions_sources.columns and energy in ccs_list:
-                ns_energy = energy
-                if last_part_key not in ['co2_per_use', 'cons', 'prod']:
-                    very_last_part_key = energy_prod_info.split('#')[2]
-                    if very_last_part_key == 'prod':
-                        self.set_partial_derivative_for_other_types(
-                            ('CO2_emissions_sources', co2_emission_column),
-                            (f'{ns_energy}.{GlossaryEnergy.EnergyProductionValue}', last_part_key),
-                            np.identity(len(years)) * scaling_factor_energy_production * value / 1e3)
-                        self.set_partial_derivative_for_other_types(
-                            ('GHG_total_energy_emissions', 'Total CO2 emissions'),
-                            (f'{ns_energy}.{GlossaryEnergy.EnergyProductionValue}', last_part_key),
-                            np.identity(len(years)) * scaling_factor_energy_production * value / 1e3)
-
-        dtot_co2_emissions = self.model.compute_grad_total_co2_emissions(
+        # namespaces of the stream inputs and of the streams consuming each energy, computed once for all gradients
+        ns_streams = {energy: energy for energy in energy_list + ccs_list}
+        if BiomassDry.name in energy_list:
+            ns_streams[BiomassDry.name] = AgricultureMixDiscipline.name
+        consumer_ns_streams = get_consumer_ns_streams(
+            {energy: inputs_dict[f'{energy}.{GlossaryEnergy.StreamConsumptionValue}'] for energy in energy_list},
+            lambda energy: energy)
+
+        self.set_partial_derivatives_co2_emissions(
+            'CO2_emissions_sources', CO2_emissions_sources.columns, dtot_co2_emissions_sources, ns_streams,
+            consumer_ns_streams, scaling_factor_energy_production, scaling_factor_energy_consumption,
+            total_co2_sign=1.0, column_only_streams=set(ccs_list) - set(energy_list))
+
+        # gradients of the total emissions of each GHG wrt the net production of each energy (ghg x energy x year)
+        dtot_ghg_emissions = self.model.compute_grad_total_ghg_emissions(
             energy_production_detailed)
 
-        for energy in energy_list:
+        for ienergy, energy in enumerate(energy_list):
             max_prod_grad = dtot_co2_emissions_sources[
-                f'Total CO2 by use (Gt) vs {energy}#co2_per_use']
-            if energy == GlossaryEnergy.biomass_dry:
-                for ghg in self.model.GHG_TYPE_LIST:
-                    self.set_partial_derivative_for_other_types(
-                        ('GHG_total_energy_emissions', GlossaryCore.insertGHGTotalEmissions.format(ghg)),
-                        (f'{AgricultureMixDiscipline.name}.{ghg}_per_use', f'{ghg}_per_use'),
-                        np.identity(len(years)) * max_prod_grad / 1e3)
-            else:
-                for ghg in self.model.GHG_TYPE_LIST:
-                    self.set_partial_derivative_for_other_types(
-                        ('GHG_total_energy_emissions', GlossaryCore.insertGHGTotalEmissions.format(ghg)),
-                        (f'{energy}.{ghg}_per_use', f'{ghg}_per_use'),
-                        np.identity(len(years)) * max_prod_grad / 1e3)
-            for ghg in self.model.GHG_TYPE_LIST:
-                value = dtot_co2_emissions[f'Total {ghg} emissions vs prod{energy}']
+                GradientKey('Total CO2 by use (Gt)', energy, CO2_PER_USE)]
+            for ighg, ghg in enumerate(self.model.GHG_TYPE_LIST):
+                self.set_partial_derivative_for_other_types(
+                    ('GHG_total_energy_emissions', GlossaryCore.insertGHGTotalEmissions.format(ghg)),
+                    (f'{ns_streams[energy]}.{ghg}_per_use', f'{ghg}_per_use'),
+                    DiagonalJacobianBlock(max_prod_grad / 1e3))
                 self.set_partial_derivative_for_other_types(
                     ('GHG_total_energy_emissions', GlossaryCore.insertGHGTotalEmissions.format(ghg)),
                     (GlossaryEnergy.StreamProductionDetailedValue, f'production {energy} ({GlossaryEnergy.energy_unit})'),
-                    np.identity(len(years)) * value / 1e3)
-            ns_energy = energy
-            if energy == GlossaryEnergy.biomass_dry:
-                ns_energy = AgricultureMixDiscipline.name
+                    DiagonalJacobianBlock(dtot_ghg_emissions[ighg, ienergy] / 1e3))
             for col in self.model.sub_production_dict[energy].keys():
                 for ghg in self.model.GHG_TYPE_LIST:
                     if col == f'{ghg} {self.model.ghg_input_unit}':
                         self.set_partial_derivative_for_other_types(
                             ('GHG_total_energy_emissions', GlossaryCore.insertGHGTotalEmissions.format(ghg)),
-                            (f'{ns_energy}.{GlossaryEnergy.EnergyProductionValue}', col),
+                            (f'{ns_streams[energy]}.{GlossaryEnergy.EnergyProductionValue}', col),
                             np.identity(len(years)))
 
         # ------------------------------------#
@@ -330,54 +278,11 @@ class EnergyGHGEmissionsDiscipline(SoSWrapp):
         # ------------------------------------#
         dtot_co2_emissions_sinks = self.model.compute_grad_CO2_emissions_sinks()
 
-        for key, value in dtot_co2_emissions_sinks.items():
-            co2_emission_column = key.split(' vs ')[0]
-            energy_prod_info = key.split(' vs ')[1]
-            energy = energy_prod_info.split('#')[0]
-            last_part_key = energy_prod_info.split('#')[1]
-            if co2_emission_column in CO2_emissions_sinks.columns and energy in energy_list:
-                ns_energy = energy
-                if energy == BiomassDry.name:
-                    ns_energy = AgricultureMixDiscipline.name
-                if last_part_key == 'prod':
-                    self.set_partial_derivative_for_other_types(
-                        ('CO2_emissions_sinks', co2_emission_column),
-                        (f'{ns_energy}.{GlossaryEnergy.EnergyProductionValue}', energy),
-                        np.identity(len(years)) * scaling_factor_energy_production * value / 1e3)
-                elif last_part_key == 'cons':
-                    for energy_df in energy_list:
-                        list_columnsenergycons = list(
-                            inputs_dict[f'{energy_df}.{GlossaryEnergy.StreamConsumptionValue}'].columns)
-                        if f'{energy} ({GlossaryEnergy.energy_unit})' in list_columnsenergycons:
-                            self.set_partial_derivative_for_other_types(
-                                ('CO2_emissions_sinks', co2_emission_column),
-                                (f'{energy_df}.{GlossaryEnergy.StreamConsumptionValue}', f'{energy} ({GlossaryEnergy.energy_unit})'),
-                                np.identity(len(years)) * scaling_factor_energy_consumption * value / 1e3)
-                elif last_part_key == 'co2_per_use':
-                    self.set_partial_derivative_for_other_types(
-                        ('CO2_emissions_sinks', co2_emission_column),
-                        (f'{ns_energy}.{GlossaryEnergy.CO2PerUse}', GlossaryEnergy.CO2PerUse),
-                        np.identity(len(years)) * value / 1e3)
-                else:
-                    very_last_part_key = energy_prod_info.split('#')[2]
-                    if very_last_part_key == 'prod':
-                        self.set_partial_derivative_for_other_types(
-                            ('CO2_emissions_sinks', co2_emission_column),
-                            (f'{ns_energy}.{GlossaryEnergy.EnergyProductionValue}', last_part_key),
-                            np.identity(len(years)) * scaling_factor_energy_production * value / 1e3)
-                        self.set_partial_derivative_for_other_types(
-                            ('GHG_total_energy_emissions', 'Total CO2 emissions'),
-                            (f'{ns_energy}.{GlossaryEnergy.EnergyProductionValue}', last_part_key),
-                            -np.identity(len(years)) * scaling_factor_energy_production * value / 1e3)
-                    elif very_last_part_key == 'cons':
-                        self.set_partial_derivative_for_other_types(
-                            ('CO2_emissions_sinks', co2_emission_column),
-                            (f'{ns_energy}.{GlossaryEnergy.StreamConsumptionValue}', last_part_key),
-                            np.identity(len(years)) * scaling_factor_energy_production * value / 1e3)
-                        self.set_partial_derivative_for_other_types(
-                            ('GHG_total_energy_emissions', 'Total CO2 emissions'),
-                            (f'{ns_energy}.{GlossaryEnergy.StreamConsumptionValue}', last_part_key),
-                            -np.identity(len(years)) * scaling_factor_energy_production * value / 1e3)
+        sinks_ns_streams = {energy: ns_streams[energy] for energy in energy_list}
+        self.set_partial_derivatives_co2_emissions(
+            'CO2_emissions_sinks', CO2_emissions_sinks.columns, dtot_co2_emissions_sinks, sinks_ns_streams,
+            consumer_ns_streams, scaling_factor_energy_production, scaling_factor_energy_consumption,
+            total_co2_sign=-1.0)
         self.set_partial_derivative_for_other_types(
             ('GHG_total_energy_emissions', 'Total CO2 emissions'),
             ('co2_emissions_ccus_Gt', 'carbon_storage Limited by capture (Gt)'),
@@ -387,6 +292,35 @@ class EnergyGHGEmissionsDiscipline(SoSWrapp):
             ('co2_emissions_needed_by_energy_mix', 'carbon_capture needed by energy mix (Gt)'),
             -np.identity(len(years)))
 
+    def set_partial_derivatives_co2_emissions(self, co2_variable, co2_emissions_columns, gradient_registry,
+                                              ns_streams, consumer_ns_streams, scaling_factor_energy_production,
+                                              scaling_factor_energy_consumption, total_co2_sign,
+                                              column_only_streams=()):
+        '''
+        Set the gradients of the registry for the columns of co2_variable, the gradients wrt a column of a stream
+        input are also gradients of the total CO2 emissions with total_co2_sign
+        :param ns_streams: dict {stream: namespace of its inputs} of the streams whose gradients are set
+        :param column_only_streams: streams with only their gradients wrt a production column set
+        '''
+        for key, diagonal in gradient_registry.items():
+            if key.output not in co2_emissions_columns or key.stream not in ns_streams:
+                continue
+            if key.stream in column_only_streams and (key.column is None or key.input != PRODUCTION):
+                continue
+            if key.input == PRODUCTION and key.column is None and 'Total CO2 by use' in key.output:
+                self.set_partial_derivative_for_other_types(
+                    (co2_variable, key.output),
+                    (GlossaryEnergy.StreamProductionDetailedValue, f'production {key.stream} ({GlossaryEnergy.energy_unit})'),
+                    DiagonalJacobianBlock(diagonal / 1e3))
+                continue
+            for x_key_column, block in gradient_registry.get_input_blocks(
+                    key, ns_streams[key.stream], consumer_ns_streams, scaling_factor_energy_production,
+                    scaling_factor_energy_consumption):
+                self.set_partial_derivative_for_other_types((co2_variable, key.output), x_key_column, block)
+                if key.column is not None:
+                    self.set_partial_derivative_for_other_types(
+                        ('GHG_total_energy_emissions', 'Total CO2 emissions'), x_key_column, block * total_co2_sign)
+
     def get_chart_filter_list(self):
 
         chart_filters = []
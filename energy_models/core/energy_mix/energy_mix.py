@@ -22,11 +22,21 @@ import pandas as pd
 from climateeconomics.sos_wrapping.sos_wrapping_agriculture.agriculture.agriculture_mix_disc import (
     AgricultureMixDiscipline,
 )
-from sostrades_core.tools.base_functions.exp_min import compute_func_with_exp_min
+from sostrades_core.tools.base_functions.exp_min import (
+    compute_dfunc_with_exp_min,
+    compute_func_with_exp_min,
+)
 from sostrades_optimization_plugins.tools.cst_manager.func_manager_common import (
     smooth_maximum,
 )
 
+from energy_models.core.energy_mix.stream_flow_matrix import StreamFlowMatrix
+from energy_models.core.fingerprint import compute_input_fingerprint
+from energy_models.core.gradient_registry import (
+    CONSUMPTION,
+    PRODUCTION,
+    GradientRegistry,
+)
 from energy_models.core.stream_type.base_stream import BaseStream
 from energy_models.core.stream_type.carbon_models.carbon import Carbon
 from energy_models.core.stream_type.carbon_models.carbon_capture import CarbonCapture
@@ -132,6 +142,49 @@ class EnergyMix(BaseStream):
     movable_fuel_list = [liquidHydrogen_name,
                          LiquidFuel.name, BioDiesel.name, Methane.name]
 
+    # sub-steps of compute with the variables of the streams they read ({stream}.{variable} inputs) :
+    # with the incremental compute, a sub-step is skipped if none of these variables changed since the previous compute
+    compute_steps = [
+        ('compute_raw_production', [GlossaryEnergy.EnergyProductionValue]),
+        ('compute_net_consumable_energy', [GlossaryEnergy.EnergyProductionValue,
+                                           GlossaryEnergy.StreamConsumptionValue]),
+        ('compute_net_energy_production', [GlossaryEnergy.EnergyProductionValue,
+                                           GlossaryEnergy.StreamConsumptionValue]),
+        ('compute_energy_production_uncut', [GlossaryEnergy.EnergyProductionValue,
+                                             GlossaryEnergy.StreamConsumptionValue]),
+        ('compute_price_by_energy', [GlossaryEnergy.StreamPricesValue, GlossaryEnergy.CO2PerUse]),
+        ('compute_CO2_emissions', [GlossaryEnergy.EnergyProductionValue, GlossaryEnergy.StreamConsumptionValue,
+                                   GlossaryEnergy.CO2PerUse]),
+        ('compute_CO2_emissions_ratio', [GlossaryEnergy.CO2EmissionsValue, GlossaryEnergy.CO2PerUse]),
+        ('aggregate_land_use_required', [GlossaryEnergy.LandUseRequiredValue]),
+        ('compute_energy_capital', [GlossaryEnergy.EnergyTypeCapitalDfValue]),
+        ('compute_non_use_capital_mean_by_stream', [GlossaryEnergy.EnergyTypeCapitalDfValue]),
+        ('compute_non_use_energy_capital_constraint', [GlossaryEnergy.EnergyTypeCapitalDfValue]),
+        ('compute_non_use_energy_capital_objective', [GlossaryEnergy.EnergyTypeCapitalDfValue]),
+        ('compute_total_prod_minus_min_prod_constraint', [GlossaryEnergy.EnergyProductionValue,
+                                                          GlossaryEnergy.StreamConsumptionValue]),
+        ('compute_constraint_solid_fuel_elec', [GlossaryEnergy.EnergyProductionValue,
+                                                GlossaryEnergy.StreamConsumptionValue]),
+        ('compute_constraint_h2', [GlossaryEnergy.EnergyProductionValue, GlossaryEnergy.StreamConsumptionValue]),
+        ('compute_syngas_prod_objective', [GlossaryEnergy.EnergyProductionValue,
+                                           GlossaryEnergy.StreamConsumptionValue]),
+        ('compute_syngas_prod_constraint', [GlossaryEnergy.EnergyProductionValue,
+                                            GlossaryEnergy.StreamConsumptionValue]),
+        ('compute_all_streams_demand_ratio', [GlossaryEnergy.EnergyProductionValue,
+                                              GlossaryEnergy.StreamConsumptionWithoutRatioValue]),
+        ('compute_net_positive_consumable_energy_production', [GlossaryEnergy.EnergyProductionValue,
+                                                               GlossaryEnergy.StreamConsumptionValue]),
+        ('compute_mean_price', [GlossaryEnergy.EnergyProductionValue, GlossaryEnergy.StreamConsumptionValue,
+                                GlossaryEnergy.StreamPricesValue, GlossaryEnergy.CO2PerUse]),
+        ('compute_energy_mean_price_objective', [GlossaryEnergy.EnergyProductionValue,
+                                                 GlossaryEnergy.StreamConsumptionValue,
+                                                 GlossaryEnergy.StreamPricesValue, GlossaryEnergy.CO2PerUse]),
+        ('compute_target_production_constraint', [GlossaryEnergy.EnergyProductionValue,
+                                                  GlossaryEnergy.StreamConsumptionValue]),
+    ]
+    # sub-steps recomputing only the contributions of the streams with changed inputs
+    stream_patched_steps = ['compute_raw_production', 'compute_price_by_energy', 'compute_CO2_emissions_ratio']
+
     def __init__(self, name):
         '''
         Constructor
@@ -174,6 +227,10 @@ class EnergyMix(BaseStream):
         self.energy_capital = None
         self.consumable_energy_df = None
         self.consumed_energy_by_ccus_sum = None
+        # flows between streams, indexed once from the columns of the consumption dataframes
+        self.stream_flow_matrix = None
+        self.consumption_flows = None
+        self.consumption_woratio_flows = None
         self.production = None
         self.carbon_emissions_after_use = None
         self.co2_production = None
@@ -198,6 +255,11 @@ class EnergyMix(BaseStream):
         self.ref_constraint_non_use_capital_energy = None
         self.losses_percentage_dict = {}
         self.inputs = {}
+        # fingerprints of the inputs of the previous compute and computed/skipped sub-steps for the incremental compute
+        self.inputs_fingerprints = None
+        self.compute_report = None
+        # intermediates of the compute reused by the gradients, recorded by the sub-steps (see get_gradient_tape)
+        self.gradient_tape = {}
 
     def configure(self, inputs_dict):
         '''
@@ -282,41 +344,39 @@ class EnergyMix(BaseStream):
                 self.sub_carbon_emissions[energy] = inputs_dict[f'{energy}.{GlossaryEnergy.CO2EmissionsValue}'][energy]
                 self.co2_emitted_by_energy[energy] = inputs_dict[f'{energy}.{GlossaryEnergy.CO2PerUse}']
 
+        consumed_columns = {energy: f'{energy} ({self.stream_class_dict[energy].unit})'
+                            for energy in self.subelements_list}
+        consumed_columns.update({resource: f'{resource} ({self.RESOURCE_CONSUMPTION_UNIT})'
+                                 for resource in self.resource_list})
+        if self.stream_flow_matrix is None or \
+                self.stream_flow_matrix.signature != StreamFlowMatrix.get_signature(self.sub_consumption_dict) or \
+                self.stream_flow_matrix.consumed != list(consumed_columns.keys()):
+            self.stream_flow_matrix = StreamFlowMatrix(self.subelements_list, consumed_columns,
+                                                       self.sub_consumption_dict)
+        self.consumption_flows = self.stream_flow_matrix.stack(self.sub_consumption_dict)
+        self.consumption_woratio_flows = self.stream_flow_matrix.stack(self.sub_consumption_woratio_dict)
+
         self.co2_emissions = self.sub_carbon_emissions.copy(deep=True)
         self.stream_prices = self.sub_prices.copy(deep=True)
-        self.price_by_energy = pd.DataFrame(
-            {GlossaryEnergy.Years: self.stream_prices[GlossaryEnergy.Years].values})
 
-        # dataframe resource demand
+        # dataframe resource demand : consumption of the resources by all streams
+        resources_consumption = self.consumption_flows.sum_over_consumers()
+        resources_consumption_woratio = self.consumption_woratio_flows.sum_over_consumers()
         self.resources_demand = pd.DataFrame(
-            {GlossaryEnergy.Years: self.stream_prices[GlossaryEnergy.Years].values})
+            {GlossaryEnergy.Years: self.stream_prices[GlossaryEnergy.Years].values,
+             **{resource: resources_consumption[resource] for resource in self.resource_list}})
         self.resources_demand_woratio = pd.DataFrame(
-            {GlossaryEnergy.Years: self.stream_prices[GlossaryEnergy.Years].values})
-        for elements in self.resource_list:
-            if elements in self.resource_list:
-                self.resources_demand[elements] = np.linspace(
-                    0, 0, len(self.resources_demand.index)) * 100.
-                self.resources_demand_woratio[elements] = np.linspace(
-                    0, 0, len(self.resources_demand.index)) * 100.
-        for energy in self.subelements_list:
-            for resource in self.resource_list:
-                if f'{resource} ({self.RESOURCE_CONSUMPTION_UNIT})' in self.sub_consumption_dict[energy].columns:
-                    self.resources_demand[resource] = self.resources_demand[resource] + \
-                                                      inputs_dict[f'{energy}.{GlossaryEnergy.StreamConsumptionValue}'][
-                                                          f'{resource} ({self.RESOURCE_CONSUMPTION_UNIT})'].values * \
-                                                      self.scaling_factor_energy_consumption
-                    self.resources_demand_woratio[resource] = self.resources_demand_woratio[resource] + \
-                                                              inputs_dict[
-                                                                  f'{energy}.{GlossaryEnergy.StreamConsumptionWithoutRatioValue}'][
-                                                                  f'{resource} ({self.RESOURCE_CONSUMPTION_UNIT})'].values * \
-                                                              self.scaling_factor_energy_consumption
-
-        # DataFrame stream demand
-        self.all_streams_demand_ratio = pd.DataFrame(
-            {GlossaryEnergy.Years: self.stream_prices[GlossaryEnergy.Years].values})
-        for energy in self.subelements_list:
-            self.all_streams_demand_ratio[energy] = np.ones(
-                len(self.all_streams_demand_ratio[GlossaryEnergy.Years].values)) * 100.
+            {GlossaryEnergy.Years: self.stream_prices[GlossaryEnergy.Years].values,
+             **{resource: resources_consumption_woratio[resource] for resource in self.resource_list}})
+
+        # DataFrame stream demand, before its first compute
+        if self.all_streams_demand_ratio is None or \
+                list(self.all_streams_demand_ratio.columns) != [GlossaryEnergy.Years] + self.subelements_list:
+            self.all_streams_demand_ratio = pd.DataFrame(
+                {GlossaryEnergy.Years: self.stream_prices[GlossaryEnergy.Years].values})
+            for energy in self.subelements_list:
+                self.all_streams_demand_ratio[energy] = np.ones(
+                    len(self.all_streams_demand_ratio[GlossaryEnergy.Years].values)) * 100.
 
     def set_energy_prices_in(self, energy_prices):
         '''
@@ -384,10 +444,11 @@ class EnergyMix(BaseStream):
 
         self.non_use_capital_obj_by_stream = np.array([obj / len(streams)])
 
-    def compute_raw_production(self):
-        """sum of positive energy production --> raw total production"""
+    def compute_raw_production(self, streams=None):
+        """sum of positive energy production --> raw total production
+        streams : streams whose production is updated, all streams by default"""
 
-        for energy in self.subelements_list:
+        for energy in self.subelements_list if streams is None else streams:
             column_name = f'{self.PRODUCTION} {energy} ({self.stream_class_dict[energy].unit})'
             self.production_raw[column_name] = self.sub_production_dict[energy][energy].values
 
@@ -415,26 +476,18 @@ class EnergyMix(BaseStream):
         #                     f'The columns {wrong_columns} in the energy_consumption out of {idx} cannot be taken into account for an error of unity')
 
         self.consumable_energy_df = pd.DataFrame({GlossaryEnergy.Years: self.years})
-        self.consumed_energy_by_ccus_sum = {}
+        # energy consumed by the energies and by the ccus streams
+        consumed_energy_by_energy = self.consumption_flows.sum_over_consumers(
+            [stream for stream in self.subelements_list if stream in self.energy_list])
+        self.consumed_energy_by_ccus_sum = self.consumption_flows.sum_over_consumers(
+            [stream for stream in self.subelements_list if stream not in self.energy_list])
         for energy in self.energy_list:
             # starting from raw energy production
             column_name_energy = f'{self.PRODUCTION} {energy} ({self.stream_class_dict[energy].unit})'
             raw_production_energy = self.production_raw[column_name_energy]
 
             # removing consumed energy
-            consumed_energy_by_energy_list = []
-            consumed_energy_by_ccus_list = []
-            column_name_consumption = f'{energy} ({self.stream_class_dict[energy].unit})'
-            for energy_other, consu in self.sub_consumption_dict.items():
-                if column_name_consumption in consu.columns:
-                    if energy_other in self.energy_list:
-                        consumed_energy_by_energy_list.append(consu[column_name_consumption].values)
-                    else:
-                        consumed_energy_by_ccus_list.append(consu[column_name_consumption].values)
-            consumed_energy_by_energy_sum = np.sum(np.array(consumed_energy_by_energy_list), axis=0) if len(
-                consumed_energy_by_energy_list) else 0.
-            self.consumed_energy_by_ccus_sum[energy] = np.sum(np.array(consumed_energy_by_ccus_list), axis=0) if len(
-                consumed_energy_by_ccus_list) else 0.
+            consumed_energy_by_energy_sum = consumed_energy_by_energy[energy]
             # obtaining net energy production for the techno
             column_name = f'{self.PRODUCTION} {energy} ({self.stream_class_dict[energy].unit})'
             prod_raw_to_substract = self.compute_net_prod_of_coarse_energies(energy, column_name)
@@ -474,8 +527,7 @@ class EnergyMix(BaseStream):
                 for column in consumption_ccs_df.columns:
                     if column.endswith(f"({GlossaryEnergy.mass_unit})"):
                         ccs_consumptions_list.append(consumption_ccs_df[column].values)
-                self.production[production_column_name_ccs] = - np.sum(np.array(ccs_consumptions_list), axis=0) if len(
-                    ccs_consumptions_list) else 0.
+                self.production[production_column_name_ccs] = - np.sum(np.array(ccs_consumptions_list), axis=0) if ccs_consumptions_list else 0.
         # Delete energy used by ccs from energy production (and not only from total production)
         for energy in self.energy_list:
             production_column_name_energy = f'{self.PRODUCTION} {energy} ({GlossaryEnergy.energy_unit})'
@@ -491,18 +543,22 @@ class EnergyMix(BaseStream):
 
     def compute_energy_production_uncut(self):
         """maybe to delete"""
-        self.production['Total production (uncut)'] = self.production[GlossaryEnergy.TotalProductionValue].values
+        total_production = self.production[GlossaryEnergy.TotalProductionValue].values
+        self.production['Total production (uncut)'] = total_production
         min_energy = self.minimum_energy_production
-        for year in self.production.index:
-            if self.production.at[year, GlossaryEnergy.TotalProductionValue] < min_energy:
-                # To avoid underflow : exp(-200) is considered to be the
-                # minimum value for the exp
-                production_year = max(
-                    self.production.at[year, GlossaryEnergy.TotalProductionValue], -200.0 * min_energy)
-                self.production.loc[year, GlossaryEnergy.TotalProductionValue] = min_energy / 10. * \
-                                                                                 (9 + np.exp(
-                                                                                     production_year / min_energy) * np.exp(
-                                                                                     -1))
+        below_min_energy = total_production < min_energy
+        # To avoid underflow : exp(-200) is considered to be the
+        # minimum value for the exp
+        exp_production = np.exp(
+            np.maximum(total_production[below_min_energy], -200.0 * min_energy) / min_energy) * np.exp(-1)
+        total_production_cut = total_production.copy()
+        total_production_cut[below_min_energy] = min_energy / 10. * (9 + exp_production)
+        self.production[GlossaryEnergy.TotalProductionValue] = total_production_cut
+
+        # derivative of the total production wrt the uncut total production
+        dtotal_production_duncut = np.ones(len(total_production))
+        dtotal_production_duncut[below_min_energy] = exp_production / 10.
+        self.gradient_tape['dtotal_production_duncut'] = dtotal_production_duncut
 
     def compute_net_prod_of_coarse_energies(self, energy, column_name):
         '''
@@ -516,26 +572,36 @@ class EnergyMix(BaseStream):
         except KeyError:
             return 0.
 
-    def compute_price_by_energy(self):
+    def compute_price_by_energy(self, streams=None):
         '''
         Compute the price of each energy.
         Energy price (techno, year) = Raw energy price (techno, year) + CO2 emitted(techno, year) * carbon tax ($/tEqCO2)
         after carbon tax with all technology prices and technology weights computed with energy production
+        streams : streams whose price is updated, all streams by default
         '''
+        if streams is None:
+            self.price_by_energy = pd.DataFrame(
+                {GlossaryEnergy.Years: self.stream_prices[GlossaryEnergy.Years].values})
+        else:
+            self.price_by_energy = self.price_by_energy.copy()
 
-        for energy in self.subelements_list:
+        for energy in self.subelements_list if streams is None else streams:
             if energy in self.energy_class_dict:
                 self.price_by_energy[energy] = self.sub_prices[energy].values + \
                                                self.co2_emitted_by_energy[energy][GlossaryEnergy.CO2PerUse].values * \
                                                self.carbon_tax[GlossaryEnergy.CO2Tax].values
 
-    def compute_CO2_emissions_ratio(self):
+    def compute_CO2_emissions_ratio(self, streams=None):
         '''
         Compute the CO2 emission_ratio in kgCO2/kWh for the MDA
+        streams : streams whose emissions are updated, all streams by default
         '''
-        self.carbon_emissions_after_use = pd.DataFrame(
-            {GlossaryEnergy.Years: self.total_carbon_emissions[GlossaryEnergy.Years].values})
-        for stream in self.subelements_list:
+        if streams is None:
+            self.carbon_emissions_after_use = pd.DataFrame(
+                {GlossaryEnergy.Years: self.total_carbon_emissions[GlossaryEnergy.Years].values})
+        else:
+            self.carbon_emissions_after_use = self.carbon_emissions_after_use.copy()
+        for stream in self.subelements_list if streams is None else streams:
             if stream in self.energy_class_dict:
                 self.total_carbon_emissions[stream] = self.sub_carbon_emissions[stream]
                 self.carbon_emissions_after_use[stream] = self.total_carbon_emissions[stream] + \
@@ -660,42 +726,39 @@ class EnergyMix(BaseStream):
         energy_mean_price[GlossaryEnergy.EnergyPriceValue] = 0.0
 
         element_dict = dict(zip(self.energy_list, self.energy_list))
-        if exp_min:
-            prod_element, prod_total_for_mix_weight = self.compute_prod_with_exp_min(
-                self.net_positive_consumable_energy_production, element_dict, self.production_threshold)
-        else:
-            prod_element, prod_total_for_mix_weight = self.compute_prod_wcutoff(
-                self.net_positive_consumable_energy_production, element_dict, self.production_threshold)
-
-        for energy in self.energy_list:
-            # compute mix weights for each energy
-            mix_weight = prod_element[energy] / prod_total_for_mix_weight
-            # If the element is negligible do not take into account this element
-            # It is negligible if tol = 0.1%
-            tol = 1e-3
-            mix_weight[mix_weight < tol] = 0.0
-            energy_mean_price[GlossaryEnergy.EnergyPriceValue] += self.price_by_energy[energy].values * \
-                                                                  mix_weight
-            self.mix_weights[energy] = mix_weight
+        # compute mix weights for each energy
+        mix_weights = self.compute_mix_weights(
+            self.net_positive_consumable_energy_production, element_dict, exp_min=exp_min,
+            min_prod=self.production_threshold)['mix_weights']
+        prices = self.price_by_energy[self.energy_list].values
+        mean_price = np.ascontiguousarray(prices.T * mix_weights).sum(axis=0)
 
         # In case all the technologies are below the threshold assign a
         # placeholder price
         if not exp_min:
-            for year in energy_mean_price[GlossaryEnergy.Years].values:
-                if np.real(energy_mean_price.loc[energy_mean_price[GlossaryEnergy.Years] == year][
-                               GlossaryEnergy.EnergyPriceValue].values) == 0.0:
-                    year_energy_prices = self.price_by_energy[
-                        self.energy_list].loc[energy_mean_price[GlossaryEnergy.Years] == year]
-                    min_energy_price = min(
-                        val for val in year_energy_prices.values[0] if val > 0.0)
-                    min_energy_name = [
-                        name for name in year_energy_prices.columns if
-                        year_energy_prices[name].values == min_energy_price][0]
-                    energy_mean_price.loc[energy_mean_price[GlossaryEnergy.Years] ==
-                                          year, GlossaryEnergy.EnergyPriceValue] = min_energy_price
-                    for energy in self.energy_list:
-                        self.mix_weights.loc[self.mix_weights[GlossaryEnergy.Years] == year,
-                                             energy] = 1. if energy == min_energy_name else 0.0
+            no_price_years, cheapest_energies = self.compute_cutoff_placeholder(
+                prices, mean_price, self.energy_list)
+            mix_weights = np.where(no_price_years,
+                                   1. * (np.arange(len(self.energy_list))[:, np.newaxis] == cheapest_energies),
+                                   mix_weights)
+            mean_price = np.where(no_price_years, prices[np.arange(len(mean_price)), cheapest_energies], mean_price)
+
+        for energy, mix_weight in zip(self.energy_list, mix_weights):
+            self.mix_weights[energy] = mix_weight.copy()
+        energy_mean_price[GlossaryEnergy.EnergyPriceValue] = mean_price
+
+        # prices and sign masks of the gradients of the mean price (see compute_grad_mean_price_vs_net_production) :
+        # no gradient through the negligible energies and the negative net productions, but a gradient in 0+
+        production_columns = [f'production {energy} ({self.energy_class_dict[energy].unit})'
+                              for energy in self.energy_list]
+        self.gradient_tape['mean_price'] = {
+            'exp_min': exp_min,
+            'prices_after_tax': prices.T,
+            'mix_weights_signs': np.sign(mix_weights),
+            'net_production_signs': np.sign(
+                self.net_positive_consumable_energy_production[self.energy_list].values.T),
+            'zero_production': self.production[production_columns].values.T == 0.0,
+        }
 
         self.energy_mean_price = energy_mean_price
         return energy_mean_price
@@ -775,19 +838,15 @@ class EnergyMix(BaseStream):
         demand_ratio_df = pd.DataFrame(
             {GlossaryEnergy.Years: self.years})
 
+        # consumption without ratio
+        streams_consumption = self.consumption_woratio_flows.sum_over_consumers()
+        ddemand_ratio = {}
         for energy in self.subelements_list:
 
             # Prod with ratio
             energy_production = deepcopy(
                 self.sub_production_dict[f'{energy}'][f'{energy}'].values)
-            # consumption without ratio
-            sub_cons = self.sub_consumption_woratio_dict
-
-            energy_consumption = np.zeros(len(self.years))
-            for idx, consu in sub_cons.items():
-                if f'{energy} ({self.stream_class_dict[energy].unit})' in consu.columns:
-                    energy_consumption = np.sum([energy_consumption, consu[
-                        f'{energy} ({self.stream_class_dict[energy].unit})'].values], axis=0)
+            energy_consumption = streams_consumption[energy]
             # if energy is in raw_tonet_dict, add the consumption due to raw_to_net ratio to energy_consumption
             if energy in self.raw_tonet_dict.keys():
                 column_name = f'{self.PRODUCTION} {energy} ({self.stream_class_dict[energy].unit})'
@@ -801,7 +860,23 @@ class EnergyMix(BaseStream):
 
             demand_ratio_df[f'{energy}'] = np.minimum(
                 np.maximum(energy_prod_limited / energy_cons_limited, 1E-15), 1.0) * 100.0
+
+            # gradients of the ratio wrt the production and the consumption where the ratio is not capped
+            not_capped = (energy_prod_limited <= energy_cons_limited) * (
+                    energy_prod_limited / energy_cons_limited > 1e-15)
+            denergy_prod_limited = compute_dfunc_with_exp_min(energy_production, 1.0e-10).reshape(-1)
+            denergy_cons_limited = compute_dfunc_with_exp_min(energy_consumption, 1.0e-10).reshape(-1)
+            if energy in self.raw_tonet_dict.keys():
+                denergy_prod_limited = denergy_prod_limited * self.scaling_factor_energy_production * \
+                                       self.raw_tonet_dict[energy]
+            else:
+                denergy_prod_limited = denergy_prod_limited * self.scaling_factor_energy_production
+            ddemand_ratio[energy] = (
+                100.0 * np.where(not_capped, denergy_prod_limited / energy_cons_limited, 0.0),
+                100.0 * np.where(not_capped, -self.scaling_factor_energy_production * energy_prod_limited *
+                                 denergy_cons_limited / energy_cons_limited ** 2, 0.0))
         self.all_streams_demand_ratio = demand_ratio_df
+        self.gradient_tape['ddemand_ratio'] = ddemand_ratio
 
         # COmpute ratio_objective
         self.compute_ratio_objective()
@@ -824,25 +899,11 @@ class EnergyMix(BaseStream):
         # Initialize dataframes
         len_years = len(self.production[GlossaryEnergy.Years])
 
-        co2_production = pd.DataFrame({GlossaryEnergy.Years: self.production[GlossaryEnergy.Years]})
-        co2_consumption = pd.DataFrame(
-            {GlossaryEnergy.Years: self.production[GlossaryEnergy.Years]})
-
-        dtot_CO2_emissions = {}
-        # Do not loop over carbon capture and carbon storage which will be
-        # handled differently
-        for energy in self.subelements_list:
-            if energy in self.only_energy_list:
-
-                # gather all production columns with a CO2 name in it
-                for col, production in self.sub_production_dict[energy].items():
-                    if col in self.CO2_list:
-                        co2_production[f'{energy} {col}'] = production.values
-                # gather all consumption columns with a CO2 name in it
-                for col, consumption in self.sub_consumption_dict[energy].items():
-                    if col in self.CO2_list:
-                        co2_consumption[f'{energy} {col}'] = consumption.values
+        # CO2 production and consumption columns of the energies gathered by compute_CO2_emissions
+        co2_production = self.co2_production
+        co2_consumption = self.co2_consumption
 
+        dtot_CO2_emissions = GradientRegistry()
         #                 # Compute the CO2 emitted during the use of the net energy
         #                 # If net energy is negative, CO2 by use is equals to zero
         #                 net_prod = net_production[
@@ -871,9 +932,9 @@ class EnergyMix(BaseStream):
          solidcarbonstorage technology
         '''
         if GlossaryEnergy.carbon_storage in self.sub_production_dict:
-            dtot_CO2_emissions[
-                f'{GlossaryEnergy.carbon_storage} ({GlossaryEnergy.mass_unit}) vs {GlossaryEnergy.carbon_storage}#{GlossaryEnergy.carbon_storage}#prod'] = np.ones(
-                len_years)
+            dtot_CO2_emissions.add(
+                f'{GlossaryEnergy.carbon_storage} ({GlossaryEnergy.mass_unit})', GlossaryEnergy.carbon_storage, PRODUCTION,
+                np.ones(len_years), column=GlossaryEnergy.carbon_storage)
         #             self.total_co2_emissions[f'{GlossaryEnergy.carbon_storage} ({GlossaryEnergy.mass_unit})'] = self.sub_production_dict[
         #                 GlossaryEnergy.carbon_storage][GlossaryEnergy.carbon_storage].values
         #         else:
@@ -885,9 +946,9 @@ class EnergyMix(BaseStream):
          captured)
         '''
         if GlossaryEnergy.carbon_capture in self.sub_production_dict:
-            dtot_CO2_emissions[
-                f'{GlossaryEnergy.carbon_capture} ({GlossaryEnergy.mass_unit}) from CC technos vs {GlossaryEnergy.carbon_capture}#{GlossaryEnergy.carbon_capture}#prod'] = np.ones(
-                len_years)
+            dtot_CO2_emissions.add(
+                f'{GlossaryEnergy.carbon_capture} ({GlossaryEnergy.mass_unit}) from CC technos', GlossaryEnergy.carbon_capture, PRODUCTION,
+                np.ones(len_years), column=GlossaryEnergy.carbon_capture)
         #             self.total_co2_emissions[f'{GlossaryEnergy.carbon_capture} ({GlossaryEnergy.mass_unit}) from CC technos'] = self.sub_production_dict[
         #                 GlossaryEnergy.carbon_capture][GlossaryEnergy.carbon_capture].values
         #         else:
@@ -905,9 +966,9 @@ class EnergyMix(BaseStream):
             f' {GlossaryEnergy.carbon_capture} ({GlossaryEnergy.mass_unit})', '') for key in energy_producing_carbon_capture]
         if len(energy_producing_carbon_capture_list) != 0:
             for energy1 in energy_producing_carbon_capture_list:
-                dtot_CO2_emissions[
-                    f'{GlossaryEnergy.carbon_capture} from energy mix (Gt) vs {energy1}#{GlossaryEnergy.carbon_capture} ({GlossaryEnergy.mass_unit})#prod'] = np.ones(
-                    len_years)
+                dtot_CO2_emissions.add(
+                    f'{GlossaryEnergy.carbon_capture} from energy mix (Gt)', energy1, PRODUCTION, np.ones(len_years),
+                    column=f'{GlossaryEnergy.carbon_capture} ({GlossaryEnergy.mass_unit})')
         #             self.total_co2_emissions[f'{GlossaryEnergy.carbon_capture} from energy mix (Mt)'] = energy_producing_carbon_capture.sum(
         #                 axis=1).values
         #         else:
@@ -924,9 +985,9 @@ class EnergyMix(BaseStream):
             f' {GlossaryEnergy.carbon_capture} ({GlossaryEnergy.mass_unit})', '') for key in energy_needing_carbon_capture]
         if len(energy_needing_carbon_capture_list) != 0:
             for energy1 in energy_needing_carbon_capture_list:
-                dtot_CO2_emissions[
-                    f'{GlossaryEnergy.carbon_capture} needed by energy mix (Gt) vs {energy1}#{GlossaryEnergy.carbon_capture} ({GlossaryEnergy.mass_unit})#cons'] = np.ones(
-                    len_years)
+                dtot_CO2_emissions.add(
+                    f'{GlossaryEnergy.carbon_capture} needed by energy mix (Gt)', energy1, CONSUMPTION, np.ones(len_years),
+                    column=f'{GlossaryEnergy.carbon_capture} ({GlossaryEnergy.mass_unit})')
         #             self.total_co2_emissions[f'{GlossaryEnergy.carbon_capture} needed by energy mix (Mt)'] = energy_needing_carbon_capture.sum(
         #                 axis=1).values
         #         else:
@@ -943,8 +1004,9 @@ class EnergyMix(BaseStream):
             f' {GlossaryEnergy.carbon_capture} ({GlossaryEnergy.mass_unit})', '') for key in energy_producing_co2]
         if len(energy_producing_co2_list) != 0:
             for energy1 in energy_producing_co2_list:
-                dtot_CO2_emissions[
-                    f'{GlossaryEnergy.carbon_capture} from energy mix (Mt) vs {energy1}#{GlossaryEnergy.carbon_capture} ({GlossaryEnergy.mass_unit})#prod'] = np.ones(len_years)
+                dtot_CO2_emissions.add(
+                    f'{GlossaryEnergy.carbon_capture} from energy mix (Mt)', energy1, PRODUCTION, np.ones(len_years),
+                    column=f'{GlossaryEnergy.carbon_capture} ({GlossaryEnergy.mass_unit})')
 
         #             self.total_co2_emissions[f'{GlossaryEnergy.carbon_capture} from energy mix (Mt)'] = energy_producing_co2.sum(
         #                 axis=1).values
@@ -962,8 +1024,9 @@ class EnergyMix(BaseStream):
             f' {GlossaryEnergy.carbon_capture} ({GlossaryEnergy.mass_unit})', '') for key in energy_removing_co2]
         if len(energy_removing_co2_list) != 0:
             for energy1 in energy_removing_co2_list:
-                dtot_CO2_emissions[
-                    f'{GlossaryEnergy.carbon_capture} removed by energy mix (Mt) vs {energy1}#{GlossaryEnergy.carbon_capture} ({GlossaryEnergy.mass_unit})#cons'] = np.ones(len_years)
+                dtot_CO2_emissions.add(
+                    f'{GlossaryEnergy.carbon_capture} removed by energy mix (Mt)', energy1, CONSUMPTION, np.ones(len_years),
+                    column=f'{GlossaryEnergy.carbon_capture} ({GlossaryEnergy.mass_unit})')
         #             self.total_co2_emissions[f'{GlossaryEnergy.carbon_capture} removed by energy mix (Mt)'] = energy_removing_co2.sum(
         #                 axis=1).values
         #         else:
@@ -981,9 +1044,9 @@ class EnergyMix(BaseStream):
             if col.endswith(f'{CarbonCapture.flue_gas_name} ({GlossaryEnergy.mass_unit})'):
                 energy1 = col.replace(
                     f' {CarbonCapture.flue_gas_name} ({GlossaryEnergy.mass_unit})', '')
-                dtot_CO2_emissions[
-                    f'Total {CarbonCapture.flue_gas_name} ({GlossaryEnergy.mass_unit}) vs {energy1}#{CarbonCapture.flue_gas_name} ({GlossaryEnergy.mass_unit})#prod'] = np.ones(
-                    len_years)
+                dtot_CO2_emissions.add(
+                    f'Total {CarbonCapture.flue_gas_name} ({GlossaryEnergy.mass_unit})', energy1, PRODUCTION, np.ones(len_years),
+                    column=f'{CarbonCapture.flue_gas_name} ({GlossaryEnergy.mass_unit})')
         ''' Carbon captured that needs to be stored
             sum of the one from CC technos and the one directly captured
             we delete the one needed by energy mix and potentially later the CO2 for food
@@ -998,8 +1061,7 @@ class EnergyMix(BaseStream):
         key_dep_tuple_list = [(f'{GlossaryEnergy.carbon_capture} ({GlossaryEnergy.mass_unit}) from CC technos', 1.0),
                               (f'{GlossaryEnergy.carbon_capture} from energy mix (Mt)', 1.0),
                               (f'{GlossaryEnergy.carbon_capture} needed by energy mix (Mt)', -1.0)]
-        dtot_CO2_emissions = update_new_gradient(
-            dtot_CO2_emissions, key_dep_tuple_list, new_key)
+        dtot_CO2_emissions.combine(new_key, key_dep_tuple_list)
 
         return dtot_CO2_emissions
 
@@ -1015,34 +1077,94 @@ class EnergyMix(BaseStream):
         })
 
     def compute(self, inputs: dict, exp_min=True):
+        '''
+        Compute all the sub-steps (see compute_steps). With the incremental compute, the sub-steps are computed
+        only if the inputs of the streams they read changed since the previous compute, and the sub-steps of
+        stream_patched_steps only for the streams with changed inputs.
+        self.compute_report gives the computed and skipped sub-steps
+        '''
         self.configure_parameters_update(inputs)
 
-        self.compute_raw_production()
-        self.compute_net_consumable_energy()
-        self.compute_net_energy_production()
-        self.compute_energy_production_uncut()
-        self.compute_price_by_energy()
-        self.compute_CO2_emissions()
-        self.compute_CO2_emissions_ratio()
-        self.aggregate_land_use_required()
-        self.compute_energy_capital()
-        self.compute_non_use_capital_mean_by_stream()
-        self.compute_non_use_energy_capital_constraint()
-        self.compute_non_use_energy_capital_objective()
-        self.compute_total_prod_minus_min_prod_constraint()
-        self.compute_constraint_solid_fuel_elec()
-        self.compute_constraint_h2()
-        self.compute_syngas_prod_objective()
-        self.compute_syngas_prod_constraint()
-
-        self.compute_all_streams_demand_ratio()
-        self.compute_net_positive_consumable_energy_production()
-        self.compute_mean_price(exp_min=inputs['exp_min'])
-        self.compute_energy_mean_price_objective()
-
-        self.compute_constraint_h2()
-
-        self.compute_target_production_constraint(inputs)
+        changed_streams = self.get_changed_streams(inputs) if inputs['incremental_compute'] else None
+        if not inputs['incremental_compute']:
+            self.inputs_fingerprints = None
+        step_kwargs = {'compute_mean_price': {'exp_min': inputs['exp_min']},
+                       'compute_target_production_constraint': {'inputs_dict': inputs}}
+        self.compute_report = {'computed_steps': [], 'skipped_steps': [], 'patched_streams': {}}
+        for step_name, variables in self.compute_steps:
+            kwargs = step_kwargs.get(step_name, {})
+            if changed_streams is not None:
+                streams = [stream for stream in self.subelements_list if any(
+                    stream in changed_streams.get(variable, ()) for variable in variables)]
+                if not streams:
+                    self.compute_report['skipped_steps'].append(step_name)
+                    continue
+                if step_name in self.stream_patched_steps:
+                    kwargs = {'streams': streams}
+                    self.compute_report['patched_streams'][step_name] = streams
+            getattr(self, step_name)(**kwargs)
+            self.compute_report['computed_steps'].append(step_name)
+        # inputs of the intermediates recorded for the gradients : the fingerprints already computed by the
+        # incremental compute, else the input values themselves, compared by identity
+        self.gradient_tape['inputs_fingerprints'] = self.inputs_fingerprints
+        self.gradient_tape['inputs'] = None if inputs['incremental_compute'] else dict(inputs)
+
+    def get_gradient_tape(self, inputs: dict):
+        '''
+        Intermediates of the compute reused by the gradients, the compute is done again if the inputs
+        are not the ones of the last compute
+        '''
+        tape_inputs = self.gradient_tape.get('inputs')
+        if tape_inputs is not None:
+            is_tape_up_to_date = tape_inputs.keys() == inputs.keys() and all(
+                value is tape_inputs[key] for key, value in inputs.items())
+        else:
+            is_tape_up_to_date = self.gradient_tape.get('inputs_fingerprints') is not None and \
+                self.gradient_tape['inputs_fingerprints'] == {
+                    key: compute_input_fingerprint(value) for key, value in inputs.items()}
+        if not is_tape_up_to_date:
+            self.compute(inputs)
+        return self.gradient_tape
+
+    def compute_grad_mean_price_vs_net_production(self):
+        '''
+        Gradient of the mean price wrt the net positive consumable production of each energy (energy x year) :
+        sum over the energies of their price after tax times the gradient of their mix weight,
+        without the negligible energies
+        '''
+        mean_price_tape = self.gradient_tape['mean_price']
+        grad_mix_weights = self.compute_grad_mix_weights(
+            self.net_positive_consumable_energy_production, dict(zip(self.energy_list, self.energy_list)),
+            exp_min=mean_price_tape['exp_min'], min_prod=self.production_threshold)
+        return np.einsum('ijy,jy->iy', grad_mix_weights,
+                         mean_price_tape['prices_after_tax'] * mean_price_tape['mix_weights_signs'])
+
+    def get_changed_streams(self, inputs: dict):
+        '''
+        Fingerprint the inputs and compare them with the ones of the previous compute
+        Returns the streams with changed inputs for each variable {variable: set of streams},
+        None if everything has to be computed (first compute, or change of an input not specific to a stream)
+        '''
+        stream_prefixes = {f'{stream}.': stream for stream in self.subelements_list}
+        if BiomassDry.name in self.subelements_list:
+            stream_prefixes[f'{AgricultureMixDiscipline.name}.'] = BiomassDry.name
+        # longest prefix first for streams like hydrogen.gaseous_hydrogen
+        stream_prefixes = dict(sorted(stream_prefixes.items(), key=lambda item: -len(item[0])))
+
+        previous_fingerprints = self.inputs_fingerprints
+        self.inputs_fingerprints = {key: compute_input_fingerprint(value) for key, value in inputs.items()}
+        if previous_fingerprints is None or previous_fingerprints.keys() != self.inputs_fingerprints.keys():
+            return None
+
+        changed_streams = {}
+        for key, fingerprint in self.inputs_fingerprints.items():
+            if previous_fingerprints[key] == fingerprint:
+                continue
+            prefix = next((prefix for prefix in stream_prefixes if key.startswith(prefix)), None)
+            if prefix is None:
+                return None
+            changed_streams.setdefault(key[len(prefix):], set()).add(stream_prefixes[prefix])
+        return changed_streams
 
     def compute_energy_mean_price_objective(self):
         self.energy_mean_price_objective = np.array([
@@ -1108,22 +1230,3 @@ class EnergyMix(BaseStream):
         d_capital = np.diag(- non_use_capital * period_tolerance / (capital ** 2) / self.ref_constraint_non_use_capital_energy / 1e3)
         return d_non_use_capital, d_capital
 
-
-def update_new_gradient(grad_dict, key_dep_tuple_list, new_key):
-    '''
-        Update new gradient which are dependent of old ones by simple sum or difference
-    '''
-    new_grad_dict = grad_dict.copy()
-    for key in grad_dict:
-        for old_key, factor in key_dep_tuple_list:
-            if key.startswith(old_key):
-                # the grad of old key is equivalent to the new key because its
-                # a sum
-                new_grad_key = key.replace(old_key, new_key)
-                if new_grad_key in new_grad_dict:
-                    new_grad_dict[new_grad_key] = new_grad_dict[new_grad_key] + \
-                                                  grad_dict[key] * factor
-                else:
-                    new_grad_dict[new_grad_key] = grad_dict[key] * factor
-
-    return new_grad_dict
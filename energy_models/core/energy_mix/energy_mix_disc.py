@@ -18,7 +18,6 @@ limitations under the License.
 from __future__ import annotations
 
 import re
-from copy import deepcopy
 from typing import TYPE_CHECKING
 
 import numpy as np
@@ -31,10 +30,6 @@ from climateeconomics.sos_wrapping.sos_wrapping_agriculture.agriculture.agricult
 )
 from plotly import graph_objects as go
 from sostrades_core.execution_engine.sos_wrapp import SoSWrapp
-from sostrades_core.tools.base_functions.exp_min import (
-    compute_dfunc_with_exp_min,
-    compute_func_with_exp_min,
-)
 from sostrades_core.tools.post_processing.charts.chart_filter import ChartFilter
 from sostrades_core.tools.post_processing.charts.two_axes_instanciated_chart import (
     InstanciatedSeries,
@@ -59,7 +54,21 @@ from sostrades_optimization_plugins.tools.plot_tools.plotting import (
     InstantiatedPlotlyNativeChart,
 )
 
+from energy_models.core.chart_registry import (
+    ChartDeclaration,
+    ChartRegistry,
+    LazyChartsMixin,
+)
+from energy_models.core.discipline_instrumentation import (
+    InstrumentedDisciplineMixin,
+    discipline_instrumentation,
+)
 from energy_models.core.energy_mix.energy_mix import EnergyMix
+from energy_models.core.gradient_registry import get_consumer_ns_streams
+from energy_models.core.jacobian_blocks import (
+    DiagonalJacobianBlock,
+    VectorJacobianProductMixin,
+)
 from energy_models.core.stream_type.carbon_models.carbon_capture import CarbonCapture
 from energy_models.core.stream_type.energy_models.biomass_dry import BiomassDry
 from energy_models.core.stream_type.energy_models.gaseous_hydrogen import (
@@ -84,7 +93,7 @@ if TYPE_CHECKING:
     import logging
 
 
-class Energy_Mix_Discipline(SoSWrapp):
+class Energy_Mix_Discipline(LazyChartsMixin, VectorJacobianProductMixin, InstrumentedDisciplineMixin, SoSWrapp):
     # ontology information
     _ontology_data = {
         "label": "Energy Mix Model",
@@ -98,6 +107,73 @@ class Energy_Mix_Discipline(SoSWrapp):
         "icon": "fa-solid fa-bolt",
         "version": "",
     }
+    # post-processing charts in their display order : (charts filter value, build method, inputs, filter keys)
+    chart_registry = ChartRegistry(
+        [
+            ChartDeclaration(
+                "Target energy production constraint",
+                "get_chart_target_energy_production",
+                (GlossaryEnergy.TargetEnergyProductionValue,),
+            ),
+            ChartDeclaration(
+                "Energy price",
+                "get_charts_energy_price_in_dollar_mwh",
+                filter_keys=("price_unit",),
+            ),
+            ChartDeclaration(
+                "Energy mean price", "get_chart_energy_mean_price_in_dollar_mwh"
+            ),
+            ChartDeclaration(GlossaryEnergy.Capital, "get_chart_capital"),
+            ChartDeclaration(
+                "Energy price",
+                "get_charts_energy_price_in_dollar_t",
+                filter_keys=("price_unit",),
+            ),
+            ChartDeclaration("CO2 emissions", "get_chart_co2_needed_by_energy_mix"),
+            ChartDeclaration(
+                "Carbon intensity",
+                "get_chart_comparison_carbon_intensity",
+                (GlossaryEnergy.energy_list,),
+            ),
+            ChartDeclaration("production", "get_chart_energies_net_production"),
+            ChartDeclaration("production", "get_chart_energies_brut_production"),
+            ChartDeclaration(
+                "production", "get_chart_energies_net_raw_production_and_limit"
+            ),
+            ChartDeclaration(
+                "Energy mix",
+                "get_pie_charts_production",
+                (GlossaryEnergy.energy_list,),
+                (GlossaryEnergy.Years,),
+            ),
+            ChartDeclaration(
+                "Solid energy and electricity production constraint",
+                "get_charts_solid_energy_elec_constraint",
+                (GlossaryEnergy.energy_list,),
+            ),
+            ChartDeclaration(
+                "Liquid hydrogen production constraint",
+                "get_charts_liquid_hydrogen_constraint",
+                (GlossaryEnergy.energy_list,),
+            ),
+            ChartDeclaration("Stream ratio", "get_chart_stream_ratio"),
+            # get_chart_stream_consumed_by_techno needs data not in data_io of the discipline
+            # TODO move this chart in a namespace post processing
+            ChartDeclaration(
+                "Energy mix losses",
+                "get_charts_energy_mix_losses",
+                (GlossaryEnergy.energy_list,),
+            ),
+            ChartDeclaration(
+                "Stream Flow", "get_charts_stream_flow", (GlossaryEnergy.energy_list,)
+            ),
+            ChartDeclaration(
+                "Individual Stream Flow",
+                "get_charts_individual_stream_flow",
+                (GlossaryEnergy.EnergyListName,),
+            ),
+        ]
+    )
     # All values used to calibrate heat loss percentage
     heat_tfc_2019 = 3561.87
     # + heat losses for transmission,distrib and transport
@@ -174,6 +250,8 @@ class Energy_Mix_Discipline(SoSWrapp):
             "unit": "Twh",
         },
         "exp_min": {"type": "bool", "default": True, "user_level": 2},
+        "incremental_compute": {"type": "bool", "default": False, "user_level": 3},
+        "discipline_instrumentation": {"type": "bool", "default": False, "user_level": 3, "structuring": True},
         "production_threshold": {"type": "float", "default": 1e-3, "unit": "Twh"},
         "scaling_factor_energy_production": {
             "type": "float",
@@ -383,7 +461,6 @@ class Energy_Mix_Discipline(SoSWrapp):
     def __init__(self, sos_name, logger: logging.Logger):
         super().__init__(sos_name, logger)
         self.energy_model = None
-        self.grad_energy_mix_vs_prod_dict = None
 
     def init_execution(self):
         inputs_dict = self.get_sosdisc_inputs()
@@ -394,6 +471,9 @@ class Energy_Mix_Discipline(SoSWrapp):
         dynamic_inputs = {}
         dynamic_outputs = {}
         inputs_dict = self.get_sosdisc_inputs()
+        if "discipline_instrumentation" in inputs_dict:
+            # the study input records the disciplines phases of the whole process while it is True
+            discipline_instrumentation.set_enabled_by_input(inputs_dict["discipline_instrumentation"])
         if GlossaryEnergy.YearStart in self.get_data_in():
             year_start, year_end = self.get_sosdisc_inputs(
                 [GlossaryEnergy.YearStart, GlossaryEnergy.YearEnd]
@@ -638,6 +718,11 @@ class Energy_Mix_Discipline(SoSWrapp):
         self.update_biomass_dry_name(inputs_dict_orig, inputs_dict)
 
         self.energy_model.compute(inputs_dict)
+        if inputs_dict["incremental_compute"]:
+            self.logger.debug(
+                f"Sub-steps skipped by the incremental compute of the energy mix : "
+                f"{self.energy_model.compute_report['skipped_steps']}"
+            )
 
         # -- Compute objectives with alpha trades
         alpha = inputs_dict["alpha"]
@@ -807,19 +892,16 @@ class Energy_Mix_Discipline(SoSWrapp):
             inputs_dict[GlossaryEnergy.YearStart],
             inputs_dict[GlossaryEnergy.YearEnd] + 1,
         )
-        identity = np.eye(len(years))
+        identity = DiagonalJacobianBlock.identity(len(years))
 
         heat_losses_percentage = inputs_dict["heat_losses_percentage"] / 100.0
         primary_energy_percentage = inputs_dict["primary_energy_percentage"]
         production_detailed_df = outputs_dict[
             GlossaryEnergy.StreamProductionDetailedValue
         ]
-        minimum_energy_production = inputs_dict["minimum_energy_production"]
-        production_threshold = inputs_dict["production_threshold"]
         total_prod_minus_min_prod_constraint_ref = inputs_dict[
             "total_prod_minus_min_prod_constraint_ref"
         ]
-        production_energy_net_pos = outputs_dict["production_energy_net_positive"]
         energies = [
             j
             for j in stream_list
@@ -832,116 +914,120 @@ class Energy_Mix_Discipline(SoSWrapp):
         scaling_factor_energy_consumption = inputs_dict[
             "scaling_factor_energy_consumption"
         ]
-        energy_price_after_tax = outputs_dict["energy_prices_after_tax"]
         solid_fuel_elec_percentage = inputs_dict["solid_fuel_elec_percentage"]
         solid_fuel_elec_constraint_ref = inputs_dict["solid_fuel_elec_constraint_ref"]
         liquid_hydrogen_percentage = inputs_dict["liquid_hydrogen_percentage"]
         liquid_hydrogen_constraint_ref = inputs_dict["liquid_hydrogen_constraint_ref"]
         syngas_prod_ref = inputs_dict["syngas_prod_ref"]
-        sub_production_dict, sub_consumption_dict = {}, {}
-        sub_consumption_woratio_dict = self.energy_model.sub_consumption_woratio_dict
-        for stream in stream_list:
-            sub_production_dict[stream] = (
-                inputs_dict[f"{stream}.{GlossaryEnergy.EnergyProductionValue}"]
-                * scaling_factor_energy_production
-            )
-            sub_consumption_dict[stream] = (
-                inputs_dict[f"{stream}.{GlossaryEnergy.StreamConsumptionValue}"]
-                * scaling_factor_energy_consumption
-            )
+        # intermediates of the compute of the model for these inputs
+        gradient_tape = self.energy_model.get_gradient_tape(inputs_dict)
+        # (consumer, consumed) pairs of streams, indexed once by the model
+        stream_flow_matrix = self.energy_model.stream_flow_matrix
 
         # -------------------------------------------#
         # ---- Production / Consumption gradients----#
         # -------------------------------------------#
-        d_non_use_capital, d_capital = (
-            self.energy_model.d_non_use_capital_constraint_d_capital()
-        )
-        d_non_use_capital_obj, d_capital_obj = (
-            self.energy_model.d_non_use_capital_obj_d_capital()
-        )
-        for stream in (
-            inputs_dict[GlossaryEnergy.energy_list]
-            + inputs_dict[GlossaryEnergy.ccs_list]
+        if self.is_jacobian_output_requested(
+                GlossaryEnergy.ObjectiveEnergyNonUseCapitalByStream, GlossaryEnergy.EnergyCapitalDfValue,
+                GlossaryEnergy.ConstraintEnergyNonUseCapital, GlossaryEnergy.ObjectiveEnergyNonUseCapital
         ):
-            ns_stream = self.get_ns_stream(stream)
-            d_non_use_capital_by_stream, d_capital_by_stream = (
-                self.energy_model.d_non_use_capital_obj_by_stream_d_capital(ns_stream)
-            )
-            self.set_partial_derivative_for_other_types(
-                (GlossaryEnergy.ObjectiveEnergyNonUseCapitalByStream,),
-                (
-                    f"{ns_stream}.{GlossaryEnergy.EnergyTypeCapitalDfValue}",
-                    GlossaryEnergy.Capital,
-                ),
-                d_capital_by_stream,
-            )
-            self.set_partial_derivative_for_other_types(
-                (GlossaryEnergy.ObjectiveEnergyNonUseCapitalByStream,),
-                (
-                    f"{ns_stream}.{GlossaryEnergy.EnergyTypeCapitalDfValue}",
-                    GlossaryEnergy.NonUseCapital,
-                ),
-                d_non_use_capital_by_stream,
+            d_non_use_capital, d_capital = (
+                self.energy_model.d_non_use_capital_constraint_d_capital()
             )
-            self.set_partial_derivative_for_other_types(
-                (GlossaryEnergy.EnergyCapitalDfValue, GlossaryEnergy.Capital),
-                (
-                    f"{ns_stream}.{GlossaryEnergy.EnergyTypeCapitalDfValue}",
-                    GlossaryEnergy.Capital,
-                ),
-                identity / 1e3,
-            )
-            self.set_partial_derivative_for_other_types(
-                (GlossaryEnergy.EnergyCapitalDfValue, GlossaryEnergy.NonUseCapital),
-                (
-                    f"{ns_stream}.{GlossaryEnergy.EnergyTypeCapitalDfValue}",
-                    GlossaryEnergy.NonUseCapital,
-                ),
-                identity / 1e3,
+            d_non_use_capital_obj, d_capital_obj = (
+                self.energy_model.d_non_use_capital_obj_d_capital()
             )
+            for stream in (
+                inputs_dict[GlossaryEnergy.energy_list]
+                + inputs_dict[GlossaryEnergy.ccs_list]
+            ):
+                ns_stream = self.get_ns_stream(stream)
+                d_non_use_capital_by_stream, d_capital_by_stream = (
+                    self.energy_model.d_non_use_capital_obj_by_stream_d_capital(ns_stream)
+                )
+                self.set_partial_derivative_for_other_types(
+                    (GlossaryEnergy.ObjectiveEnergyNonUseCapitalByStream,),
+                    (
+                        f"{ns_stream}.{GlossaryEnergy.EnergyTypeCapitalDfValue}",
+                        GlossaryEnergy.Capital,
+                    ),
+                    d_capital_by_stream,
+                )
+                self.set_partial_derivative_for_other_types(
+                    (GlossaryEnergy.ObjectiveEnergyNonUseCapitalByStream,),
+                    (
+                        f"{ns_stream}.{GlossaryEnergy.EnergyTypeCapitalDfValue}",
+                        GlossaryEnergy.NonUseCapital,
+                    ),
+                    d_non_use_capital_by_stream,
+                )
+                self.set_partial_derivative_for_other_types(
+                    (GlossaryEnergy.EnergyCapitalDfValue, GlossaryEnergy.Capital),
+                    (
+                        f"{ns_stream}.{GlossaryEnergy.EnergyTypeCapitalDfValue}",
+                        GlossaryEnergy.Capital,
+                    ),
+                    identity / 1e3,
+                )
+                self.set_partial_derivative_for_other_types(
+                    (GlossaryEnergy.EnergyCapitalDfValue, GlossaryEnergy.NonUseCapital),
+                    (
+                        f"{ns_stream}.{GlossaryEnergy.EnergyTypeCapitalDfValue}",
+                        GlossaryEnergy.NonUseCapital,
+                    ),
+                    identity / 1e3,
+                )
 
-            self.set_partial_derivative_for_other_types(
-                (
-                    GlossaryEnergy.ConstraintEnergyNonUseCapital,
-                    GlossaryEnergy.ConstraintEnergyNonUseCapital,
-                ),
-                (
-                    f"{ns_stream}.{GlossaryEnergy.EnergyTypeCapitalDfValue}",
-                    GlossaryEnergy.Capital,
-                ),
-                d_capital,
-            )
+                self.set_partial_derivative_for_other_types(
+                    (
+                        GlossaryEnergy.ConstraintEnergyNonUseCapital,
+                        GlossaryEnergy.ConstraintEnergyNonUseCapital,
+                    ),
+                    (
+                        f"{ns_stream}.{GlossaryEnergy.EnergyTypeCapitalDfValue}",
+                        GlossaryEnergy.Capital,
+                    ),
+                    d_capital,
+                )
 
-            self.set_partial_derivative_for_other_types(
-                (
-                    GlossaryEnergy.ConstraintEnergyNonUseCapital,
-                    GlossaryEnergy.ConstraintEnergyNonUseCapital,
-                ),
-                (
-                    f"{ns_stream}.{GlossaryEnergy.EnergyTypeCapitalDfValue}",
-                    GlossaryEnergy.NonUseCapital,
-                ),
-                d_non_use_capital,
-            )
+                self.set_partial_derivative_for_other_types(
+                    (
+                        GlossaryEnergy.ConstraintEnergyNonUseCapital,
+                        GlossaryEnergy.ConstraintEnergyNonUseCapital,
+                    ),
+                    (
+                        f"{ns_stream}.{GlossaryEnergy.EnergyTypeCapitalDfValue}",
+                        GlossaryEnergy.NonUseCapital,
+                    ),
+                    d_non_use_capital,
+                )
 
-            self.set_partial_derivative_for_other_types(
-                (GlossaryEnergy.ObjectiveEnergyNonUseCapital,),
-                (
-                    f"{ns_stream}.{GlossaryEnergy.EnergyTypeCapitalDfValue}",
-                    GlossaryEnergy.Capital,
-                ),
-                d_capital_obj,
-            )
+                self.set_partial_derivative_for_other_types(
+                    (GlossaryEnergy.ObjectiveEnergyNonUseCapital,),
+                    (
+                        f"{ns_stream}.{GlossaryEnergy.EnergyTypeCapitalDfValue}",
+                        GlossaryEnergy.Capital,
+                    ),
+                    d_capital_obj,
+                )
 
-            self.set_partial_derivative_for_other_types(
-                (GlossaryEnergy.ObjectiveEnergyNonUseCapital,),
-                (
-                    f"{ns_stream}.{GlossaryEnergy.EnergyTypeCapitalDfValue}",
-                    GlossaryEnergy.NonUseCapital,
-                ),
-                d_non_use_capital_obj,
-            )
+                self.set_partial_derivative_for_other_types(
+                    (GlossaryEnergy.ObjectiveEnergyNonUseCapital,),
+                    (
+                        f"{ns_stream}.{GlossaryEnergy.EnergyTypeCapitalDfValue}",
+                        GlossaryEnergy.NonUseCapital,
+                    ),
+                    d_non_use_capital_obj,
+                )
 
+        # gradients wrt the consumptions, the same for all the consumptions
+        dtotal_prod_denergy_cons = -self.compute_dtotal_production_denergy_production(0.0)
+        dprod_objective_dcons = self.compute_denergy_production_objective_dprod(
+            dtotal_prod_denergy_cons,
+            inputs_dict["alpha"],
+            outputs_dict[GlossaryEnergy.EnergyProductionValue],
+            years,
+        )
         for stream in stream_list:
             ns_stream = self.get_ns_stream(stream)
 
@@ -954,9 +1040,7 @@ class Energy_Mix_Discipline(SoSWrapp):
 
                 # ---- Production gradients----#
                 dtotal_prod_denergy_prod = (
-                    self.compute_dtotal_production_denergy_production(
-                        production_detailed_df, minimum_energy_production, loss_percent
-                    )
+                    self.compute_dtotal_production_denergy_production(loss_percent)
                 )
                 dprod_objective_dprod = self.compute_denergy_production_objective_dprod(
                     dtotal_prod_denergy_prod,
@@ -997,7 +1081,7 @@ class Energy_Mix_Discipline(SoSWrapp):
                         "Total production (uncut)",
                     ),
                     (f"{ns_stream}.{GlossaryEnergy.EnergyProductionValue}", stream),
-                    np.identity(len(years))
+                    identity
                     * scaling_factor_energy_production
                     * (1.0 - loss_percent),
                 )
@@ -1007,14 +1091,14 @@ class Energy_Mix_Discipline(SoSWrapp):
                         f"production {stream} ({GlossaryEnergy.unit_dicts[stream]})",
                     ),
                     (f"{ns_stream}.{GlossaryEnergy.EnergyProductionValue}", stream),
-                    np.identity(len(years))
+                    identity
                     * scaling_factor_energy_production
                     * (1.0 - loss_percentage),
                 )
                 self.set_partial_derivative_for_other_types(
                     ("energy_production_brut", GlossaryEnergy.TotalProductionValue),
                     (f"{ns_stream}.{GlossaryEnergy.EnergyProductionValue}", stream),
-                    scaling_factor_energy_production * np.identity(len(years)),
+                    scaling_factor_energy_production * identity,
                 )
                 self.set_partial_derivative_for_other_types(
                     ("energy_production_objective",),
@@ -1041,7 +1125,7 @@ class Energy_Mix_Discipline(SoSWrapp):
                                 stream,
                             ),
                             (
-                                np.identity(len(years)) * (1 - loss_percentage)
+                                identity * (1 - loss_percentage)
                                 - primary_energy_percentage * dtotal_prod_denergy_prod
                             )
                             * scaling_factor_energy_production,
@@ -1074,7 +1158,7 @@ class Energy_Mix_Discipline(SoSWrapp):
                             )
                             / solid_fuel_elec_constraint_ref
                         )
-                        * np.identity(len(years)),
+                        * identity,
                     )
                 else:
                     self.set_partial_derivative_for_other_types(
@@ -1087,7 +1171,7 @@ class Energy_Mix_Discipline(SoSWrapp):
                         * solid_fuel_elec_percentage
                         * dtotal_prod_denergy_prod
                         / solid_fuel_elec_constraint_ref
-                        * np.identity(len(years)),
+                        * identity,
                     )
 
                 if stream == self.SYNGAS_NAME:
@@ -1100,7 +1184,7 @@ class Energy_Mix_Discipline(SoSWrapp):
                                 f"production {GlossaryEnergy.syngas} ({GlossaryEnergy.energy_unit})"
                             ].values
                         )
-                        * np.identity(len(years))
+                        * identity
                         / syngas_prod_ref,
                     )
 
@@ -1108,7 +1192,7 @@ class Energy_Mix_Discipline(SoSWrapp):
                         (EnergyMix.SYNGAS_PROD_CONSTRAINT,),
                         (f"{ns_stream}.{GlossaryEnergy.EnergyProductionValue}", stream),
                         -scaling_factor_energy_production
-                        * np.identity(len(years))
+                        * identity
                         / syngas_prod_ref,
                     )
 
@@ -1129,7 +1213,7 @@ class Energy_Mix_Discipline(SoSWrapp):
                             * (liquid_hydrogen_percentage - 1)
                             / liquid_hydrogen_constraint_ref
                         )
-                        * np.identity(len(years)),
+                        * identity,
                     )
                 elif stream == self.GASEOUS_HYDROGEN_NAME:
                     self.set_partial_derivative_for_other_types(
@@ -1143,34 +1227,13 @@ class Energy_Mix_Discipline(SoSWrapp):
                             * liquid_hydrogen_percentage
                             / liquid_hydrogen_constraint_ref
                         )
-                        * np.identity(len(years)),
+                        * identity,
                     )
                 # ---- Loop on energy again to differentiate production and consumption ----#
                 for stream_input in stream_list:
                     ns_stream_input = self.get_ns_stream(stream_input)
-                    list_columns_energy_consumption = list(
-                        inputs_dict[
-                            f"{stream_input}.{GlossaryEnergy.StreamConsumptionValue}"
-                        ].columns
-                    )
-                    if (
-                        f"{stream} ({GlossaryEnergy.unit_dicts[stream]})"
-                        in list_columns_energy_consumption
-                    ):
+                    if stream_flow_matrix.has_flow(stream_input, stream):
                         # ---- Consumption gradients----#
-                        dtotal_prod_denergy_cons = (
-                            -self.compute_dtotal_production_denergy_production(
-                                production_detailed_df, minimum_energy_production, 0.0
-                            )
-                        )
-                        dprod_objective_dcons = (
-                            self.compute_denergy_production_objective_dprod(
-                                dtotal_prod_denergy_cons,
-                                inputs_dict["alpha"],
-                                outputs_dict[GlossaryEnergy.EnergyProductionValue],
-                                years,
-                            )
-                        )
                         self.set_partial_derivative_for_other_types(
                             (
                                 GlossaryEnergy.EnergyProductionValue,
@@ -1223,7 +1286,7 @@ class Energy_Mix_Discipline(SoSWrapp):
                                 f"{stream} ({GlossaryEnergy.unit_dicts[stream]})",
                             ),
                             -scaling_factor_energy_consumption
-                            * np.identity(len(years))
+                            * identity
                             / scaling_factor_energy_production
                             * scaling_factor_energy_production,
                         )
@@ -1237,7 +1300,7 @@ class Energy_Mix_Discipline(SoSWrapp):
                                 f"{stream} ({GlossaryEnergy.unit_dicts[stream]})",
                             ),
                             -scaling_factor_energy_consumption
-                            * np.identity(len(years))
+                            * identity
                             / scaling_factor_energy_production
                             * scaling_factor_energy_production,
                         )
@@ -1275,7 +1338,7 @@ class Energy_Mix_Discipline(SoSWrapp):
                                     * (
                                         primary_energy_percentage
                                         * dtotal_prod_denergy_cons
-                                        + np.identity(len(years))
+                                        + identity
                                     ),
                                 )
                             else:
@@ -1310,7 +1373,7 @@ class Energy_Mix_Discipline(SoSWrapp):
                                     )
                                     / solid_fuel_elec_constraint_ref
                                 )
-                                * np.identity(len(years)),
+                                * identity,
                             )
                         else:
                             self.set_partial_derivative_for_other_types(
@@ -1326,7 +1389,7 @@ class Energy_Mix_Discipline(SoSWrapp):
                                 * solid_fuel_elec_percentage
                                 * dtotal_prod_denergy_cons
                                 / solid_fuel_elec_constraint_ref
-                                * np.identity(len(years)),
+                                * identity,
                             )
 
                         if (
@@ -1347,7 +1410,7 @@ class Energy_Mix_Discipline(SoSWrapp):
                                     * (liquid_hydrogen_percentage - 1)
                                     / liquid_hydrogen_constraint_ref
                                 )
-                                * np.identity(len(years)),
+                                * identity,
                             )
                         elif stream == self.GASEOUS_HYDROGEN_NAME:
                             self.set_partial_derivative_for_other_types(
@@ -1364,7 +1427,7 @@ class Energy_Mix_Discipline(SoSWrapp):
                                     * liquid_hydrogen_percentage
                                     / liquid_hydrogen_constraint_ref
                                 )
-                                * np.identity(len(years)),
+                                * identity,
                             )
 
                         if stream == self.SYNGAS_NAME:
@@ -1380,7 +1443,7 @@ class Energy_Mix_Discipline(SoSWrapp):
                                         f"production {GlossaryEnergy.syngas} ({GlossaryEnergy.energy_unit})"
                                     ].values
                                 )
-                                * np.identity(len(years))
+                                * identity
                                 / syngas_prod_ref,
                             )
 
@@ -1391,7 +1454,7 @@ class Energy_Mix_Discipline(SoSWrapp):
                                     f"{stream} ({GlossaryEnergy.unit_dicts[stream]})",
                                 ),
                                 scaling_factor_energy_production
-                                * np.identity(len(years))
+                                * identity
                                 / syngas_prod_ref,
                             )
 
@@ -1403,20 +1466,12 @@ class Energy_Mix_Discipline(SoSWrapp):
                         f"production {stream} ({GlossaryEnergy.unit_dicts[stream]})",
                     ),
                     (f"{ns_stream}.{GlossaryEnergy.EnergyProductionValue}", stream),
-                    np.identity(len(years)) * scaling_factor_energy_production * 00,
+                    identity * scaling_factor_energy_production * 00,
                 )
                 # ---- Loop on energy again to differentiate production and consumption ----#
                 for stream_input in stream_list:
                     ns_stream_input = self.get_ns_stream(stream_input)
-                    list_columns_energy_consumption = list(
-                        inputs_dict[
-                            f"{stream_input}.{GlossaryEnergy.StreamConsumptionValue}"
-                        ].columns
-                    )
-                    if (
-                        f"{stream} ({GlossaryEnergy.unit_dicts[stream]})"
-                        in list_columns_energy_consumption
-                    ):  # F or stream_input == GlossaryEnergy.carbon_storage:
+                    if stream_flow_matrix.has_flow(stream_input, stream):  # F or stream_input == GlossaryEnergy.carbon_storage:
                         self.set_partial_derivative_for_other_types(
                             (
                                 GlossaryEnergy.StreamProductionDetailedValue,
@@ -1427,16 +1482,13 @@ class Energy_Mix_Discipline(SoSWrapp):
                                 f"{stream} ({GlossaryEnergy.unit_dicts[stream]})",
                             ),
                             -scaling_factor_energy_consumption
-                            * np.identity(len(years))
+                            * identity
                             / scaling_factor_energy_production
                             * scaling_factor_energy_production
                             * 0,
                         )
 
-                    if (
-                        f"{stream} ({GlossaryEnergy.unit_dicts[stream]})"
-                        in list_columns_energy_consumption
-                    ):  # or stream_input == GlossaryEnergy.carbon_capture:
+                    if stream_flow_matrix.has_flow(stream_input, stream):  # or stream_input == GlossaryEnergy.carbon_capture:
                         self.set_partial_derivative_for_other_types(
                             (
                                 GlossaryEnergy.StreamProductionDetailedValue,
@@ -1447,7 +1499,7 @@ class Energy_Mix_Discipline(SoSWrapp):
                                 f"{stream} ({GlossaryEnergy.unit_dicts[stream]})",
                             ),
                             -scaling_factor_energy_consumption
-                            * np.identity(len(years))
+                            * identity
                             / scaling_factor_energy_production
                             * scaling_factor_energy_production
                             * 0,
@@ -1456,529 +1508,384 @@ class Energy_Mix_Discipline(SoSWrapp):
         # -------------------------#
         # ---- Prices gradients----#
         # -------------------------#
-        for stream in stream_list:
-            ns_stream = self.get_ns_stream(stream)
-            if stream in energies:
+        if self.is_jacobian_output_requested("energy_prices_after_tax", GlossaryEnergy.StreamPricesValue):
+            for stream in stream_list:
+                ns_stream = self.get_ns_stream(stream)
+                if stream in energies:
+                    self.set_partial_derivative_for_other_types(
+                        ("energy_prices_after_tax", stream),
+                        (f"{ns_stream}.{GlossaryEnergy.StreamPricesValue}", stream),
+                        identity,
+                    )
+                    self.set_partial_derivative_for_other_types(
+                        ("energy_prices_after_tax", stream),
+                        (GlossaryEnergy.CO2TaxesValue, GlossaryEnergy.CO2Tax),
+                        inputs_dict[f"{stream}.{GlossaryEnergy.CO2PerUse}"][
+                            GlossaryEnergy.CO2PerUse
+                        ].values
+                        * identity,
+                    )
+                    self.set_partial_derivative_for_other_types(
+                        ("energy_prices_after_tax", stream),
+                        (
+                            f"{ns_stream}.{GlossaryEnergy.CO2PerUse}",
+                            GlossaryEnergy.CO2PerUse,
+                        ),
+                        inputs_dict[GlossaryEnergy.CO2TaxesValue][
+                            GlossaryEnergy.CO2Tax
+                        ].values
+                        * identity,
+                    )
                 self.set_partial_derivative_for_other_types(
-                    ("energy_prices_after_tax", stream),
+                    (GlossaryEnergy.StreamPricesValue, stream),
                     (f"{ns_stream}.{GlossaryEnergy.StreamPricesValue}", stream),
-                    np.identity(len(years)),
+                    identity,
                 )
-                self.set_partial_derivative_for_other_types(
-                    ("energy_prices_after_tax", stream),
-                    (GlossaryEnergy.CO2TaxesValue, GlossaryEnergy.CO2Tax),
-                    inputs_dict[f"{stream}.{GlossaryEnergy.CO2PerUse}"][
-                        GlossaryEnergy.CO2PerUse
-                    ].values
-                    * np.identity(len(years)),
-                )
-                self.set_partial_derivative_for_other_types(
-                    ("energy_prices_after_tax", stream),
-                    (
-                        f"{ns_stream}.{GlossaryEnergy.CO2PerUse}",
-                        GlossaryEnergy.CO2PerUse,
-                    ),
-                    inputs_dict[GlossaryEnergy.CO2TaxesValue][
-                        GlossaryEnergy.CO2Tax
-                    ].values
-                    * np.identity(len(years)),
-                )
-            self.set_partial_derivative_for_other_types(
-                (GlossaryEnergy.StreamPricesValue, stream),
-                (f"{ns_stream}.{GlossaryEnergy.StreamPricesValue}", stream),
-                np.identity(len(years)),
-            )
 
         # -------------------------------#
         # ---Resource Demand gradients---#
         # -------------------------------#
 
-        resource_list = EnergyMix.RESOURCE_LIST
-        for stream in stream_list:
-            ns_stream = self.get_ns_stream(stream)
-            for resource in inputs_dict[
-                f"{stream}.{GlossaryEnergy.StreamConsumptionValue}"
-            ]:
-                resource_wo_unit = resource.replace(
-                    f" ({ResourceGlossary.UNITS['consumption']})", ""
-                )
-                if resource_wo_unit in resource_list:
-                    self.set_partial_derivative_for_other_types(
-                        ("resources_demand", resource_wo_unit),
-                        (
-                            f"{ns_stream}.{GlossaryEnergy.StreamConsumptionValue}",
-                            resource,
-                        ),
-                        scaling_factor_energy_consumption * np.identity(len(years)),
-                    )
-                    self.set_partial_derivative_for_other_types(
-                        ("resources_demand_woratio", resource_wo_unit),
-                        (
-                            f"{ns_stream}.{GlossaryEnergy.StreamConsumptionWithoutRatioValue}",
-                            resource,
-                        ),
-                        scaling_factor_energy_consumption * np.identity(len(years)),
+        if self.is_jacobian_output_requested("resources_demand", "resources_demand_woratio"):
+            resource_list = EnergyMix.RESOURCE_LIST
+            for stream in stream_list:
+                ns_stream = self.get_ns_stream(stream)
+                for resource in inputs_dict[
+                    f"{stream}.{GlossaryEnergy.StreamConsumptionValue}"
+                ]:
+                    resource_wo_unit = resource.replace(
+                        f" ({ResourceGlossary.UNITS['consumption']})", ""
                     )
+                    if resource_wo_unit in resource_list:
+                        self.set_partial_derivative_for_other_types(
+                            ("resources_demand", resource_wo_unit),
+                            (
+                                f"{ns_stream}.{GlossaryEnergy.StreamConsumptionValue}",
+                                resource,
+                            ),
+                            scaling_factor_energy_consumption * identity,
+                        )
+                        self.set_partial_derivative_for_other_types(
+                            ("resources_demand_woratio", resource_wo_unit),
+                            (
+                                f"{ns_stream}.{GlossaryEnergy.StreamConsumptionWithoutRatioValue}",
+                                resource,
+                            ),
+                            scaling_factor_energy_consumption * identity,
+                        )
         # -----------------------------#
         # ---- Mean Price gradients----#
         # -----------------------------#
-        element_dict = dict(zip(energies, energies))
-        self.grad_energy_mix_vs_prod_dict = (
-            self.energy_model.compute_grad_element_mix_vs_prod(
-                deepcopy(production_energy_net_pos),
-                element_dict,
-                exp_min=inputs_dict["exp_min"],
-                min_prod=production_threshold,
+        if self.is_jacobian_output_requested(GlossaryEnergy.EnergyMeanPriceValue, GlossaryEnergy.EnergyMeanPriceObjectiveValue):
+            grad_mean_price_vs_net_prod = (
+                self.energy_model.compute_grad_mean_price_vs_net_production()
             )
-        )
-        dmean_price_dco2_tax = np.zeros((len(years), len(years)))
-        for stream in stream_list:
-            ns_stream = self.get_ns_stream(stream)
-            if stream in energies:
-                mix_weight_energy = mix_weight[stream].values
-                dmean_price_dco2_tax += (
-                    inputs_dict[f"{stream}.{GlossaryEnergy.CO2PerUse}"][
-                        GlossaryEnergy.CO2PerUse
-                    ].values
-                    * mix_weight_energy
-                )
-                d_emp = mix_weight_energy * np.identity(len(years))
-                self.set_partial_derivative_for_other_types(
-                    (
-                        GlossaryEnergy.EnergyMeanPriceValue,
-                        GlossaryEnergy.EnergyPriceValue,
-                    ),
-                    (f"{ns_stream}.{GlossaryEnergy.StreamPricesValue}", stream),
-                    d_emp,
-                )
-                d_emp_obj = (
-                    self.energy_model.d_energy_mean_price_obj_d_energy_mean_price(d_emp)
-                )
-                self.set_partial_derivative_for_other_types(
-                    (GlossaryEnergy.EnergyMeanPriceObjectiveValue,),
-                    (f"{ns_stream}.{GlossaryEnergy.StreamPricesValue}", stream),
-                    d_emp_obj,
-                )
-                d_emp = (
-                    inputs_dict[GlossaryEnergy.CO2TaxesValue][
-                        GlossaryEnergy.CO2Tax
-                    ].values
-                    * mix_weight_energy
-                    * np.identity(len(years))
-                )
-                self.set_partial_derivative_for_other_types(
-                    (
-                        GlossaryEnergy.EnergyMeanPriceValue,
-                        GlossaryEnergy.EnergyPriceValue,
-                    ),
-                    (
-                        f"{ns_stream}.{GlossaryEnergy.CO2PerUse}",
-                        GlossaryEnergy.CO2PerUse,
-                    ),
-                    d_emp,
-                )
-                d_emp_obj = (
-                    self.energy_model.d_energy_mean_price_obj_d_energy_mean_price(d_emp)
-                )
-                self.set_partial_derivative_for_other_types(
-                    (GlossaryEnergy.EnergyMeanPriceObjectiveValue,),
-                    (
-                        f"{ns_stream}.{GlossaryEnergy.CO2PerUse}",
-                        GlossaryEnergy.CO2PerUse,
-                    ),
-                    d_emp_obj,
-                )
-                dmean_price_dprod = self.compute_dmean_price_dprod(
-                    stream,
-                    energies,
-                    mix_weight,
-                    energy_price_after_tax,
-                    production_energy_net_pos,
-                    production_detailed_df,
-                )
-
-                loss_percentage = inputs_dict[f"{ns_stream}.losses_percentage"] / 100.0
-                # To model raw to net percentage for witness coarse energies
-                if stream in self.energy_model.raw_tonet_dict:
-                    loss_percentage += 1.0 - self.energy_model.raw_tonet_dict[stream]
-                d_emp = (
-                    scaling_factor_energy_production
-                    * dmean_price_dprod
-                    * (1.0 - loss_percentage)
-                )
-                self.set_partial_derivative_for_other_types(
-                    (
-                        GlossaryEnergy.EnergyMeanPriceValue,
-                        GlossaryEnergy.EnergyPriceValue,
-                    ),
-                    (f"{ns_stream}.{GlossaryEnergy.EnergyProductionValue}", stream),
-                    d_emp,
-                )
-                d_emp_obj = (
-                    self.energy_model.d_energy_mean_price_obj_d_energy_mean_price(d_emp)
-                )
-                self.set_partial_derivative_for_other_types(
-                    (GlossaryEnergy.EnergyMeanPriceObjectiveValue,),
-                    (f"{ns_stream}.{GlossaryEnergy.EnergyProductionValue}", stream),
-                    d_emp_obj,
-                )
-
-            for stream_input in stream_list:
-                if stream_input in energies:
-                    ns_stream_input = self.get_ns_stream(stream_input)
-                    list_columns_energy_consumption = list(
-                        inputs_dict[
-                            f"{stream_input}.{GlossaryEnergy.StreamConsumptionValue}"
-                        ].columns
-                    )
-                    if (
-                        f"{stream} ({GlossaryEnergy.unit_dicts[stream]})"
-                        in list_columns_energy_consumption
-                    ):
-                        if stream in energies:
-                            dmean_price_dcons = self.compute_dmean_price_dprod(
-                                stream,
-                                energies,
-                                mix_weight,
-                                energy_price_after_tax,
-                                production_energy_net_pos,
-                                production_detailed_df,
-                                cons=True,
-                            )
-                            d_emp = (
-                                scaling_factor_energy_consumption * dmean_price_dcons
-                            )
-                            self.set_partial_derivative_for_other_types(
-                                (
-                                    GlossaryEnergy.EnergyMeanPriceValue,
-                                    GlossaryEnergy.EnergyPriceValue,
-                                ),
-                                (
-                                    f"{ns_stream_input}.{GlossaryEnergy.StreamConsumptionValue}",
-                                    f"{stream} ({GlossaryEnergy.unit_dicts[stream]})",
-                                ),
-                                d_emp,
-                            )
-                            d_emp_obj = self.energy_model.d_energy_mean_price_obj_d_energy_mean_price(
-                                d_emp
-                            )
-                            self.set_partial_derivative_for_other_types(
-                                (GlossaryEnergy.EnergyMeanPriceObjectiveValue,),
-                                (
-                                    f"{ns_stream_input}.{GlossaryEnergy.StreamConsumptionValue}",
-                                    f"{stream} ({GlossaryEnergy.unit_dicts[stream]})",
-                                ),
-                                d_emp_obj,
-                            )
-        d_emp = dmean_price_dco2_tax * np.identity(len(years))
-        self.set_partial_derivative_for_other_types(
-            (GlossaryEnergy.EnergyMeanPriceValue, GlossaryEnergy.EnergyPriceValue),
-            (GlossaryEnergy.CO2TaxesValue, GlossaryEnergy.CO2Tax),
-            dmean_price_dco2_tax * np.identity(len(years)),
-        )
-        d_emp_obj = self.energy_model.d_energy_mean_price_obj_d_energy_mean_price(d_emp)
-        self.set_partial_derivative_for_other_types(
-            (GlossaryEnergy.EnergyMeanPriceObjectiveValue,),
-            (GlossaryEnergy.CO2TaxesValue, GlossaryEnergy.CO2Tax),
-            d_emp_obj,
-        )
-
-        # --------------------------------#
-        # -- New CO2 emissions gradients--#
-        # --------------------------------#
-
-        co2_emissions_needed_by_energy_mix = outputs_dict[
-            "co2_emissions_needed_by_energy_mix"
-        ]
-        carbon_capture_from_energy_mix = outputs_dict["carbon_capture_from_energy_mix"]
-        self.energy_model.configure_parameters_update(inputs_dict)
-        dtot_co2_emissions = self.energy_model.compute_grad_CO2_emissions()
-
-        for key, value in dtot_co2_emissions.items():
-            co2_emission_column = key.split(" vs ")[0]
-            energy_prod_info = key.split(" vs ")[1]
-            stream = energy_prod_info.split("#")[0]
-            last_part_key = energy_prod_info.split("#")[1]
-            if stream in stream_list:
-                self.set_gradient_for_co2_emissions(
-                    "co2_emissions_needed_by_energy_mix",
-                    co2_emissions_needed_by_energy_mix,
-                    co2_emission_column,
-                    stream,
-                    energy_prod_info,
-                    last_part_key,
-                    value,
-                    inputs_dict,
-                    years,
-                )
-                self.set_gradient_for_co2_emissions(
-                    "carbon_capture_from_energy_mix",
-                    carbon_capture_from_energy_mix,
-                    co2_emission_column,
-                    stream,
-                    energy_prod_info,
-                    last_part_key,
-                    value,
-                    inputs_dict,
-                    years,
-                )
-        # -----------------------------------#
-        # ---- Demand Violation gradients----#
-        # -----------------------------------#
-        for stream in energies:
-            ns_stream = self.get_ns_stream(stream)
-            if stream in outputs_dict[GlossaryEnergy.StreamsCO2EmissionsValue].keys():
-                self.set_partial_derivative_for_other_types(
-                    (GlossaryEnergy.StreamsCO2EmissionsValue, stream),
-                    (f"{ns_stream}.{GlossaryEnergy.CO2EmissionsValue}", stream),
-                    np.identity(len(years)),
-                )
-            for stream_input in stream_list:
-                ns_stream_input = self.get_ns_stream(stream_input)
-                list_columnsenergyprod = list(
-                    inputs_dict[
-                        f"{stream_input}.{GlossaryEnergy.EnergyProductionValue}"
-                    ].columns
-                )
-                list_columns_energy_consumption = list(
-                    inputs_dict[
-                        f"{stream_input}.{GlossaryEnergy.StreamConsumptionValue}"
-                    ].columns
-                )
-                list_index_prod = [j == stream for j in list_columnsenergyprod]
-                list_index_conso = [
-                    j == f"{stream} ({GlossaryEnergy.unit_dicts[stream]})"
-                    for j in list_columns_energy_consumption
-                ]
-
-                if True in list_index_prod:
-                    loss_percentage = (
-                        inputs_dict[f"{ns_stream}.losses_percentage"] / 100.0
+            dmean_price_dco2_tax = np.zeros(len(years))
+            for stream in stream_list:
+                ns_stream = self.get_ns_stream(stream)
+                if stream in energies:
+                    mix_weight_energy = mix_weight[stream].values
+                    dmean_price_dco2_tax += (
+                        inputs_dict[f"{stream}.{GlossaryEnergy.CO2PerUse}"][
+                            GlossaryEnergy.CO2PerUse
+                        ].values
+                        * mix_weight_energy
                     )
-                    # To model raw to net percentage for witness coarse
-                    # energies
-                    if stream in self.energy_model.raw_tonet_dict:
-                        loss_percentage += (
-                            1.0 - self.energy_model.raw_tonet_dict[stream]
-                        )
-                    loss_percent = heat_losses_percentage + loss_percentage
-
+                    d_emp = mix_weight_energy * identity
                     self.set_partial_derivative_for_other_types(
                         (
-                            EnergyMix.TOTAL_PROD_MINUS_MIN_PROD_CONSTRAINT_DF,
-                            EnergyMix.TOTAL_PROD_MINUS_MIN_PROD_CONSTRAINT,
+                            GlossaryEnergy.EnergyMeanPriceValue,
+                            GlossaryEnergy.EnergyPriceValue,
                         ),
-                        (
-                            f"{ns_stream_input}.{GlossaryEnergy.EnergyProductionValue}",
-                            stream,
-                        ),
-                        scaling_factor_energy_production
-                        * np.identity(len(years))
-                        / total_prod_minus_min_prod_constraint_ref
-                        * (1.0 - loss_percent),
+                        (f"{ns_stream}.{GlossaryEnergy.StreamPricesValue}", stream),
+                        d_emp,
+                    )
+                    d_emp_obj = (
+                        self.energy_model.d_energy_mean_price_obj_d_energy_mean_price(d_emp)
+                    )
+                    self.set_partial_derivative_for_other_types(
+                        (GlossaryEnergy.EnergyMeanPriceObjectiveValue,),
+                        (f"{ns_stream}.{GlossaryEnergy.StreamPricesValue}", stream),
+                        d_emp_obj,
+                    )
+                    d_emp = (
+                        inputs_dict[GlossaryEnergy.CO2TaxesValue][
+                            GlossaryEnergy.CO2Tax
+                        ].values
+                        * mix_weight_energy
+                        * identity
                     )
-
-                if True in list_index_conso:
                     self.set_partial_derivative_for_other_types(
                         (
-                            EnergyMix.TOTAL_PROD_MINUS_MIN_PROD_CONSTRAINT_DF,
-                            EnergyMix.TOTAL_PROD_MINUS_MIN_PROD_CONSTRAINT,
+                            GlossaryEnergy.EnergyMeanPriceValue,
+                            GlossaryEnergy.EnergyPriceValue,
                         ),
                         (
-                            f"{ns_stream_input}.{GlossaryEnergy.StreamConsumptionValue}",
-                            list_columns_energy_consumption[
-                                list_index_conso.index(True)
-                            ],
+                            f"{ns_stream}.{GlossaryEnergy.CO2PerUse}",
+                            GlossaryEnergy.CO2PerUse,
                         ),
-                        -scaling_factor_energy_consumption
-                        * np.identity(len(years))
-                        / total_prod_minus_min_prod_constraint_ref,
+                        d_emp,
+                    )
+                    d_emp_obj = (
+                        self.energy_model.d_energy_mean_price_obj_d_energy_mean_price(d_emp)
                     )
-
-        # --------------------------------------#
-        # ---- Stream Demand ratio gradients ---#
-        # --------------------------------------#
-        all_streams_demand_ratio = outputs_dict[
-            GlossaryEnergy.AllStreamsDemandRatioValue
-        ]
-        energy_production_brut_detailed = outputs_dict[
-            "energy_production_brut_detailed"
-        ]
-        ratio_ref = inputs_dict["ratio_ref"]
-        # Loop on streams
-        dobjective_dratio = self.compute_dratio_objective(
-            all_streams_demand_ratio, ratio_ref, stream_list
-        )
-        ienergy = 0
-        for stream in stream_list:
-            ns_stream = self.get_ns_stream(stream)
-            ddemand_ratio_denergy_prod, ddemand_ratio_denergy_cons = (
-                self.compute_ddemand_ratio_denergy_production(
-                    stream,
-                    sub_production_dict,
-                    sub_consumption_woratio_dict,
-                    scaling_factor_energy_production,
-                    years,
-                    energy_production_brut_detailed,
-                )
-            )
-            self.set_partial_derivative_for_other_types(
-                (GlossaryEnergy.AllStreamsDemandRatioValue, f"{stream}"),
-                (f"{ns_stream}.{GlossaryEnergy.EnergyProductionValue}", stream),
-                ddemand_ratio_denergy_prod,
-            )
-            dobjective_dratio_energy = np.array(
-                [
-                    dobjective_dratio[ienergy + iyear * len(stream_list)]
-                    for iyear in range(len(years))
-                ]
-            ).reshape((1, len(years)))
-            dobjective_dprod = np.matmul(
-                dobjective_dratio_energy, ddemand_ratio_denergy_prod
-            )
-
-            self.set_partial_derivative_for_other_types(
-                ("ratio_objective",),
-                (f"{ns_stream}.{GlossaryEnergy.EnergyProductionValue}", stream),
-                dobjective_dprod,
-            )
-            # ---- Loop on energy again to differentiate production and consumption ----#
-            for stream_input in stream_list:
-                ns_stream_input = self.get_ns_stream(stream_input)
-                list_columns_energy_consumption = list(
-                    inputs_dict[
-                        f"{stream_input}.{GlossaryEnergy.StreamConsumptionValue}"
-                    ].columns
-                )
-                if (
-                    f"{stream} ({GlossaryEnergy.unit_dicts[stream]})"
-                    in list_columns_energy_consumption
-                ):
                     self.set_partial_derivative_for_other_types(
-                        (GlossaryEnergy.AllStreamsDemandRatioValue, f"{stream}"),
+                        (GlossaryEnergy.EnergyMeanPriceObjectiveValue,),
                         (
-                            f"{ns_stream_input}.{GlossaryEnergy.StreamConsumptionWithoutRatioValue}",
-                            f"{stream} ({GlossaryEnergy.unit_dicts[stream]})",
+                            f"{ns_stream}.{GlossaryEnergy.CO2PerUse}",
+                            GlossaryEnergy.CO2PerUse,
                         ),
-                        ddemand_ratio_denergy_cons,
+                        d_emp_obj,
                     )
-                    dobjective_dcons = np.matmul(
-                        dobjective_dratio_energy, ddemand_ratio_denergy_cons
+                    dmean_price_dprod = self.compute_dmean_price_dprod(
+                        stream, grad_mean_price_vs_net_prod
+                    )
+
+                    loss_percentage = inputs_dict[f"{ns_stream}.losses_percentage"] / 100.0
+                    # To model raw to net percentage for witness coarse energies
+                    if stream in self.energy_model.raw_tonet_dict:
+                        loss_percentage += 1.0 - self.energy_model.raw_tonet_dict[stream]
+                    d_emp = (
+                        scaling_factor_energy_production
+                        * dmean_price_dprod
+                        * (1.0 - loss_percentage)
                     )
                     self.set_partial_derivative_for_other_types(
-                        ("ratio_objective",),
                         (
-                            f"{ns_stream_input}.{GlossaryEnergy.StreamConsumptionWithoutRatioValue}",
-                            f"{stream} ({GlossaryEnergy.unit_dicts[stream]})",
+                            GlossaryEnergy.EnergyMeanPriceValue,
+                            GlossaryEnergy.EnergyPriceValue,
                         ),
-                        dobjective_dcons,
+                        (f"{ns_stream}.{GlossaryEnergy.EnergyProductionValue}", stream),
+                        d_emp,
+                    )
+                    d_emp_obj = (
+                        self.energy_model.d_energy_mean_price_obj_d_energy_mean_price(d_emp)
                     )
-            ienergy += 1
-        # --------------------------------------#
-        # ---- Land use constraint gradients----#
-        # --------------------------------------#
-
-        for stream in stream_list:
-            ns_stream = self.get_ns_stream(stream)
-            for key in outputs_dict["land_demand_df"]:
-                if (
-                    key
-                    in inputs_dict[f"{stream}.{GlossaryEnergy.LandUseRequiredValue}"]
-                    and key != GlossaryEnergy.Years
-                ):
                     self.set_partial_derivative_for_other_types(
-                        ("land_demand_df", key),
-                        (f"{ns_stream}.{GlossaryEnergy.LandUseRequiredValue}", key),
-                        np.identity(len(years)),
+                        (GlossaryEnergy.EnergyMeanPriceObjectiveValue,),
+                        (f"{ns_stream}.{GlossaryEnergy.EnergyProductionValue}", stream),
+                        d_emp_obj,
                     )
 
-    def set_gradient_for_co2_emissions(
-        self,
-        co2_variable,
-        co2_emissions,
-        co2_emission_column,
-        energy,
-        energy_prod_info,
-        last_part_key,
-        value,
-        inputs_dict,
-        years,
-    ):
-        if co2_emission_column in co2_emissions.columns:
-            ns_energy = self.get_ns_stream(energy)
+                    dmean_price_dcons = self.compute_dmean_price_dprod(
+                        stream, grad_mean_price_vs_net_prod, cons=True
+                    )
+                for stream_input in stream_list:
+                    if stream_input in energies:
+                        ns_stream_input = self.get_ns_stream(stream_input)
+                        if stream_flow_matrix.has_flow(stream_input, stream):
+                            if stream in energies:
+                                d_emp = (
+                                    scaling_factor_energy_consumption * dmean_price_dcons
+                                )
+                                self.set_partial_derivative_for_other_types(
+                                    (
+                                        GlossaryEnergy.EnergyMeanPriceValue,
+                                        GlossaryEnergy.EnergyPriceValue,
+                                    ),
+                                    (
+                                        f"{ns_stream_input}.{GlossaryEnergy.StreamConsumptionValue}",
+                                        f"{stream} ({GlossaryEnergy.unit_dicts[stream]})",
+                                    ),
+                                    d_emp,
+                                )
+                                d_emp_obj = self.energy_model.d_energy_mean_price_obj_d_energy_mean_price(
+                                    d_emp
+                                )
+                                self.set_partial_derivative_for_other_types(
+                                    (GlossaryEnergy.EnergyMeanPriceObjectiveValue,),
+                                    (
+                                        f"{ns_stream_input}.{GlossaryEnergy.StreamConsumptionValue}",
+                                        f"{stream} ({GlossaryEnergy.unit_dicts[stream]})",
+                                    ),
+                                    d_emp_obj,
+                                )
+            d_emp = dmean_price_dco2_tax * identity
+            self.set_partial_derivative_for_other_types(
+                (GlossaryEnergy.EnergyMeanPriceValue, GlossaryEnergy.EnergyPriceValue),
+                (GlossaryEnergy.CO2TaxesValue, GlossaryEnergy.CO2Tax),
+                dmean_price_dco2_tax * identity,
+            )
+            d_emp_obj = self.energy_model.d_energy_mean_price_obj_d_energy_mean_price(d_emp)
+            self.set_partial_derivative_for_other_types(
+                (GlossaryEnergy.EnergyMeanPriceObjectiveValue,),
+                (GlossaryEnergy.CO2TaxesValue, GlossaryEnergy.CO2Tax),
+                d_emp_obj,
+            )
 
-            """
-            Needed by energy mix gradient
-            """
+        # --------------------------------#
+        # -- New CO2 emissions gradients--#
+        # --------------------------------#
 
-            if last_part_key == "prod":
-                self.set_partial_derivative_for_other_types(
-                    (co2_variable, co2_emission_column),
-                    (f"{ns_energy}.{GlossaryEnergy.EnergyProductionValue}", energy),
-                    np.identity(len(years))
-                    * inputs_dict["scaling_factor_energy_production"]
-                    * value
-                    / 1.0e3,
-                )
-            elif last_part_key == "cons":
-                for energy_df in inputs_dict[GlossaryEnergy.energy_list]:
-                    ns_energy_df = self.get_ns_stream(energy_df)
-                    list_columnsenergycons = list(
+        if self.is_jacobian_output_requested("co2_emissions_needed_by_energy_mix", "carbon_capture_from_energy_mix"):
+            co2_emissions_needed_by_energy_mix = outputs_dict[
+                "co2_emissions_needed_by_energy_mix"
+            ]
+            carbon_capture_from_energy_mix = outputs_dict["carbon_capture_from_energy_mix"]
+            dtot_co2_emissions = self.energy_model.compute_grad_CO2_emissions()
+
+            # namespaces of the streams consuming each energy, computed once for all gradients
+            consumer_ns_streams = get_consumer_ns_streams(
+                {
+                    energy: inputs_dict[f"{energy}.{GlossaryEnergy.StreamConsumptionValue}"]
+                    for energy in inputs_dict[GlossaryEnergy.energy_list]
+                },
+                self.get_ns_stream,
+            )
+            for key in dtot_co2_emissions.diagonals:
+                if key.stream in stream_list:
+                    for co2_variable, co2_emissions in [
+                        ("co2_emissions_needed_by_energy_mix", co2_emissions_needed_by_energy_mix),
+                        ("carbon_capture_from_energy_mix", carbon_capture_from_energy_mix),
+                    ]:
+                        if key.output in co2_emissions.columns:
+                            for x_key_column, block in dtot_co2_emissions.get_input_blocks(
+                                key,
+                                self.get_ns_stream(key.stream),
+                                consumer_ns_streams,
+                                inputs_dict["scaling_factor_energy_production"],
+                                inputs_dict["scaling_factor_energy_consumption"],
+                            ):
+                                self.set_partial_derivative_for_other_types(
+                                    (co2_variable, key.output), x_key_column, block
+                                )
+        # -----------------------------------#
+        # ---- Demand Violation gradients----#
+        # -----------------------------------#
+        if self.is_jacobian_output_requested(GlossaryEnergy.StreamsCO2EmissionsValue, EnergyMix.TOTAL_PROD_MINUS_MIN_PROD_CONSTRAINT_DF):
+            for stream in energies:
+                ns_stream = self.get_ns_stream(stream)
+                if stream in outputs_dict[GlossaryEnergy.StreamsCO2EmissionsValue].keys():
+                    self.set_partial_derivative_for_other_types(
+                        (GlossaryEnergy.StreamsCO2EmissionsValue, stream),
+                        (f"{ns_stream}.{GlossaryEnergy.CO2EmissionsValue}", stream),
+                        identity,
+                    )
+                for stream_input in stream_list:
+                    ns_stream_input = self.get_ns_stream(stream_input)
+                    list_columnsenergyprod = list(
                         inputs_dict[
-                            f"{energy_df}.{GlossaryEnergy.StreamConsumptionValue}"
+                            f"{stream_input}.{GlossaryEnergy.EnergyProductionValue}"
                         ].columns
                     )
-                    if (
-                        f"{energy} ({GlossaryEnergy.energy_unit})"
-                        in list_columnsenergycons
-                    ):
+                    list_index_prod = [j == stream for j in list_columnsenergyprod]
+
+                    if True in list_index_prod:
+                        loss_percentage = (
+                            inputs_dict[f"{ns_stream}.losses_percentage"] / 100.0
+                        )
+                        # To model raw to net percentage for witness coarse
+                        # energies
+                        if stream in self.energy_model.raw_tonet_dict:
+                            loss_percentage += (
+                                1.0 - self.energy_model.raw_tonet_dict[stream]
+                            )
+                        loss_percent = heat_losses_percentage + loss_percentage
+
+                        self.set_partial_derivative_for_other_types(
+                            (
+                                EnergyMix.TOTAL_PROD_MINUS_MIN_PROD_CONSTRAINT_DF,
+                                EnergyMix.TOTAL_PROD_MINUS_MIN_PROD_CONSTRAINT,
+                            ),
+                            (
+                                f"{ns_stream_input}.{GlossaryEnergy.EnergyProductionValue}",
+                                stream,
+                            ),
+                            scaling_factor_energy_production
+                            * identity
+                            / total_prod_minus_min_prod_constraint_ref
+                            * (1.0 - loss_percent),
+                        )
+
+                    if stream_flow_matrix.has_flow(stream_input, stream):
                         self.set_partial_derivative_for_other_types(
-                            (co2_variable, co2_emission_column),
                             (
-                                f"{ns_energy_df}.{GlossaryEnergy.StreamConsumptionValue}",
-                                f"{energy} ({GlossaryEnergy.energy_unit})",
+                                EnergyMix.TOTAL_PROD_MINUS_MIN_PROD_CONSTRAINT_DF,
+                                EnergyMix.TOTAL_PROD_MINUS_MIN_PROD_CONSTRAINT,
                             ),
-                            np.identity(len(years))
-                            * inputs_dict["scaling_factor_energy_consumption"]
-                            * value
-                            / 1.0e3,
+                            (
+                                f"{ns_stream_input}.{GlossaryEnergy.StreamConsumptionValue}",
+                                f"{stream} ({GlossaryEnergy.unit_dicts[stream]})",
+                            ),
+                            -scaling_factor_energy_consumption
+                            * identity
+                            / total_prod_minus_min_prod_constraint_ref,
                         )
-            elif last_part_key == "co2_per_use":
+
+        # --------------------------------------#
+        # ---- Stream Demand ratio gradients ---#
+        # --------------------------------------#
+        if self.is_jacobian_output_requested(GlossaryEnergy.AllStreamsDemandRatioValue, "ratio_objective"):
+            all_streams_demand_ratio = outputs_dict[
+                GlossaryEnergy.AllStreamsDemandRatioValue
+            ]
+            ratio_ref = inputs_dict["ratio_ref"]
+            # Loop on streams
+            dobjective_dratio = self.compute_dratio_objective(
+                all_streams_demand_ratio, ratio_ref, stream_list
+            )
+            ienergy = 0
+            for stream in stream_list:
+                ns_stream = self.get_ns_stream(stream)
+                ddemand_ratio_denergy_prod, ddemand_ratio_denergy_cons = (
+                    self.compute_ddemand_ratio_denergy_production(stream, gradient_tape)
+                )
                 self.set_partial_derivative_for_other_types(
-                    (co2_variable, co2_emission_column),
-                    (
-                        f"{ns_energy}.{GlossaryEnergy.CO2PerUse}",
-                        GlossaryEnergy.CO2PerUse,
-                    ),
-                    np.identity(len(years)) * value / 1.0e3,
+                    (GlossaryEnergy.AllStreamsDemandRatioValue, f"{stream}"),
+                    (f"{ns_stream}.{GlossaryEnergy.EnergyProductionValue}", stream),
+                    ddemand_ratio_denergy_prod,
                 )
+                # ratios are flattened year by year
+                dobjective_dratio_energy = dobjective_dratio[
+                    ienergy :: len(stream_list)
+                ].reshape((1, len(years)))
+                dobjective_dprod = dobjective_dratio_energy @ ddemand_ratio_denergy_prod
 
-            else:
-                very_last_part_key = energy_prod_info.split("#")[2]
-                if very_last_part_key == "prod":
-                    self.set_partial_derivative_for_other_types(
-                        (co2_variable, co2_emission_column),
-                        (
-                            f"{ns_energy}.{GlossaryEnergy.EnergyProductionValue}",
-                            last_part_key,
-                        ),
-                        np.identity(len(years))
-                        * inputs_dict["scaling_factor_energy_production"]
-                        * value
-                        / 1.0e3,
-                    )
-                elif very_last_part_key == "cons":
-                    self.set_partial_derivative_for_other_types(
-                        (co2_variable, co2_emission_column),
-                        (
-                            f"{ns_energy}.{GlossaryEnergy.StreamConsumptionValue}",
-                            last_part_key,
-                        ),
-                        np.identity(len(years))
-                        * inputs_dict["scaling_factor_energy_production"]
-                        * value
-                        / 1.0e3,
-                    )
+                self.set_partial_derivative_for_other_types(
+                    ("ratio_objective",),
+                    (f"{ns_stream}.{GlossaryEnergy.EnergyProductionValue}", stream),
+                    dobjective_dprod,
+                )
+                # ---- Loop on the consumers of the stream to differentiate production and consumption ----#
+                for stream_input in stream_flow_matrix.get_consumers(stream):
+                    if stream_input in stream_list:
+                        ns_stream_input = self.get_ns_stream(stream_input)
+                        self.set_partial_derivative_for_other_types(
+                            (GlossaryEnergy.AllStreamsDemandRatioValue, f"{stream}"),
+                            (
+                                f"{ns_stream_input}.{GlossaryEnergy.StreamConsumptionWithoutRatioValue}",
+                                f"{stream} ({GlossaryEnergy.unit_dicts[stream]})",
+                            ),
+                            ddemand_ratio_denergy_cons,
+                        )
+                        dobjective_dcons = dobjective_dratio_energy @ ddemand_ratio_denergy_cons
+                        self.set_partial_derivative_for_other_types(
+                            ("ratio_objective",),
+                            (
+                                f"{ns_stream_input}.{GlossaryEnergy.StreamConsumptionWithoutRatioValue}",
+                                f"{stream} ({GlossaryEnergy.unit_dicts[stream]})",
+                            ),
+                            dobjective_dcons,
+                        )
+                ienergy += 1
+        # --------------------------------------#
+        # ---- Land use constraint gradients----#
+        # --------------------------------------#
+
+        if self.is_jacobian_output_requested("land_demand_df"):
+            for stream in stream_list:
+                ns_stream = self.get_ns_stream(stream)
+                for key in outputs_dict["land_demand_df"]:
+                    if (
+                        key
+                        in inputs_dict[f"{stream}.{GlossaryEnergy.LandUseRequiredValue}"]
+                        and key != GlossaryEnergy.Years
+                    ):
+                        self.set_partial_derivative_for_other_types(
+                            ("land_demand_df", key),
+                            (f"{ns_stream}.{GlossaryEnergy.LandUseRequiredValue}", key),
+                            identity,
+                        )
 
     def compute_dratio_objective(self, stream_ratios, ratio_ref, energy_list):
         """
@@ -2005,7 +1912,9 @@ class Energy_Mix_Discipline(SoSWrapp):
         tot_energy_production_sum = prod[GlossaryEnergy.TotalProductionValue].sum()
         dtot_energy_production_sum = dtotal_production_denergy_production.sum(axis=0)
         tot_energy_production_0 = prod[GlossaryEnergy.TotalProductionValue].values[0]
-        dtot_energy_production_0 = dtotal_production_denergy_production[0]
+        # first line of the diagonal block
+        dtot_energy_production_0 = np.zeros_like(dtot_energy_production_sum)
+        dtot_energy_production_0[0] = dtotal_production_denergy_production.diagonal[0]
 
         delta_years = years[-1] - years[0] + 1
 
@@ -2038,192 +1947,64 @@ class Energy_Mix_Discipline(SoSWrapp):
         denergy_mean_prod.loc[index_l] = 0
         return denergy_mean_prod
 
-    def compute_dtotal_production_denergy_production(
-        self, production_detailed_df, min_energy, total_loss_percent
-    ):
+    def compute_dtotal_production_denergy_production(self, total_loss_percent):
         """
         Compute gradient of production[GlossaryEnergy.TotalProductionValue] by {energy}.energy_prod[{energy}] taking into account
         the exponential decrease towards the limit applied on the calculation of the total net energy production
-        Inputs: minimum_energy_production, production_df
+        Inputs: derivative of the exponential decrease recorded by the compute of the model
         Outputs:dtotal_production_denergy_production
         """
-        years = production_detailed_df[GlossaryEnergy.Years]
-        dtotal_production_denergy_production = np.ones(len(years))
-        dtotal_production_denergy_production *= 1.0 - total_loss_percent
-
-        total_prod = production_detailed_df["Total production (uncut)"].values
-        if total_prod.min() < min_energy:
-            # To avoid underflow : exp(-200) is considered to be the
-            # minimum value for the exp
-            total_prod[total_prod < -200.0 * min_energy] = -200.0 * min_energy
-            dtotal_production_denergy_production[total_prod < min_energy] = (
-                np.exp(total_prod[total_prod < min_energy] / min_energy)
-                * np.exp(-1)
-                / 10.0
-                * (1.0 - total_loss_percent)
-            )
+        dtotal_production_duncut = self.energy_model.gradient_tape["dtotal_production_duncut"]
 
-        return np.identity(len(years)) * dtotal_production_denergy_production
+        return DiagonalJacobianBlock(dtotal_production_duncut * (1.0 - total_loss_percent))
 
-    def compute_ddemand_ratio_denergy_production(
-        self,
-        energy,
-        sub_production_dict,
-        sub_consumption_dict,
-        scaling_factor_production,
-        years,
-        energy_production_brut_detailed,
-    ):
-        """! Compute the gradient of the demand ratio vs energy production function :
+    def compute_ddemand_ratio_denergy_production(self, energy, gradient_tape):
+        """! Gradient of the demand ratio vs energy production and consumption recorded by the compute of the model :
                  -the ratio is capped to one if energy_prod>energy_cons, hence the special condition.
                  -the function is designed to be used even if no energy_input is specified (to get ddemand_ratio_denergy_prod gradient alone)
         @param energy: string, name of the energy
-        @param sub_production_dict: dictionary with the raw production for all the energies
-        @param sub_consumption_dict: dictionary with the raw consumption for all energies
-        @param scaling_factor_production: float used to scale the energy production at input/output of the model
-        @return ddemand_ratio_denergy_prod, ddemand_ratio_denergy_cons: numpy.arrays, shape=(len(years),len(years)) with the gradients
-        :param years:
-        :type years:
-        :param energy_production_brut_detailed:
-        :type energy_production_brut_detailed:
+        @param gradient_tape: intermediates of the compute of the model
+        @return ddemand_ratio_denergy_prod, ddemand_ratio_denergy_cons: diagonal blocks with the gradients
         """
+        ddemand_ratio_denergy_prod, ddemand_ratio_denergy_cons = gradient_tape[
+            "ddemand_ratio"
+        ][energy]
 
-        # Calculate energy production and consumption
-        energy_production = sub_production_dict[f"{energy}"][f"{energy}"].values
-        if energy in EnergyMix.raw_tonet_dict.keys():
-            column_name = f"{EnergyMix.PRODUCTION} {energy} ({self.stream_class_dict[energy].unit})"
-
-            prod_raw_to_substract = energy_production_brut_detailed[
-                column_name
-            ].values * (1.0 - EnergyMix.raw_tonet_dict[energy])
-            energy_production -= prod_raw_to_substract
-        energy_consumption = np.zeros(len(years))
-        for consu in sub_consumption_dict.values():
-            if f"{energy} ({self.stream_class_dict[energy].unit})" in consu.columns:
-                energy_consumption = np.sum(
-                    [
-                        energy_consumption,
-                        consu[
-                            f"{energy} ({self.stream_class_dict[energy].unit})"
-                        ].values,
-                    ],
-                    axis=0,
-                )
-
-        # If prod < cons, set the identity element for the given year to the
-        # corresponding value
-        denergy_prod_limited = compute_dfunc_with_exp_min(energy_production, 1.0e-10)
-        energy_prod_limited = compute_func_with_exp_min(energy_production, 1.0e-10)
-
-        # If prod < cons, set the identity element for the given year to
-        # the corresponding value
-        denergy_cons_limited = compute_dfunc_with_exp_min(energy_consumption, 1.0e-10)
-        energy_cons_limited = compute_func_with_exp_min(energy_consumption, 1.0e-10)
-        ddemand_ratio_denergy_cons = (
-            np.identity(len(years))
-            * 100.0
-            * np.where(
-                (energy_prod_limited <= energy_cons_limited)
-                * (energy_prod_limited / energy_cons_limited > 1e-15),
-                -scaling_factor_production
-                * energy_prod_limited
-                * denergy_cons_limited
-                / energy_cons_limited**2,
-                0.0,
-            )
+        return DiagonalJacobianBlock(ddemand_ratio_denergy_prod), DiagonalJacobianBlock(
+            ddemand_ratio_denergy_cons
         )
 
-        if energy in EnergyMix.raw_tonet_dict.keys():
-            denergy_prod_limited = (
-                np.identity(len(years))
-                * 100.0
-                * np.where(
-                    (energy_prod_limited <= energy_cons_limited)
-                    * (energy_prod_limited / energy_cons_limited > 1e-15),
-                    denergy_prod_limited
-                    * scaling_factor_production
-                    * EnergyMix.raw_tonet_dict[energy]
-                    / energy_cons_limited,
-                    0.0,
-                )
-            )
-        else:
-            denergy_prod_limited = (
-                np.identity(len(years))
-                * 100.0
-                * np.where(
-                    (energy_prod_limited <= energy_cons_limited)
-                    * (energy_prod_limited / energy_cons_limited > 1e-15),
-                    denergy_prod_limited
-                    * scaling_factor_production
-                    / energy_cons_limited,
-                    0.0,
-                )
-            )
-
-        return denergy_prod_limited, ddemand_ratio_denergy_cons
-
     def compute_dmean_price_dprod(
         self,
         energy,
-        energies,
-        mix_weight,
-        energy_price_after_tax,
-        production_energy_net_pos_consumable,
-        production_detailed_df,
+        grad_mean_price_vs_net_prod,
         cons=False,
     ):
         """
         Function that returns the gradient of mean_price compared to energy_prod
         Params:
             - energy: name of the energy derived by
-            - energies: list of all the energies
-            - mix_weight: dataframe of the energies ratio
-            - energy_price_after_tax: dataframe with values
-            - production_energy_net_pos_consumable: dataframe with values
-            - production_detailed_df: dataframe with values
+            - grad_mean_price_vs_net_prod: gradient of the mean price wrt the net production of each energy
         Output:
             - dmean_price_dprod
         """
-        mix_weight_energy = mix_weight[energy].values
-        # The mix_weight_techno is zero means that the techno is negligible else we do nothing
-        # np.sign gives 0 if zero and 1 if value so it suits well
-        # with our needs
-        grad_energy_mix_vs_prod = self.grad_energy_mix_vs_prod_dict[energy] * np.sign(
-            mix_weight_energy
-        )
-        grad_price_vs_prod = (
-            energy_price_after_tax[energy].values * grad_energy_mix_vs_prod
-        )
-        for energy_other in energies:
-            if energy_other != energy:
-                mix_weight_techno_other = mix_weight[energy_other].values
-                grad_energy_mix_vs_prod = self.grad_energy_mix_vs_prod_dict[
-                    f"{energy} {energy_other}"
-                ] * np.sign(mix_weight_techno_other)
-                grad_price_vs_prod += (
-                    energy_price_after_tax[energy_other].values
-                    * grad_energy_mix_vs_prod
-                )
+        mean_price_tape = self.energy_model.gradient_tape["mean_price"]
+        index = self.energy_model.energy_list.index(energy)
+        grad_price_vs_prod = grad_mean_price_vs_net_prod[index]
         # If the prod is negative then there is no gradient
         # BUT if the prod is zero a gradient in 0+ exists
         # then we check the sign of prod but if zero the gradient
         # should not be zero
-        gradient_sign = np.sign(production_energy_net_pos_consumable[energy].values) + (
-            production_detailed_df[
-                f"production {energy} ({GlossaryEnergy.energy_unit})"
-            ].values
-            == 0.0
+        gradient_sign = (
+            mean_price_tape["net_production_signs"][index]
+            + mean_price_tape["zero_production"][index]
         )
-        years = production_detailed_df[GlossaryEnergy.Years].values
 
-        dmean_price_dprod = grad_price_vs_prod * gradient_sign * np.identity(len(years))
+        dmean_price_dprod = DiagonalJacobianBlock(grad_price_vs_prod * gradient_sign)
         # if dmean_price_dcons
         if cons:
-            dmean_price_dprod = (
-                -grad_price_vs_prod
-                * np.sign(production_energy_net_pos_consumable[energy].values)
-                * np.identity(len(years))
+            dmean_price_dprod = DiagonalJacobianBlock(
+                -grad_price_vs_prod * mean_price_tape["net_production_signs"][index]
             )
         return dmean_price_dprod
 
@@ -2288,174 +2069,110 @@ class Energy_Mix_Discipline(SoSWrapp):
     def get_post_processing_list(self, filters=None):
         # For the outputs, making a graph for block fuel vs range and blocktime vs
         # range
+        # the charts are declared in chart_registry and only built when requested by the filters
 
-        instanciated_charts = []
-        charts = []
+        return self.get_lazy_charts(
+            filters,
+            {
+                "price_unit": ["$/MWh", "$/t"],
+                GlossaryEnergy.Years: [self.get_sosdisc_inputs(GlossaryEnergy.YearStart)],
+            },
+        )
 
-        price_unit_list = ["$/MWh", "$/t"]
-        years_list = [self.get_sosdisc_inputs(GlossaryEnergy.YearStart)]
-        energy_list = self.get_sosdisc_inputs(GlossaryEnergy.energy_list)
-        # Overload default value with chart filter
-        if filters is not None:
-            for chart_filter in filters:
-                if chart_filter.filter_key == "charts":
-                    charts = chart_filter.selected_values
-                if chart_filter.filter_key == "price_unit":
-                    price_unit_list = chart_filter.selected_values
-                if chart_filter.filter_key == GlossaryEnergy.Years:
-                    years_list = chart_filter.selected_values
-
-        if "Target energy production constraint" in charts:
-            target_energy_production_df = self.get_sosdisc_inputs(
-                GlossaryEnergy.TargetEnergyProductionValue
-            )
-            target_energy_production = target_energy_production_df[
-                GlossaryEnergy.TargetEnergyProductionValue
-            ].values
-            years = target_energy_production_df[GlossaryEnergy.Years].values
-            if target_energy_production.max() > 0:
-                chart_target_energy_production = TwoAxesInstanciatedChart(
-                    GlossaryEnergy.Years,
-                    GlossaryEnergy.TargetEnergyProductionDf["unit"],
-                    chart_name=GlossaryEnergy.TargetProductionConstraintValue,
-                    stacked_bar=True,
-                )
+    def get_chart_target_energy_production(self):
+        target_energy_production_df = self.get_sosdisc_inputs(
+            GlossaryEnergy.TargetEnergyProductionValue
+        )
+        target_energy_production = target_energy_production_df[
+            GlossaryEnergy.TargetEnergyProductionValue
+        ].values
+        years = target_energy_production_df[GlossaryEnergy.Years].values
+        if target_energy_production.max() <= 0:
+            return None
+        chart_target_energy_production = TwoAxesInstanciatedChart(
+            GlossaryEnergy.Years,
+            GlossaryEnergy.TargetEnergyProductionDf["unit"],
+            chart_name=GlossaryEnergy.TargetProductionConstraintValue,
+            stacked_bar=True,
+        )
 
-                serie_target_energy_production = InstanciatedSeries(
-                    list(years),
-                    list(target_energy_production),
-                    "Minimal energy production required",
-                    "dash_lines",
-                )
-                chart_target_energy_production.add_series(
-                    serie_target_energy_production
-                )
+        serie_target_energy_production = InstanciatedSeries(
+            list(years),
+            list(target_energy_production),
+            "Minimal energy production required",
+            "dash_lines",
+        )
+        chart_target_energy_production.add_series(serie_target_energy_production)
 
-                energy_production = self.get_sosdisc_outputs(
-                    GlossaryEnergy.StreamProductionDetailedValue
-                )[GlossaryEnergy.TotalProductionValue].values
-                serie_production = InstanciatedSeries(
-                    list(years), list(energy_production), "Energy production", "bar"
-                )
-                chart_target_energy_production.add_series(serie_production)
-                instanciated_charts.append(chart_target_energy_production)
+        energy_production = self.get_sosdisc_outputs(
+            GlossaryEnergy.StreamProductionDetailedValue
+        )[GlossaryEnergy.TotalProductionValue].values
+        serie_production = InstanciatedSeries(
+            list(years), list(energy_production), "Energy production", "bar"
+        )
+        chart_target_energy_production.add_series(serie_production)
+        return chart_target_energy_production
+
+    def get_charts_energy_price_in_dollar_mwh(self, price_unit_list):
+        if "$/MWh" not in price_unit_list:
+            return None
+        return [
+            self.get_chart_energy_price_in_dollar_kwh_without_production_taxes(),
+            self.get_chart_energy_price_in_dollar_kwh(),
+            self.get_chart_energy_price_after_co2_tax_in_dollar_kwh(),
+        ]
 
-        if "Energy price" in charts and "$/MWh" in price_unit_list:
-            new_chart = (
-                self.get_chart_energy_price_in_dollar_kwh_without_production_taxes()
-            )
-            if new_chart is not None:
-                instanciated_charts.append(new_chart)
-
-            new_chart = self.get_chart_energy_price_in_dollar_kwh()
-            if new_chart is not None:
-                instanciated_charts.append(new_chart)
-
-            new_chart = self.get_chart_energy_price_after_co2_tax_in_dollar_kwh()
-            if new_chart is not None:
-                instanciated_charts.append(new_chart)
-
-        if "Energy mean price" in charts:
-            new_chart = self.get_chart_energy_mean_price_in_dollar_mwh()
-            if new_chart is not None:
-                instanciated_charts.append(new_chart)
-        if GlossaryEnergy.Capital in charts:
-            new_chart = self.get_chart_capital()
-            if new_chart is not None:
-                instanciated_charts.append(new_chart)
-
-        if "Energy price" in charts and "$/t" in price_unit_list:
-            new_chart = self.get_chart_energy_price_in_dollar_t()
-            if new_chart is not None:
-                instanciated_charts.append(new_chart)
-
-        if "CO2 emissions" in charts:
-            new_chart = self.get_chart_co2_needed_by_energy_mix()
-            if new_chart is not None:
-                instanciated_charts.append(new_chart)
-
-        if "Carbon intensity" in charts:
-            new_charts = self.get_chart_comparison_carbon_intensity()
-            for new_chart in new_charts:
-                if new_chart is not None:
-                    instanciated_charts.append(new_chart)
-
-        if "production" in charts:
-            new_chart = self.get_chart_energies_net_production()
-            if new_chart is not None:
-                instanciated_charts.append(new_chart)
-
-            new_chart = self.get_chart_energies_brut_production()
-            if new_chart is not None:
-                instanciated_charts.append(new_chart)
-
-            new_chart = self.get_chart_energies_net_raw_production_and_limit()
-            if new_chart is not None:
-                instanciated_charts.append(new_chart)
-        if "Energy mix" in charts:
-            new_charts = self.get_pie_charts_production(years_list)
-            for new_chart in new_charts:
-                if new_chart is not None:
-                    instanciated_charts.append(new_chart)
+    def get_charts_energy_price_in_dollar_t(self, price_unit_list):
+        if "$/t" not in price_unit_list:
+            return None
+        return self.get_chart_energy_price_in_dollar_t()
 
+    def get_charts_solid_energy_elec_constraint(self):
+        energy_list = self.get_sosdisc_inputs(GlossaryEnergy.energy_list)
         if (
-            "Solid energy and electricity production constraint" in charts
-            and len(list(set(self.energy_constraint_list).intersection(energy_list)))
-            > 0
+            len(list(set(self.energy_constraint_list).intersection(energy_list))) > 0
             and f"{GlossaryEnergy.fuel}.{GlossaryEnergy.solid_fuel}" in energy_list
         ):
-            new_chart = self.get_chart_solid_energy_elec_constraint()
-            if new_chart is not None:
-                instanciated_charts.append(new_chart)
+            return self.get_chart_solid_energy_elec_constraint()
+        return None
 
-        if (
-            "Liquid hydrogen production constraint" in charts
-            and f"{GlossaryEnergy.hydrogen}.{GlossaryEnergy.liquid_hydrogen}"
-            in energy_list
-        ):
-            new_chart = self.get_chart_liquid_hydrogen_constraint()
-            if new_chart is not None:
-                instanciated_charts.append(new_chart)
-
-        if "Stream ratio" in charts:
-            new_chart = self.get_chart_stream_ratio()
-            if new_chart is not None:
-                instanciated_charts.append(new_chart)
-        # Need data not in data_io of the discipline
-        # TODO move this chart in a namespace post processing
-        # new_chart = self.get_chart_stream_consumed_by_techno()
-        # if new_chart is not None:
-        #     instanciated_charts.append(new_chart)
-
-        if "Energy mix losses" in charts:
-            new_chart = self.get_chart_energy_mix_losses(energy_list)
-            if new_chart is not None:
-                instanciated_charts.append(new_chart)
-
-        if "Stream Flow" in charts:
-            new_chart = self.get_chart_sankey_fluxes(
-                "Flow of energy streams (TWh)", split_external=False
-            )
-            new_chart.post_processing_section_name = "Detailed Stream Flow"
-            instanciated_charts.append(new_chart)
+    def get_charts_liquid_hydrogen_constraint(self):
+        energy_list = self.get_sosdisc_inputs(GlossaryEnergy.energy_list)
+        if f"{GlossaryEnergy.hydrogen}.{GlossaryEnergy.liquid_hydrogen}" in energy_list:
+            return self.get_chart_liquid_hydrogen_constraint()
+        return None
 
+    def get_charts_energy_mix_losses(self):
+        return self.get_chart_energy_mix_losses(
+            self.get_sosdisc_inputs(GlossaryEnergy.energy_list)
+        )
+
+    def get_charts_stream_flow(self):
+        instanciated_charts = []
+        new_chart = self.get_chart_sankey_fluxes(
+            "Flow of energy streams (TWh)", split_external=False
+        )
+        new_chart.post_processing_section_name = "Detailed Stream Flow"
+        instanciated_charts.append(new_chart)
+
+        new_chart = self.get_chart_sankey_fluxes(
+            chart_name="Flow of energy streams (schematic)", normalized_links=True
+        )
+        new_chart.post_processing_section_name = "Detailed Stream Flow"
+        instanciated_charts.append(new_chart)
+        return instanciated_charts
+
+    def get_charts_individual_stream_flow(self):
+        instanciated_charts = []
+        # Get list of energy technologies
+        energy_list = self.get_sosdisc_inputs(GlossaryEnergy.EnergyListName)
+
+        for energy_stream in energy_list:
             new_chart = self.get_chart_sankey_fluxes(
-                chart_name="Flow of energy streams (schematic)", normalized_links=True
+                f"Production/Consumption of {energy_stream} (TWh)", streams_filter=[energy_stream]
             )
             new_chart.post_processing_section_name = "Detailed Stream Flow"
             instanciated_charts.append(new_chart)
-
-        if "Individual Stream Flow" in charts:
-            # Get list of energy technologies
-            energy_list = self.get_sosdisc_inputs(GlossaryEnergy.EnergyListName)
-
-            for energy_stream in energy_list:
-                new_chart = self.get_chart_sankey_fluxes(
-                    f"Production/Consumption of {energy_stream} (TWh)", streams_filter=[energy_stream]
-                )
-                new_chart.post_processing_section_name = "Detailed Stream Flow"
-                instanciated_charts.append(new_chart)
-
         return instanciated_charts
 
     def get_chart_solid_energy_elec_constraint(self):
@@ -0,0 +1,109 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+import numpy as np
+
+
+class StreamFlowMatrix:
+    """
+    Flows between the streams of the energy mix : index of the (consumer stream, consumed stream or resource) pairs
+    for which the consumption dataframe of the consumer has the column of the consumed stream or resource.
+
+    The index is built once from the columns of the consumption dataframes and reused while they keep the same
+    columns (see get_signature). At each run the consumption columns are stacked in a
+    (consumer x consumed x year) array by stack, and the consumptions of a stream or resource by a set of
+    consumers are reductions of this array.
+    """
+
+    def __init__(self, consumers: list, consumed_columns: dict, consumption_dict: dict):
+        '''
+        consumers : names of the consumer streams
+        consumed_columns : {name of the consumed stream or resource: name of its column in the consumption dataframes}
+        consumption_dict : {consumer: consumption dataframe}
+        '''
+        self.consumers = list(consumers)
+        self.consumed = list(consumed_columns.keys())
+        self.consumer_index = {consumer: i for i, consumer in enumerate(self.consumers)}
+        self.consumed_index = {consumed: j for j, consumed in enumerate(self.consumed)}
+        self.signature = self.get_signature(consumption_dict)
+
+        column_to_consumed = {column: j for j, column in enumerate(consumed_columns.values())}
+        # (consumer index, consumed index, column name) of each flow
+        self.flows = []
+        for i, consumer in enumerate(self.consumers):
+            for column in consumption_dict[consumer].columns:
+                if column in column_to_consumed:
+                    self.flows.append((i, column_to_consumed[column], column))
+        self.flow_pairs = {(self.consumers[i], self.consumed[j]) for i, j, _ in self.flows}
+
+    @staticmethod
+    def get_signature(consumption_dict: dict):
+        '''
+        Columns of the consumption dataframes, the index has to be built again if they change
+        '''
+        return tuple((consumer, tuple(consumption.columns)) for consumer, consumption in consumption_dict.items())
+
+    def has_flow(self, consumer: str, consumed: str):
+        '''
+        True if consumer consumes the stream or resource consumed
+        '''
+        return (consumer, consumed) in self.flow_pairs
+
+    def get_consumers(self, consumed: str):
+        '''
+        Consumers of the stream or resource consumed
+        '''
+        return [consumer for consumer in self.consumers if (consumer, consumed) in self.flow_pairs]
+
+    def stack(self, consumption_dict: dict):
+        '''
+        Consumption flows (consumer x consumed x year) of the consumption dataframes of the consumers
+        '''
+        flow_columns = [(i, j, consumption_dict[self.consumers[i]][column].values) for i, j, column in self.flows
+                        if column in consumption_dict[self.consumers[i]].columns]
+        nb_years = len(next(iter(consumption_dict.values())))
+        values = np.zeros((len(self.consumers), len(self.consumed), nb_years),
+                          dtype=np.result_type(np.float64, *[flow.dtype for _, _, flow in flow_columns]))
+        is_complex = np.zeros(len(self.consumed), dtype=bool)
+        for i, j, flow in flow_columns:
+            values[i, j] = flow
+            is_complex[j] |= np.iscomplexobj(flow)
+        return ConsumptionFlows(self, values, is_complex)
+
+
+class ConsumptionFlows:
+    """
+    Consumption flows (consumer x consumed x year) stacked by StreamFlowMatrix.stack
+    """
+
+    def __init__(self, flow_matrix: StreamFlowMatrix, values: np.ndarray, is_complex: np.ndarray):
+        self.flow_matrix = flow_matrix
+        self.values = values
+        # consumed streams or resources with complex consumptions, the other ones are summed as real
+        self.is_complex = is_complex
+
+    def sum_over_consumers(self, consumers: list = None):
+        '''
+        Consumption of each consumed stream or resource by the consumers (all consumers by default)
+        as a dict {consumed: array of the consumption by year}
+        '''
+        if consumers is None:
+            values = self.values
+        else:
+            values = self.values[[self.flow_matrix.consumer_index[consumer] for consumer in consumers]]
+        # sum of the consumers one after the other
+        consumptions = values.sum(axis=0)
+        return {consumed: consumption if is_complex else consumption.real
+                for consumed, consumption, is_complex in zip(self.flow_matrix.consumed, consumptions, self.is_complex)}
@@ -0,0 +1,55 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+
+def compute_input_fingerprint(value):
+    '''
+    Fingerprint of an input value, to detect its changes between two computes
+    '''
+    hasher = hashlib.blake2b(digest_size=16)
+    if isinstance(value, pd.DataFrame):
+        for column, column_values in value.items():
+            hasher.update(repr((column, str(column_values.dtype))).encode())
+            if column_values.dtype == object:
+                hasher.update(repr(column_values.tolist()).encode())
+            else:
+                hasher.update(np.ascontiguousarray(column_values.values).tobytes())
+    elif isinstance(value, np.ndarray) and value.dtype != object:
+        hasher.update(repr((value.shape, str(value.dtype))).encode())
+        hasher.update(np.ascontiguousarray(value).tobytes())
+    else:
+        hasher.update(repr(value).encode())
+    return hasher.digest()
+
+
+def compute_inputs_fingerprint(inputs):
+    '''
+    Fingerprint of a tuple of inputs, dicts are fingerprinted item by item so that arrays in dicts are fully hashed
+    '''
+    hasher = hashlib.blake2b(digest_size=16)
+    for value in inputs:
+        if isinstance(value, dict):
+            hasher.update(compute_inputs_fingerprint(
+                [item for key in sorted(value, key=str) for item in (key, value[key])]))
+        elif isinstance(value, pd.Series):
+            hasher.update(compute_input_fingerprint(value.values))
+        else:
+            hasher.update(compute_input_fingerprint(value))
+    return hasher.digest()
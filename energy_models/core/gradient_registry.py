@@ -0,0 +1,118 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+from typing import NamedTuple
+
+from energy_models.core.jacobian_blocks import DiagonalJacobianBlock
+from energy_models.glossaryenergy import GlossaryEnergy
+
+# kinds of stream inputs the emissions gradients are computed against
+PRODUCTION = 'prod'
+CONSUMPTION = 'cons'
+CO2_PER_USE = 'co2_per_use'
+
+
+class GradientKey(NamedTuple):
+    """
+    Gradient of an output column wrt an input of a stream :
+        - input is the kind of input (PRODUCTION, CONSUMPTION or CO2_PER_USE)
+        - column is the column of the stream input, None for the column of the stream itself
+    """
+    output: str
+    stream: str
+    input: str
+    column: str = None
+
+
+class GradientRegistry:
+    """
+    Diagonal gradients of output columns wrt stream inputs, stored as the vectors of their diagonal
+    """
+
+    def __init__(self):
+        self.diagonals = {}
+
+    def add(self, output, stream, input_kind, diagonal, column=None):
+        self.diagonals[GradientKey(output, stream, input_kind, column)] = diagonal
+
+    def __getitem__(self, key):
+        return self.diagonals[key]
+
+    def __contains__(self, key):
+        return key in self.diagonals
+
+    def __len__(self):
+        return len(self.diagonals)
+
+    def items(self):
+        return self.diagonals.items()
+
+    def combine(self, new_output, output_factors):
+        '''
+        Add the gradients of new_output, linear combination of the outputs given as a list of (output, factor)
+        '''
+        factors = dict(output_factors)
+        for key, diagonal in list(self.diagonals.items()):
+            if key.output in factors:
+                new_key = key._replace(output=new_output)
+                if new_key in self.diagonals:
+                    self.diagonals[new_key] = self.diagonals[new_key] + diagonal * factors[key.output]
+                else:
+                    self.diagonals[new_key] = diagonal * factors[key.output]
+
+    def get_input_blocks(self, key, ns_stream, consumer_ns_streams, scaling_factor_production,
+                         scaling_factor_consumption):
+        '''
+        Jacobian blocks of the gradient of key, the gradients in Mt are converted to the outputs in Gt
+        :param ns_stream: namespace of the inputs of key.stream
+        :param consumer_ns_streams: dict {consumption column: namespaces of the streams consuming it}
+        :return: list of ((input variable, input column), diagonal jacobian block)
+        '''
+        diagonal = self.diagonals[key]
+        if key.column is None:
+            if key.input == PRODUCTION:
+                routes = [((f'{ns_stream}.{GlossaryEnergy.EnergyProductionValue}', key.stream),
+                           scaling_factor_production)]
+            elif key.input == CONSUMPTION:
+                consumption_column = f'{key.stream} ({GlossaryEnergy.energy_unit})'
+                routes = [((f'{ns_consumer}.{GlossaryEnergy.StreamConsumptionValue}', consumption_column),
+                           scaling_factor_consumption)
+                          for ns_consumer in consumer_ns_streams.get(consumption_column, [])]
+            elif key.input == CO2_PER_USE:
+                routes = [((f'{ns_stream}.{GlossaryEnergy.CO2PerUse}', GlossaryEnergy.CO2PerUse), 1.0)]
+            else:
+                routes = []
+        elif key.input == PRODUCTION:
+            routes = [((f'{ns_stream}.{GlossaryEnergy.EnergyProductionValue}', key.column), scaling_factor_production)]
+        elif key.input == CONSUMPTION:
+            # consumptions of a column are scaled as productions
+            routes = [((f'{ns_stream}.{GlossaryEnergy.StreamConsumptionValue}', key.column), scaling_factor_production)]
+        else:
+            routes = []
+        return [(x_key_column, DiagonalJacobianBlock(diagonal * factor / 1e3)) for x_key_column, factor in routes]
+
+
+def get_consumer_ns_streams(streams_consumption, get_ns_stream):
+    '''
+    Namespaces of the streams consuming each consumption column, computed once for all the gradients
+    :param streams_consumption: dict {stream: consumption dataframe of the stream}
+    '''
+    consumer_ns_streams = {}
+    for stream, consumption in streams_consumption.items():
+        ns_stream = get_ns_stream(stream)
+        for column in consumption.columns:
+            consumer_ns_streams.setdefault(column, []).append(ns_stream)
+    return consumer_ns_streams
+
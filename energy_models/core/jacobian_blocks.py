@@ -0,0 +1,265 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+import numpy as np
+import scipy.sparse as sp
+
+
+class DiagonalJacobianBlock:
+    """
+    Square jacobian block with non zero values only on its diagonal, stored as the vector of its diagonal.
+
+    Arithmetic follows the numpy semantics of the dense matrix np.diag(diagonal) so that the block
+    can replace np.diag(vect) or np.identity(n) * vect in gradient computations :
+        - elementwise product with a scalar, a (n,) vector (columns scaling), a (n, 1) vector (rows scaling)
+          or a (n, n) array (only its diagonal matters) gives a diagonal block
+        - sum with a diagonal block gives a diagonal block, other sums are done with the dense matrix
+        - matrix product with a diagonal block gives a diagonal block, with an array it scales its rows/columns
+    The block is converted to the dense matrix by to_jacobian_value when it is given to the discipline jacobian.
+    """
+    # numpy operators with a block as right operand are delegated to the reflected operators of the block
+    __array_ufunc__ = None
+
+    def __init__(self, diagonal):
+        self.diagonal = np.asarray(diagonal).reshape(-1)
+
+    @classmethod
+    def identity(cls, size):
+        return cls(np.ones(size))
+
+    @property
+    def shape(self):
+        return len(self.diagonal), len(self.diagonal)
+
+    @property
+    def ndim(self):
+        return 2
+
+    @property
+    def dtype(self):
+        return self.diagonal.dtype
+
+    @property
+    def T(self):
+        return self
+
+    def copy(self):
+        return DiagonalJacobianBlock(self.diagonal.copy())
+
+    def to_dense(self):
+        return np.diag(self.diagonal)
+
+    def to_sparse(self):
+        # csr arrays built from the non zero values of the diagonal, as sp.diags(self.diagonal, format='csr')
+        # without its conversions through the dia and coo formats
+        nb_lines = len(self.diagonal)
+        non_zero_lines = np.flatnonzero(self.diagonal)
+        indptr = np.zeros(nb_lines + 1, dtype=np.int32)
+        indptr[non_zero_lines + 1] = 1
+        return sp.csr_matrix((self.diagonal[non_zero_lines], non_zero_lines.astype(np.int32), np.cumsum(indptr, dtype=np.int32)),
+                             shape=(nb_lines, nb_lines))
+
+    def __array__(self, dtype=None, copy=None):
+        dense = self.to_dense()
+        return dense if dtype is None else dense.astype(dtype)
+
+    def __getitem__(self, key):
+        return self.to_dense()[key]
+
+    def _diagonal_factor(self, other):
+        """
+        Diagonal of the elementwise product factor if the product with other keeps the block diagonal, else None
+        """
+        if isinstance(other, DiagonalJacobianBlock):
+            return other.diagonal
+        other = np.asarray(other)
+        nb_lines = len(self.diagonal)
+        if other.size == 1 and other.ndim <= 2:
+            return other.reshape(())
+        if other.shape in [(nb_lines,), (1, nb_lines), (nb_lines, 1)]:
+            return other.reshape(nb_lines)
+        if other.shape == (nb_lines, nb_lines):
+            return np.diagonal(other)
+        return None
+
+    def __mul__(self, other):
+        factor = self._diagonal_factor(other)
+        if factor is None:
+            return self.to_dense() * np.asarray(other)
+        return DiagonalJacobianBlock(self.diagonal * factor)
+
+    def __rmul__(self, other):
+        factor = self._diagonal_factor(other)
+        if factor is None:
+            return np.asarray(other) * self.to_dense()
+        return DiagonalJacobianBlock(factor * self.diagonal)
+
+    def __truediv__(self, other):
+        factor = self._diagonal_factor(other)
+        if factor is None or isinstance(other, DiagonalJacobianBlock):
+            return self.to_dense() / np.asarray(other)
+        return DiagonalJacobianBlock(self.diagonal / factor)
+
+    def __rtruediv__(self, other):
+        return np.asarray(other) / self.to_dense()
+
+    def __neg__(self):
+        return DiagonalJacobianBlock(-self.diagonal)
+
+    def __pos__(self):
+        return self
+
+    def __add__(self, other):
+        if isinstance(other, DiagonalJacobianBlock):
+            return DiagonalJacobianBlock(self.diagonal + other.diagonal)
+        return self.to_dense() + np.asarray(other)
+
+    def __radd__(self, other):
+        return np.asarray(other) + self.to_dense()
+
+    def __sub__(self, other):
+        if isinstance(other, DiagonalJacobianBlock):
+            return DiagonalJacobianBlock(self.diagonal - other.diagonal)
+        return self.to_dense() - np.asarray(other)
+
+    def __rsub__(self, other):
+        return np.asarray(other) - self.to_dense()
+
+    def __matmul__(self, other):
+        if isinstance(other, DiagonalJacobianBlock):
+            return DiagonalJacobianBlock(self.diagonal * other.diagonal)
+        other = np.asarray(other)
+        if other.ndim == 1:
+            return self.diagonal * other
+        return self.diagonal[:, np.newaxis] * other
+
+    def __rmatmul__(self, other):
+        return np.asarray(other) * self.diagonal
+
+    def sum(self, axis=None, dtype=None, out=None):
+        if axis is None:
+            return self.diagonal.sum(dtype=dtype)
+        return self.diagonal.astype(dtype) if dtype is not None else self.diagonal.copy()
+
+    def mean(self, axis=None, dtype=None, out=None):
+        if axis is None:
+            return self.sum(dtype=dtype) / len(self.diagonal) ** 2
+        return self.sum(axis=axis, dtype=dtype) / len(self.diagonal)
+
+
+def to_jacobian_value(value):
+    """
+    Convert a jacobian block to the value given to set_partial_derivative_for_other_types :
+    diagonal blocks are converted to dense arrays, dense arrays are left unchanged.
+    SoSWrapp assigns the values in dense slices of the jacobian, scipy.sparse matrices are not supported there
+    """
+    if isinstance(value, DiagonalJacobianBlock):
+        return value.to_dense()
+    return value
+
+
+def vector_jacobian_product(block, cotangent):
+    """
+    Product cotangent @ block of a row cotangent with a jacobian block, without building the dense block
+    when it is diagonal or sparse. 1-D blocks are rows of a scalar output if the cotangent has a single value,
+    else columns of a scalar input, as set_partial_derivative_for_other_types reads them
+    """
+    cotangent = np.asarray(cotangent).reshape(-1)
+    if isinstance(block, DiagonalJacobianBlock):
+        return cotangent * block.diagonal
+    if sp.issparse(block):
+        return block.T @ cotangent
+    block = np.asarray(block)
+    if block.ndim == 1:
+        block = block[np.newaxis, :] if len(cotangent) == 1 else block[:, np.newaxis]
+    return cotangent @ block
+
+
+class JacobianBlocksTape:
+    """
+    Jacobian blocks set during compute_sos_jacobian contracted with the output cotangents as they are set :
+    only the products cotangent @ block are kept, blocks of outputs without cotangent are dropped
+    """
+
+    def __init__(self, cotangents):
+        """
+        :param cotangents: dict {(output, column): cotangent vector}
+        """
+        self.cotangents = cotangents
+        self.outputs = {y_key_column[0] for y_key_column in cotangents}
+        self.products = {}
+
+    def has_output(self, *outputs):
+        return any(output in self.outputs for output in outputs)
+
+    def record(self, y_key_column, x_key_column, value):
+        # the last block set for a couple of variables overwrites the previous ones, as in the jacobian
+        if y_key_column in self.cotangents:
+            self.products[(y_key_column, x_key_column)] = vector_jacobian_product(value, self.cotangents[y_key_column])
+
+    def vjp(self):
+        """
+        Sum over the outputs of the recorded products for each input
+        :return: dict {(input, column): gradient vector}
+        """
+        gradients = {}
+        for (_, x_key_column), product in self.products.items():
+            if x_key_column in gradients:
+                gradients[x_key_column] = gradients[x_key_column] + product
+            else:
+                gradients[x_key_column] = product
+        return gradients
+
+
+class VectorJacobianProductMixin:
+    """
+    Jacobian blocks handling of the disciplines :
+        - diagonal blocks are kept compact during compute_sos_jacobian and converted to dense arrays
+          only when set in the jacobian of the discipline
+        - vjp gives the product of output cotangents with the jacobian of this discipline only, contracting the
+          blocks as they are set instead of storing them. compute_sos_jacobian can skip the blocks of the outputs
+          without cotangent with is_jacobian_output_requested.
+          It is a per-discipline tool (gradient checks, studies of one discipline) : no process calls it, the
+          coupling solver and the optim processes use the full jacobians of compute_sos_jacobian
+    """
+    jacobian_blocks_tape = None
+
+    def set_partial_derivative_for_other_types(self, y_key_column, x_key_column, value):
+        if self.jacobian_blocks_tape is not None:
+            self.jacobian_blocks_tape.record(y_key_column, x_key_column, value)
+        else:
+            super().set_partial_derivative_for_other_types(y_key_column, x_key_column, to_jacobian_value(value))
+
+    def is_jacobian_output_requested(self, *outputs):
+        """
+        True if the jacobian blocks of one of these outputs are needed :
+        always for the full jacobian, only for the outputs with a cotangent in vjp
+        """
+        return self.jacobian_blocks_tape is None or self.jacobian_blocks_tape.has_output(*outputs)
+
+    def vjp(self, cotangents):
+        """
+        Vector jacobian product of this discipline at its current inputs, it is not propagated to other disciplines
+        compute_sos_jacobian is run as for the full jacobian : the intermediate gradients of the model are computed
+        (the dense production vs invest gradient of the technos for instance), only the blocks storage is avoided
+        :param cotangents: dict {(output, column): cotangent vector}, only these outputs are differentiated
+        :return: dict {(input, column): gradient vector}
+        """
+        self.jacobian_blocks_tape = JacobianBlocksTape(cotangents)
+        try:
+            self.compute_sos_jacobian()
+            return self.jacobian_blocks_tape.vjp()
+        finally:
+            self.jacobian_blocks_tape = None
@@ -62,6 +62,8 @@ class BaseStream:
         self.min_prod = 1e-3
         self.subelements_list = []
         self.total_prices = None  # energy outputs dataframe
+        # mix weights and their gradients computed by compute_mix_weights
+        self.mix_weights_cache = None
 
         self.sub_production_dict = {}
         self.sub_consumption_dict = {}
@@ -158,49 +160,54 @@ class BaseStream:
         Compute energy production by summing all energy productions
         And compute the techno_mix_weights each year
         '''
-
-        # Initialize dataframe out
-        base_df = pd.DataFrame({GlossaryEnergy.Years: self.years})
-        production = base_df.copy(deep=True)
-        consumption = base_df.copy(deep=True)
-        production_by_techno = base_df.copy(deep=True)
-
+        main_production_column = f'{self.name} ({self.unit})'
+        production_by_techno = {GlossaryEnergy.Years: self.years}
+        total_production = np.zeros(len(self.years))
         # Loop on technologies
-        production[f'{self.name}'] = 0.
         for element in self.subelements_list:
             production_by_techno[f'{self.name} {element} ({self.unit})'] = sub_production_dict[
-                element][f'{self.name} ({self.unit})'].values
-            production[
-                f'{self.name}'] += production_by_techno[f'{self.name} {element} ({self.unit})'].values
-
-            production, consumption = self.compute_byproducts_consumption_and_production(
-                element, sub_production_dict, sub_consumption_dict, production, consumption)
-
-        #print(self.name, "&&#", self.unit)
-        #print(self.name, list(production_by_techno.columns))
-        return production, consumption, production_by_techno
-
-    def compute_byproducts_consumption_and_production(self, element, sub_production_dict, sub_consumption_dict, production,
-                                                      consumption, factor=1.0):
-        """Compute byproducts consumptions and productions"""
-
-        for elem, prod in sub_production_dict[element].items():
-            # DO not count major energy production in this function (already
-            # computed)
-            if elem != f'{self.name} ({self.unit})' and elem != GlossaryEnergy.Years:
-                if elem in production:
-                    production[elem] += prod.values * factor
-                else:
-                    production[elem] = prod.values * factor
-
-        for elem, cons in sub_consumption_dict[element].items():
-            if elem != GlossaryEnergy.Years:
-                if elem in consumption:
-                    consumption[elem] += cons.values * factor
-                else:
-                    consumption[elem] = cons.values * factor
-
-        return production, consumption
+                element][main_production_column].values
+            total_production = total_production + production_by_techno[f'{self.name} {element} ({self.unit})']
+
+        production = self.aggregate_columns(
+            [sub_production_dict[element] for element in self.subelements_list],
+            first_columns={f'{self.name}': total_production}, excluded_columns=[main_production_column])
+        consumption = self.aggregate_columns([sub_consumption_dict[element] for element in self.subelements_list])
+
+        return production, consumption, pd.DataFrame(production_by_techno)
+
+    def aggregate_columns(self, dataframes, factors=None, first_columns=None, excluded_columns=()):
+        """
+        Sum the columns with the same name of the dataframes (each dataframe multiplied by its factor)
+        The union of the column names is collected first, then the columns are summed in a preallocated
+        (column x year) array and the output dataframe is built once
+        Columns of the output are years, first_columns and the summed columns in order of first appearance
+        """
+        if factors is None:
+            factors = [1.0] * len(dataframes)
+        first_columns = {} if first_columns is None else first_columns
+
+        column_dtypes = {column: np.asarray(values).dtype for column, values in first_columns.items()}
+        for df, factor in zip(dataframes, factors):
+            for column, dtype in df.dtypes.items():
+                if column != GlossaryEnergy.Years and column not in excluded_columns:
+                    column_dtypes[column] = np.result_type(column_dtypes.get(column, np.float64), dtype, factor)
+        column_indices = {column: index for index, column in enumerate(column_dtypes)}
+
+        sum_buffer = np.zeros((len(column_indices), len(self.years)), dtype=np.result_type(np.float64, *column_dtypes.values()))
+        for column, values in first_columns.items():
+            sum_buffer[column_indices[column]] = values
+        for df, factor in zip(dataframes, factors):
+            for column in df.columns:
+                if column in column_indices:
+                    sum_buffer[column_indices[column]] += df[column].values * factor
+
+        aggregated_columns = {GlossaryEnergy.Years: self.years}
+        for column, index in column_indices.items():
+            # columns summed with real values only are kept real
+            aggregated_columns[column] = sum_buffer[index] if np.issubdtype(column_dtypes[column], np.complexfloating) \
+                else sum_buffer[index].real
+        return pd.DataFrame(aggregated_columns)
 
     def compute_energy_type_capital(self, inputs):
         technos = inputs[GlossaryEnergy.techno_list]
@@ -224,166 +231,151 @@ class BaseStream:
         '''
         Compute the price with all sub_prices and sub weights computed with total production 
         '''
-
-        self.total_prices[self.name] = 0.
-        self.total_prices[f'{self.name}_wotaxes'] = 0.
-
         element_list = self.subelements_list
         full_element_list = [
             f'{self.name} {element} ({self.unit})' for element in element_list]
         element_dict = dict(zip(element_list, full_element_list))
-        if exp_min:
-            prod_element, prod_total_for_mix_weight = self.compute_prod_with_exp_min(
-                self.production_by_techno, element_dict, self.min_prod)
-        else:
-            prod_element, prod_total_for_mix_weight = self.compute_prod_wcutoff(
-                self.production_by_techno, element_dict, self.min_prod)
-        for element in self.subelements_list:
-            # we compute then mix_weight with these prods minimized and use it
-            # also for co2 emissions
-            mix_weight = prod_element[element] / \
-                         prod_total_for_mix_weight
-            # Still If the element is negligible do not take into account this element
-            # It is negligible if tol = 0.1%
-            tol = 1e-3
-            mix_weight[mix_weight < tol] = 0.0
-            self.mix_weights[element] = mix_weight * 100.
-
-            self.total_prices[self.name] += self.sub_prices[element] * mix_weight
-            self.total_prices[f'{self.name}_wotaxes'] += self.sub_prices_wo_taxes[element] * mix_weight
-            self.mix_weights[element] = mix_weight * 100.
+        # we compute the mix_weights with the prods minimized and use it
+        # also for co2 emissions
+        mix_weights = self.compute_mix_weights(
+            self.production_by_techno, element_dict, exp_min=exp_min, min_prod=self.min_prod)['mix_weights']
+
+        # prices summed element by element (rows of the element x year arrays)
+        sub_prices = self.sub_prices[element_list].values
+        sub_prices_wo_taxes = self.sub_prices_wo_taxes[element_list].values
+        total_price = np.ascontiguousarray(sub_prices.T * mix_weights).sum(axis=0)
+        total_price_wo_taxes = np.ascontiguousarray(sub_prices_wo_taxes.T * mix_weights).sum(axis=0)
+        mix_weights = mix_weights * 100.
         # In case all the technologies are below the threshold
         # and the cutoff is applied, assign a placeholder price
         if not exp_min:
-            for year in self.total_prices[GlossaryEnergy.Years].values:
-                if np.real(self.total_prices.loc[self.total_prices[GlossaryEnergy.Years] == year][
-                               self.name].values) == 0.0:
-                    # Get the min_price of the technos this year that are > 0.0
-                    year_techno_prices = self.sub_prices[self.subelements_list].loc[
-                        self.sub_prices[GlossaryEnergy.Years] == year]
-                    min_techno_price = min(
-                        val for val in year_techno_prices.values[0] if val > 0.0)
-                    min_techno_name = [
-                        name for name in year_techno_prices.columns if
-                        year_techno_prices[name].values == min_techno_price][0]
-                    for element in self.subelements_list:
-                        self.mix_weights.loc[self.mix_weights[GlossaryEnergy.Years] == year,
-                                             element] = 100. if element == min_techno_name else 0.0
-                    min_techno_price_wo_taxes = self.sub_prices_wo_taxes[min_techno_name]
-                    self.total_prices.loc[self.total_prices[GlossaryEnergy.Years] ==
-                                          year, self.name] = min_techno_price
-                    self.total_prices.loc[self.total_prices[GlossaryEnergy.Years] ==
-                                          year, f'{self.name}_wotaxes'] = min_techno_price_wo_taxes
-
-    def compute_prod_wcutoff(self, production_by_techno, elements_dict, min_prod):
-
-        prod_total_for_mix_weight = np.zeros(len(self.years))
-        prod_element_dict = {}
-        for key, value in elements_dict.items():
-            prod_element_dict[key] = deepcopy(production_by_techno[
-                                                  value].values)
-            prod_element_dict[key][prod_element_dict[key]
-                                   < min_prod] = 0.0
-            prod_total_for_mix_weight = prod_total_for_mix_weight + \
-                                        prod_element_dict[key]
-        prod_total_for_mix_weight[prod_total_for_mix_weight == 0.0] = min_prod
-
-        return prod_element_dict, prod_total_for_mix_weight
-
-    def compute_dprod_wcutoff(self, production_by_techno, elements_dict, min_prod):
-
-        prod_element_dict = {}
-        dprod_element_dict = {}
-
-        for key, value in elements_dict.items():
-            prod_element_dict[key] = deepcopy(production_by_techno[
-                                                  value].values)
-            dprod_element_dict[key] = np.ones(
-                len(prod_element_dict[key]))
-            dprod_element_dict[key][prod_element_dict[key]
-                                    < min_prod] = 0.0
-
-        return dprod_element_dict
-
-    def compute_prod_with_exp_min(self, production_by_techno, elements_dict, min_prod):
+            no_price_years, cheapest_elements = self.compute_cutoff_placeholder(sub_prices, total_price, element_list)
+            years_index = np.arange(len(total_price))
+            mix_weights = np.where(no_price_years,
+                                   100. * (np.arange(len(element_list))[:, np.newaxis] == cheapest_elements),
+                                   mix_weights)
+            total_price = np.where(no_price_years, sub_prices[years_index, cheapest_elements], total_price)
+            total_price_wo_taxes = np.where(no_price_years, sub_prices_wo_taxes[years_index, cheapest_elements],
+                                            total_price_wo_taxes)
+
+        for element, mix_weight in zip(element_list, mix_weights):
+            self.mix_weights[element] = mix_weight
+        self.total_prices[self.name] = total_price
+        self.total_prices[f'{self.name}_wotaxes'] = total_price_wo_taxes
+
+    @staticmethod
+    def compute_cutoff_placeholder(prices, total_price, element_list):
         '''
-        Compute the production of each element by minimizing them with and exponential function to reach min prod
-        Objective is to decrease gradients when prod are very low 
-        Be careful the objective is to increase the total production to
-        decrease the gradient then we have to modify the sum also
-
-        BIG WARNING : there is an issue in the handling of complex number in this function that may cause small errors 
-        in gradient tests. So far, no solution has been found. This error can be reproduced by running the test on the 
-        gradients of liquid_hydrogen stream in the case of a production of techno HydrogenLiquefaction below min_prod.
+        With the cutoff, the total price is null the years all the elements are below the threshold :
+        the placeholder price of these years is the min price of the elements with a positive price
+        prices : (year x element) prices of the elements
+        returns the mask of the years with a null total price and the index of the cheapest element of each year
+        '''
+        no_price_years = np.real(total_price) == 0.0
+        positive_prices = np.where(np.real(prices) > 0.0, np.real(prices), np.inf)
+        if np.isinf(positive_prices[no_price_years]).all(axis=1).any():
+            raise Exception(f'No element of {element_list} has a positive price to be used as placeholder price '
+                            f'for the years with a null price')
+        return no_price_years, positive_prices.argmin(axis=1)
+
+    def compute_mix_weights(self, production_by_techno, elements_dict, exp_min=True, min_prod=1e-3):
+        '''
+        Fused computation of the mix weights of the elements on the stacked productions (element x year) :
+            - prod : productions of the elements minimized with an exponential function to reach min_prod
+              (exp_min=True) or set to 0 below min_prod (exp_min=False)
+            - dprod : derivative of prod with respect to the productions
+            - prod_total : sum of prod used for the mix weights
+            - mix_weights : prod / prod_total, set to 0 when negligible (below 0.1%)
+        The gradient of the mix weights wrt the productions (compute_grad_mix_weights) is computed on demand
+
+        The result is cached on the stream and reused while the productions and the options are the same,
+        so that the gradients of the discipline do not compute it again after the run
+
+        BIG WARNING : there is an issue in the handling of complex number in the exponential smoothing that may
+        cause small errors in gradient tests. So far, no solution has been found. This error can be reproduced by
+        running the test on the gradients of liquid_hydrogen stream in the case of a production of techno
+        HydrogenLiquefaction below min_prod.
 
         elements_dict contains {Name of the prod techno or energy: full name of the column}
         '''
-
-        prod_total_for_mix_weight = np.zeros(len(self.years))
-        prod_element_dict = {}
-        for key, value in elements_dict.items():
-            prod_element_dict[key] = deepcopy(production_by_techno[
-                                                  value].values)
-
-            if prod_element_dict[key].min() < min_prod:
-                # if some values are below min_prod
-                # We use the exp smoothing only on values below self.min_prod (np.minimum(prod_element, min_prod))
-                # Then we take the maximum to take prod_element if it is higher
-                # than min_prod
-                # To avoid underflow : exp(-200) is considered to be the
-                # minimum value for the exp
-                prod_element_dict[key][prod_element_dict[key]
-                                       < -200.0 * min_prod] = -200.0 * min_prod
-                prod_element_dict[key] = np.maximum(
-                    min_prod / 10.0 * (9.0 + np.exp(np.minimum(prod_element_dict[key], min_prod) / min_prod)
-                                       * np.exp(-1)), prod_element_dict[key])
-
-            prod_total_for_mix_weight = prod_total_for_mix_weight + \
-                                        prod_element_dict[key]
-
-        return prod_element_dict, prod_total_for_mix_weight
-
-    def compute_dprod_with_exp_min(self, production_by_techno, elements_dict, min_prod):
-
-        prod_element_dict = {}
-        dprod_element_dict = {}
-
-        for key, value in elements_dict.items():
-            prod_element_dict[key] = deepcopy(production_by_techno[
-                                                  value].values)
-            dprod_element_dict[key] = np.ones(
-                len(prod_element_dict[key]))
-            if prod_element_dict[key].min() < min_prod:
+        elements = list(elements_dict.keys())
+        production = np.array([production_by_techno[column].values for column in elements_dict.values()]).reshape(
+            len(elements), len(self.years))
+        cache_key = (tuple(elements_dict.items()), exp_min, min_prod)
+        cache = self.mix_weights_cache
+        if cache is not None and cache['key'] == cache_key and cache['production'].dtype == production.dtype \
+                and np.array_equal(cache['production'], production):
+            return cache
+
+        prod = production.copy()
+        dprod = np.ones(production.shape)
+        if exp_min:
+            # exp smoothing only on the elements with some values below min_prod
+            rows = prod.min(axis=1) < min_prod
+            if rows.any():
                 # To avoid underflow : exp(-200) is considered to be the
                 # minimum value for the exp
-                prod_element_dict[key][prod_element_dict[key]
-                                       < -200.0 * min_prod] = -200.0 * min_prod
-                dprod_element_dict[key][prod_element_dict[key] < min_prod] = np.exp(
-                    prod_element_dict[key][prod_element_dict[key] < min_prod] / min_prod) * np.exp(-1) / 10.0
-
-        return dprod_element_dict
+                prod_rows = prod[rows]
+                prod_rows[prod_rows < -200.0 * min_prod] = -200.0 * min_prod
+                dprod_rows = dprod[rows]
+                below_min_prod = prod_rows < min_prod
+                dprod_rows[below_min_prod] = np.real(
+                    np.exp(prod_rows[below_min_prod] / min_prod) * np.exp(-1) / 10.0)
+                # We use the exp smoothing only on values below min_prod (np.minimum(prod, min_prod))
+                # Then we take the maximum to take prod if it is higher than min_prod
+                prod[rows] = np.maximum(
+                    min_prod / 10.0 * (9.0 + np.exp(np.minimum(prod_rows, min_prod) / min_prod) * np.exp(-1)),
+                    prod_rows)
+                dprod[rows] = dprod_rows
+            prod_total = prod.sum(axis=0)
+        else:
+            below_min_prod = prod < min_prod
+            prod[below_min_prod] = 0.0
+            dprod[below_min_prod] = 0.0
+            prod_total = prod.sum(axis=0)
+            prod_total[prod_total == 0.0] = min_prod
+
+        mix_weights = prod / prod_total
+        # If the element is negligible do not take into account this element
+        # It is negligible if tol = 0.1%
+        tol = 1e-3
+        mix_weights[mix_weights < tol] = 0.0
+
+        self.mix_weights_cache = {'key': cache_key, 'production': production, 'elements': elements,
+                                  'prod': prod, 'dprod': dprod, 'prod_total': prod_total,
+                                  'mix_weights': mix_weights, 'grad_mix_weights': None}
+        return self.mix_weights_cache
+
+    def compute_grad_mix_weights(self, production_by_techno, elements_dict, exp_min=True, min_prod=1e-3):
+        '''
+        Gradient of the mix weights wrt the productions as an (element x element x year) tensor :
+        grad[i, i] = dprod_i * (prod_total - prod_i) / prod_total**2
+        grad[i, j] = -dprod_i * prod_j / prod_total**2 (gradient of the mix weight of j wrt the production of i)
+        '''
+        mix_weights_data = self.compute_mix_weights(production_by_techno, elements_dict, exp_min, min_prod)
+        if mix_weights_data['grad_mix_weights'] is None:
+            prod, dprod, prod_total = mix_weights_data['prod'], mix_weights_data['dprod'], mix_weights_data[
+                'prod_total']
+            grad_mix_weights = -dprod[:, np.newaxis, :] * prod[np.newaxis, :, :] / prod_total ** 2
+            diagonal = np.arange(len(prod))
+            grad_mix_weights[diagonal, diagonal] = dprod * (prod_total - prod) / prod_total ** 2
+            mix_weights_data['grad_mix_weights'] = grad_mix_weights
+        return mix_weights_data['grad_mix_weights']
 
     def compute_grad_element_mix_vs_prod(self, production_by_techno, elements_dict, exp_min=True, min_prod=1e-3):
-        if exp_min:
-            prod_element_dict, prod_total_for_mix_weight = self.compute_prod_with_exp_min(
-                production_by_techno, elements_dict, min_prod)
-            dprod_element_dict = self.compute_dprod_with_exp_min(
-                production_by_techno, elements_dict, min_prod)
-        else:
-            prod_element_dict, prod_total_for_mix_weight = self.compute_prod_wcutoff(
-                production_by_techno, elements_dict, min_prod)
-            dprod_element_dict = self.compute_dprod_wcutoff(
-                production_by_techno, elements_dict, min_prod)
+        '''
+        Gradients of the mix weights wrt the productions as views of the tensor of compute_grad_mix_weights
+        grad_element_mix_vs_prod[element] : gradient of the mix weight of element wrt its production
+        grad_element_mix_vs_prod[element element_other] : gradient of the mix weight of element_other
+        wrt the production of element
+        '''
+        grad_mix_weights = self.compute_grad_mix_weights(production_by_techno, elements_dict, exp_min, min_prod)
         grad_element_mix_vs_prod = {}
-
-        for element in elements_dict.keys():
-            grad_element_mix_vs_prod[f'{element}'] = dprod_element_dict[element] * (
-                    prod_total_for_mix_weight - prod_element_dict[element]) / prod_total_for_mix_weight ** 2
-            for element_other in elements_dict.keys():
+        for i, element in enumerate(elements_dict.keys()):
+            grad_element_mix_vs_prod[f'{element}'] = grad_mix_weights[i, i]
+            for j, element_other in enumerate(elements_dict.keys()):
                 if element_other != element:
-                    grad_element_mix_vs_prod[f'{element} {element_other}'] = -dprod_element_dict[element] * \
-                                                                             prod_element_dict[element_other] / \
-                                                                             prod_total_for_mix_weight ** 2
+                    grad_element_mix_vs_prod[f'{element} {element_other}'] = grad_mix_weights[i, j]
 
         return grad_element_mix_vs_prod
 
@@ -94,7 +94,6 @@ class CarbonCapture(BaseStream):
         # Initialize dataframe out
         base_df = pd.DataFrame({GlossaryEnergy.Years: self.years})
         production = base_df.copy(deep=True)
-        consumption = base_df.copy(deep=True)
         production_by_techno = base_df.copy(deep=True)
         carbon_captured_type = pd.DataFrame({GlossaryEnergy.Years: self.years,
                                              'flue gas': 0.0,
@@ -139,16 +138,22 @@ class CarbonCapture(BaseStream):
             carbon_captured_type['flue gas limited'] = carbon_captured_type['flue gas']
 
         # Divide the prod or the cons  if element is carbon capture
+        factors = []
         for element in self.subelements_list:
             if element.startswith('flue_gas_capture') and min(diff_flue_gas.real) < 0:
                 factor = flue_gas_percentage
             else:
                 factor = 1.0
+            factors.append(factor)
             production_by_techno[f'{self.name} {element} ({self.unit})'] = sub_production_dict[
                                                                                element][
                                                                                f'{self.name} ({self.unit})'].values * factor
-            production, consumption = self.compute_byproducts_consumption_and_production(
-                element, sub_production_dict, sub_consumption_dict, production, consumption, factor=factor)
+        production = self.aggregate_columns(
+            [sub_production_dict[element] for element in self.subelements_list], factors=factors,
+            first_columns={f'{self.name}': production[f'{self.name}'].values},
+            excluded_columns=[f'{self.name} ({self.unit})'])
+        consumption = self.aggregate_columns([sub_consumption_dict[element] for element in self.subelements_list],
+                                             factors=factors)
         return production, consumption, production_by_techno, carbon_captured_type, flue_gas_percentage, fg_ratio
 
     def compute_flue_gas_with_exp_min(self, fg_perc):
@@ -227,16 +232,10 @@ class CarbonCapture(BaseStream):
         prodi = self.sub_production_dict
         pi = prod_element_dict
         '''
-        if exp_min:
-            prod_element_dict, prod_total_for_mix_weight = self.compute_prod_with_exp_min(
-                production_by_techno, elements_dict, min_prod)
-            dprod_element_dict = self.compute_dprod_with_exp_min(
-                production_by_techno, elements_dict, min_prod)
-        else:
-            prod_element_dict, prod_total_for_mix_weight = self.compute_prod_wcutoff(
-                production_by_techno, elements_dict, min_prod)
-            dprod_element_dict = self.compute_dprod_wcutoff(
-                production_by_techno, elements_dict, min_prod)
+        mix_weights_data = self.compute_mix_weights(production_by_techno, elements_dict, exp_min, min_prod)
+        prod_element_dict = dict(zip(elements_dict, mix_weights_data['prod']))
+        dprod_element_dict = dict(zip(elements_dict, mix_weights_data['dprod']))
+        prod_total_for_mix_weight = mix_weights_data['prod_total']
 
         if self.flue_gas_percentage is not None:
             dfluegas = self.compute_dflue_gas_with_exp_min(
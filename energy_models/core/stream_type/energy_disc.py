@@ -22,6 +22,7 @@ from sostrades_core.tools.post_processing.charts.two_axes_instanciated_chart imp
     TwoAxesInstanciatedChart,
 )
 
+from energy_models.core.chart_registry import ChartDeclaration
 from energy_models.core.stream_type.stream_disc import StreamDiscipline
 from energy_models.glossaryenergy import GlossaryEnergy
 
@@ -40,6 +41,12 @@ class EnergyDiscipline(StreamDiscipline):
         'icon': '',
         'version': '',
     }
+    chart_registry = StreamDiscipline.chart_registry.extend([
+        ChartDeclaration('CO2 emissions', 'get_chart_comparison_carbon_intensity', (GlossaryEnergy.techno_list,)),
+        ChartDeclaration('CO2 emissions', 'get_chart_co2_emissions',
+                         (GlossaryEnergy.techno_list, 'scaling_factor_energy_production')),
+    ])
+
     DESC_IN = {GlossaryEnergy.CO2Taxes['var_name']: GlossaryEnergy.CO2Taxes,
                }
     DESC_IN.update(StreamDiscipline.DESC_IN)
@@ -179,32 +186,6 @@ class EnergyDiscipline(StreamDiscipline):
             'Years for techno mix', years, [year_start, year_end], GlossaryEnergy.Years))
         return chart_filters
 
-    def get_post_processing_list(self, filters=None):
-
-        # For the outputs, making a graph for block fuel vs range and blocktime vs
-        # range
-
-        instanciated_charts = StreamDiscipline.get_post_processing_list(
-            self, filters)
-        charts = []
-        # Overload default value with chart filter
-        if filters is not None:
-            for chart_filter in filters:
-                if chart_filter.filter_key == 'charts':
-                    charts = chart_filter.selected_values
-
-        if 'CO2 emissions' in charts:
-            new_charts = self.get_chart_comparison_carbon_intensity()
-            for new_chart in new_charts:
-                if new_chart is not None:
-                    instanciated_charts.append(new_chart)
-
-            new_charts = self.get_chart_co2_emissions()
-            for new_chart in new_charts:
-                if new_chart is not None:
-                    instanciated_charts.append(new_chart)
-        return instanciated_charts
-
     def get_chart_comparison_carbon_intensity(self):
         new_charts = []
         chart_name = f'Comparison of carbon intensity due to production<br>of {self.energy_name} technologies'
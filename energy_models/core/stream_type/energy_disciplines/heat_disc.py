@@ -30,6 +30,11 @@ from sostrades_core.tools.post_processing.pie_charts.instanciated_pie_chart impo
     InstanciatedPieChart,
 )
 
+from energy_models.core.chart_registry import (
+    ChartDeclaration,
+    ChartRegistry,
+    LazyChartsMixin,
+)
 from energy_models.core.energy_mix.energy_mix import EnergyMix
 from energy_models.core.stream_type.energy_disciplines.high_heat_disc import (
     HighHeatDiscipline,
@@ -43,7 +48,7 @@ from energy_models.core.stream_type.energy_disciplines.medium_heat_disc import (
 from energy_models.glossaryenergy import GlossaryEnergy
 
 
-class HeatDiscipline(SoSWrapp):
+class HeatDiscipline(LazyChartsMixin, SoSWrapp):
     # ontology information
     _ontology_data = {
         'label': 'Heat Energy Model',
@@ -58,6 +63,16 @@ class HeatDiscipline(SoSWrapp):
         'version': '',
     }
 
+    # post-processing charts in their display order : (charts filter value, build method, inputs, filter keys)
+    chart_registry = ChartRegistry([
+        ChartDeclaration('Energy price', 'get_charts_energy_price', filter_keys=('price_unit',)),
+        ChartDeclaration('Technology price', 'get_charts_techno_price', filter_keys=('price_unit',)),
+        ChartDeclaration('Consumption and production', 'get_charts_consumption_and_production',
+                         ('scaling_factor_energy_consumption', 'scaling_factor_energy_production')),
+        ChartDeclaration('Technology production', 'get_chart_technology_mix', filter_keys=(GlossaryEnergy.Years,)),
+        ChartDeclaration('Technology production', 'get_charts_production_by_techno'),
+    ])
+
     name = GlossaryEnergy.heat
     energy_name = name
     heat_list = [HighHeatDiscipline.energy_name,
@@ -236,51 +251,21 @@ class HeatDiscipline(SoSWrapp):
         return chart_filters
 
     def get_post_processing_list(self, filters=None):
+        # the charts are declared in chart_registry and only built when requested by the filters
+        # the energy price in $/t is not available for heat
 
-        instanciated_charts = []
-        charts = []
-        price_unit_list = ['$/MWh', '$/t']
-        years_list = [self.get_sosdisc_inputs(GlossaryEnergy.YearStart)]
-        # Overload default value with chart filter
-        if filters is not None:
-            for chart_filter in filters:
-                if chart_filter.filter_key == 'charts':
-                    charts = chart_filter.selected_values
-                if chart_filter.filter_key == 'price_unit':
-                    price_unit_list = chart_filter.selected_values
-                if chart_filter.filter_key == GlossaryEnergy.Years:
-                    years_list = chart_filter.selected_values
-
-        if 'Energy price' in charts and '$/MWh' in price_unit_list:
-            new_chart = self.get_chart_energy_price_in_dollar_mwh()
-            if new_chart is not None:
-                instanciated_charts.append(new_chart)
-
-        if 'Technology price' in charts and '$/MWh' in price_unit_list:
-            new_chart = self.get_chart_techno_price_in_dollar_mwh()
-            if new_chart is not None:
-                instanciated_charts.append(new_chart)
-        # if 'Energy price' in charts and '$/t' in price_unit_list and 'calorific_value' in self.get_sosdisc_inputs('data_fuel_dict'):
-        #     new_chart = self.get_chart_energy_price_in_dollar_kg()
-        #     if new_chart is not None:
-        #         instanciated_charts.append(new_chart)
-
-        if 'Consumption and production' in charts:
-            new_charts = self.get_charts_consumption_and_production()
-            for new_chart in new_charts:
-                if new_chart is not None:
-                    instanciated_charts.append(new_chart)
-        if 'Technology production' in charts:
-            new_charts = self.get_chart_technology_mix(years_list)
-            for new_chart in new_charts:
-                if new_chart is not None:
-                    instanciated_charts.append(new_chart)
-            new_charts = self.get_charts_production_by_techno()
-            for new_chart in new_charts:
-                if new_chart is not None:
-                    instanciated_charts.append(new_chart)
+        return self.get_lazy_charts(filters, {'price_unit': ['$/MWh', '$/t'],
+                                              GlossaryEnergy.Years: [self.get_sosdisc_inputs(GlossaryEnergy.YearStart)]})
 
-        return instanciated_charts
+    def get_charts_energy_price(self, price_unit_list):
+        if '$/MWh' in price_unit_list:
+            return self.get_chart_energy_price_in_dollar_mwh()
+        return None
+
+    def get_charts_techno_price(self, price_unit_list):
+        if '$/MWh' in price_unit_list:
+            return self.get_chart_techno_price_in_dollar_mwh()
+        return None
 
     def get_chart_energy_price_in_dollar_mwh(self):
         energy_prices = self.get_sosdisc_outputs(GlossaryEnergy.StreamPricesValue)
@@ -44,13 +44,23 @@ from sostrades_optimization_plugins.tools.plot_tools.plotting import (
     TwoAxesInstanciatedChart,
 )
 
+from energy_models.core.chart_registry import (
+    ChartDeclaration,
+    ChartRegistry,
+    LazyChartsMixin,
+)
+from energy_models.core.discipline_instrumentation import InstrumentedDisciplineMixin
+from energy_models.core.jacobian_blocks import (
+    DiagonalJacobianBlock,
+    VectorJacobianProductMixin,
+)
 from energy_models.glossaryenergy import GlossaryEnergy
 
 if TYPE_CHECKING:
     import logging
 
 
-class StreamDiscipline(SoSWrapp):
+class StreamDiscipline(LazyChartsMixin, VectorJacobianProductMixin, InstrumentedDisciplineMixin, SoSWrapp):
     # ontology information
     _ontology_data = {
         "label": "Core Stream Type Model",
@@ -65,6 +75,46 @@ class StreamDiscipline(SoSWrapp):
         "version": "",
     }
 
+    # post-processing charts in their display order : (charts filter value, build method, inputs, filter keys)
+    chart_registry = ChartRegistry(
+        [
+            ChartDeclaration(
+                "Energy price",
+                "get_charts_energy_price",
+                (GlossaryEnergy.techno_list, "data_fuel_dict"),
+                ("price_unit",),
+            ),
+            ChartDeclaration(
+                "Consumption and production",
+                "get_charts_consumption_and_production",
+                ("scaling_factor_energy_consumption", "scaling_factor_energy_production"),
+            ),
+            ChartDeclaration(
+                "Technology mix",
+                "get_chart_technology_mix",
+                (GlossaryEnergy.techno_list,),
+                (GlossaryEnergy.Years,),
+            ),
+            ChartDeclaration(
+                "Technology mix",
+                "get_charts_production_by_techno_in_twh",
+                (GlossaryEnergy.techno_list,),
+            ),
+            ChartDeclaration(
+                GlossaryEnergy.Capital,
+                "get_capital_breakdown_by_technos",
+                (GlossaryEnergy.techno_list,),
+            ),
+            # the stream flow charts are always built
+            ChartDeclaration(
+                None,
+                "get_charts_stream_flow",
+                (GlossaryEnergy.TechnoListName,),
+                (GlossaryEnergy.Years,),
+            ),
+        ]
+    )
+
     DESC_IN = {
         GlossaryEnergy.YearStart: ClimateEcoDiscipline.YEAR_START_DESC_IN,
         GlossaryEnergy.YearEnd: GlossaryEnergy.YearEndVar,
@@ -233,7 +283,7 @@ class StreamDiscipline(SoSWrapp):
             inputs_dict[GlossaryEnergy.YearStart],
             inputs_dict[GlossaryEnergy.YearEnd] + 1,
         )
-        identity = np.eye(len(years))
+        identity = DiagonalJacobianBlock.identity(len(years))
         technos_list = inputs_dict[GlossaryEnergy.techno_list]
         list_columns_energyprod = list(
             outputs_dict[GlossaryEnergy.EnergyProductionValue].columns
@@ -286,7 +336,7 @@ class StreamDiscipline(SoSWrapp):
                                 techno_prod_name_with_unit,
                             ),
                             inputs_dict["scaling_factor_techno_production"]
-                            * np.identity(len(years))
+                            * identity
                             / scaling_factor_energy_production,
                         )
                     else:
@@ -299,7 +349,7 @@ class StreamDiscipline(SoSWrapp):
                                         col_technoprod,
                                     ),
                                     inputs_dict["scaling_factor_techno_production"]
-                                    * np.identity(len(years))
+                                    * identity
                                     / scaling_factor_energy_production,
                                 )
 
@@ -313,7 +363,7 @@ class StreamDiscipline(SoSWrapp):
                                 techno_prod_name_with_unit,
                             ),
                             inputs_dict["scaling_factor_techno_consumption"]
-                            * np.identity(len(years))
+                            * identity
                             / scaling_factor_energy_consumption,
                         )
                         self.set_partial_derivative_for_other_types(
@@ -326,7 +376,7 @@ class StreamDiscipline(SoSWrapp):
                                 techno_prod_name_with_unit,
                             ),
                             inputs_dict["scaling_factor_techno_consumption"]
-                            * np.identity(len(years))
+                            * identity
                             / scaling_factor_energy_consumption,
                         )
 
@@ -344,7 +394,7 @@ class StreamDiscipline(SoSWrapp):
                                         col_technoprod,
                                     ),
                                     inputs_dict["scaling_factor_techno_consumption"]
-                                    * np.identity(len(years))
+                                    * identity
                                     / scaling_factor_energy_consumption,
                                 )
                                 self.set_partial_derivative_for_other_types(
@@ -357,7 +407,7 @@ class StreamDiscipline(SoSWrapp):
                                         col_technoprod,
                                     ),
                                     inputs_dict["scaling_factor_techno_consumption"]
-                                    * np.identity(len(years))
+                                    * identity
                                     / scaling_factor_energy_consumption,
                                 )
 
@@ -383,7 +433,7 @@ class StreamDiscipline(SoSWrapp):
                             column_name,
                         ),
                         inputs_dict["scaling_factor_techno_production"]
-                        * np.identity(len(years))
+                        * identity
                         * 100.0
                         * grad_techno_mix_vs_prod,
                     )
@@ -431,7 +481,7 @@ class StreamDiscipline(SoSWrapp):
                                     column_name,
                                 ),
                                 inputs_dict["scaling_factor_techno_production"]
-                                * np.identity(len(years))
+                                * identity
                                 * 100.0
                                 * grad_techno_mix_vs_prod,
                             )
@@ -443,7 +493,7 @@ class StreamDiscipline(SoSWrapp):
                             column_name,
                         ),
                         inputs_dict["scaling_factor_techno_production"]
-                        * np.identity(len(years))
+                        * identity
                         * grad_price_vs_prod,
                     )
 
@@ -457,26 +507,26 @@ class StreamDiscipline(SoSWrapp):
                             column_name,
                         ),
                         inputs_dict["scaling_factor_techno_production"]
-                        * np.identity(len(years))
+                        * identity
                         * grad_price_wotaxes_vs_prod,
                     )
 
             self.set_partial_derivative_for_other_types(
                 (GlossaryEnergy.StreamPricesValue, self.energy_name),
                 (f"{techno}.{GlossaryEnergy.TechnoPricesValue}", techno),
-                np.diag(outputs_dict["techno_mix"][techno] / 100.0),
+                DiagonalJacobianBlock(mix_weight_techno),
             )
 
             self.set_partial_derivative_for_other_types(
                 (GlossaryEnergy.StreamPricesValue, f"{self.energy_name}_wotaxes"),
                 (f"{techno}.{GlossaryEnergy.TechnoPricesValue}", f"{techno}_wotaxes"),
-                np.diag(outputs_dict["techno_mix"][techno] / 100.0),
+                DiagonalJacobianBlock(mix_weight_techno),
             )
 
             self.set_partial_derivative_for_other_types(
                 (GlossaryEnergy.LandUseRequiredValue, f"{techno} (Gha)"),
                 (f"{techno}.{GlossaryEnergy.LandUseRequiredValue}", f"{techno} (Gha)"),
-                np.identity(len(years)),
+                identity,
             )
 
         for techno in technos_list:
@@ -530,71 +580,47 @@ class StreamDiscipline(SoSWrapp):
     def get_post_processing_list(self, filters=None):
         # For the outputs, making a graph for block fuel vs range and blocktime vs
         # range
+        # the charts are declared in chart_registry and only built when requested by the filters
 
+        return self.get_lazy_charts(
+            filters,
+            {
+                "price_unit": ["$/MWh", "$/t"],
+                GlossaryEnergy.Years: [self.get_sosdisc_inputs(GlossaryEnergy.YearStart)],
+            },
+        )
+
+    def get_charts_energy_price(self, price_unit_list):
         instanciated_charts = []
-        charts = []
-        price_unit_list = ["$/MWh", "$/t"]
-        unit = "TWh"
-        years_list = [self.get_sosdisc_inputs(GlossaryEnergy.YearStart)]
-        # Overload default value with chart filter
-        if filters is not None:
-            for chart_filter in filters:
-                if chart_filter.filter_key == "charts":
-                    charts = chart_filter.selected_values
-                if chart_filter.filter_key == "price_unit":
-                    price_unit_list = chart_filter.selected_values
-                if chart_filter.filter_key == GlossaryEnergy.Years:
-                    years_list = chart_filter.selected_values
-
-        if "Energy price" in charts and "$/MWh" in price_unit_list:
-            new_chart = self.get_chart_energy_price_in_dollar_kwh()
-            if new_chart is not None:
-                instanciated_charts.append(new_chart)
-        if (
-            "Energy price" in charts
-            and "$/t" in price_unit_list
-            and "calorific_value" in self.get_sosdisc_inputs("data_fuel_dict")
+        if "$/MWh" in price_unit_list:
+            instanciated_charts.append(self.get_chart_energy_price_in_dollar_kwh())
+        if "$/t" in price_unit_list and "calorific_value" in self.get_sosdisc_inputs(
+            "data_fuel_dict"
         ):
-            new_chart = self.get_chart_energy_price_in_dollar_kg()
-            if new_chart is not None:
-                instanciated_charts.append(new_chart)
-        if "Consumption and production" in charts:
-            new_charts = self.get_charts_consumption_and_production()
-            for new_chart in new_charts:
-                if new_chart is not None:
-                    instanciated_charts.append(new_chart)
-        if "Technology mix" in charts:
-            new_charts = self.get_chart_technology_mix(years_list)
-            for new_chart in new_charts:
-                if new_chart is not None:
-                    instanciated_charts.append(new_chart)
-            new_charts = self.get_charts_production_by_techno(unit)
-            for new_chart in new_charts:
-                if new_chart is not None:
-                    instanciated_charts.append(new_chart)
-
-        if GlossaryEnergy.Capital in charts:
-            chart = self.get_capital_breakdown_by_technos()
-            instanciated_charts.append(chart)
-
-        if "Stream Flow" in charts or True:
-            new_chart = self.get_chart_sankey_fluxes(
-                years_list,
-                chart_name=f"Flow of energy streams for {self.sos_name.split('.')[-1]} production (TWh)",
-                split_external=True,
-            )
-            new_chart.post_processing_section_name = "Detailed Stream Flow"
-            instanciated_charts.append(new_chart)
+            instanciated_charts.append(self.get_chart_energy_price_in_dollar_kg())
+        return instanciated_charts
 
-            new_chart = self.get_chart_sankey_fluxes(
-                years_list,
-                chart_name="Flow of energy streams (schematic)",
-                normalized_links=True,
-                split_external=True,
-            )
-            new_chart.post_processing_section_name = "Detailed Stream Flow"
-            instanciated_charts.append(new_chart)
+    def get_charts_production_by_techno_in_twh(self):
+        return self.get_charts_production_by_techno("TWh")
+
+    def get_charts_stream_flow(self, years_list):
+        instanciated_charts = []
+        new_chart = self.get_chart_sankey_fluxes(
+            years_list,
+            chart_name=f"Flow of energy streams for {self.sos_name.split('.')[-1]} production (TWh)",
+            split_external=True,
+        )
+        new_chart.post_processing_section_name = "Detailed Stream Flow"
+        instanciated_charts.append(new_chart)
 
+        new_chart = self.get_chart_sankey_fluxes(
+            years_list,
+            chart_name="Flow of energy streams (schematic)",
+            normalized_links=True,
+            split_external=True,
+        )
+        new_chart.post_processing_section_name = "Detailed Stream Flow"
+        instanciated_charts.append(new_chart)
         return instanciated_charts
 
     def get_chart_energy_price_in_dollar_kwh(self):
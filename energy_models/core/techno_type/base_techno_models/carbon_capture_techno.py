@@ -173,17 +173,7 @@ class CCTechno(TechnoType):
             capex_list, invest_list, techno_dict, invest_before_year_start)
 
         # dprod_dfluegas = dpprod_dpfluegas + dprod_dcapex * dcapexdfluegas
-        if 'complex128' in [dcapexdfluegas.dtype, dprod_dcapex.dtype]:
-            arr_type = 'complex128'
-        else:
-            arr_type = 'float64'
-
-        dprod_dfluegas = np.zeros(dprod_dcapex.shape, dtype=arr_type)
-
-        for line in range(dprod_dcapex.shape[0]):
-            for column in range(dprod_dcapex.shape[1]):
-                dprod_dfluegas[line, column] = np.matmul(
-                    dprod_dcapex[line, :], dcapexdfluegas[:, column])
+        dprod_dfluegas = dprod_dcapex @ dcapexdfluegas
 
         return dprod_dfluegas
 
@@ -0,0 +1,192 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+import numpy as np
+
+# below this cumulated investment (M$) investments have no influence on the learning rate
+MIN_INVEST_SUM_FOR_LEARNING = 10.0
+# the learning ratio is smoothly floored when it goes below this value
+LEARNING_RATIO_THRESHOLD = 0.95
+DEFAULT_MAXIMUM_LEARNING_CAPEX_RATIO = 0.9
+
+
+def compute_learning_curve(invest_list, capex_init, initial_production, expo_factor,
+                           capacity_factor_ratio=None, techno_name=''):
+    """
+    Vectorized learning curve on capex :
+        capex_i = capex_i-1 * ratio_i with ratio_i = ((invest_sum_i + invest_i) / invest_sum_i) ** (-expo_factor)
+
+    invest_sum_i is the cumulated investment before year i (initialized with initial_production * capex_init).
+    The capex is reset to capex_init each year the cumulated investment is below 10 M$ (and for the first year).
+    The ratio is smoothly floored with 0.9 + 0.05 * exp(ratio - 0.9) when below 0.95.
+
+    Works for float64 and complex128 inputs (complex step), if the basis of the power is negative
+    for real inputs the computation is switched to complex numbers.
+
+    @param invest_list: array of investments for each year
+    @param capex_init: initial capex of the techno
+    @param initial_production: production of the techno at year start
+    @param expo_factor: learning exponent factor
+    @param capacity_factor_ratio: array of capacity_factor(year) / capacity_factor(year start), None if not used
+    @param techno_name: name of the techno, used in error messages
+    @return: dict with the learning capex ('capex_year') and the intermediates reused by the gradient
+    """
+    invest_list = np.asarray(invest_list)
+    nb_years = len(invest_list)
+    indices = np.arange(nb_years)
+
+    # cumulated invest before each year (same order of summation as the yearly loop)
+    invest_sum = np.cumsum(np.concatenate(([initial_production * capex_init], invest_list)))[:-1]
+    reset = (np.real(invest_sum) < MIN_INVEST_SUM_FOR_LEARNING) | (indices == 0)
+    # last year where the capex has been reset to capex_init
+    last_reset = np.maximum.accumulate(np.where(reset, indices, 0))
+
+    safe_invest_sum = np.where(reset, 1.0, invest_sum)
+    ratio_basis = (safe_invest_sum + invest_list) / safe_invest_sum
+    if capacity_factor_ratio is not None:
+        ratio_basis = ratio_basis * capacity_factor_ratio
+    ratio_basis = np.where(reset, 1.0, ratio_basis)
+
+    if not np.iscomplexobj(ratio_basis) and np.any(ratio_basis < 0.0):
+        if capacity_factor_ratio is not None:
+            i = np.argmax(ratio_basis < 0.0)
+            raise Exception(
+                f'invest is {invest_list[i]} and invest sum {invest_sum[i]} on techno {techno_name}')
+        # set the basis as a complex to compute the capex as a complex
+        ratio_basis = ratio_basis.astype('complex128')
+
+    ratio_invest_raw = ratio_basis ** (-expo_factor)
+    # Check that the ratio is always above 0.95 but no strict threshold for
+    # optim is equal to 0.92 when tends to zero
+    is_floored = np.real(ratio_invest_raw) < LEARNING_RATIO_THRESHOLD
+    ratio_invest = np.where(is_floored, 0.9 + 0.05 * np.exp(ratio_invest_raw - 0.9), ratio_invest_raw)
+    ratio_invest = np.where(reset, 1.0, ratio_invest)
+
+    cumprod_ratio = np.cumprod(ratio_invest)
+    capex_year = capex_init * cumprod_ratio / cumprod_ratio[last_reset]
+
+    return {'capex_year': capex_year,
+            'capex_init': capex_init,
+            'initial_production': initial_production,
+            'expo_factor': expo_factor,
+            'invest': invest_list,
+            'invest_sum': invest_sum,
+            'reset': reset,
+            'last_reset': last_reset,
+            'ratio_invest_raw': ratio_invest_raw,
+            'is_floored': is_floored,
+            'ratio_invest': ratio_invest,
+            'cumprod_ratio': cumprod_ratio,
+            'capacity_factor_ratio': capacity_factor_ratio}
+
+
+def is_learning_curve_up_to_date(learning_curve, invest_list, capex_init, initial_production, expo_factor,
+                                 capacity_factor_ratio):
+    """
+    Check that the intermediates of a learning curve have been computed with the given inputs
+    """
+    if learning_curve is None:
+        return False
+    if capacity_factor_ratio is None or learning_curve['capacity_factor_ratio'] is None:
+        same_capacity_factor = capacity_factor_ratio is None and learning_curve['capacity_factor_ratio'] is None
+    else:
+        same_capacity_factor = np.array_equal(capacity_factor_ratio, learning_curve['capacity_factor_ratio'])
+
+    return same_capacity_factor and learning_curve['capex_init'] == capex_init and \
+        learning_curve['initial_production'] == initial_production and \
+        learning_curve['expo_factor'] == expo_factor and np.array_equal(learning_curve['invest'], invest_list)
+
+
+def compute_dlearning_curve_dinvest(learning_curve):
+    """
+    Lower triangular jacobian of the learning capex (capex_year) wrt the invest of each year
+
+    With c_i = c_i-1 * r_i, r_i depending on invest_i and on invest_sum_i (sum of all previous invests) :
+        dc_i/dinvest_i = c_i-1 * dr_i/dinvest_i
+        dc_i/dinvest_j = dc_i-1/dinvest_j * r_i + c_i-1 * dr_i/dinvest_sum_i  for j < i
+
+    The recurrence is unrolled with the cumulative product P of the ratios (P_i/P_k = r_k+1 * ... * r_i):
+        dc_i/dinvest_j = P_i * sum_{k=j+1..i} (c_k-1 * dr_k/dinvest_sum_k / P_k) + P_i / P_j * dc_j/dinvest_j
+    Rows of years where the capex is reset to capex_init are zeros and
+    cut the dependency to the invests before the reset.
+
+    @param learning_curve: intermediates returned by compute_learning_curve
+    @return: jacobian dcapex_year/dinvest of shape (nb_years, nb_years)
+    """
+    invest = learning_curve['invest']
+    invest_sum = learning_curve['invest_sum']
+    reset = learning_curve['reset']
+    last_reset = learning_curve['last_reset']
+    expo_factor = learning_curve['expo_factor']
+    ratio_invest_raw = learning_curve['ratio_invest_raw']
+    cumprod_ratio = learning_curve['cumprod_ratio']
+    nb_years = len(invest)
+    indices = np.arange(nb_years)
+
+    safe_invest_sum = np.where(reset, 1.0, invest_sum)
+    # derivatives of the ratio wrt invest_i and wrt invest_sum_i (ie wrt all previous invests)
+    dratio_dinvest = -expo_factor * ratio_invest_raw / (safe_invest_sum + invest)
+    dratio_dinvest_sum = expo_factor * invest * ratio_invest_raw / (safe_invest_sum * (safe_invest_sum + invest))
+    dfloor = np.where(learning_curve['is_floored'], 0.05 * np.exp(ratio_invest_raw - 0.9), 1.0)
+
+    capex_year_m1 = np.concatenate(([learning_curve['capex_init']], learning_curve['capex_year'][:-1]))
+    diag_terms = np.where(reset, 0.0, capex_year_m1 * dfloor * dratio_dinvest)
+    sum_terms = np.where(reset, 0.0, capex_year_m1 * dfloor * dratio_dinvest_sum)
+
+    cumsum_terms = np.cumsum(sum_terms / cumprod_ratio)
+    first_column = np.maximum(indices[np.newaxis, :], last_reset[:, np.newaxis])
+    dcapex_dinvest = cumprod_ratio[:, np.newaxis] * (cumsum_terms[:, np.newaxis] - cumsum_terms[first_column])
+    dcapex_dinvest = dcapex_dinvest + np.where(indices[np.newaxis, :] >= last_reset[:, np.newaxis],
+                                               np.outer(cumprod_ratio, diag_terms / cumprod_ratio), 0.0)
+
+    return np.tril(dcapex_dinvest)
+
+
+def compute_learning_curve_capex(invest_list, capex_init, initial_production, expo_factor, data_config,
+                                 techno_name='', learning_curve=None):
+    """
+    Compute the capex list of a techno with the learning curve described in data_config (techno_infos_dict)
+    The learning curve decrease of the capex is bounded by the maximum_learning_capex_ratio (default 0.9)
+    The given learning_curve (computed at a previous run) is reused if it is up to date
+    @return: capex array and the learning curve intermediates (None if there is no learning)
+    """
+    if expo_factor == 0.0:
+        return capex_init * np.ones(len(invest_list)), None
+
+    capacity_factor_ratio = get_capacity_factor_ratio(data_config, len(invest_list))
+    if not is_learning_curve_up_to_date(learning_curve, invest_list, capex_init, initial_production, expo_factor,
+                                        capacity_factor_ratio):
+        learning_curve = compute_learning_curve(invest_list, capex_init, initial_production, expo_factor,
+                                                capacity_factor_ratio=capacity_factor_ratio,
+                                                techno_name=techno_name)
+
+    maximum_learning_capex_ratio = data_config.get('maximum_learning_capex_ratio',
+                                                   DEFAULT_MAXIMUM_LEARNING_CAPEX_RATIO)
+    capex = capex_init * (maximum_learning_capex_ratio + (
+            1.0 - maximum_learning_capex_ratio) * learning_curve['capex_year'] / capex_init)
+
+    return capex, learning_curve
+
+
+def get_capacity_factor_ratio(data_config, nb_years):
+    """
+    Linear evolution of the capacity factor between year start and year end divided by its initial value,
+    None if capacity_factor_at_year_end is not in data_config
+    """
+    if 'capacity_factor_at_year_end' in data_config and 'capacity_factor' in data_config:
+        return np.linspace(data_config['capacity_factor'],
+                           data_config['capacity_factor_at_year_end'],
+                           nb_years) / data_config['capacity_factor']
+    return None
@@ -0,0 +1,163 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+import numpy as np
+
+from energy_models.core.stream_type.carbon_models.carbon_dioxyde import CO2
+from energy_models.core.stream_type.carbon_models.carbon_monoxyde import CO
+from energy_models.core.stream_type.energy_models.gaseous_hydrogen import (
+    GaseousHydrogen,
+)
+from energy_models.core.stream_type.energy_models.syngas import (
+    compute_calorific_value,
+    compute_dcal_val_dsyngas_ratio,
+    compute_molar_mass,
+)
+from energy_models.core.stream_type.resources_models.water import Water
+from energy_models.core.techno_type.learning_curve import (
+    DEFAULT_MAXIMUM_LEARNING_CAPEX_RATIO,
+    LEARNING_RATIO_THRESHOLD,
+    MIN_INVEST_SUM_FOR_LEARNING,
+)
+
+
+def compute_linear_interpolant(x_values, y_values):
+    """
+    Slope and intercept of the line through the two first points (x_values, y_values),
+    used to extrapolate capex and electricity demand of syngas ratio technos
+    """
+    slope = (y_values[0] - y_values[1]) / (x_values[0] - x_values[1])
+    return slope, y_values[0] - slope * x_values[0]
+
+
+def compute_syngas_ratio_sensitivity(syngas_ratio, needed_syngas_ratio):
+    """
+    Molar balances of the syngas ratio transformations and their derivatives wrt syngas_ratio, for the whole horizon
+
+    RWGS (syngas_ratio r1 below the needed ratio r2) : dCO2 + e(H2 + r1CO) --> (H2 + r2CO) + cH2O
+        e = (1+r2)/(1+r1), c = (r2-r1)/(1+r1), d = r2 - r1(1+r2)/(1+r1)
+    WGS (syngas_ratio r1 above the needed ratio r2) : (H2 + r1CO) + cH2O --> dCO2 + e(H2 + r2CO)
+        e = (1+r1)/(1+r2), c = (r1-r2)/(1+r2), d = r1 - r2(1+r1)/(1+r2)
+
+    Needs and productions are given for 1 kWh of needed syngas, ratios are molar ratios of CO over H2 (not in %)
+    @return: dict of arrays, 'd<name>' is the derivative of '<name>' wrt syngas_ratio
+    """
+    syngas_ratio = np.asarray(syngas_ratio)
+    # needed syngas_ratio could be 0 in this case syngas is H2
+    needed_molar_mass = compute_molar_mass(needed_syngas_ratio)
+    needed_energy = needed_molar_mass * compute_calorific_value(needed_syngas_ratio)
+
+    molar_mass = compute_molar_mass(syngas_ratio)
+    dmolar_mass = (CO.data_energy_dict['molar_mass'] - GaseousHydrogen.data_energy_dict['molar_mass']) / \
+                  (1.0 + syngas_ratio) ** 2
+    calorific_value = compute_calorific_value(syngas_ratio)
+    dcalorific_value = compute_dcal_val_dsyngas_ratio(syngas_ratio)
+    syngas_energy = molar_mass * calorific_value
+    dsyngas_energy = dmolar_mass * calorific_value + molar_mass * dcalorific_value
+
+    # RWGS, the three coefficients e, c and d have the same derivative
+    rwgs_mol_syngas = (1.0 + needed_syngas_ratio) / (1.0 + syngas_ratio)
+    rwgs_mol_water = (needed_syngas_ratio - syngas_ratio) / (1.0 + syngas_ratio)
+    rwgs_mol_co2 = needed_syngas_ratio - syngas_ratio * rwgs_mol_syngas
+    rwgs_dmol = -(1.0 + needed_syngas_ratio) / (1.0 + syngas_ratio) ** 2
+
+    # WGS, quantities for 1 mol of syngas in
+    wgs_mol_h2 = (1.0 + syngas_ratio) / (1.0 + needed_syngas_ratio)
+    wgs_dmol_h2 = 1.0 / (1.0 + needed_syngas_ratio)
+    wgs_mol_water = (syngas_ratio - needed_syngas_ratio) / (1.0 + needed_syngas_ratio)
+    wgs_mol_co2 = syngas_ratio - needed_syngas_ratio * wgs_mol_h2
+    wgs_dmol_co2 = 1.0 - needed_syngas_ratio * wgs_dmol_h2
+    wgs_energy = wgs_mol_h2 * needed_energy
+    wgs_denergy = wgs_dmol_h2 * needed_energy
+
+    water_molar_mass = Water.data_energy_dict['molar_mass']
+    co2_molar_mass = CO2.data_energy_dict['molar_mass']
+
+    return {'syngas_ratio': syngas_ratio,
+            'needed_syngas_ratio': needed_syngas_ratio,
+            'needed_molar_mass': needed_molar_mass,
+            'rwgs_mol_co2': rwgs_mol_co2,
+            'rwgs_syngas_needs': rwgs_mol_syngas * syngas_energy / needed_energy,
+            'rwgs_dsyngas_needs': (rwgs_dmol * syngas_energy + rwgs_mol_syngas * dsyngas_energy) / needed_energy,
+            'rwgs_water_prod': rwgs_mol_water * water_molar_mass / needed_energy,
+            'rwgs_dwater_prod': rwgs_dmol * water_molar_mass / needed_energy,
+            'rwgs_co2_needs': rwgs_mol_co2 * co2_molar_mass / needed_energy,
+            'rwgs_dco2_needs': rwgs_dmol * co2_molar_mass / needed_energy,
+            'wgs_mol_h2': wgs_mol_h2,
+            'wgs_mol_co2': wgs_mol_co2,
+            'wgs_syngas_needs': syngas_energy / wgs_energy,
+            'wgs_dsyngas_needs': (dsyngas_energy * wgs_energy - syngas_energy * wgs_denergy) / wgs_energy ** 2,
+            'wgs_water_needs': wgs_mol_water * water_molar_mass / wgs_energy,
+            'wgs_dwater_needs': water_molar_mass * (wgs_dmol_h2 * wgs_energy - wgs_mol_water * wgs_denergy) /
+                                wgs_energy ** 2,
+            'wgs_co2_prod': wgs_mol_co2 * co2_molar_mass / wgs_energy,
+            'wgs_dco2_prod': co2_molar_mass * (wgs_dmol_co2 * wgs_energy - wgs_mol_co2 * wgs_denergy) /
+                             wgs_energy ** 2,
+            }
+
+
+def is_syngas_ratio_sensitivity_up_to_date(sensitivity, syngas_ratio, needed_syngas_ratio):
+    """
+    Check that the syngas ratio sensitivity has been computed with the given ratios
+    """
+    return sensitivity is not None and sensitivity['needed_syngas_ratio'] == needed_syngas_ratio and \
+        np.array_equal(sensitivity['syngas_ratio'], syngas_ratio)
+
+
+def compute_dcapex_dsyngas_ratio(invest_list, capex_init, dcapex_init, initial_production, dinvest_sum, expo_factor,
+                                 maximum_learning_capex_ratio=DEFAULT_MAXIMUM_LEARNING_CAPEX_RATIO,
+                                 differentiated_invests=None):
+    """
+    Jacobian of the learning capex wrt the syngas ratio, the syngas ratio of the first year sets capex_init
+    so only the first column is non zero. With the learning curve capex_i = capex_i-1 * q_i (see learning_curve) :
+        dcapex_i = q_i * dcapex_i-1 + dq_i * capex_i-1
+    which is unrolled with the cumulative product P of the ratios : dcapex_i = P_i * (dcapex_r / P_r + sum dq_k / q_k)
+    summed from the last year r where the capex is reset to capex_init
+
+    @param invest_list: investments for each year, must be positive
+    @param dcapex_init: derivative of capex_init wrt the syngas ratio
+    @param dinvest_sum: derivative of the cumulated investment wrt the syngas ratio
+    @param differentiated_invests: boolean array, False for the years where the ratio derivative is ignored
+    @return: capex gradient of shape (nb_years, nb_years)
+    """
+    invest_list = np.asarray(invest_list)
+    nb_years = len(invest_list)
+    indices = np.arange(nb_years)
+
+    invest_sum = initial_production * capex_init + np.concatenate(([0.0], np.cumsum(invest_list)[:-1]))
+    reset = (np.real(invest_sum) < MIN_INVEST_SUM_FOR_LEARNING) | (indices == 0)
+    last_reset = np.maximum.accumulate(np.where(reset, indices, 0))
+    safe_invest_sum = np.where(reset, 1.0, invest_sum)
+
+    ratio = ((safe_invest_sum + invest_list) / safe_invest_sum) ** (-expo_factor)
+    dratio = dinvest_sum * expo_factor * invest_list * ratio / (safe_invest_sum * (safe_invest_sum + invest_list))
+    if differentiated_invests is not None:
+        dratio = np.where(differentiated_invests, dratio, 0.0)
+    is_floored = np.real(ratio) < LEARNING_RATIO_THRESHOLD
+    dratio = np.where(is_floored, 0.05 * np.exp(ratio - 0.9) * dratio, dratio)
+    ratio = np.where(is_floored, 0.9 + 0.05 * np.exp(ratio - 0.9), ratio)
+    ratio = np.where(reset, 1.0, ratio)
+    dlog_ratio = np.where(reset, 0.0, dratio / ratio)
+
+    cumprod_ratio = np.cumprod(ratio)
+    cumsum_dlog_ratio = np.cumsum(dlog_ratio)
+    learning_since_reset = cumprod_ratio / cumprod_ratio[last_reset]
+    capex_year = capex_init * learning_since_reset
+    dcapex = learning_since_reset * dcapex_init + capex_year * (cumsum_dlog_ratio - cumsum_dlog_ratio[last_reset])
+
+    # dcapex = maximum_learning_capex_ratio*dcapex_init + (1.0 - maximum_learning_capex_ratio)*dcapex
+    capex_grad = np.zeros((nb_years, nb_years), dtype=dcapex.dtype)
+    capex_grad[:, 0] = maximum_learning_capex_ratio * dcapex_init + (1.0 - maximum_learning_capex_ratio) * dcapex
+    return capex_grad
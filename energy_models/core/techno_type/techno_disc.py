@@ -35,7 +35,17 @@ from sostrades_core.tools.post_processing.plotly_native_charts.instantiated_plot
     InstantiatedPlotlyNativeChart,
 )
 
+from energy_models.core.chart_registry import (
+    ChartDeclaration,
+    ChartRegistry,
+    LazyChartsMixin,
+)
+from energy_models.core.discipline_instrumentation import InstrumentedDisciplineMixin
 from energy_models.core.energy_mix.energy_mix import EnergyMix
+from energy_models.core.jacobian_blocks import (
+    DiagonalJacobianBlock,
+    VectorJacobianProductMixin,
+)
 from energy_models.core.stream_type.resources_data_disc import (
     get_default_resources_CO2_emissions,
     get_default_resources_prices,
@@ -44,7 +54,7 @@ from energy_models.database_witness_energy import DatabaseWitnessEnergy
 from energy_models.glossaryenergy import GlossaryEnergy
 
 
-class TechnoDiscipline(SoSWrapp):
+class TechnoDiscipline(LazyChartsMixin, VectorJacobianProductMixin, InstrumentedDisciplineMixin, SoSWrapp):
     # ontology information
     _ontology_data = {
         'label': 'Core Technology Type Model',
@@ -59,6 +69,27 @@ class TechnoDiscipline(SoSWrapp):
         'version': '',
     }
 
+    # post-processing charts in their display order : (charts filter value, build method, inputs, filter keys)
+    chart_registry = ChartRegistry([
+        ChartDeclaration('Detailed prices', 'get_charts_detailed_prices', ('data_fuel_dict', 'percentage_resource'),
+                         ('price_unit',)),
+        ChartDeclaration('Consumption and production', 'get_chart_investments',
+                         (GlossaryEnergy.InvestLevelValue, 'scaling_factor_invest_level')),
+        ChartDeclaration('Consumption and production', 'get_charts_consumption_and_production'),
+        ChartDeclaration('Consumption and production', 'get_chart_required_land'),
+        ChartDeclaration('Applied Ratio', 'get_chart_applied_ratio'),
+        ChartDeclaration(GlossaryEnergy.UtilisationRatioValue, 'get_utilisation_ratio_chart',
+                         (GlossaryEnergy.UtilisationRatioValue,)),
+        ChartDeclaration('Initial Production', 'get_charts_initial_production',
+                         (GlossaryEnergy.YearStart, 'initial_production')),
+        ChartDeclaration('Factory Mean Age', 'get_chart_factory_mean_age'),
+        ChartDeclaration('CO2 emissions', 'get_charts_carbon_intensity', ('data_fuel_dict',)),
+        ChartDeclaration('Non-Use Capital', 'get_chart_non_use_capital'),
+        ChartDeclaration('Power production', 'get_chart_installed_power', ('techno_infos_dict',)),
+        ChartDeclaration('Power plants initial age distribution', 'get_chart_initial_age_distrib'),
+        ChartDeclaration('Capex', 'get_chart_capex'),
+    ])
+
     DESC_IN = {
         GlossaryEnergy.YearStart: dict({'structuring': True}, **ClimateEcoDiscipline.YEAR_START_DESC_IN),
         GlossaryEnergy.YearEnd: dict({'structuring': True}, **GlossaryEnergy.YearEndVar),
@@ -83,6 +114,9 @@ class TechnoDiscipline(SoSWrapp):
                              'visibility': SoSWrapp.SHARED_VISIBILITY, 'namespace': 'ns_public'},
         GlossaryEnergy.BoolApplyResourceRatio: {'type': 'bool', 'default': False, 'user_level': 2, 'structuring': True,
                                     'visibility': SoSWrapp.SHARED_VISIBILITY, 'namespace': 'ns_public'},
+        GlossaryEnergy.BoolStoreAgeDistribProduction: {'type': 'bool', 'default': True, 'user_level': 3, 'structuring': True,
+                                                       'visibility': SoSWrapp.SHARED_VISIBILITY, 'namespace': 'ns_public',
+                                                       'description': 'store the age_distrib_production output of the technos'},
         GlossaryEnergy.ResourcesUsedForProductionValue: GlossaryEnergy.ResourcesUsedForProduction,
         GlossaryEnergy.ResourcesUsedForBuildingValue: GlossaryEnergy.ResourcesUsedForBuilding,
         GlossaryEnergy.StreamsUsedForProductionValue: GlossaryEnergy.StreamsUsedForProduction,
@@ -206,6 +240,11 @@ class TechnoDiscipline(SoSWrapp):
                                                                                 'visibility': SoSWrapp.SHARED_VISIBILITY,
                                                                                 'namespace': 'ns_resource',
                                                                                 "dynamic_dataframe_columns": True}
+            if GlossaryEnergy.BoolStoreAgeDistribProduction in self.get_data_in() and \
+                    self.get_sosdisc_inputs(GlossaryEnergy.BoolStoreAgeDistribProduction):
+                # not coupled, dataframe view of the vintage matrix built only when this output is stored
+                dynamic_outputs['age_distrib_production'] = GlossaryEnergy.get_age_distrib_prod_df(
+                    energy_name=self.energy_name)
 
         dynamic_outputs.update({
             GlossaryEnergy.TechnoPricesValue: GlossaryEnergy.get_techno_price_df(techno_name=self.techno_name),
@@ -216,7 +255,6 @@ class TechnoDiscipline(SoSWrapp):
                                                                                             energy_name=self.energy_name,
                                                                                             byproducts_list=GlossaryEnergy.techno_byproducts[self.techno_name]),
             GlossaryEnergy.LandUseRequiredValue: GlossaryEnergy.get_land_use_df(techno_name=self.techno_name),
-            'age_distrib_production': GlossaryEnergy.get_age_distrib_prod_df(energy_name=self.energy_name),  # todo: not coupled, rename cols and move to DESC_OUT
             GlossaryEnergy.TechnoDetailedPricesValue: GlossaryEnergy.get_techno_detailed_price_df(techno_name=self.techno_name),
         })
         self.add_inputs(dynamic_inputs)
@@ -318,7 +356,6 @@ class TechnoDiscipline(SoSWrapp):
                         GlossaryEnergy.TechnoDetailedProductionValue: self.techno_model.production_detailed,
                         GlossaryEnergy.TechnoProductionValue: self.techno_model.production,
                         GlossaryEnergy.TechnoProductionWithoutRatioValue: self.techno_model.production_woratio,
-                        'age_distrib_production': self.techno_model.age_distrib_prod_df,
                         'mean_age_production': self.techno_model.mean_age_df,
                         GlossaryEnergy.CO2EmissionsValue: self.techno_model.carbon_intensity[[GlossaryEnergy.Years, self.techno_name]],
                         'CO2_emissions_detailed': self.techno_model.carbon_intensity,
@@ -333,6 +370,9 @@ class TechnoDiscipline(SoSWrapp):
                         GlossaryEnergy.InitialPlantsTechnoProductionValue: self.techno_model.initial_plants_historical_prod,
                         }
 
+        if 'age_distrib_production' in self.get_data_out():
+            outputs_dict['age_distrib_production'] = self.techno_model.age_distrib_prod_df
+
         self.store_sos_outputs_values(outputs_dict)
 
     def compute_sos_jacobian(self):
@@ -396,7 +436,7 @@ class TechnoDiscipline(SoSWrapp):
             (GlossaryEnergy.InvestLevelValue, GlossaryEnergy.InvestValue),
             dprod_name_dinvest)
 
-        dprod_dutilisation_ratio = np.diag(
+        dprod_dutilisation_ratio = DiagonalJacobianBlock(
             applied_ratio * production_wo_ratio[f'{self.energy_name} ({self.techno_model.product_unit})'] / 100.)
         self.set_partial_derivative_for_other_types(
             (GlossaryEnergy.TechnoProductionValue, f'{self.energy_name} ({self.techno_model.product_unit})'),
@@ -479,7 +519,7 @@ class TechnoDiscipline(SoSWrapp):
                     (
                             dprod_column_dinvest.T * applied_ratio * utilisation_ratio / 100).T * scaling_factor_invest_level / scaling_factor_techno_production)
 
-                dprod_dutilisation_ratio = np.diag(applied_ratio * production_wo_ratio[column] / 100.)
+                dprod_dutilisation_ratio = DiagonalJacobianBlock(applied_ratio * production_wo_ratio[column] / 100.)
                 self.set_partial_derivative_for_other_types(
                     (GlossaryEnergy.TechnoProductionValue, column),
                     (GlossaryEnergy.UtilisationRatioValue, GlossaryEnergy.UtilisationRatioValue),
@@ -563,7 +603,7 @@ class TechnoDiscipline(SoSWrapp):
                     (GlossaryEnergy.InvestLevelValue, GlossaryEnergy.InvestValue),
                     self.dcons_column_dinvest * scaling_factor_invest_level / scaling_factor_techno_production)
 
-                dcons_dutilisation_ratio = np.diag(applied_ratio * consumption_wo_ratio[column] / 100.)
+                dcons_dutilisation_ratio = DiagonalJacobianBlock(applied_ratio * consumption_wo_ratio[column] / 100.)
                 self.set_partial_derivative_for_other_types(
                     (GlossaryEnergy.TechnoConsumptionValue, column),
                     (GlossaryEnergy.UtilisationRatioValue, GlossaryEnergy.UtilisationRatioValue),
@@ -603,53 +643,55 @@ class TechnoDiscipline(SoSWrapp):
                                     ('all_resource_ratio_usable_demand', ratio_name),
                                     dprod_dratio)
 
-        dland_use_dinvest = self.techno_model.compute_dlanduse_dinvest()
-        derivate_land_use = dland_use_dinvest.copy()
+        if self.is_jacobian_output_requested(GlossaryEnergy.LandUseRequiredValue):
+            dland_use_dinvest = self.techno_model.compute_dlanduse_dinvest()
+            derivate_land_use = dland_use_dinvest.copy()
 
-        self.set_partial_derivative_for_other_types(
-            (GlossaryEnergy.LandUseRequiredValue, f'{self.techno_model.name} (Gha)'),
-            (GlossaryEnergy.InvestLevelValue, GlossaryEnergy.InvestValue),
-            derivate_land_use * applied_ratio[:, np.newaxis] * scaling_factor_invest_level)
+            self.set_partial_derivative_for_other_types(
+                (GlossaryEnergy.LandUseRequiredValue, f'{self.techno_model.name} (Gha)'),
+                (GlossaryEnergy.InvestLevelValue, GlossaryEnergy.InvestValue),
+                derivate_land_use * applied_ratio[:, np.newaxis] * scaling_factor_invest_level)
 
         '''
         non_use capital gradients vs invest_level and all_stream_demand_ratio
         '''
-        dnon_use_capital_dinvest, dtechnocapital_dinvest = self.techno_model.compute_dnon_usecapital_dinvest(
-            dcapex_dinvest, self.dprod_dinvest)
-        self.set_partial_derivative_for_other_types(
-            (GlossaryEnergy.TechnoCapitalValue, GlossaryEnergy.NonUseCapital),
-            (GlossaryEnergy.InvestLevelValue, GlossaryEnergy.InvestValue),
-            dnon_use_capital_dinvest)
+        if self.is_jacobian_output_requested(GlossaryEnergy.TechnoCapitalValue):
+            dnon_use_capital_dinvest, dtechnocapital_dinvest = self.techno_model.compute_dnon_usecapital_dinvest(
+                dcapex_dinvest, self.dprod_dinvest)
+            self.set_partial_derivative_for_other_types(
+                (GlossaryEnergy.TechnoCapitalValue, GlossaryEnergy.NonUseCapital),
+                (GlossaryEnergy.InvestLevelValue, GlossaryEnergy.InvestValue),
+                dnon_use_capital_dinvest)
 
-        self.set_partial_derivative_for_other_types(
-            (GlossaryEnergy.TechnoCapitalValue, GlossaryEnergy.NonUseCapital),
-            (GlossaryEnergy.UtilisationRatioValue, GlossaryEnergy.UtilisationRatioValue),
-            self.techno_model.d_non_use_capital_d_utilisation_ratio())
+            self.set_partial_derivative_for_other_types(
+                (GlossaryEnergy.TechnoCapitalValue, GlossaryEnergy.NonUseCapital),
+                (GlossaryEnergy.UtilisationRatioValue, GlossaryEnergy.UtilisationRatioValue),
+                self.techno_model.d_non_use_capital_d_utilisation_ratio())
 
-        self.set_partial_derivative_for_other_types(
-            (GlossaryEnergy.TechnoCapitalValue, GlossaryEnergy.Capital),
-            (GlossaryEnergy.InvestLevelValue, GlossaryEnergy.InvestValue),
-            dtechnocapital_dinvest)
-
-        dapplied_ratio_dratio = self.techno_model.compute_dapplied_ratio_dratios()
-        for ratio_name in ratio_df.columns:
-            if GlossaryEnergy.AllStreamsDemandRatioValue in inputs_dict.keys():
-                if ratio_name in inputs_dict[GlossaryEnergy.AllStreamsDemandRatioValue].columns and ratio_name != GlossaryEnergy.Years:
-                    dnon_use_capital_dratio = self.techno_model.compute_dnon_usecapital_dratio(
-                        dapplied_ratio_dratio[ratio_name])
-                    self.set_partial_derivative_for_other_types(
-                        (GlossaryEnergy.TechnoCapitalValue, GlossaryEnergy.NonUseCapital),
-                        (GlossaryEnergy.AllStreamsDemandRatioValue, ratio_name),
-                        dnon_use_capital_dratio)
-            if 'all_resource_ratio_usable_demand' in inputs_dict.keys():
-                if ratio_name in inputs_dict[
-                    'all_resource_ratio_usable_demand'].columns and ratio_name != GlossaryEnergy.Years:
-                    dnon_use_capital_dratio = self.techno_model.compute_dnon_usecapital_dratio(
-                        dapplied_ratio_dratio[ratio_name])
-                    self.set_partial_derivative_for_other_types(
-                        (GlossaryEnergy.TechnoCapitalValue, GlossaryEnergy.NonUseCapital),
-                        ('all_resource_ratio_usable_demand', ratio_name),
-                        dnon_use_capital_dratio)
+            self.set_partial_derivative_for_other_types(
+                (GlossaryEnergy.TechnoCapitalValue, GlossaryEnergy.Capital),
+                (GlossaryEnergy.InvestLevelValue, GlossaryEnergy.InvestValue),
+                dtechnocapital_dinvest)
+
+            dapplied_ratio_dratio = self.techno_model.compute_dapplied_ratio_dratios()
+            for ratio_name in ratio_df.columns:
+                if GlossaryEnergy.AllStreamsDemandRatioValue in inputs_dict.keys():
+                    if ratio_name in inputs_dict[GlossaryEnergy.AllStreamsDemandRatioValue].columns and ratio_name != GlossaryEnergy.Years:
+                        dnon_use_capital_dratio = self.techno_model.compute_dnon_usecapital_dratio(
+                            dapplied_ratio_dratio[ratio_name])
+                        self.set_partial_derivative_for_other_types(
+                            (GlossaryEnergy.TechnoCapitalValue, GlossaryEnergy.NonUseCapital),
+                            (GlossaryEnergy.AllStreamsDemandRatioValue, ratio_name),
+                            dnon_use_capital_dratio)
+                if 'all_resource_ratio_usable_demand' in inputs_dict.keys():
+                    if ratio_name in inputs_dict[
+                        'all_resource_ratio_usable_demand'].columns and ratio_name != GlossaryEnergy.Years:
+                        dnon_use_capital_dratio = self.techno_model.compute_dnon_usecapital_dratio(
+                            dapplied_ratio_dratio[ratio_name])
+                        self.set_partial_derivative_for_other_types(
+                            (GlossaryEnergy.TechnoCapitalValue, GlossaryEnergy.NonUseCapital),
+                            ('all_resource_ratio_usable_demand', ratio_name),
+                            dnon_use_capital_dratio)
 
     def set_partial_derivatives_techno(self, grad_dict, carbon_emissions, grad_dict_resources={}, grad_dict_resources_for_co2=None):
         """
@@ -704,7 +746,7 @@ class TechnoDiscipline(SoSWrapp):
             self.set_partial_derivative_for_other_types(
                 (GlossaryEnergy.TechnoPricesValue, self.techno_name),
                 (GlossaryEnergy.CO2TaxesValue, GlossaryEnergy.CO2Tax),
-                dtechno_prices_dCO2_taxes.values * np.identity(len(self.techno_model.years)))
+                DiagonalJacobianBlock(dtechno_prices_dCO2_taxes.values))
 
         if grad_dict_resources_for_co2 is None:
             grad_dict_resources_for_co2 = grad_dict_resources
@@ -773,94 +815,33 @@ class TechnoDiscipline(SoSWrapp):
 
         # For the outputs, making a graph for block fuel vs range and blocktime vs
         # range
+        # the charts are declared in chart_registry and only built when requested by the filters
+
+        return self.get_lazy_charts(filters, {'price_unit': ['$/MWh', '$/t']})
 
+    def get_charts_detailed_prices(self, price_unit_list):
         instanciated_charts = []
-        charts = []
-        price_unit_list = ['$/MWh', '$/t']
-        inputs_dict = self.get_sosdisc_inputs()
-        data_fuel_dict = inputs_dict['data_fuel_dict']
-        technos_info_dict = inputs_dict['techno_infos_dict']
-        # Overload default value with chart filter
-        if filters is not None:
-            for chart_filter in filters:
-                if chart_filter.filter_key == 'charts':
-                    charts = chart_filter.selected_values
-                if chart_filter.filter_key == 'price_unit':
-                    price_unit_list = chart_filter.selected_values
-
-        if 'Detailed prices' in charts and '$/MWh' in price_unit_list:
-            new_chart = self.get_chart_detailed_price_in_dollar_kwh()
-            if new_chart is not None:
-                instanciated_charts.append(new_chart)
-
-        if 'Detailed prices' in charts \
-                and '$/t' in price_unit_list \
-                and 'calorific_value' in data_fuel_dict:
-            new_chart = self.get_chart_detailed_price_in_dollar_kg()
-            if new_chart is not None:
-                instanciated_charts.append(new_chart)
-
-        if 'Consumption and production' in charts:
-            new_chart = self.get_chart_investments()
-            if new_chart is not None:
-                instanciated_charts.append(new_chart)
-
-            new_charts = self.get_charts_consumption_and_production()
-            for new_chart in new_charts:
-                if new_chart is not None:
-                    instanciated_charts.append(new_chart)
-
-            new_chart = self.get_chart_required_land()
-            if new_chart is not None:
-                instanciated_charts.append(new_chart)
-
-        if 'Applied Ratio' in charts:
-            new_chart = self.get_chart_applied_ratio()
-            if new_chart is not None:
-                instanciated_charts.append(new_chart)
-
-        if GlossaryEnergy.UtilisationRatioValue in charts:
-            new_chart = self.get_utilisation_ratio_chart()
-            instanciated_charts.append(new_chart)
+        if '$/MWh' in price_unit_list:
+            instanciated_charts.append(self.get_chart_detailed_price_in_dollar_kwh())
+        if '$/t' in price_unit_list and 'calorific_value' in self.get_sosdisc_inputs('data_fuel_dict'):
+            instanciated_charts.append(self.get_chart_detailed_price_in_dollar_kg())
+        return instanciated_charts
 
-        if 'Initial Production' in charts:
-            if 'initial_production' in self.get_data_in():
-                new_chart = self.get_chart_initial_production()
-                if new_chart is not None:
-                    instanciated_charts.append(new_chart)
-
-        if 'Factory Mean Age' in charts:
-            new_chart = self.get_chart_factory_mean_age()
-            if new_chart is not None:
-                instanciated_charts.append(new_chart)
-
-        if 'CO2 emissions' in charts:
-            new_chart = self.get_chart_carbon_intensity_kwh()
-            if new_chart is not None:
-                instanciated_charts.append(new_chart)
-            if 'calorific_value' in data_fuel_dict and 'high_calorific_value' in data_fuel_dict:
-                new_chart = self.get_chart_carbon_intensity_kg()
-                if new_chart is not None:
-                    instanciated_charts.append(new_chart)
-        if 'Non-Use Capital' in charts:
-            new_chart = self.get_chart_non_use_capital()
-            if new_chart is not None:
-                instanciated_charts.append(new_chart)
-        if 'Power production' in charts:
-            new_chart = self.get_chart_power_production(technos_info_dict)
-            if new_chart is not None:
-                instanciated_charts.append(new_chart)
-        if 'Power plants initial age distribution' in charts:
-            new_chart = self.get_chart_initial_age_distrib()
-            if new_chart is not None:
-                instanciated_charts.append(new_chart)
-
-        if 'Capex' in charts:
-            new_chart = self.get_chart_capex()
-            instanciated_charts.append(new_chart)
+    def get_charts_initial_production(self):
+        if 'initial_production' in self.get_data_in():
+            return self.get_chart_initial_production()
+        return None
 
+    def get_charts_carbon_intensity(self):
+        instanciated_charts = [self.get_chart_carbon_intensity_kwh()]
+        data_fuel_dict = self.get_sosdisc_inputs('data_fuel_dict')
+        if 'calorific_value' in data_fuel_dict and 'high_calorific_value' in data_fuel_dict:
+            instanciated_charts.append(self.get_chart_carbon_intensity_kg())
         return instanciated_charts
 
+    def get_chart_installed_power(self):
+        return self.get_chart_power_production(self.get_sosdisc_inputs('techno_infos_dict'))
+
     def get_utilisation_ratio_chart(self):
         utilisation_ratio_df = self.get_sosdisc_inputs(GlossaryEnergy.UtilisationRatioValue)
         years = list(utilisation_ratio_df[GlossaryEnergy.Years].values)
@@ -1174,6 +1155,8 @@ class TechnoDiscipline(SoSWrapp):
         return new_chart
 
     def get_chart_age_distribution_production(self):
+        if 'age_distrib_production' not in self.get_data_out():
+            return None
         age_distrib_production = self.get_sosdisc_outputs('age_distrib_production')
         chart_name = f'{self.techno_name} factories age in term of TWh of {self.energy_name} production'
 
@@ -0,0 +1,73 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from energy_models.core.fingerprint import compute_inputs_fingerprint
+
+
+def copy_memo_value(value):
+    '''
+    Copy of the arrays and dataframes of a memoized value, so that the caller can modify them
+    '''
+    if isinstance(value, (np.ndarray, pd.DataFrame, pd.Series)):
+        return value.copy()
+    if isinstance(value, tuple):
+        return tuple(copy_memo_value(item) for item in value)
+    return value
+
+
+class TechnoMemo:
+    """
+    Least recently used memo of the pure sub-computations of a techno, keyed on the fingerprint of their inputs.
+    During an optimization the same inputs come back (line searches, compute then compute_sos_jacobian),
+    the memo keeps the last max_size results of all the sub-computations of the techno.
+    A max_size of 0 disables the memo.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.values = OrderedDict()
+        self.nb_hits = 0
+        self.nb_misses = 0
+
+    def get_or_compute(self, name, inputs, compute_function):
+        '''
+        Value of compute_function() memoized under name and the fingerprint of inputs
+        compute_function must only depend on inputs, the returned arrays and dataframes are copies of the memoized ones
+        '''
+        if self.max_size <= 0:
+            return compute_function()
+        key = (name, compute_inputs_fingerprint(inputs))
+        if key in self.values:
+            self.nb_hits += 1
+            self.values.move_to_end(key)
+        else:
+            self.nb_misses += 1
+            self.values[key] = compute_function()
+            if len(self.values) > self.max_size:
+                self.values.popitem(last=False)
+        return copy_memo_value(self.values[key])
+
+    def clear(self):
+        '''
+        Remove all memoized values
+        '''
+        self.values.clear()
+        self.nb_hits = 0
+        self.nb_misses = 0
@@ -37,6 +37,16 @@ from sostrades_optimization_plugins.tools.cst_manager.func_manager_common import
 )
 
 from energy_models.core.energy_mix.energy_mix import EnergyMix
+from energy_models.core.jacobian_blocks import DiagonalJacobianBlock
+from energy_models.core.techno_type.learning_curve import (
+    compute_dlearning_curve_dinvest,
+    compute_learning_curve,
+    compute_learning_curve_capex,
+    get_capacity_factor_ratio,
+    is_learning_curve_up_to_date,
+)
+from energy_models.core.techno_type.techno_memo import TechnoMemo
+from energy_models.core.techno_type.vintage_production import compute_vintage_production
 from energy_models.glossaryenergy import GlossaryEnergy
 
 
@@ -47,6 +57,8 @@ class TechnoType:
 
     energy_name = 'energy'
     min_value_invest = 1.e-12
+    # number of sub-computation results kept from one iteration to the other, 0 disables the memo
+    memo_max_size = 32
 
     def __init__(self, name):
         self.initial_plants_historical_prod = None
@@ -98,6 +110,7 @@ class TechnoType:
         self.techno_infos_dict = {}
         self.data_energy_dict = {}
         self.initial_production = None
+        self.vintage_production = None
         self.age_distrib_prod_df = None
         self.initial_age_distrib = None
 
@@ -122,6 +135,8 @@ class TechnoType:
         self.applied_ratio = None
         self.installed_power = None
         self.utilisation_ratio = None
+        self.learning_curve = None
+        self.memo = TechnoMemo(self.memo_max_size)
 
         self.production_woratio = None
         self.consumption_woratio = None
@@ -368,17 +383,21 @@ class TechnoType:
         self.techno_capital[GlossaryEnergy.NonUseCapital] = self.techno_capital[GlossaryEnergy.Capital].values * (
                 1.0 - self.applied_ratio['applied_ratio'].values * self.utilisation_ratio / 100.)
 
+    def compute_invest_inputs(self):
+        """
+        Investments in the technology for the years of study
+        """
+        invest_inputs = self.invest_level[GlossaryEnergy.InvestValue].values[
+            self.invest_level[GlossaryEnergy.Years].values <= self.cost_details[GlossaryEnergy.Years].values.max()]
+        # Maximize with smooth exponential
+        return compute_func_with_exp_min(invest_inputs, self.min_value_invest)
+
     def compute_price(self):
         """
         Compute the detail price of the technology
         """
 
-        invest_inputs = self.invest_level.loc[self.invest_level[GlossaryEnergy.Years]
-                                              <= self.cost_details[GlossaryEnergy.Years].max()][
-            GlossaryEnergy.InvestValue].values
-        # Maximize with smooth exponential
-        self.cost_details[GlossaryEnergy.InvestValue] = compute_func_with_exp_min(
-            invest_inputs, self.min_value_invest)
+        self.cost_details[GlossaryEnergy.InvestValue] = self.compute_invest_inputs()
 
         self.cost_details[f'Capex_{self.name}'] = self.compute_capex(
             self.cost_details[GlossaryEnergy.InvestValue].values, self.techno_infos_dict)
@@ -520,84 +539,19 @@ class TechnoType:
         """
         expo_factor = self.compute_expo_factor(data_config)
         capex_init = self.check_capex_unity(data_config)
-        if expo_factor != 0.0:
-            capacity_factor_list = None
-            if 'capacity_factor_at_year_end' in data_config \
-                    and 'capacity_factor' in data_config:
-                capacity_factor_list = np.linspace(data_config['capacity_factor'],
-                                                   data_config['capacity_factor_at_year_end'],
-                                                   len(invest_list))
-
-            capex_calc_list = []
-            invest_sum = self.initial_production * capex_init
-            capex_year = capex_init
-
-            for i, invest in enumerate(invest_list):
-
-                # below 1M$ investments has no influence on learning rate for capex
-                # decrease
-                if invest_sum.real < 10.0 or i == 0.0:
-                    capex_year = capex_init
-                    # first capex calculation
-                else:
-                    np.seterr('raise')
-                    if capacity_factor_list is not None:
-                        try:
-                            ratio_invest = ((invest_sum + invest) / invest_sum *
-                                            (capacity_factor_list[i] / data_config['capacity_factor'])) \
-                                           ** (-expo_factor)
-
-                        except:
-                            raise Exception(
-                                f'invest is {invest} and invest sum {invest_sum} on techno {self.name}')
-
-                    else:
-                        np.seterr('raise')
-                        try:
-                            # try to calculate capex_year "normally"
-                            ratio_invest = ((invest_sum + invest) /
-                                            invest_sum) ** (-expo_factor)
-
-                            pass
-
-                        except FloatingPointError:
-                            # set invest as a complex to calculate capex_year as a
-                            # complex
-                            ratio_invest = ((invest_sum + np.complex128(invest)) /
-                                            invest_sum) ** (-expo_factor)
-
-                            pass
-                        np.seterr('warn')
-
-                    # Check that the ratio is always above 0.95 but no strict threshold for
-                    # optim is equal to 0.92 when tends to zero:
-                    if ratio_invest.real < 0.95:
-                        ratio_invest = 0.9 + \
-                                       0.05 * np.exp(ratio_invest - 0.9)
-                    capex_year = capex_year * ratio_invest
-
-                capex_calc_list.append(capex_year)
-                invest_sum += invest
-
-            if 'maximum_learning_capex_ratio' in data_config:
-                maximum_learning_capex_ratio = data_config['maximum_learning_capex_ratio']
-            else:
-                # if maximum learning_capex_ratio is not specified, the learning
-                # rate on capex ratio cannot decrease the initial capex mor ethan
-                # 10%
-                maximum_learning_capex_ratio = 0.9
-
-            capex_calc_list = capex_init * (maximum_learning_capex_ratio + (
-                    1.0 - maximum_learning_capex_ratio) * np.array(capex_calc_list) / capex_init)
-        else:
-            capex_calc_list = capex_init * np.ones(len(invest_list))
+        capex_calc_list, self.learning_curve = self.memo.get_or_compute(
+            'capex', (invest_list, capex_init, self.initial_production, expo_factor, data_config),
+            lambda: compute_learning_curve_capex(
+                invest_list, capex_init, self.initial_production, expo_factor, data_config, techno_name=self.name,
+                learning_curve=self.learning_curve))
 
         return capex_calc_list.tolist()
 
     def compute_expo_factor(self, data_config):
 
         progress_ratio = 1.0 - data_config['learning_rate']
-        expo_factor = -np.log(progress_ratio) / np.log(2.0)
+        expo_factor = self.memo.get_or_compute('expo_factor', (progress_ratio,),
+                                               lambda: -np.log(progress_ratio) / np.log(2.0))
 
         return expo_factor
 
@@ -608,7 +562,9 @@ class TechnoType:
         """
         wacc = self.techno_infos_dict['WACC']
 
-        capital_recovery_factor = (wacc * (1.0 + wacc) ** self.lifetime) / ((1.0 + wacc) ** self.lifetime - 1.0)
+        capital_recovery_factor = self.memo.get_or_compute(
+            'capital_recovery_factor', (wacc, self.lifetime),
+            lambda: (wacc * (1.0 + wacc) ** self.lifetime) / ((1.0 + wacc) ** self.lifetime - 1.0))
 
         return capital_recovery_factor
 
@@ -767,6 +723,18 @@ class TechnoType:
 
     def compute_efficiency(self):
         # Compute efficiency evolving in time or not
+        efficiency_infos = {key: self.techno_infos_dict.get(key) for key in
+                            ['techno_evo_time', 'techno_evo_eff', 'efficiency_max', 'efficiency',
+                             'efficiency evolution slope']}
+        efficiency = self.memo.get_or_compute('efficiency', (self.years, efficiency_infos),
+                                              self.compute_efficiency_evolution)
+        self.cost_details['efficiency'] = efficiency
+        return efficiency
+
+    def compute_efficiency_evolution(self):
+        """
+        Efficiency over the years, following a sigmoid if techno_evo_eff is 'yes'
+        """
         if 'techno_evo_time' in self.techno_infos_dict and self.techno_infos_dict['techno_evo_eff'] == 'yes':
             middle_evolution_year = self.techno_infos_dict['techno_evo_time']
             efficiency_max = self.techno_infos_dict['efficiency_max']
@@ -785,7 +753,6 @@ class TechnoType:
         else:
             efficiency = self.techno_infos_dict['efficiency'] * np.ones_like(self.years)
 
-        self.cost_details['efficiency'] = efficiency
         return efficiency
     
     def sigmoid_function(self, x, eff_max, eff_ini, x_shift, slope):
@@ -900,21 +867,17 @@ class TechnoType:
         # Compute the aging distribution over the years of study to determine the total production over the years
         # This function also erase old factories from the distribution
         self.compute_aging_distribution_production()
+        self.compute_production_from_vintage()
 
-        # Finally compute the production by summing all aged production for
-        # each year
-
-        age_distrib_prod_sum = self.age_distrib_prod_df.groupby([GlossaryEnergy.Years], as_index=False).agg(
-            {f'distrib_prod ({self.product_unit})': 'sum'}
-        )
+    def compute_production_from_vintage(self):
+        '''
+        Compute the primary energy production by summing all aged production for each year
+        '''
         if f'{self.energy_name} ({self.product_unit})' in self.production_detailed:
             del self.production_detailed[f'{self.energy_name} ({self.product_unit})']
 
-        self.production_detailed = pd.merge(self.production_detailed, age_distrib_prod_sum, how='left',
-                                            on=GlossaryEnergy.Years).rename(
-            columns={
-                f'distrib_prod ({self.product_unit})': f'{self.energy_name} ({self.product_unit})'}).fillna(
-            0.0)
+        self.production_detailed[f'{self.energy_name} ({self.product_unit})'] = self.vintage_production.sum(axis=1)
+        self.production_detailed = self.production_detailed.fillna(0.0)
 
     def compute_primary_installed_power(self):
 
@@ -948,62 +911,54 @@ class TechnoType:
     def compute_aging_distribution_production(self):
         '''
         Compute the aging distribution production of primary energy for years of study
-        Start with the initial distribution and add a year on the age each year 
-        Add also the yearly production regarding the investment
-        All productions older than the lifetime are removed from the dataframe  
+        in the vintage matrix vintage_production[year, age] (production of the factories of this age during this year)
+        Factories built from investments produce at age 0 the year they are available (after the construction delay)
+        and the initial distribution gets one year older each year
+        All productions older than the lifetime are removed from the matrix
         '''
-        # To break the object link with initial distrib
-        aging_distrib_year_df = pd.DataFrame(
-            {'age': self.initial_age_distrib['age'].values})
-        aging_distrib_year_df[f'distrib_prod ({self.product_unit})'] = self.initial_age_distrib['distrib'] * self.initial_production / 100.0
-
-        production_from_invest = self.compute_prod_from_invest()
+        initial_ages = self.initial_age_distrib['age'].values
+        initial_distrib_prod = self.initial_age_distrib['distrib'].values * self.initial_production / 100.0
+        prod_from_invest_df = self.compute_prod_from_invest()
+        # no new production during the construction delay if there is no invest before year start
+        prod_from_invest = np.zeros(len(self.years), dtype=prod_from_invest_df['prod_from_invest'].values.dtype)
+        prod_from_invest[prod_from_invest_df[GlossaryEnergy.Years].values.astype(int) - self.year_start] = \
+            prod_from_invest_df['prod_from_invest'].values
+
+        self.set_vintage_production(
+            compute_vintage_production(prod_from_invest, initial_ages, initial_distrib_prod, self.lifetime))
+
+    def set_vintage_production(self, vintage_production):
+        '''
+        Store the vintage matrix computed by compute_aging_distribution_production
+        '''
+        self.vintage_production = vintage_production
+        # the dataframe view is rebuilt only if requested
+        self.age_distrib_prod_df = None
 
-        # get the whole dataframe for new production with one line for each
-        # year at each age
-        # concatenate tuple to get correct df to mimic the old year loop
-        len_years = len(self.years)
-        range_years = np.arange(
-            self.year_start, self.year_end + len_years)
-
-        year_array = np.concatenate(
-            tuple(range_years[i:i + len_years] for i in range(len_years)))
-        age_array = np.concatenate(tuple(np.ones(
-            len_years) * (len_years - i) for i in range(len_years, 0, -1)))
-        prod_array = production_from_invest['prod_from_invest'].values.tolist(
-        ) * len_years
-
-        new_prod_aged = pd.DataFrame({GlossaryEnergy.Years: year_array, 'age': age_array,
-                                      f'distrib_prod ({self.product_unit})': prod_array})
-
-        # get the whole dataframe for old production with one line for each
-        # year at each age
-        year_array = np.array([[year] * len(aging_distrib_year_df)
-                               for year in self.years]).flatten()
-        age_values = aging_distrib_year_df['age'].values
-        age_array = np.concatenate(tuple(
-            age_values + i for i in range(len_years)))
-        prod_array = aging_distrib_year_df[f'distrib_prod ({self.product_unit})'].values.tolist(
-        ) * len_years
-
-        old_prod_aged = pd.DataFrame({GlossaryEnergy.Years: year_array, 'age': age_array,
-                                      f'distrib_prod ({self.product_unit})': prod_array})
-
-        # Concat the two created df
-        self.age_distrib_prod_df = pd.concat(
-            [new_prod_aged, old_prod_aged], ignore_index=True)
-
-        self.age_distrib_prod_df = self.age_distrib_prod_df.loc[
-            # Suppress all lines where age is higher than lifetime
-            (self.age_distrib_prod_df['age'] <
-             self.lifetime)
-            # Suppress all lines where age is higher than lifetime
-            & (self.age_distrib_prod_df[GlossaryEnergy.Years] < self.year_end + 1)
-            # Fill Nan with zeros and suppress all zeros
-            & (self.age_distrib_prod_df[f'distrib_prod ({self.product_unit})'] != 0.0)
-            ]
-        # Fill Nan with zeros
-        self.age_distrib_prod_df.fillna(0.0, inplace=True)
+    @property
+    def age_distrib_prod_df(self):
+        '''
+        DataFrame view of the vintage matrix with one line for each year and age with a non zero production,
+        built lazily when the age_distrib_production output is stored
+        '''
+        if self._age_distrib_prod_df is None and self.vintage_production is not None:
+            year_indices, ages = np.nonzero(self.vintage_production)
+            distrib_prod = self.vintage_production[year_indices, ages]
+            self._age_distrib_prod_df = pd.DataFrame({GlossaryEnergy.Years: np.asarray(self.years)[year_indices],
+                                                      'age': ages.astype(float),
+                                                      f'distrib_prod ({self.product_unit})': distrib_prod,
+                                                      'age_x_prod': ages * distrib_prod})
+        return self._age_distrib_prod_df
+
+    @age_distrib_prod_df.setter
+    def age_distrib_prod_df(self, age_distrib_prod_df):
+        self._age_distrib_prod_df = age_distrib_prod_df
+
+    def compute_age_x_production(self):
+        '''
+        Sum over the ages of age x production for each year (reduction of the vintage matrix)
+        '''
+        return self.vintage_production @ np.arange(self.vintage_production.shape[1])
 
     def compute_prod_from_invest(self):
         '''
@@ -1011,36 +966,32 @@ class TechnoType:
         Add a delay for factory construction
         '''
 
-        years_before_year_start = np.arange(self.year_start - self.construction_delay, self.year_start)
         invest_before_year_start = self.invest_before_ystart[GlossaryEnergy.InvestValue].values
-        capex_year_start = self.cost_details.loc[self.cost_details[GlossaryEnergy.Years] == self.year_start, f'Capex_{self.name}'].values[0]
-        invest_before_year_start_df = pd.DataFrame({
-            GlossaryEnergy.Years: years_before_year_start,
-            GlossaryEnergy.InvestValue: invest_before_year_start,
-            f'Capex_{self.name}': capex_year_start
-         })
-        invests_after_year_start_df = self.cost_details[[GlossaryEnergy.Years, GlossaryEnergy.InvestValue, f'Capex_{self.name}']].copy()
-        prod_from_invests_df = pd.concat([invest_before_year_start_df, invests_after_year_start_df], ignore_index=True) if len(invest_before_year_start) > 0 else invests_after_year_start_df
-        # Need prod_from invest in TWh we have M$ and $/MWh  M$/($/MWh)= TWh
-
-        production_from_invests = prod_from_invests_df[GlossaryEnergy.InvestValue].values / \
-                                                     prod_from_invests_df[f'Capex_{self.name}'].values
-        prod_from_invests_df['prod_from_invest'] = production_from_invests
-        prod_from_invests_df[GlossaryEnergy.Years] += self.construction_delay
-        prod_from_invests_df = prod_from_invests_df[prod_from_invests_df[GlossaryEnergy.Years] <= self.year_end]
+        capex = self.cost_details[f'Capex_{self.name}'].values
+        years = self.cost_details[GlossaryEnergy.Years].values
+        capex_year_start = capex[years == self.year_start][0]
+
+        # invests before year start, if any, are built with the capex of year start
+        years_before_year_start = np.arange(self.year_start - self.construction_delay, self.year_start) \
+            if len(invest_before_year_start) > 0 else np.array([], dtype=years.dtype)
+        years = np.concatenate((years_before_year_start, years)) + self.construction_delay
+        invests = np.concatenate((invest_before_year_start, self.cost_details[GlossaryEnergy.InvestValue].values))
+        capex = np.concatenate((np.full(len(invest_before_year_start), capex_year_start), capex))
+        is_available = years <= self.year_end
 
-        return prod_from_invests_df
+        # Need prod_from invest in TWh we have M$ and $/MWh  M$/($/MWh)= TWh
+        return pd.DataFrame({GlossaryEnergy.Years: years[is_available],
+                             GlossaryEnergy.InvestValue: invests[is_available],
+                             f'Capex_{self.name}': capex[is_available],
+                             'prod_from_invest': invests[is_available] / capex[is_available]})
 
     def get_mean_age_over_years(self):
 
         mean_age_df = pd.DataFrame({GlossaryEnergy.Years: self.years})
 
-        self.age_distrib_prod_df['age_x_prod'] = self.age_distrib_prod_df['age'] * \
-                                                 self.age_distrib_prod_df[f'distrib_prod ({self.product_unit})']
-
-        mean_age_df['mean age'] = self.age_distrib_prod_df.groupby(
-            [GlossaryEnergy.Years], as_index=False).agg({'age_x_prod': 'sum'})['age_x_prod'] / self.production_woratio[
-                                      f'{self.energy_name} ({self.product_unit})']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean_age_df['mean age'] = self.compute_age_x_production() / self.production_woratio[
+                f'{self.energy_name} ({self.product_unit})'].values
         mean_age_df.replace([np.inf, -np.inf], np.nan, inplace=True)
         mean_age_df.fillna(0.0, inplace=True)
 
@@ -1165,6 +1116,13 @@ class TechnoType:
         self.compute_price()
         self.compute_initial_plants_historical_prod()
         self.compute_primary_energy_production()
+        self.compute_from_primary_energy_production()
+
+    def compute_from_primary_energy_production(self):
+        '''
+        Compute the outputs depending on the primary energy production (land use, consumptions, installed power),
+        apply the utilisation and resources ratios and compute the capital
+        '''
         self.compute_land_use()
         self.compute_resource_consumption()
         self.compute_streams_consumption()
@@ -1185,22 +1143,22 @@ class TechnoType:
 
     "---------START OF GRADIENTS---------"
     def grad_price_vs_stream_price(self):
-        return {stream: np.diag(self.cost_details[f'{stream}_needs'].values) for stream in self.streams_used_for_production}
+        return {stream: DiagonalJacobianBlock(self.cost_details[f'{stream}_needs'].values) for stream in self.streams_used_for_production}
 
     def grad_price_vs_resources_price(self):
-        return {resource: np.diag(self.cost_details[f'{resource}_needs'].values) for resource in self.resources_used_for_production}
+        return {resource: DiagonalJacobianBlock(self.cost_details[f'{resource}_needs'].values) for resource in self.resources_used_for_production}
 
     def grad_co2_emissions_vs_resources_co2_emissions(self):
         '''
         Compute the gradient of global CO2 emissions vs resources CO2 emissions
         '''
         return {
-            resource: np.diag(self.cost_details[f"{resource}_needs"].values) for resource in self.resources_used_for_production
+            resource: DiagonalJacobianBlock(self.cost_details[f"{resource}_needs"].values) for resource in self.resources_used_for_production
         }
 
     def d_non_use_capital_d_utilisation_ratio(self):
         techno_capital = self.techno_capital[GlossaryEnergy.Capital].values
-        d_non_use_capital_d_utilisation_ratio = np.diag(
+        d_non_use_capital_d_utilisation_ratio = DiagonalJacobianBlock(
             - techno_capital * self.applied_ratio['applied_ratio'].values / 100.
         )
         return d_non_use_capital_d_utilisation_ratio
@@ -1282,36 +1240,32 @@ class TechnoType:
         To compute after the total derivative of prod vs invest = dpprod_dpinvest + dpprod_dpcapex*dcapexdinvest
         with dcapexdinvest already computed for detailed prices
         '''
-        nb_years = len(capex_list)
+        self.dprod_dinvest, self.dprod_list_dcapex_list = self.memo.get_or_compute(
+            'dprod_dinvest', (capex_list, invest_list, invest_before_year_start, techno_dict, dcapex_list_dinvest_list,
+                              self.lifetime, self.construction_delay),
+            lambda: self.compute_dprod_dinvest_and_dcapex(capex_list, invest_list, invest_before_year_start,
+                                                          techno_dict, dcapex_list_dinvest_list))
 
-        if 'complex128' in [capex_list.dtype, invest_list.dtype, invest_before_year_start.dtype,
-                            dcapex_list_dinvest_list.dtype]:
-            arr_type = 'complex128'
-        else:
-            arr_type = 'float64'
-        dprod_list_dinvest_list = np.zeros(
-            (nb_years, nb_years), dtype=arr_type)
-        # We fill this jacobian column by column because it is the same element
-        # in the entire column
-        for i in range(nb_years):
-            dpprod_dpinvest = compute_dfunc_with_exp_min(np.array([invest_list[i]]), self.min_value_invest)[0][0] / \
-                              capex_list[i]
-            len_non_zeros = min(max(0, nb_years - self.construction_delay - i),
-                                self.lifetime)
-            first_len_zeros = min(i + self.construction_delay, nb_years)
-            last_len_zeros = max(0, nb_years -
-                                 len_non_zeros - first_len_zeros)
-            # For prod in each column there is lifetime times the same value which is dpprod_dpinvest
-            # This value is delayed in time (means delayed in lines for
-            # jacobian by construction _delay)
-            # Each column is then composed of [0,0,0... (dp/dx,dp/dx)*lifetime,
-            # 0,0,0]
-            is_invest_negative = max(
-                np.sign(invest_list[i] + np.finfo(float).eps), 0.0)
-            dprod_list_dinvest_list[:, i] = np.hstack((np.zeros(first_len_zeros),
-                                                       np.ones(
-                                                           len_non_zeros) * dpprod_dpinvest * is_invest_negative,
-                                                       np.zeros(last_len_zeros)))
+        return self.dprod_dinvest
+
+    def compute_dprod_dinvest_and_dcapex(self, capex_list, invest_list, invest_before_year_start, techno_dict,
+                                         dcapex_list_dinvest_list):
+        '''
+        Total derivative of prod vs invest and partial derivative of prod vs capex, see compute_dprod_dinvest
+        '''
+        nb_years = len(capex_list)
+        invest_list_years = invest_list[:nb_years]
+
+        # For prod in each column there is lifetime times the same value which is dpprod_dpinvest
+        # This value is delayed in time (means delayed in lines for
+        # jacobian by construction _delay)
+        # Each column is then composed of [0,0,0... (dp/dx,dp/dx)*lifetime,
+        # 0,0,0]
+        dpprod_dpinvest = compute_dfunc_with_exp_min(invest_list_years, self.min_value_invest).reshape(
+            nb_years) / capex_list
+        is_invest_negative = np.maximum(np.sign(invest_list_years + np.finfo(float).eps), 0.0)
+        dprod_list_dinvest_list = self.get_lifetime_band_mask(nb_years, nb_years, self.construction_delay) * \
+                                  (dpprod_dpinvest * is_invest_negative)
 
         dprod_list_dcapex_list = self.compute_dprod_dcapex(
             capex_list, invest_list, techno_dict, invest_before_year_start)
@@ -1320,61 +1274,40 @@ class TechnoType:
             invest_list, self.min_value_invest)
 
         dcapex_list_dinvest_list_withexp = dcapex_list_dinvest_list * dinvest_exp_min
-        dprod_dinvest = np.zeros(
-            (nb_years, nb_years), dtype=arr_type)
         # dprod_dinvest= dpprod_dpinvest + dprod_dcapex*dcapex_dinvest
-        for line in range(nb_years):
-            for column in range(nb_years):
-                dprod_dinvest[line, column] = dprod_list_dinvest_list[line, column] + \
-                                              np.matmul(
-                                                  dprod_list_dcapex_list[line, :],
-                                                  dcapex_list_dinvest_list_withexp[:, column])
-
-        self.dprod_dinvest = dprod_dinvest
+        dprod_dinvest = dprod_list_dinvest_list + dprod_list_dcapex_list @ dcapex_list_dinvest_list_withexp
 
-        return dprod_dinvest
+        return dprod_dinvest, dprod_list_dcapex_list
 
     def compute_dprod_dcapex(self, capex_list, invest_list, techno_dict, invest_before_year_start):
         '''
         Compute the derivative of production over capex
         '''
         nb_years = len(capex_list)
-        dprod_list_dcapex_list = np.zeros(
-            (nb_years, nb_years))
-        if 'complex128' in [capex_list.dtype, invest_list.dtype, invest_before_year_start.dtype]:
-            dprod_list_dcapex_list = np.zeros(
-                (nb_years, nb_years), dtype='complex128')
-        for i in range(nb_years):
-            len_non_zeros = min(max(0, nb_years - self.construction_delay - i),
-                                self.lifetime)
-            first_len_zeros = min(
-                i + self.construction_delay, nb_years)
-            last_len_zeros = max(0, nb_years -
-                                 len_non_zeros - first_len_zeros)
-            # Same for capex
-            dpprod_dpcapex = - invest_list[i] / capex_list[i] ** 2
-
-            dprod_list_dcapex_list[:, i] = np.hstack((np.zeros(first_len_zeros),
-                                                      np.ones(
-                                                          len_non_zeros) * dpprod_dpcapex,
-                                                      np.zeros(last_len_zeros)))
+        # Same band structure as the production vs invest
+        dpprod_dpcapex = - invest_list[:nb_years] / capex_list ** 2
+        dprod_list_dcapex_list = self.get_lifetime_band_mask(nb_years, nb_years, self.construction_delay) * \
+                                 dpprod_dpcapex
+
         # but the capex[0] is used for invest before
         # year_start then we need to add it to the first column
-        dpprod_dpcapex0_list = [- invest / capex_list[0]
-                                ** 2 for invest in invest_before_year_start]
-
-        for index, dpprod_dpcapex0 in enumerate(dpprod_dpcapex0_list):
-            len_non_zeros = min(
-                self.lifetime, nb_years - index)
-            dprod_list_dcapex_list[:, 0] += np.hstack((np.zeros(index),
-                                                       np.ones(
-                                                           len_non_zeros) * dpprod_dpcapex0,
-                                                       np.zeros(nb_years - index - len_non_zeros)))
+        dpprod_dpcapex0_list = - invest_before_year_start / capex_list[0] ** 2
+        dprod_dcapex0 = self.get_lifetime_band_mask(nb_years, len(dpprod_dpcapex0_list), 0) @ dpprod_dpcapex0_list
+        dprod_list_dcapex_list = dprod_list_dcapex_list.astype(np.result_type(dprod_list_dcapex_list, dprod_dcapex0))
+        dprod_list_dcapex_list[:, 0] += dprod_dcapex0
 
         self.dprod_list_dcapex_list = dprod_list_dcapex_list
 
         return dprod_list_dcapex_list
 
+    def get_lifetime_band_mask(self, nb_lines, nb_columns, delay):
+        '''
+        Toeplitz band mask of plants built with the invest of year (column) j,
+        producing from year j + delay during lifetime years (lines)
+        '''
+        age = np.subtract.outer(np.arange(nb_lines), np.arange(nb_columns))
+        return ((age >= delay) & (age < delay + self.lifetime)).astype('float64')
+
     def compute_dpower_dinvest(self, capex_list, invest_list, dcapex_dinvest,
                                scaling_factor_techno_consumption):
         nb_years = len(capex_list)
@@ -1451,97 +1384,38 @@ class TechnoType:
         '''
         mult_vect = self.cost_details[f'Capex_{self.name}'].values * \
                     self.production_woratio[f'{self.energy_name} ({self.product_unit})'].values
-        dnon_use_capital_dratio = -dapplied_ratio_dratio * np.diag(mult_vect * self.utilisation_ratio / 100.)
+        dnon_use_capital_dratio = -dapplied_ratio_dratio * DiagonalJacobianBlock(mult_vect * self.utilisation_ratio / 100.)
         return dnon_use_capital_dratio
 
     def compute_dcapex_dinvest(self, invest_list, data_config):
         """
-        Compute Capital expenditures (immobilisations)
-        depending on the demand on the technology
+        Compute the gradient of Capital expenditures (immobilisations) vs invest
+        The learning curve intermediates computed by compute_capex are reused if the inputs are the same
         """
-        progress_ratio = 1.0 - data_config['learning_rate']
-
-        capacity_factor_list = None
-        if 'capacity_factor_at_year_end' in data_config \
-                and 'capacity_factor' in data_config:
-            capacity_factor_list = np.linspace(data_config['capacity_factor'],
-                                               data_config['capacity_factor_at_year_end'],
-                                               len(invest_list))
-
-        expo_factor = -np.log(progress_ratio) / np.log(2.0)
-
+        expo_factor = self.compute_expo_factor(data_config)
         capex_init = self.check_capex_unity(data_config)
+        return self.memo.get_or_compute(
+            'dcapex_dinvest', (invest_list, capex_init, self.initial_production, expo_factor, data_config),
+            lambda: self.compute_dlearning_capex_dinvest(invest_list, capex_init, expo_factor, data_config))
 
-        invest_sum = self.initial_production * capex_init
-        dcapex_year_dinvest_list = []
-        capex_year = capex_init
-
-        if 'complex128' in [invest_list.dtype]:
-            arr_type = 'complex128'
-        else:
-            arr_type = 'float64'
-        dcapex_calc_list_dinvest_list = np.zeros(
-            (len(invest_list), len(invest_list)), dtype=arr_type)
+    def compute_dlearning_capex_dinvest(self, invest_list, capex_init, expo_factor, data_config):
+        """
+        Gradient of the learning curve capex vs invest, see compute_dcapex_dinvest
+        """
+        capacity_factor_ratio = get_capacity_factor_ratio(data_config, len(invest_list))
 
         invest_list_2 = compute_func_with_exp_min(
             invest_list, self.min_value_invest)
         dinvest_func = compute_dfunc_with_exp_min(
             invest_list, self.min_value_invest)
 
-        for i, invest in enumerate(invest_list_2):
-
-            # first capex calculation
-            if invest_sum.real < 10.0 or i == 0.0:
-                capex_year = capex_init
-                dcapex_year_dinvest_list = np.zeros(i + 1)
-            else:
-                if capacity_factor_list is not None:
-                    ratio_capa = (
-                            capacity_factor_list[i] / data_config['capacity_factor'])
-                    ratio_invest = ((invest_sum + invest) / invest_sum *
-                                    ratio_capa) \
-                                   ** (-expo_factor)
-                else:
-
-                    ratio_invest = ((invest_sum + invest) /
-                                    invest_sum) ** (-expo_factor)
-
-                #                     # capexi = capex_i-1 * ratio
-                # dcapexi = dcapex_i-1*ratio + dratio*capex
-
-                dratio_invest_i_dinvest_i = -expo_factor * \
-                                            ratio_invest / (invest_sum + invest)
-                # dratioinvesti wrt invest i minus one
-                dratio_invest_i_dinvest_i_m1 = expo_factor * invest * \
-                                               ratio_invest / \
-                                               (invest_sum * (invest_sum + invest))
-
-                if ratio_invest.real < 0.95:
-                    dratio_invest_i_dinvest_i = 0.05 * \
-                                                np.exp(ratio_invest - 0.9) * dratio_invest_i_dinvest_i
-
-                    dratio_invest_i_dinvest_i_m1 = 0.05 * \
-                                                   np.exp(ratio_invest - 0.9) * \
-                                                   dratio_invest_i_dinvest_i_m1
-
-                    ratio_invest = 0.9 + 0.05 * np.exp(ratio_invest - 0.9)
-
-                capex_i_m1 = capex_year
-                dcapex_i_dinvest_i = capex_i_m1 * dratio_invest_i_dinvest_i
-
-                dcapex_i_dinvest_i_m1 = [dcapex_i_dinvest_i_old * ratio_invest +
-                                         capex_i_m1 * dratio_invest_i_dinvest_i_m1 for dcapex_i_dinvest_i_old
-                                         in dcapex_year_dinvest_list]
-
-                dcapex_year_dinvest_list = np.append(
-                    dcapex_i_dinvest_i_m1, [dcapex_i_dinvest_i])
-
-                dcapex_calc_list_dinvest_list[i,
-                :i + 1] = dcapex_year_dinvest_list
-
-                capex_year = capex_year * ratio_invest
-            #
-            invest_sum += invest
+        learning_curve = self.learning_curve
+        if not is_learning_curve_up_to_date(learning_curve, invest_list_2, capex_init, self.initial_production,
+                                            expo_factor, capacity_factor_ratio):
+            learning_curve = compute_learning_curve(invest_list_2, capex_init, self.initial_production, expo_factor,
+                                                    capacity_factor_ratio=capacity_factor_ratio,
+                                                    techno_name=self.name)
+        dcapex_calc_list_dinvest_list = compute_dlearning_curve_dinvest(learning_curve)
 
         if 'maximum_learning_capex_ratio' in data_config:
             maximum_learning_capex_ratio = data_config['maximum_learning_capex_ratio']
@@ -1552,28 +1426,45 @@ class TechnoType:
         return (1.0 - maximum_learning_capex_ratio) * dcapex_calc_list_dinvest_list * dinvest_func.reshape(
             len(invest_list))
 
-
     "---------END OF GRADIENTS---------"
 
     def compute_initial_age_distribution(self):
+        self.initial_age_distrib = self.memo.get_or_compute(
+            'initial_age_distrib', (self.lifetime, self.initial_age_distrib_distrib_factor),
+            self.compute_initial_age_distrib_df)
+
+    def compute_initial_age_distrib_df(self):
+        """
+        Percentage of the initial production for each age of the plants, decreasing with the age
+        """
         initial_value = 1
         decay_rate = self.initial_age_distrib_distrib_factor
         n_year = self.lifetime - 1
         total_sum = sum(initial_value * (decay_rate ** i) for i in range(n_year))
         distribution = [(initial_value * (decay_rate ** i) / total_sum) * 100 for i in range(n_year)]
         distrib = np.flip(distribution)
-        self.initial_age_distrib = pd.DataFrame({
+        return pd.DataFrame({
             "age": np.arange(1, self.lifetime),
             "distrib": distrib
         })
 
     def compute_initial_plants_historical_prod(self):
+        self.initial_plants_historical_prod = self.memo.get_or_compute(
+            'initial_plants_historical_prod',
+            (self.initial_age_distrib, self.initial_production, self.year_start, self.product_unit),
+            self.compute_initial_plants_historical_prod_df)
+
+    def compute_initial_plants_historical_prod_df(self):
+        """
+        Production of the plants built before year start, with its cumulated sum
+        """
         energy = self.initial_age_distrib['distrib'] / 100.0 * self.initial_production
 
-        self.initial_plants_historical_prod = pd.DataFrame({
+        initial_plants_historical_prod = pd.DataFrame({
             GlossaryEnergy.Years: self.year_start - self.initial_age_distrib['age'],
             f'energy ({self.product_unit})': energy,
         })
 
-        self.initial_plants_historical_prod.sort_values(GlossaryEnergy.Years, inplace=True)
-        self.initial_plants_historical_prod[f'cum energy ({self.product_unit})'] = self.initial_plants_historical_prod[f'energy ({self.product_unit})'].cumsum()
\ No newline at end of file
+        initial_plants_historical_prod.sort_values(GlossaryEnergy.Years, inplace=True)
+        initial_plants_historical_prod[f'cum energy ({self.product_unit})'] = initial_plants_historical_prod[f'energy ({self.product_unit})'].cumsum()
+        return initial_plants_historical_prod
\ No newline at end of file
@@ -0,0 +1,57 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+import numpy as np
+
+
+def compute_vintage_production(prod_from_invest, initial_ages, initial_distrib_prod, lifetime):
+    """
+    Vintage matrix vintage_production[year, age] : production of the factories of this age during this year
+    Factories built from investments produce at age 0 the year they are available (after the construction delay)
+    and the initial distribution gets one year older each year
+    All productions older than the lifetime are removed from the matrix
+
+    @param prod_from_invest: production from the investments available each year (after construction delay)
+    @param initial_ages: ages of the initial factories at year start
+    @param initial_distrib_prod: production of the initial factories at year start
+    @param lifetime: lifetime of the factories
+    @return: vintage matrix (year x age)
+    """
+    prod_from_invest = np.asarray(prod_from_invest)
+    initial_ages = np.asarray(initial_ages).astype(int)
+    initial_distrib_prod = np.asarray(initial_distrib_prod)
+    # number of ages of the factories younger than the lifetime, the lifetime may not be an integer
+    nb_ages = max(int(np.ceil(lifetime)), 0)
+
+    nb_years = len(prod_from_invest)
+    year_indices = np.arange(nb_years)
+    ages = np.arange(nb_ages)
+
+    # new production : factories of age a during year t are available since year t - a
+    vintage_index = np.subtract.outer(year_indices, ages)
+    vintage_production = np.where(vintage_index >= 0, prod_from_invest[np.maximum(vintage_index, 0)], 0.0)
+    vintage_production = vintage_production.astype(np.result_type(vintage_production, initial_distrib_prod))
+
+    # old production : initial distribution aged of one year each year
+    aged_initial_ages = initial_ages[np.newaxis, :] + year_indices[:, np.newaxis]
+    is_alive = (aged_initial_ages >= 0) & (aged_initial_ages < nb_ages)
+    alive_year_indices, alive_initial_indices = np.nonzero(is_alive)
+    np.add.at(vintage_production, (alive_year_indices, aged_initial_ages[is_alive]),
+              initial_distrib_prod[alive_initial_indices])
+
+    # Fill Nan with zeros
+    vintage_production[np.isnan(vintage_production)] = 0.0
+
+    return vintage_production
@@ -20,7 +20,39 @@ from os.path import join
 from pathlib import Path
 
 import pandas as pd
-from climateeconomics.database.collected_data import ColectedData, HeavyCollectedData
+from climateeconomics.database.collected_data import ColectedData
+
+from energy_models.techno_data_bundle import DEFAULT_BUNDLE_PATH, TechnoDataBundle
+
+
+class TechnoCollectedData(ColectedData):
+    """
+    Collected data of the csv file of a techno, with the queries of HeavyCollectedData,
+    built from the dataframe of the csv file (read in the binary bundle) instead of parsing the csv file again
+    """
+
+    def __init__(self, value: pd.DataFrame, unit: str, column_to_pick: str, critical_at_year_start: bool = True):
+        super().__init__(
+            value=value,
+            unit=unit,
+            description="",
+            link="",
+            source="",
+            last_update_date=datetime.datetime.today(),
+        )
+        self.critical_at_year_start = critical_at_year_start
+        self.column_to_pick = column_to_pick
+
+    def is_available_at_year(self, year: int) -> bool:
+        return year in self.value["years"].values
+
+    def get_value_at_year(self, year: int):
+        if not self.is_available_at_year(year):
+            raise Exception(f"No {self.column_to_pick} value at year {year}")
+        return self.value.loc[self.value["years"] == year, self.column_to_pick].values[0]
+
+    def get_between_years(self, year_start: int, year_end: int) -> pd.DataFrame:
+        return self.value.loc[(self.value["years"] >= year_start) & (self.value["years"] <= year_end)]
 
 
 class DatabaseWitnessEnergy:
@@ -85,114 +117,144 @@ class DatabaseWitnessEnergy:
     )
 
     invest_before_year_start_folder = join(Path(__file__).parents[1], "data_energy", "techno_invests")
+    techno_production_historic_folder = join(Path(__file__).parents[1], "data_energy", "techno_production_historic")
+    techno_age_distrib_folder = join(Path(__file__).parents[1], "data_energy", "techno_factories_age")
+
+    # csv files of the technos parsed once : (folder, formatted techno name) -> (dataframe, TechnoCollectedData)
+    techno_data_cache = {}
+    # answers of the get_techno_xxx queries : (query name, formatted techno name, query arguments) -> answer
+    techno_query_cache = {}
+    # binary bundle of the csv files built by the techno_data_bundle build step, loaded once if it is up to date
+    techno_data_bundle_path = DEFAULT_BUNDLE_PATH
+    techno_data_bundle = None
+    is_techno_data_bundle_loaded = False
+
+    @staticmethod
+    def format_techno_name(techno_name: str) -> str:
+        return techno_name.replace(".", "_").lower()
+
+    @classmethod
+    def clear_techno_data_cache(cls):
+        """
+        Invalidate the parsed csv files and the answered queries (to use after a modification of the csv files)
+        """
+        cls.techno_data_cache.clear()
+        cls.techno_query_cache.clear()
+        cls.techno_data_bundle = None
+        cls.is_techno_data_bundle_loaded = False
+
+    @classmethod
+    def read_techno_csv(cls, path_to_csv: str) -> pd.DataFrame:
+        """
+        Read the csv file of a techno in the binary bundle, or in the csv file if the bundle is missing or stale
+        """
+        if not cls.is_techno_data_bundle_loaded:
+            cls.techno_data_bundle = TechnoDataBundle.load(cls.techno_data_bundle_path)
+            cls.is_techno_data_bundle_loaded = True
+        df = None
+        if cls.techno_data_bundle is not None:
+            df = cls.techno_data_bundle.get_dataframe(path_to_csv)
+        return pd.read_csv(path_to_csv) if df is None else df
+
+    @classmethod
+    def preload_techno_data(cls):
+        """
+        Parse all the csv files of invests, historic productions and factories ages of the technos
+        """
+        for folder, unit, column_to_pick in [(cls.invest_before_year_start_folder, "G$", "invest"),
+                                             (cls.techno_production_historic_folder, None, "production"),
+                                             (cls.techno_age_distrib_folder, "-", "growth_rate")]:
+            for file_name in sorted(os.listdir(folder)):
+                # empty csv files are not techno data
+                if file_name.endswith(".csv") and os.path.getsize(os.path.join(folder, file_name)) > 0:
+                    cls.get_techno_data(folder, file_name[:-len(".csv")], unit, column_to_pick)
+
+    @classmethod
+    def get_techno_data(cls, folder: str, techno_name: str, unit, column_to_pick: str):
+        """
+        Dataframe and collected data of the csv file of the techno in folder, the csv file is parsed only once
+        If unit is None, it is read in the unit column of the csv file
+        """
+        key = (folder, cls.format_techno_name(techno_name))
+        if key not in cls.techno_data_cache:
+            path_to_csv = os.path.join(folder, key[1]) + ".csv"
+            df = cls.read_techno_csv(path_to_csv)
+            heavy_collected_data = TechnoCollectedData(
+                value=df,
+                unit=df["unit"].values[0] if unit is None else unit,
+                column_to_pick=column_to_pick
+            )
+            cls.techno_data_cache[key] = (df, heavy_collected_data)
+        return cls.techno_data_cache[key]
+
+    @classmethod
+    def get_techno_query_answer(cls, query_name: str, techno_name: str, query_args: tuple, compute_answer):
+        """
+        Answer of a query on the data of a techno, computed only the first time it is asked
+        Dataframes are copied so that the caller can modify them without modifying the stored answer
+        """
+        key = (query_name, cls.format_techno_name(techno_name), query_args)
+        if key not in cls.techno_query_cache:
+            cls.techno_query_cache[key] = compute_answer()
+        answer = cls.techno_query_cache[key]
+        if isinstance(answer, tuple):
+            return tuple(value.copy() if isinstance(value, pd.DataFrame) else value for value in answer)
+        return answer.copy() if isinstance(answer, pd.DataFrame) else answer
 
     @classmethod
     def get_techno_invest(cls, techno_name: str, year: int) -> float:
-        name_formatted = techno_name.replace(".", "_")
-        name_formatted = name_formatted.lower()
-        path_to_csv = os.path.join(cls.invest_before_year_start_folder, name_formatted) + ".csv"
-        heavy_collected_data = HeavyCollectedData(
-            value=path_to_csv,
-            description="",
-            unit="G$",
-            link="",
-            source="",
-            last_update_date=datetime.datetime.today(),
-            critical_at_year_start=True,
-            column_to_pick="invest"
-        )
-        return heavy_collected_data.get_value_at_year(year=year)
+        _, heavy_collected_data = cls.get_techno_data(cls.invest_before_year_start_folder, techno_name, "G$", "invest")
+        return cls.get_techno_query_answer("invest", techno_name, (year,),
+                                           lambda: heavy_collected_data.get_value_at_year(year=year))
 
     @classmethod
     def get_techno_invest_df(cls, techno_name: str) -> pd.DataFrame:
-        name_formatted = techno_name.replace(".", "_")
-        name_formatted = name_formatted.lower()
-        path_to_csv = os.path.join(cls.invest_before_year_start_folder, name_formatted) + ".csv"
-        heavy_collected_data = HeavyCollectedData(
-            value=path_to_csv,
-            description="",
-            unit="G$",
-            link="",
-            source="",
-            last_update_date=datetime.datetime.today(),
-            critical_at_year_start=True,
-            column_to_pick="invest"
-        )
-        return heavy_collected_data.value
+        _, heavy_collected_data = cls.get_techno_data(cls.invest_before_year_start_folder, techno_name, "G$", "invest")
+        return cls.get_techno_query_answer("invest_df", techno_name, (), lambda: heavy_collected_data.value)
 
     @classmethod
     def get_techno_invest_before_year_start(cls, techno_name: str, year_start: int, construction_delay: int, is_available_at_year: bool = False):
-        name_formatted = techno_name.replace(".", "_")
-        name_formatted = name_formatted.lower()
-        path_to_csv = os.path.join(cls.invest_before_year_start_folder, name_formatted) + ".csv"
-        df = pd.read_csv(path_to_csv)
-        heavy_collected_data = HeavyCollectedData(
-            value=path_to_csv,
-            description="",
-            unit="G$",
-            link="",
-            source="",
-            last_update_date=datetime.datetime.today(),
-            critical_at_year_start=True,
-            column_to_pick="invest"
-        )
-        out_df = df.loc[df['years'] < year_start]
-        if is_available_at_year:
-            return construction_delay == 0 or (heavy_collected_data.is_available_at_year(year_start - construction_delay) and heavy_collected_data.is_available_at_year(year_start - 1))
-        if construction_delay == 0:
-            out_df = pd.DataFrame({
-            "years": [],
-            "invest": []
-        })
-        elif construction_delay > 0:
-            out_df = heavy_collected_data.get_between_years(year_start=year_start - construction_delay, year_end=year_start - 1)
-        return out_df, heavy_collected_data
+        df, heavy_collected_data = cls.get_techno_data(cls.invest_before_year_start_folder, techno_name, "G$", "invest")
 
+        def compute_answer():
+            out_df = df.loc[df['years'] < year_start]
+            if is_available_at_year:
+                return construction_delay == 0 or (heavy_collected_data.is_available_at_year(year_start - construction_delay) and heavy_collected_data.is_available_at_year(year_start - 1))
+            if construction_delay == 0:
+                out_df = pd.DataFrame({
+                "years": [],
+                "invest": []
+            })
+            elif construction_delay > 0:
+                out_df = heavy_collected_data.get_between_years(year_start=year_start - construction_delay, year_end=year_start - 1)
+            return out_df, heavy_collected_data
+
+        return cls.get_techno_query_answer("invest_before_year_start", techno_name,
+                                           (year_start, construction_delay, is_available_at_year), compute_answer)
 
-    techno_production_historic_folder = join(Path(__file__).parents[1], "data_energy", "techno_production_historic")
     @classmethod
     def get_techno_prod(cls, techno_name: str, year: int, is_available_at_year: bool = False):
-        name_formatted = techno_name.replace(".", "_")
-        name_formatted = name_formatted.lower()
-        path_to_csv = os.path.join(cls.techno_production_historic_folder, name_formatted) + ".csv"
-        df = pd.read_csv(path_to_csv)
-        heavy_collected_data = HeavyCollectedData(
-            value=path_to_csv,
-            description="",
-            unit=df["unit"].values[0],
-            link="",
-            source="",
-            last_update_date=datetime.datetime.today(),
-            critical_at_year_start=True,
-            column_to_pick="production"
-        )
-        if is_available_at_year:
-            return heavy_collected_data.is_available_at_year(year=year)
+        _, heavy_collected_data = cls.get_techno_data(cls.techno_production_historic_folder, techno_name, None, "production")
 
-        out = heavy_collected_data.get_value_at_year(year=year)
-        return out, heavy_collected_data
+        def compute_answer():
+            if is_available_at_year:
+                return heavy_collected_data.is_available_at_year(year=year)
 
+            out = heavy_collected_data.get_value_at_year(year=year)
+            return out, heavy_collected_data
 
-    techno_age_distrib_folder = join(Path(__file__).parents[1], "data_energy", "techno_factories_age")
+        return cls.get_techno_query_answer("prod", techno_name, (year, is_available_at_year), compute_answer)
 
     @classmethod
     def get_techno_age_distrib_factor(cls, techno_name: str, year: int, is_available_at_year: bool = False):
-        name_formatted = techno_name.replace(".", "_")
-        name_formatted = name_formatted.lower()
-        path_to_csv = os.path.join(cls.techno_age_distrib_folder, name_formatted) + ".csv"
-        heavy_collected_data = HeavyCollectedData(
-            value=path_to_csv,
-            description="",
-            unit="-",
-            link="",
-            source="",
-            last_update_date=datetime.datetime.today(),
-            critical_at_year_start=True,
-            column_to_pick="growth_rate"
-        )
-        if is_available_at_year:
-            return heavy_collected_data.is_available_at_year(year=year)
+        _, heavy_collected_data = cls.get_techno_data(cls.techno_age_distrib_folder, techno_name, "-", "growth_rate")
+
+        def compute_answer():
+            if is_available_at_year:
+                return heavy_collected_data.is_available_at_year(year=year)
 
-        out = heavy_collected_data.get_value_at_year(year=year)
-        return out, heavy_collected_data
+            out = heavy_collected_data.get_value_at_year(year=year)
+            return out, heavy_collected_data
 
+        return cls.get_techno_query_answer("age_distrib_factor", techno_name, (year, is_available_at_year),
+                                           compute_answer)
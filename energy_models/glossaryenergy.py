@@ -119,6 +119,7 @@ class GlossaryEnergy(GlossaryWitnessCore):
     BoolApplyRatio = "is_apply_ratio"
     BoolApplyStreamRatio = "is_stream_demand"
     BoolApplyResourceRatio = "is_apply_resource_ratio"
+    BoolStoreAgeDistribProduction = "store_age_distrib_production"
     AllStreamsDemandRatioValue = "all_streams_demand_ratio"
     FlueGasMean = "flue_gas_mean"
     MarginValue = "margin"
@@ -171,9 +171,6 @@ class UnmanagedWood(BiomassDryTechno):
 
         mean_age_df = pd.DataFrame({GlossaryEnergy.Years: self.years})
 
-        self.age_distrib_prod_df['age_x_prod'] = self.age_distrib_prod_df['age'] * \
-                                                 self.age_distrib_prod_df[f'distrib_prod ({self.product_unit})']
-
         production = self.production_woratio[f'{self.energy_name} ({self.product_unit})']
 
         # compute production for non energy at year start with percentages
@@ -182,9 +179,9 @@ class UnmanagedWood(BiomassDryTechno):
         wood_year_start_production = production[0] * self.techno_infos_dict['non_residue_density_percentage'] * \
                                      (1 - self.techno_infos_dict['wood_percentage_for_energy'])
 
-        mean_age_df['mean age'] = self.age_distrib_prod_df.groupby(
-            [GlossaryEnergy.Years], as_index=False).agg({'age_x_prod': 'sum'})['age_x_prod'] / \
-                                  (production + residue_year_start_production + wood_year_start_production)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean_age_df['mean age'] = self.compute_age_x_production() / \
+                                      (production + residue_year_start_production + wood_year_start_production).values
         mean_age_df.replace([np.inf, -np.inf], np.nan, inplace=True)
         mean_age_df.fillna(0.0, inplace=True)
         self.mean_age_df = mean_age_df
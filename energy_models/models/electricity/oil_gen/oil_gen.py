@@ -14,8 +14,8 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 '''
-import numpy as np
 
+from energy_models.core.jacobian_blocks import DiagonalJacobianBlock
 from energy_models.core.stream_type.carbon_models.carbon_capture import CarbonCapture
 from energy_models.core.stream_type.carbon_models.nitrous_oxide import N2O
 from energy_models.core.stream_type.energy_models.heat import hightemperatureheat
@@ -59,7 +59,7 @@ class OilGen(ElectricityTechno):
         '''
         liquid_fuel_needs = self.techno_infos_dict['fuel_demand']
         efficiency = self.compute_efficiency()
-        return {LiquidFuel.name: np.diag(liquid_fuel_needs / efficiency)}
+        return {LiquidFuel.name: DiagonalJacobianBlock(liquid_fuel_needs / efficiency)}
 
 
     def compute_dprod_dinvest(self, capex_list, invest_list, invest_before_year_start, techno_dict,
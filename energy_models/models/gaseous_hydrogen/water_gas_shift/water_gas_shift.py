@@ -21,20 +21,17 @@ from sostrades_core.tools.base_functions.exp_min import compute_dfunc_with_exp_m
 from energy_models.core.stream_type.carbon_models.carbon_capture import CarbonCapture
 from energy_models.core.stream_type.carbon_models.carbon_dioxyde import CO2
 from energy_models.core.stream_type.carbon_models.carbon_monoxyde import CO
-from energy_models.core.stream_type.energy_models.gaseous_hydrogen import (
-    GaseousHydrogen,
-)
 from energy_models.core.stream_type.energy_models.methane import Methane
-from energy_models.core.stream_type.energy_models.syngas import (
-    compute_calorific_value as compute_syngas_calorific_value,
-)
-from energy_models.core.stream_type.energy_models.syngas import (
-    compute_molar_mass as compute_syngas_molar_mass,
-)
 from energy_models.core.stream_type.resources_models.water import Water
 from energy_models.core.techno_type.base_techno_models.gaseous_hydrogen_techno import (
     GaseousHydrogenTechno,
 )
+from energy_models.core.techno_type.syngas_ratio_sensitivity import (
+    compute_dcapex_dsyngas_ratio,
+    compute_linear_interpolant,
+    compute_syngas_ratio_sensitivity,
+    is_syngas_ratio_sensitivity_up_to_date,
+)
 from energy_models.glossaryenergy import GlossaryEnergy
 
 
@@ -47,7 +44,7 @@ class WGS(GaseousHydrogenTechno):
         self.inputs_dict = None
         self.available_power = None
         self.slope_capex = None
-        self.syngas_ratio = None
+        self.syngas_ratio_sensitivity = None
 
     def configure_parameters_update(self, inputs_dict):
         GaseousHydrogenTechno.configure_parameters_update(self, inputs_dict)
@@ -91,21 +88,22 @@ class WGS(GaseousHydrogenTechno):
         initial_sg_ratio = 0.3 / 0.3
         delta_sg_ratio = initial_sg_ratio - final_sg_ratio
 
-        self.slope_capex = (
-                                   capex_list[0] - capex_list[1]) / (delta_sg_ratio[0] - delta_sg_ratio[1])
-        b = capex_list[0] - self.slope_capex * delta_sg_ratio[0]
-
-        def func_capex(delta_sg_ratio):
-            return self.slope_capex * delta_sg_ratio + b
-
-        #         func_capex_a = sc.interp1d(delta_sg_ratio, capex_list,
-        #                                    kind='linear', fill_value='extrapolate')
-
-        capex_init = func_capex(
-            self.syngas_ratio[0] - self.needed_syngas_ratio)
+        self.slope_capex, b = compute_linear_interpolant(delta_sg_ratio, capex_list)
+        capex_init = self.slope_capex * (self.syngas_ratio[0] - self.needed_syngas_ratio) + b
 
         return capex_init * 1000.0
 
+    def get_syngas_ratio_sensitivity(self, syngas_ratio=None):
+        '''
+        Molar balances of the transformation and their derivatives wrt the syngas ratio, computed once for all years
+        '''
+        if syngas_ratio is None:
+            syngas_ratio = self.syngas_ratio
+        if not is_syngas_ratio_sensitivity_up_to_date(self.syngas_ratio_sensitivity, syngas_ratio,
+                                                      self.needed_syngas_ratio):
+            self.syngas_ratio_sensitivity = compute_syngas_ratio_sensitivity(syngas_ratio, self.needed_syngas_ratio)
+        return self.syngas_ratio_sensitivity
+
     def get_electricity_needs(self):
 
         elec_power = self.techno_infos_dict['elec_demand']
@@ -119,111 +117,13 @@ class WGS(GaseousHydrogenTechno):
         """
         Compute dsyngas_needs_dsyngas_ratio
         """
-        mol_syngas = 1.0
-        mol_H2 = (1.0 + self.syngas_ratio) / \
-                 (1.0 + self.needed_syngas_ratio)
-
-        needed_syngas_molar_mass = compute_syngas_molar_mass(
-            self.needed_syngas_ratio)
-        needed_calorific_value = compute_syngas_calorific_value(
-            self.needed_syngas_ratio)
-
-        molar_mass = (self.syngas_ratio * CO.data_energy_dict['molar_mass'] +
-                      GaseousHydrogen.data_energy_dict['molar_mass']) / (1.0 + self.syngas_ratio)
-
-        molmassup = (self.syngas_ratio * CO.data_energy_dict['molar_mass'] +
-                     GaseousHydrogen.data_energy_dict['molar_mass'])
-
-        molmassdown = (1.0 + self.syngas_ratio)
-
-        dmolmassup = CO.data_energy_dict['molar_mass']
-
-        dmolmassdown = 1.0
-
-        dmolarmass_dsyngas = (dmolmassup * molmassdown -
-                              dmolmassdown * molmassup) / molmassdown ** 2
-
-        calorific_value = (self.syngas_ratio * CO.data_energy_dict['molar_mass'] * CO.data_energy_dict[
-            'calorific_value'] +
-                           GaseousHydrogen.data_energy_dict['molar_mass'] * GaseousHydrogen.data_energy_dict[
-                               'calorific_value']) / (
-                                  GaseousHydrogen.data_energy_dict['molar_mass'] + self.syngas_ratio *
-                                  CO.data_energy_dict['molar_mass'])
-
-        calup = (self.syngas_ratio * CO.data_energy_dict['molar_mass'] * CO.data_energy_dict['calorific_value'] +
-                 GaseousHydrogen.data_energy_dict['molar_mass'] * GaseousHydrogen.data_energy_dict['calorific_value'])
-
-        caldown = (GaseousHydrogen.data_energy_dict['molar_mass'] +
-                   self.syngas_ratio * CO.data_energy_dict['molar_mass'])
-
-        dcalup = CO.data_energy_dict['molar_mass'] * \
-                 CO.data_energy_dict['calorific_value']
-
-        dcaldown = CO.data_energy_dict['molar_mass']
-
-        dcalorific_val_dsyngas = (
-                                         dcalup * caldown - dcaldown * calup) / (caldown ** 2)
-
-        syngasup = mol_syngas * molar_mass * calorific_value
-        dsyngasup1 = mol_syngas * \
-                     (dmolarmass_dsyngas * calorific_value +
-                      molar_mass * dcalorific_val_dsyngas)
-
-        syngasdown = mol_H2 * needed_syngas_molar_mass * needed_calorific_value
-
-        dsyngasdown = needed_syngas_molar_mass * needed_calorific_value / \
-                      (1.0 + self.needed_syngas_ratio)
-
-        dsyngas_needs_dsyngas_ratio = (dsyngasup1 * syngasdown -
-                                       syngasup * dsyngasdown) / syngasdown ** 2
-
-        return dsyngas_needs_dsyngas_ratio
+        return self.get_syngas_ratio_sensitivity()['wgs_dsyngas_needs']
 
     def compute_dwater_needs_dsyngas_ratio(self):
         """
-        Compute dsyngas_needs_dsyngas_ratio
+        Compute dwater_needs_dsyngas_ratio
         """
-
-        mol_H20 = (self.syngas_ratio - self.needed_syngas_ratio) / \
-                  (1.0 + self.needed_syngas_ratio)
-
-        # needed syngas_ratio could be 0 in this case syngas is H2
-        needed_syngas_molar_mass = compute_syngas_molar_mass(
-            self.needed_syngas_ratio)
-        needed_calorific_value = compute_syngas_calorific_value(
-            self.needed_syngas_ratio)
-
-        mol_H20up = (self.syngas_ratio - self.needed_syngas_ratio)
-        dmol_H20up = 1
-
-        molH20down = (1.0 + self.needed_syngas_ratio)
-        dmolH20down = 0.0
-
-        dmol_H20_dsyngas_ratio = (
-                                         dmol_H20up * molH20down - dmolH20down * mol_H20up) / molH20down ** 2
-
-        mol_H2 = (1.0 + self.syngas_ratio) / \
-                 (1.0 + self.needed_syngas_ratio)
-
-        dmol_H2up = 1.0
-
-        mol_H2down = (1.0 + self.needed_syngas_ratio)
-
-        dmol_H2_dsyngas_ratio = (dmol_H2up * mol_H2down) / mol_H2down ** 2
-
-        water_data = Water.data_energy_dict
-        waterup = mol_H20 * water_data['molar_mass']
-        dwaterup = water_data['molar_mass'] * dmol_H20_dsyngas_ratio
-
-        waterdown = (mol_H2 * needed_syngas_molar_mass *
-                     needed_calorific_value)
-        dwaterdown = needed_syngas_molar_mass * \
-                     needed_calorific_value * dmol_H2_dsyngas_ratio
-
-        dwater_needs_dsyngas_ratio = (
-                                             dwaterup * waterdown - dwaterdown * waterup) / waterdown ** 2
-
-        return dwater_needs_dsyngas_ratio
+        return self.get_syngas_ratio_sensitivity()['wgs_dwater_needs']
 
     def compute_delec_needs_dsyngas_ratio(self, dprod_dsyngas):
         """
@@ -260,129 +160,22 @@ class WGS(GaseousHydrogenTechno):
                                                                                                                                                 :,
                                                                                                                                                 np.newaxis]
 
-    def compute_dco2_prod_dsyngas_ratio(self, mol_CO2, mol_H2, co2_molar_mass, needed_syngas_molar_mass,
-                                        needed_calorific_value, dmol_CO2_dsyngas_ratio, dmol_H2_dsyngas_ratio):
-
-        co2_prod_up = mol_CO2 * co2_molar_mass
-
-        co2_prod_down = (mol_H2 * needed_syngas_molar_mass *
-                         needed_calorific_value)
-
-        dco2_prod_up_dsyngas_ratio = dmol_CO2_dsyngas_ratio * \
-                                     co2_molar_mass
-        dco2_prod_down_dsyngas_ratio = dmol_H2_dsyngas_ratio * \
-                                       needed_syngas_molar_mass * needed_calorific_value
-
-        return (dco2_prod_up_dsyngas_ratio * co2_prod_down -
-                dco2_prod_down_dsyngas_ratio * co2_prod_up) / co2_prod_down ** 2
-
     def compute_dcapex_dsyngas_ratio(self):
 
         capex_init = self.check_capex_unity(
             self.techno_infos_dict)
-
-        if 'complex128' in [type(self.initial_production), type(self.slope_capex), capex_init.dtype,
-                            self.cost_details[GlossaryEnergy.InvestValue].values.dtype]:
-            arr_type = 'complex128'
-        else:
-            arr_type = 'float64'
-        capex_grad = np.zeros(
-            (len(self.years), len(self.years)), dtype=arr_type)
-
         expo_factor = self.compute_expo_factor(
             self.techno_infos_dict)
-
-        dqlist = []
-        qlist = []
-        invest_sum = self.initial_production * capex_init
-        dinvest_sum = self.initial_production * 1000.0 * self.slope_capex
-        capex_year = capex_init
-        capex_grad[0][0] = 1000.0 * self.slope_capex
         invest_list = self.cost_details[GlossaryEnergy.InvestValue].values
-        if min(invest_list.real) < 0:
-            invest_list_2 = np.maximum(1e-12, invest_list)
-
-        else:
-            invest_list_2 = invest_list.copy()
-        invest_list_sign = np.sign(invest_list.real)
-        for i, invest in enumerate(invest_list_2):
-
-            if invest_sum.real < 10.0 or i == 0.0:
-                capex_year = capex_init
-                capex_grad[i][0] = 1000.0 * self.slope_capex
-
-            else:
-
-                q = ((invest_sum + invest) / invest_sum) ** (-expo_factor)
-
-                #                 dq = -expo_factor * ((invest_sum + invest) / invest_sum) ** (-expo_factor -
-                # 1.0) * (-dinvest_sum * invest / (invest_sum * invest_sum))
-                if invest_list_sign[i] == -1:
-                    dq = 0.0
-                else:
-                    dq = dinvest_sum * expo_factor * invest * \
-                         q / (invest_sum * (invest_sum + invest))
-
-                if q.real < 0.95:
-                    dq = 0.05 * np.exp(q - 0.9) * dq
-                    q = 0.9 + 0.05 * np.exp(q - 0.9)
 
-                dqlist.append(dq)
-                qlist.append(q)
-
-                capex_grad[i][0] = q * capex_grad[i - 1][0] + dq * capex_year
-
-                capex_year = capex_year * q
-
-            invest_sum += invest
-
-        if 'maximum_learning_capex_ratio' in self.techno_infos_dict:
-            maximum_learning_capex_ratio = self.techno_infos_dict['maximum_learning_capex_ratio']
-        else:
-            maximum_learning_capex_ratio = 0.9
-        # dcapex = maximum_learning_capex_ratio*dcapex_init + (1.0 - maximum_learning_capex_ratio)*dcapex
-        capex_grad = maximum_learning_capex_ratio * capex_grad[0][0] * np.insert(
-            np.zeros((len(self.years), len(self.years) - 1)), 0, np.ones(len(self.years)), axis=1) + \
-                     (1.0 - maximum_learning_capex_ratio) * capex_grad
-        return capex_grad
+        return compute_dcapex_dsyngas_ratio(
+            np.maximum(1e-12, invest_list) if min(invest_list.real) < 0 else invest_list, capex_init,
+            1000.0 * self.slope_capex, self.initial_production, self.initial_production * 1000.0 * self.slope_capex,
+            expo_factor, self.techno_infos_dict.get('maximum_learning_capex_ratio', 0.9),
+            differentiated_invests=np.sign(invest_list.real) != -1)
 
     def compute_dprice_CO2_fact_dsyngas_ratio(self):
-
-        co2_data = CO2.data_energy_dict
-        needed_syngas_molar_mass = compute_syngas_molar_mass(
-            self.needed_syngas_ratio)
-        needed_calorific_value = compute_syngas_calorific_value(
-            self.needed_syngas_ratio)
-        mol_H2 = (1.0 + self.syngas_ratio) / \
-                 (1.0 + self.needed_syngas_ratio)
-        mol_CO2 = self.syngas_ratio - self.needed_syngas_ratio * mol_H2
-
-        dmol_H2up = 1.0
-
-        mol_H2down = (1.0 + self.needed_syngas_ratio)
-
-        dmol_H2_dsyngas_ratio = (dmol_H2up * mol_H2down) / mol_H2down ** 2
-
-        dmol_CO2_dsyngas_ratio = 1 - self.needed_syngas_ratio * dmol_H2_dsyngas_ratio
-
-        co2_prod_up = mol_CO2 * co2_data['molar_mass']
-        dco2_prod_up_dsyngas_ratio = dmol_CO2_dsyngas_ratio * \
-                                     co2_data['molar_mass']
-
-        co2_prod_down = (mol_H2 * needed_syngas_molar_mass *
-                         needed_calorific_value)
-
-        dco2_prod_down_dsyngas_ratio = dmol_H2_dsyngas_ratio * \
-                                       needed_syngas_molar_mass * needed_calorific_value
-
-        dco2_prod_syngas_ratio = (dco2_prod_up_dsyngas_ratio * co2_prod_down -
-                                  dco2_prod_down_dsyngas_ratio * co2_prod_up) / co2_prod_down ** 2
-
-        #         dprice_CO2_fact = dco2_prod_syngas_ratio * \
-        #             self.inputs_dict[GlossaryEnergy.CO2TaxesValue].loc[self.inputs_dict[GlossaryEnergy.CO2TaxesValue][GlossaryEnergy.Years]
-        #                                               <= self.cost_details[GlossaryEnergy.Years].max()][GlossaryEnergy.CO2Tax].values
-
-        return dco2_prod_syngas_ratio
+        return self.get_syngas_ratio_sensitivity()['wgs_dco2_prod']
 
     def dtotal_co2_emissions_dsyngas_ratio(self):
 
@@ -445,29 +238,8 @@ class WGS(GaseousHydrogenTechno):
                                self.resources_prices[Water.name].to_numpy(
                                ) / efficiency[:, np.newaxis]
 
-        mol_H2 = (1.0 + self.syngas_ratio) / \
-                 (1.0 + self.needed_syngas_ratio)
-
-        dmol_H2up = 1.0
-
-        mol_H2down = (1.0 + self.needed_syngas_ratio)
-
-        dmol_H2_dsyngas_ratio = (dmol_H2up * mol_H2down) / mol_H2down ** 2
-
-        needed_syngas_molar_mass = compute_syngas_molar_mass(
-            self.needed_syngas_ratio)
-        needed_calorific_value = compute_syngas_calorific_value(
-            self.needed_syngas_ratio)
         # # CO2 emissions
-        co2_data = CO2.data_energy_dict
-        mol_CO2 = self.syngas_ratio - self.needed_syngas_ratio * mol_H2
-
-        dmol_CO2_dsyngas_ratio = 1 - \
-                                 self.needed_syngas_ratio * dmol_H2_dsyngas_ratio
-
-        dco2_prod_dsyngas_ratio = self.compute_dco2_prod_dsyngas_ratio(
-            mol_CO2, mol_H2, co2_data['molar_mass'], needed_syngas_molar_mass, needed_calorific_value,
-            dmol_CO2_dsyngas_ratio, dmol_H2_dsyngas_ratio)
+        dco2_prod_dsyngas_ratio = self.compute_dprice_CO2_fact_dsyngas_ratio()
 
         dco2_syngas_dsyngas_ratio = self.dco2_syngas_dsyngas_ratio()
 
@@ -518,8 +290,6 @@ class WGS(GaseousHydrogenTechno):
 
     def compute_dprod_dfluegas(self, capex_list, invest_list, invest_before_year_start, techno_dict, dcapexdfluegas):
 
-        # dpprod_dpfluegas = np.zeros(dcapexdfluegas.shape())
-
         dprod_dcapex = self.compute_dprod_dcapex(
             capex_list, invest_list, techno_dict, invest_before_year_start)
 
@@ -529,16 +299,11 @@ class WGS(GaseousHydrogenTechno):
             arr_type = 'float64'
 
         # dprod_dfluegas = dpprod_dpfluegas + dprod_dcapex * dcapexdfluegas
-        dprod_dfluegas = np.zeros(dprod_dcapex.shape, dtype=arr_type)
         dinvest_exp_min = compute_dfunc_with_exp_min(invest_list, 1e-12)
 
         dcapexdfluegas *= dinvest_exp_min
-        for line in range(dprod_dcapex.shape[0]):
-            for column in range(dprod_dcapex.shape[1]):
-                dprod_dfluegas[line, column] = np.matmul(
-                    dprod_dcapex[line, :], dcapexdfluegas[:, column])
 
-        return dprod_dfluegas
+        return np.matmul(dprod_dcapex, dcapexdfluegas).astype(arr_type)
 
     def compute_byproducts_production(self):
         co2_prod = self.get_theoretical_co2_prod()
@@ -559,25 +324,7 @@ class WGS(GaseousHydrogenTechno):
         c = (r1-r2)/(1+r2)
         d = r1 - r2(1+r1)/(1+r2)
         '''
-
-        mol_H2 = (1.0 + syngas_ratio) / (1.0 + self.needed_syngas_ratio)
-        mol_syngas = 1.0
-
-        # r1*mmCO + mmH2/(1+r1)
-        syngas_molar_mass = compute_syngas_molar_mass(syngas_ratio)
-        syngas_calorific_value = compute_syngas_calorific_value(
-            syngas_ratio)
-
-        # needed syngas_ratio could be 0 in this case syngas is H2
-        needed_syngas_molar_mass = compute_syngas_molar_mass(
-            self.needed_syngas_ratio)
-        needed_calorific_value = compute_syngas_calorific_value(
-            self.needed_syngas_ratio)
-        syngas_needs = mol_syngas * syngas_molar_mass * syngas_calorific_value / \
-                       (mol_H2 * needed_syngas_molar_mass *
-                        needed_calorific_value)
-
-        return syngas_needs
+        return self.get_syngas_ratio_sensitivity(syngas_ratio)['wgs_syngas_needs']
 
     def get_theoretical_water_needs(self):
         ''' 
@@ -587,23 +334,7 @@ class WGS(GaseousHydrogenTechno):
         c = (r1-r2)/(1+r2)
         d = r1 - r2(1+r1)/(1+r2)
         '''
-
-        mol_H20 = (self.syngas_ratio - self.needed_syngas_ratio) / \
-                  (1.0 + self.needed_syngas_ratio)
-        mol_H2 = (1.0 + self.syngas_ratio) / (1.0 + self.needed_syngas_ratio)
-
-        # needed syngas_ratio could be 0 in this case syngas is H2
-        needed_syngas_molar_mass = compute_syngas_molar_mass(
-            self.needed_syngas_ratio)
-        needed_calorific_value = compute_syngas_calorific_value(
-            self.needed_syngas_ratio)
-
-        water_data = Water.data_energy_dict
-        water_needs = mol_H20 * water_data['molar_mass'] / \
-                      (mol_H2 * needed_syngas_molar_mass *
-                       needed_calorific_value)
-
-        return water_needs
+        return self.get_syngas_ratio_sensitivity()['wgs_water_needs']
 
     def get_theoretical_co2_prod(self, unit='kg/kWh'):
         ''' 
@@ -611,25 +342,12 @@ class WGS(GaseousHydrogenTechno):
         1 mol of CO2 for 4 mol of H2
         Warning : molar mass is in g/mol but we divide and multiply by one
         '''
-
-        mol_H2 = (1.0 + self.syngas_ratio) / (1.0 + self.needed_syngas_ratio)
-        mol_CO2 = self.syngas_ratio - self.needed_syngas_ratio * mol_H2
-
-        co2_data = CO2.data_energy_dict
-
-        # needed syngas_ratio could be 0 in this case syngas is H2
-        needed_syngas_molar_mass = compute_syngas_molar_mass(
-            self.needed_syngas_ratio)
-        needed_calorific_value = compute_syngas_calorific_value(
-            self.needed_syngas_ratio)
-
+        sensitivity = self.get_syngas_ratio_sensitivity()
         if unit == 'kg/kWh':
-            co2_prod = mol_CO2 * co2_data['molar_mass'] / \
-                       (mol_H2 * needed_syngas_molar_mass *
-                        needed_calorific_value)
+            co2_prod = sensitivity['wgs_co2_prod']
         elif unit == 'kg/kg':
-            co2_prod = mol_CO2 * co2_data['molar_mass'] / \
-                       (mol_H2 * needed_syngas_molar_mass)
+            co2_prod = sensitivity['wgs_mol_co2'] * CO2.data_energy_dict['molar_mass'] / \
+                       (sensitivity['wgs_mol_h2'] * sensitivity['needed_molar_mass'])
         else:
             raise Exception("unit not handled")
 
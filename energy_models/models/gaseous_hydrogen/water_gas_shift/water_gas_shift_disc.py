@@ -20,13 +20,6 @@ from copy import deepcopy
 import numpy as np
 import pandas as pd
 
-from energy_models.core.stream_type.carbon_models.carbon_dioxyde import CO2
-from energy_models.core.stream_type.energy_models.syngas import (
-    compute_calorific_value as compute_syngas_calorific_value,
-)
-from energy_models.core.stream_type.energy_models.syngas import (
-    compute_molar_mass as compute_syngas_molar_mass,
-)
 from energy_models.core.techno_type.disciplines.gaseous_hydrogen_techno_disc import (
     GaseousHydrogenTechnoDiscipline,
 )
@@ -119,16 +112,7 @@ class WaterGasShiftDiscipline(GaseousHydrogenTechnoDiscipline):
 
         GaseousHydrogenTechnoDiscipline.compute_sos_jacobian(self)
 
-        syngas_ratio = self.techno_model.syngas_ratio
-
         inputs_dict = self.get_sosdisc_inputs()
-        ##############
-        needed_syngas_molar_mass = compute_syngas_molar_mass(
-            self.techno_model.needed_syngas_ratio)
-        needed_calorific_value = compute_syngas_calorific_value(
-            self.techno_model.needed_syngas_ratio)
-
-        ###################
 
         dsyngas_needs_dsyngas_ratio = self.techno_model.compute_dsyngas_needs_dsyngas_ratio()
 
@@ -179,29 +163,8 @@ class WaterGasShiftDiscipline(GaseousHydrogenTechnoDiscipline):
             (GlossaryEnergy.TechnoDetailedPricesValue, 'energy_and_resources_costs'), ('syngas_ratio',),
             (dsyngas_dsyngas_ratio + dwater_dsyngas_ratio) / 100.0)
 
-        mol_H2 = (1.0 + syngas_ratio) / \
-                 (1.0 + self.techno_model.needed_syngas_ratio)
-
-        dmol_H2up = 1.0
-
-        mol_H2down = (1.0 + self.techno_model.needed_syngas_ratio)
-
-        dmol_H2_dsyngas_ratio = (dmol_H2up * mol_H2down) / mol_H2down ** 2
-
         # # CO2 emissions
-        co2_data = CO2.data_energy_dict
-        mol_CO2 = syngas_ratio - self.techno_model.needed_syngas_ratio * mol_H2
-
-        dmol_CO2_dsyngas_ratio = 1 - \
-                                 self.techno_model.needed_syngas_ratio * dmol_H2_dsyngas_ratio
-
-        #         co2_prod = mol_CO2 * co2_data['molar_mass'] / \
-        #             (mol_H2 * needed_syngas_molar_mass *
-        #              needed_calorific_value)
-
-        dco2_prod_dsyngas_ratio = self.techno_model.compute_dco2_prod_dsyngas_ratio(
-            mol_CO2, mol_H2, co2_data['molar_mass'], needed_syngas_molar_mass, needed_calorific_value,
-            dmol_CO2_dsyngas_ratio, dmol_H2_dsyngas_ratio)
+        dco2_prod_dsyngas_ratio = self.techno_model.compute_dprice_CO2_fact_dsyngas_ratio()
 
         #         self.set_partial_derivative_for_other_types(
         #             (GlossaryEnergy.CO2EmissionsValue, 'production'),  ('syngas_ratio',), np.identity(len(self.techno_model.years)) * dco2_prod_dsyngas_ratio)
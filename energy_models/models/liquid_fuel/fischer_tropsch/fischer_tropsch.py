@@ -14,15 +14,13 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 '''
-from functools import reduce
-from operator import mul
-
 import numpy as np
 import pandas as pd
 from climateeconomics.core.core_resources.resource_mix.resource_mix import (
     ResourceMixModel,
 )
 
+from energy_models.core.jacobian_blocks import DiagonalJacobianBlock
 from energy_models.core.stream_type.carbon_models.carbon_capture import CarbonCapture
 from energy_models.core.stream_type.carbon_models.carbon_dioxyde import CO2
 from energy_models.core.stream_type.energy_models.electricity import Electricity
@@ -37,6 +35,10 @@ from energy_models.core.stream_type.resources_models.water import Water
 from energy_models.core.techno_type.base_techno_models.liquid_fuel_techno import (
     LiquidFuelTechno,
 )
+from energy_models.core.techno_type.syngas_ratio_sensitivity import (
+    compute_syngas_ratio_sensitivity,
+    is_syngas_ratio_sensitivity_up_to_date,
+)
 from energy_models.database_witness_energy import DatabaseWitnessEnergy
 from energy_models.glossaryenergy import GlossaryEnergy
 from energy_models.models.gaseous_hydrogen.water_gas_shift.water_gas_shift import WGS
@@ -76,6 +78,7 @@ class FischerTropsch(LiquidFuelTechno):
         self.consumption = None
         self.production = None
         self.slope_capex = None
+        self.syngas_ratio_sensitivity = None
 
     def configure_parameters_update(self, inputs_dict):
         LiquidFuelTechno.configure_parameters_update(self, inputs_dict)
@@ -112,6 +115,7 @@ class FischerTropsch(LiquidFuelTechno):
         nb_years = self.year_end - self.year_start + 1
         sg_needs_efficiency = [self.get_theoretical_syngas_needs_for_FT(
         ) / self.cost_details['efficiency']] * nb_years
+        dsg_needs_efficiency = DiagonalJacobianBlock(sg_needs_efficiency[0])
 
         # in kwh of fuel by kwh of liquid_fuel
 
@@ -134,7 +138,7 @@ class FischerTropsch(LiquidFuelTechno):
 
             self.dprice_FT_dsyngas_ratio = self.dprice_FT_wotaxes_dsyngas_ratio + \
                                            dco2_taxes_dsyngas_ratio * \
-                                           (np.identity(len(self.years)) * sg_needs_efficiency) * \
+                                           dsg_needs_efficiency * \
                                            np.sign(np.maximum(
                                                0.0, self.syngas_ratio_techno.carbon_intensity[
                                                    self.sg_transformation_name].values))
@@ -152,7 +156,7 @@ class FischerTropsch(LiquidFuelTechno):
                                                    (np.ones(len(self.years)) * sg_needs_efficiency)
             self.dprice_FT_dsyngas_ratio = self.dprice_FT_wotaxes_dsyngas_ratio + \
                                            dco2_taxes_dsyngas_ratio * \
-                                           (np.identity(len(self.years)) * sg_needs_efficiency) * \
+                                           dsg_needs_efficiency * \
                                            np.sign(np.maximum(
                                                0.0, self.syngas_ratio_techno.carbon_intensity[
                                                    self.sg_transformation_name].values))
@@ -176,7 +180,7 @@ class FischerTropsch(LiquidFuelTechno):
                                                   (np.ones(len(self.years)) * sg_needs_efficiency)
             dprice_FT_dsyngas_ratio_wgs = dprice_FT_wotaxes_dsyngas_ratio_wgs + \
                                           dco2_taxes_dsyngas_ratio_wgs * \
-                                          (np.identity(len(self.years)) * sg_needs_efficiency) * \
+                                          dsg_needs_efficiency * \
                                           np.sign(np.maximum(
                                               0.0, self.syngas_ratio_techno.carbon_intensity['WGS'].values))
 
@@ -196,7 +200,7 @@ class FischerTropsch(LiquidFuelTechno):
                                                    (np.ones(len(self.years)) * sg_needs_efficiency)
             dprice_FT_dsyngas_ratio_RWGS = dprice_FT_wotaxes_dsyngas_ratio_RWGS + \
                                            dco2_taxes_dsyngas_ratio_rwgs * \
-                                           (np.identity(len(self.years)) * sg_needs_efficiency) * \
+                                           dsg_needs_efficiency * \
                                            np.sign(
                                                self.syngas_ratio_techno.carbon_intensity[GlossaryEnergy.RWGS].values) * \
                                            np.sign(np.maximum(
@@ -216,48 +220,24 @@ class FischerTropsch(LiquidFuelTechno):
                 arr_type = 'complex128'
             else:
                 arr_type = 'float64'
-            self.dprice_FT_dsyngas_ratio = np.zeros(
-                (len(self.years), len(self.years)), dtype=arr_type)
-
-            self.dprice_FT_wotaxes_dsyngas_ratio = np.zeros(
-                (len(self.years), len(self.years)), dtype=arr_type)
-
-            if self.syngas_ratio[0] < self.needed_syngas_ratio:
-                techno_first_year = GlossaryEnergy.RWGS
-            else:
-                techno_first_year = 'WGS'
-            for i in range(self.year_end - self.year_start + 1):
-                if self.syngas_ratio[i] < self.needed_syngas_ratio:
-
-                    self.dprice_FT_dsyngas_ratio[i,
-                    :] = dprice_FT_dsyngas_ratio_RWGS[i, :]
-                    self.dprice_FT_wotaxes_dsyngas_ratio[i,
-                    :] = dprice_FT_wotaxes_dsyngas_ratio_RWGS[i, :]
-                    if self.syngas_ratio[i] == 0.:
-                        self.dprice_FT_dsyngas_ratio[i,
-                        :] = dprice_FT_wotaxes_dsyngas_ratio_RWGS[i, :]
-
-                    if techno_first_year == 'WGS':
-                        self.dprice_FT_dsyngas_ratio[i, 0] = 0.0
-                        self.dprice_FT_wotaxes_dsyngas_ratio[i, 0] = 0.0
-
-                    self.cost_details.loc[i, self.sg_transformation_name] = self.costs_details_sg_techno[
-                        f'{GlossaryEnergy.RWGS}_wotaxes'].values[i]
-
-                else:
 
-                    self.dprice_FT_dsyngas_ratio[i,
-                    :] = dprice_FT_dsyngas_ratio_wgs[i, :]
-                    self.dprice_FT_wotaxes_dsyngas_ratio[i,
-                    :] = dprice_FT_wotaxes_dsyngas_ratio_wgs[i, :]
+            rwgs_years = self.syngas_ratio < self.needed_syngas_ratio
+            self.dprice_FT_wotaxes_dsyngas_ratio = np.where(
+                rwgs_years[:, np.newaxis], dprice_FT_wotaxes_dsyngas_ratio_RWGS,
+                dprice_FT_wotaxes_dsyngas_ratio_wgs).astype(arr_type)
+            self.dprice_FT_dsyngas_ratio = np.where(
+                rwgs_years[:, np.newaxis], dprice_FT_dsyngas_ratio_RWGS, dprice_FT_dsyngas_ratio_wgs).astype(arr_type)
+            # no taxes when the syngas ratio is zero
+            zero_ratio_years = self.syngas_ratio == 0.
+            self.dprice_FT_dsyngas_ratio[zero_ratio_years] = self.dprice_FT_wotaxes_dsyngas_ratio[zero_ratio_years]
 
-                    if self.syngas_ratio[i] == 0.:
-                        self.dprice_FT_dsyngas_ratio[i,
-                        :] = dprice_FT_wotaxes_dsyngas_ratio_wgs[i, :]
+            # capex of the techno of the first year does not depend on the syngas ratio of the other techno
+            other_techno_years = rwgs_years != rwgs_years[0]
+            self.dprice_FT_dsyngas_ratio[other_techno_years, 0] = 0.0
+            self.dprice_FT_wotaxes_dsyngas_ratio[other_techno_years, 0] = 0.0
 
-                    if techno_first_year == GlossaryEnergy.RWGS:
-                        self.dprice_FT_dsyngas_ratio[i, 0] = 0.0
-                        self.dprice_FT_wotaxes_dsyngas_ratio[i, 0] = 0.0
+            self.cost_details.loc[rwgs_years, self.sg_transformation_name] = self.costs_details_sg_techno[
+                f'{GlossaryEnergy.RWGS}_wotaxes'].values[rwgs_years]
 
             # We need WGS then RWGS depending on the years
 
@@ -288,36 +268,24 @@ class FischerTropsch(LiquidFuelTechno):
 
         if self.sg_transformation_name in ['WGS', GlossaryEnergy.RWGS]:
 
-            return {Electricity.name: np.identity(len(self.years)) * elec_needs.to_numpy(),
-                    Syngas.name: np.identity(len(self.years)) * (
+            return {Electricity.name: DiagonalJacobianBlock(elec_needs),
+                    Syngas.name: DiagonalJacobianBlock(
                                 self.cost_details['syngas_needs_for_FT'].values *
-                                self.costs_details_sg_techno['syngas_needs'].values) /
-                                 self.cost_details['efficiency'].values}
+                                self.costs_details_sg_techno['syngas_needs'].values /
+                                self.cost_details['efficiency'].values)}
 
         else:
-            dsyngas_dprice = np.zeros(len(self.years))
-            delec_dprice = np.zeros((len(self.years), len(self.years)))
-            for i in range(self.year_end - self.year_start + 1):
-                if self.syngas_ratio[i] < self.needed_syngas_ratio:
-                    # RWGS
-
-                    dsyngas_dprice[i] = (self.cost_details['syngas_needs_for_FT'][i] * self.costs_details_rwgs['syngas_needs'].values[i])
-                    elec_needs = self.costs_details_rwgs[f'{GlossaryEnergy.electricity}_needs'] * \
-                                 self.cost_details['syngas_needs_for_FT'] / \
-                                 self.techno_infos_dict['efficiency']
-                    delec_dprice[i, :] = (np.identity(
-                        len(self.years)) * elec_needs.values[:, np.newaxis])[i, :]
-                else:
-                    dsyngas_dprice[i] = (self.cost_details['syngas_needs_for_FT'][i] * self.syn_needs_wgs[i] /
-                                         self.price_details_wgs['efficiency'][i])
-                    elec_needs = self.price_details_wgs[f'{GlossaryEnergy.electricity}_needs'] * \
-                                 self.cost_details['syngas_needs_for_FT'] / \
-                                 self.techno_infos_dict['efficiency']
-                    delec_dprice[i, :] = (np.identity(
-                        len(self.years)) * elec_needs.values[:, np.newaxis])[i, :]
+            rwgs_years = self.syngas_ratio < self.needed_syngas_ratio
+            syngas_needs_for_FT = self.cost_details['syngas_needs_for_FT'].values
+            dsyngas_dprice = syngas_needs_for_FT * np.where(
+                rwgs_years, self.costs_details_rwgs['syngas_needs'].values,
+                np.asarray(self.syn_needs_wgs) / self.price_details_wgs['efficiency'].values)
+            elec_needs = np.where(rwgs_years, self.costs_details_rwgs[f'{GlossaryEnergy.electricity}_needs'].values,
+                                  self.price_details_wgs[f'{GlossaryEnergy.electricity}_needs'].values) * \
+                         syngas_needs_for_FT / self.techno_infos_dict['efficiency']
+            delec_dprice = DiagonalJacobianBlock(elec_needs)
             return {Electricity.name: delec_dprice,
-                    Syngas.name: np.identity(len(self.years)) * dsyngas_dprice /
-                                 self.cost_details['efficiency'].values
+                    Syngas.name: DiagonalJacobianBlock(dsyngas_dprice / self.cost_details['efficiency'].values)
                     }
 
     def grad_price_vs_resources_price(self):
@@ -338,8 +306,8 @@ class FischerTropsch(LiquidFuelTechno):
                           self.cost_details['syngas_needs_for_FT'] /
                           self.cost_details['efficiency']).values
 
-        return {Water.name: np.diag(water_needs),
-                CO2.name: np.diag(co2_needs),
+        return {Water.name: DiagonalJacobianBlock(water_needs),
+                CO2.name: DiagonalJacobianBlock(co2_needs),
                 }
 
     def grad_co2_emission_vs_resources_co2_emissions(self):
@@ -365,8 +333,8 @@ class FischerTropsch(LiquidFuelTechno):
                           self.cost_details['syngas_needs_for_FT'] /
                           self.cost_details['efficiency']).values
 
-        return {Water.name: np.identity(len(self.years)) * water_needs,
-                CO2.name: np.identity(len(self.years)) * co2_needs,
+        return {Water.name: DiagonalJacobianBlock(water_needs),
+                CO2.name: DiagonalJacobianBlock(co2_needs),
                 }
 
     def compute_rwgs_contribution(self, sg_ratio):
@@ -671,9 +639,9 @@ class FischerTropsch(LiquidFuelTechno):
 
             dsyngasco2_dsyngasratio = self.syngas_ratio_techno.dtotal_co2_emissions_dsyngas_ratio()
 
-            dsyngas_co2_emissions_dsyngas_ratio_wgs = np.identity(len(
-                self.years)) * (dsyngasco2_dsyngasratio * self.cost_details['syngas_needs_for_FT'].values /
-                                self.cost_details['efficiency'].values)
+            dsyngas_co2_emissions_dsyngas_ratio_wgs = DiagonalJacobianBlock(
+                dsyngasco2_dsyngasratio * self.cost_details['syngas_needs_for_FT'].values /
+                self.cost_details['efficiency'].values)
 
             return dsyngas_co2_emissions_dsyngas_ratio_wgs
         #             return {CO2.name: dco2_emissions_dsyngas_ratio_wgs,
@@ -687,9 +655,9 @@ class FischerTropsch(LiquidFuelTechno):
 
             dsyngasco2_dsyngasratio = self.syngas_ratio_techno.dtotal_co2_emissions_dsyngas_ratio()
 
-            dsyngas_co2_emissions_dsyngas_ratio_rwgs = np.identity(len(
-                self.years)) * (dsyngasco2_dsyngasratio * self.cost_details['syngas_needs_for_FT'].values /
-                                self.cost_details['efficiency'].values)
+            dsyngas_co2_emissions_dsyngas_ratio_rwgs = DiagonalJacobianBlock(
+                dsyngasco2_dsyngasratio * self.cost_details['syngas_needs_for_FT'].values /
+                self.cost_details['efficiency'].values)
 
             return dsyngas_co2_emissions_dsyngas_ratio_rwgs
         #             return {CO2.name: dco2_emission_dsyngas_ratio_rwgs,
@@ -703,15 +671,15 @@ class FischerTropsch(LiquidFuelTechno):
             # WGS
             dsyngasco2_dsyngasratio_wgs = self.syngas_ratio_techno_wgs.dtotal_co2_emissions_dsyngas_ratio()
 
-            dsyngas_co2_emissions_dsyngas_ratio_wgs = np.identity(len(
-                self.years)) * (dsyngasco2_dsyngasratio_wgs * self.cost_details['syngas_needs_for_FT'].values /
-                                self.cost_details['efficiency'].values)
+            dsyngas_co2_emissions_dsyngas_ratio_wgs = DiagonalJacobianBlock(
+                dsyngasco2_dsyngasratio_wgs * self.cost_details['syngas_needs_for_FT'].values /
+                self.cost_details['efficiency'].values)
 
             dsyngasco2_dsyngasratio_rwgs = self.syngas_ratio_techno_rwgs.dtotal_co2_emissions_dsyngas_ratio()
 
-            dsyngas_co2_emissions_dsyngas_ratio_rwgs = np.identity(len(
-                self.years)) * (dsyngasco2_dsyngasratio_rwgs * self.cost_details['syngas_needs_for_FT'].values /
-                                self.cost_details['efficiency'].values)
+            dsyngas_co2_emissions_dsyngas_ratio_rwgs = DiagonalJacobianBlock(
+                dsyngasco2_dsyngasratio_rwgs * self.cost_details['syngas_needs_for_FT'].values /
+                self.cost_details['efficiency'].values)
 
             #             dco2_emission_dsyngas_ratio = np.zeros(
             #                 (len(self.years), len(self.years)))
@@ -725,28 +693,10 @@ class FischerTropsch(LiquidFuelTechno):
             else:
                 arr_type = 'float64'
 
-            dtotal_emission_dsyngas_ratio = np.zeros(
-                (len(self.years), len(self.years)), dtype=arr_type)
-            for i in range(self.year_end - self.year_start + 1):
-                if self.syngas_ratio[i] < self.needed_syngas_ratio:
-                    # RWGS
-                    #                     dco2_emission_dsyngas_ratio[i,
-                    #                                                 :] = dco2_emission_dsyngas_ratio_rwgs[i, :]
-                    #                     dsyngas_emission_dsyngas_ratio[i,
-                    #                                                    :] = dsyngas_co2_emissions_dsyngas_ratio_rwgs[i, :] - dco2_emission_dsyngas_ratio_rwgs[i, :] - delectricity_emission_dsyngas_ratio_rwgs[i, :]
-                    #                     delec_emission_dsyngas_ratio[i,
-                    #                                                  :] = delectricity_emission_dsyngas_ratio_rwgs[i, :]
-                    dtotal_emission_dsyngas_ratio[i,
-                    :] = dsyngas_co2_emissions_dsyngas_ratio_rwgs[i, :]
-                else:
-                    #                     dco2_emission_dsyngas_ratio[i,
-                    #                                                 :] = dco2_emissions_dsyngas_ratio_wgs[i, :]
-                    #                     dsyngas_emission_dsyngas_ratio[i,
-                    #                                                    :] = dsyngas_co2_emissions_dsyngas_ratio_wgs[i, :] - dco2_emissions_dsyngas_ratio_wgs[i, :]
-                    #                     delec_emission_dsyngas_ratio[i, :] = np.zeros(
-                    #                         len(self.years),)
-                    dtotal_emission_dsyngas_ratio[i,
-                    :] = dsyngas_co2_emissions_dsyngas_ratio_wgs[i, :]
+            rwgs_years = self.syngas_ratio < self.needed_syngas_ratio
+            dtotal_emission_dsyngas_ratio = DiagonalJacobianBlock(np.where(
+                rwgs_years, dsyngas_co2_emissions_dsyngas_ratio_rwgs.diagonal,
+                dsyngas_co2_emissions_dsyngas_ratio_wgs.diagonal).astype(arr_type))
             return dtotal_emission_dsyngas_ratio
 
     #             return {CO2.name: dco2_emission_dsyngas_ratio,
@@ -790,10 +740,21 @@ class FischerTropsch(LiquidFuelTechno):
 
         return water_prod
 
-    def compute_dcapex_dsyngas_ratio(self):
+    def get_syngas_ratio_sensitivity(self):
+        '''
+        Molar balances of the syngas ratio transformations and their derivatives wrt the syngas ratio of FT inputs
+        '''
+        if not is_syngas_ratio_sensitivity_up_to_date(self.syngas_ratio_sensitivity, self.syngas_ratio,
+                                                      self.needed_syngas_ratio):
+            self.syngas_ratio_sensitivity = compute_syngas_ratio_sensitivity(self.syngas_ratio,
+                                                                             self.needed_syngas_ratio)
+        return self.syngas_ratio_sensitivity
 
-        invest_sum = 0.0
-        capex_year = 0.0
+    def compute_dcapex_dsyngas_ratio(self, slope_capex=0.0):
+        '''
+        Jacobian of the learning capex wrt the syngas ratio, only the first column is non zero
+        :param slope_capex: derivative of capex_init wrt the syngas ratio, the FT capex_init does not depend on it
+        '''
         capex_init = self.check_capex_unity(
             self.techno_infos_dict)
 
@@ -809,9 +770,7 @@ class FischerTropsch(LiquidFuelTechno):
         capex_grad = np.zeros(
             (len(self.years), len(self.years)), dtype=arr_type)
 
-        dqlist = []
-        qlist = []
-        self.slope_capex = 0.0
+        self.slope_capex = slope_capex
 
         if 'maximum_learning_capex_ratio' in self.techno_infos_dict:
             maximum_learning_capex_ratio = self.techno_infos_dict['maximum_learning_capex_ratio']
@@ -825,36 +784,20 @@ class FischerTropsch(LiquidFuelTechno):
                 f'invest is negative {min(invest_list.real)} on techno {self.name}')
             invest_list = np.maximum(0.0, invest_list)
 
-        for i, invest in enumerate(invest_list):
-
-            if i == 0.0:
-                capex_year = capex_init
-                capex_grad[0][0] = 1000 * self.slope_capex
-                invest_sum = self.initial_production * capex_init
-            else:
-                dinvest_sum = self.initial_production * self.slope_capex
-                q = ((invest_sum + invest) / invest_sum) ** (-expo_factor)
-                qlist.append(q)
-                dq = -expo_factor * ((invest_sum + invest) / invest_sum) ** (-expo_factor -
-                                                                             1.0) * (
-                                 -dinvest_sum * invest / (invest_sum * invest_sum))
-                dqlist.append(dq)
-
-                q_product = reduce(mul, qlist)
-
-                qlistmod = []
-                for k in range(0, i):
-                    qlistmod.extend([qlist[:k] + qlist[k + 1:]])
-
-                if qlistmod == [[]]:
-                    productlist = [0]
-                else:
-                    productlist = [reduce(mul, ql) for ql in qlistmod]
-                prod_mul = sum([a * b for a, b in zip(productlist, dqlist)])
-                capex_year = capex_year * q
-                capex_grad[i][0] = capex_grad[0][0] * \
-                                   q_product + capex_init * prod_mul
-            invest_sum += invest
+        # capex of year i is capex_init times the product of the learning factors q_1..q_i, with
+        # q_k = ((invest_sum_k + invest_k) / invest_sum_k) ** -expo_factor
+        capex_grad[0][0] = 1000 * self.slope_capex
+        dinvest_sum = self.initial_production * self.slope_capex
+        invest_sum = self.initial_production * capex_init + np.cumsum(invest_list[:-1])
+        invest = invest_list[1:]
+        q = ((invest_sum + invest) / invest_sum) ** (-expo_factor)
+        dq = -expo_factor * ((invest_sum + invest) / invest_sum) ** (-expo_factor - 1.0) * (
+                -dinvest_sum * invest / (invest_sum * invest_sum))
+        q_product = np.cumprod(q)
+        prod_mul = self.compute_leave_one_out_product_sums(q, dq)
+        # the first learning factor alone is not differentiated
+        prod_mul[:1] = 0.0
+        capex_grad[1:, 0] = capex_grad[0][0] * q_product + capex_init * prod_mul
 
         # dcapex = maximum_learning_capex_ratio*dcapex_init + (1.0 - maximum_learning_capex_ratio)*dcapex
         capex_grad = maximum_learning_capex_ratio * capex_grad[0][0] * np.insert(
@@ -862,6 +805,14 @@ class FischerTropsch(LiquidFuelTechno):
                      (1.0 - maximum_learning_capex_ratio) * capex_grad
         return capex_grad
 
+    @staticmethod
+    def compute_leave_one_out_product_sums(q, dq):
+        '''
+        Sums over k <= i of dq_k times the product of all q_j for j <= i except q_k, for each i,
+        which is the derivative of the cumulative product of q : cumprod(q) * cumsum(dq / q) in linear time
+        '''
+        return np.cumprod(q) * np.cumsum(dq / q)
+
     def compute_dprod_dfluegas(self, capex_list, invest_list, invest_before_year_start, techno_dict, dcapexdfluegas):
 
         # dpprod_dpfluegas = np.zeros(dcapexdfluegas.shape())
@@ -869,17 +820,8 @@ class FischerTropsch(LiquidFuelTechno):
         dprod_dcapex = self.compute_dprod_dcapex(
             capex_list, invest_list, techno_dict, invest_before_year_start)
 
-        if 'complex128' in [dprod_dcapex.dtype]:
-            arr_type = 'complex128'
-        else:
-            arr_type = 'float64'
-
         # dprod_dfluegas = dpprod_dpfluegas + dprod_dcapex * dcapexdfluegas
-        dprod_dfluegas = np.zeros(dprod_dcapex.shape, dtype=arr_type)
-        for line in range(dprod_dcapex.shape[0]):
-            for column in range(dprod_dcapex.shape[1]):
-                dprod_dfluegas[line, column] = np.matmul(
-                    dprod_dcapex[line, :], dcapexdfluegas[:, column])
+        dprod_dfluegas = dprod_dcapex @ dcapexdfluegas
 
         return dprod_dfluegas
 
@@ -887,140 +829,53 @@ class FischerTropsch(LiquidFuelTechno):
         '''
         Compute the gradient of techno production vs syngas ratio
         '''
-        if np.all(self.needed_syngas_ratio <= self.syngas_ratio):
-
-            if f'{LiquidFuelTechno.energy_name} ({self.product_unit})' not in self.production:
-                self.compute_price()
-
-            mol_H2 = (1.0 + self.syngas_ratio) / \
-                     (1.0 + self.needed_syngas_ratio)
-            mol_CO2 = self.syngas_ratio - self.needed_syngas_ratio * mol_H2
-            co2_molar_mass = CO2.data_energy_dict['molar_mass']
-
-            needed_syngas_molar_mass = compute_syngas_molar_mass(
-                self.needed_syngas_ratio)
-            needed_calorific_value = compute_syngas_calorific_value(
-                self.needed_syngas_ratio)
-
-            dmol_H2up = 1.0
-            mol_H2down = (1.0 + self.needed_syngas_ratio)
+        if f'{LiquidFuelTechno.energy_name} ({self.product_unit})' not in self.production:
+            self.compute_price()
 
-            dmol_H2_dsyngas_ratio = (dmol_H2up * mol_H2down) / mol_H2down ** 2
-            dmol_CO2_dsyngas_ratio = 1 - \
-                                     self.needed_syngas_ratio * dmol_H2_dsyngas_ratio
+        # the capex gradient does not depend on the transformation, it is computed once
+        capex_grad = self.compute_dcapex_dsyngas_ratio()
+        dprodenergy_dsyngas_ratio = self.compute_dprod_dfluegas(
+            capex, invest, invest_before_ystart, techno_infos_dict, capex_grad)
+        prod_syngas_needs = self.production[f'{LiquidFuelTechno.energy_name} ({self.product_unit})'].values * \
+                            self.cost_details['syngas_needs_for_FT'].values / self.cost_details['efficiency'].values
 
-            dco2_dsyngas_ratio = self.syngas_ratio_techno.compute_dco2_prod_dsyngas_ratio(mol_CO2, mol_H2,
-                                                                                          co2_molar_mass,
-                                                                                          needed_syngas_molar_mass,
-                                                                                          needed_calorific_value,
-                                                                                          dmol_CO2_dsyngas_ratio,
-                                                                                          dmol_H2_dsyngas_ratio)
+        if np.all(self.needed_syngas_ratio <= self.syngas_ratio):
 
-            capex_grad = self.compute_dcapex_dsyngas_ratio()
-            dprodenergy_dsyngas_ratio = self.compute_dprod_dfluegas(
-                capex, invest, invest_before_ystart, techno_infos_dict, capex_grad)
+            dco2_dsyngas_ratio = self.get_syngas_ratio_sensitivity()['wgs_dco2_prod']
 
-            return {f'{CarbonCapture.flue_gas_name} ({GlossaryEnergy.mass_unit})': np.identity(len(self.years)) * (
-                    self.production[f'{LiquidFuelTechno.energy_name} ({self.product_unit})'].values *
-                    dco2_dsyngas_ratio / 100.0 * self.cost_details['syngas_needs_for_FT'].values / self.cost_details[
-                        'efficiency'].values),
+            return {f'{CarbonCapture.flue_gas_name} ({GlossaryEnergy.mass_unit})': DiagonalJacobianBlock(
+                prod_syngas_needs * dco2_dsyngas_ratio / 100.0),
                     f'{LiquidFuelTechno.energy_name} ({self.product_unit})': dprodenergy_dsyngas_ratio / 100.0}  # now syngas is in % grad is divided by 100
 
         elif np.all(self.needed_syngas_ratio > self.syngas_ratio):
 
             dwater_prod_dsyngas_ratio = self.syngas_ratio_techno.compute_dwater_prod_dsynags_ratio()
-            if f'{LiquidFuelTechno.energy_name} ({self.product_unit})' not in self.production:
-                self.compute_price()
 
-            capex_grad = self.compute_dcapex_dsyngas_ratio()
-            dprodenergy_dsyngas_ratio = self.compute_dprod_dfluegas(
-                capex, invest, invest_before_ystart, techno_infos_dict, capex_grad)
-
-            return {f'{Water.name} ({GlossaryEnergy.mass_unit})': np.identity(len(self.years)) * (self.production[
-                                                                                            f'{LiquidFuelTechno.energy_name} ({self.product_unit})'].values * dwater_prod_dsyngas_ratio / 100.0 *
-                                                                                        self.cost_details[
-                                                                                            'syngas_needs_for_FT'].values /
-                                                                                        self.cost_details[
-                                                                                            'efficiency'].values),
+            return {f'{Water.name} ({GlossaryEnergy.mass_unit})': DiagonalJacobianBlock(
+                prod_syngas_needs * dwater_prod_dsyngas_ratio / 100.0),
                     f'{LiquidFuelTechno.energy_name} ({self.product_unit})': dprodenergy_dsyngas_ratio / 100.0}  # now syngas is in % grad is divided by 100
 
         else:
-
-            if f'{LiquidFuelTechno.energy_name} ({self.product_unit})' not in self.production:
-                self.compute_price()
-
-            mol_H2 = (1.0 + self.syngas_ratio) / \
-                     (1.0 + self.needed_syngas_ratio)
-            mol_CO2 = self.syngas_ratio - self.needed_syngas_ratio * mol_H2
-            co2_molar_mass = CO2.data_energy_dict['molar_mass']
-
-            needed_syngas_molar_mass = compute_syngas_molar_mass(
-                self.needed_syngas_ratio)
-            needed_calorific_value = compute_syngas_calorific_value(
-                self.needed_syngas_ratio)
-
-            dmol_H2up = 1.0
-            mol_H2down = (1.0 + self.needed_syngas_ratio)
-
-            dmol_H2_dsyngas_ratio = (dmol_H2up * mol_H2down) / mol_H2down ** 2
-            dmol_CO2_dsyngas_ratio = 1 - \
-                                     self.needed_syngas_ratio * dmol_H2_dsyngas_ratio
-
-            dco2_dsyngas_ratio = self.syngas_ratio_techno_wgs.compute_dco2_prod_dsyngas_ratio(mol_CO2, mol_H2,
-                                                                                              co2_molar_mass,
-                                                                                              needed_syngas_molar_mass,
-                                                                                              needed_calorific_value,
-                                                                                              dmol_CO2_dsyngas_ratio,
-                                                                                              dmol_H2_dsyngas_ratio)
-
-            capex_grad = self.compute_dcapex_dsyngas_ratio()
-            dprodenergy_dsyngas_ratio = self.compute_dprod_dfluegas(
-                capex, invest, invest_before_ystart, techno_infos_dict, capex_grad)
-
-            dco2_flue_gas_prod_dsyngas_ratio = np.identity(len(self.years)) * (
-                    self.production[
-                        f'{LiquidFuelTechno.energy_name} ({self.product_unit})'].values * dco2_dsyngas_ratio *
-                    self.cost_details['syngas_needs_for_FT'].values / self.cost_details['efficiency'].values)
+            # WGS
+            dco2_dsyngas_ratio = self.get_syngas_ratio_sensitivity()['wgs_dco2_prod']
+            dco2_flue_gas_prod_dsyngas_ratio = DiagonalJacobianBlock(prod_syngas_needs * dco2_dsyngas_ratio)
 
             # RWGS
-
             dwater_prod_dsyngas_ratio = self.syngas_ratio_techno_rwgs.compute_dwater_prod_dsynags_ratio()
-            if f'{LiquidFuelTechno.energy_name} ({self.product_unit})' not in self.production:
-                self.compute_price()
-
-            capex_grad = self.compute_dcapex_dsyngas_ratio()
-            dprodenergy_dsyngas_ratio_rwgs = self.compute_dprod_dfluegas(
-                capex, invest, invest_before_ystart, techno_infos_dict, capex_grad)
-
-            dwater_dsyngas_ratio = np.identity(len(self.years)) * (
-                        self.production[f'{LiquidFuelTechno.energy_name} ({self.product_unit})'].values
-                        * dwater_prod_dsyngas_ratio * self.cost_details['syngas_needs_for_FT'].values /
-                        self.cost_details['efficiency'].values)
+            dwater_dsyngas_ratio = DiagonalJacobianBlock(prod_syngas_needs * dwater_prod_dsyngas_ratio)
 
             if 'complex128' in [dwater_dsyngas_ratio.dtype, dprodenergy_dsyngas_ratio.dtype]:
                 arr_type = 'complex128'
             else:
                 arr_type = 'float64'
 
-            dfluegas_dsyngas_ratio = np.zeros(
-                (len(self.years), len(self.years)), dtype=arr_type)
-            dwaterprod_dsyngas_ratio = np.zeros((
-                len(self.years), len(self.years)), dtype=arr_type)
-            dliquid_fuelprod_dsyngas_ratio = np.zeros(
-                (len(self.years), len(self.years)), dtype=arr_type)
-
-            for i in range(self.year_end - self.year_start + 1):
-                if self.syngas_ratio[i] < self.needed_syngas_ratio:
-                    # RWGS
-                    dwaterprod_dsyngas_ratio[i, :] = dwater_dsyngas_ratio[i, :]
-                    dliquid_fuelprod_dsyngas_ratio[:,
-                    i] = dprodenergy_dsyngas_ratio_rwgs[i, :]
-
-                else:
-                    dfluegas_dsyngas_ratio[:,
-                    i] = dco2_flue_gas_prod_dsyngas_ratio[i, :]
-                    dliquid_fuelprod_dsyngas_ratio[:,
-                    i] = dprodenergy_dsyngas_ratio[i, :]
+            # the transformation is selected year by year
+            rwgs_years = self.syngas_ratio < self.needed_syngas_ratio
+            dwaterprod_dsyngas_ratio = DiagonalJacobianBlock(np.where(
+                rwgs_years, dwater_dsyngas_ratio.diagonal, 0.0).astype(arr_type))
+            dfluegas_dsyngas_ratio = DiagonalJacobianBlock(np.where(
+                rwgs_years, 0.0, dco2_flue_gas_prod_dsyngas_ratio.diagonal).astype(arr_type))
+            dliquid_fuelprod_dsyngas_ratio = dprodenergy_dsyngas_ratio.T.astype(arr_type)
 
             return {
                 # now syngas is in % grad is divided by 100
@@ -1031,39 +886,14 @@ class FischerTropsch(LiquidFuelTechno):
             }
 
     def grad_techno_producion_vs_syngas_ratio_rwgs(self):
-        mol_H2 = (1.0 + self.syngas_ratio) / \
-                 (1.0 + self.needed_syngas_ratio)
-        mol_CO2 = self.syngas_ratio - self.needed_syngas_ratio * mol_H2
-        co2_molar_mass = CO2.data_energy_dict['molar_mass']
-
-        needed_syngas_molar_mass = compute_syngas_molar_mass(
-            self.needed_syngas_ratio)
-        needed_calorific_value = compute_syngas_calorific_value(
-            self.needed_syngas_ratio)
-
-        dmol_H2up = 1.0
-        mol_H2down = (1.0 + self.needed_syngas_ratio)
-
-        dmol_H2_dsyngas_ratio = (dmol_H2up * mol_H2down) / mol_H2down ** 2
-        dmol_CO2_dsyngas_ratio = 1 - \
-                                 self.needed_syngas_ratio * dmol_H2_dsyngas_ratio
-
-        dco2_dsyngas_ratio = self.syngas_ratio_techno.compute_dco2_prod_dsyngas_ratio(mol_CO2, mol_H2, co2_molar_mass,
-                                                                                      needed_syngas_molar_mass,
-                                                                                      needed_calorific_value,
-                                                                                      dmol_CO2_dsyngas_ratio,
-                                                                                      dmol_H2_dsyngas_ratio)
+        dco2_dsyngas_ratio = self.get_syngas_ratio_sensitivity()['wgs_dco2_prod']
 
         if f'{LiquidFuelTechno.energy_name} ({self.product_unit})' not in self.production:
             self.compute_price()
 
-        return {f'{CarbonCapture.flue_gas_name} ({GlossaryEnergy.mass_unit})': np.identity(len(self.years)) * (self.production[
-                                                                                                         f'{LiquidFuelTechno.energy_name} ({self.product_unit})'] * dco2_dsyngas_ratio *
-                                                                                                     self.cost_details[
-                                                                                                         'syngas_needs_for_FT'] /
-                                                                                                     self.cost_details[
-                                                                                                         'efficiency'])[
-                                                                                                    :, np.newaxis]}
+        return {f'{CarbonCapture.flue_gas_name} ({GlossaryEnergy.mass_unit})': DiagonalJacobianBlock(
+            self.production[f'{LiquidFuelTechno.energy_name} ({self.product_unit})'] * dco2_dsyngas_ratio *
+            self.cost_details['syngas_needs_for_FT'] / self.cost_details['efficiency'])}
 
     def grad_techno_consumption_vs_syngas_ratio(self, capex, invest, invest_before_ystart, techno_infos_dict):
         '''
@@ -1077,20 +907,17 @@ class FischerTropsch(LiquidFuelTechno):
 
             # syngas component
             dsyngas_needs_dsyngas_ratio = self.syngas_ratio_techno.compute_dsyngas_needs_dsyngas_ratio()
-            dsyngas_dsyngas_ratio = np.identity(len(self.years)) * (self.production[
-                                                                        f'{LiquidFuelTechno.energy_name} ({self.product_unit})'].values * dsyngas_needs_dsyngas_ratio *
-                                                                    self.cost_details['syngas_needs_for_FT'].values /
-                                                                    self.cost_details['efficiency'].values /
-                                                                    self.syngas_ratio_techno.cost_details[
-                                                                        'efficiency'].values)
+            dsyngas_dsyngas_ratio = DiagonalJacobianBlock(
+                self.production[f'{LiquidFuelTechno.energy_name} ({self.product_unit})'].values *
+                dsyngas_needs_dsyngas_ratio * self.cost_details['syngas_needs_for_FT'].values /
+                self.cost_details['efficiency'].values / self.syngas_ratio_techno.cost_details['efficiency'].values)
 
             # water component
             dwater_needs_dsyngas_ratio = self.syngas_ratio_techno.compute_dwater_needs_dsyngas_ratio()
-            dwater_dsyngas_ratio = np.identity(len(self.years)) * (self.production[
-                                                                       f'{LiquidFuelTechno.energy_name} ({self.product_unit})'].values * dwater_needs_dsyngas_ratio *
-                                                                   self.cost_details['syngas_needs_for_FT'].values /
-                                                                   self.cost_details['efficiency'].values /
-                                                                   self.syngas_ratio_techno.cost_details['efficiency'].values)
+            dwater_dsyngas_ratio = DiagonalJacobianBlock(
+                self.production[f'{LiquidFuelTechno.energy_name} ({self.product_unit})'].values *
+                dwater_needs_dsyngas_ratio * self.cost_details['syngas_needs_for_FT'].values /
+                self.cost_details['efficiency'].values / self.syngas_ratio_techno.cost_details['efficiency'].values)
 
             capex_grad = self.compute_dcapex_dsyngas_ratio()
             dprodenergy_dsyngas_ratio = self.compute_dprod_dfluegas(
@@ -1106,18 +933,17 @@ class FischerTropsch(LiquidFuelTechno):
 
         elif np.all(self.needed_syngas_ratio > self.syngas_ratio):
             dco2_needs_dsyngas_ratio = self.syngas_ratio_techno.compute_dco2_needs_dsyngas_ratio()
-            dco2_cons_dsyngas_ratio = np.identity(len(self.years)) * (dco2_needs_dsyngas_ratio * self.production[
-                f'{LiquidFuelTechno.energy_name} ({self.product_unit})'].values /
-                                                                      self.costs_details_sg_techno[
-                                                                          'efficiency'].values * self.cost_details[
-                                                                          'syngas_needs_for_FT'].values /
-                                                                      self.cost_details['efficiency'].values)
+            dco2_cons_dsyngas_ratio = DiagonalJacobianBlock(
+                dco2_needs_dsyngas_ratio *
+                self.production[f'{LiquidFuelTechno.energy_name} ({self.product_unit})'].values /
+                self.costs_details_sg_techno['efficiency'].values * self.cost_details['syngas_needs_for_FT'].values /
+                self.cost_details['efficiency'].values)
 
             dsyngas_needs_dsyngas_ratio = self.syngas_ratio_techno.compute_dsyngas_needs_dsyngas_ratio()
-            dsyngas_dsyngas_ratio = np.identity(len(self.years)) * (self.production[f'{LiquidFuelTechno.energy_name} ({self.product_unit})'].values * dsyngas_needs_dsyngas_ratio /
-                                                                    self.costs_details_sg_techno['efficiency'].values *
-                                                                    self.cost_details['syngas_needs_for_FT'].values /
-                                                                    self.cost_details['efficiency'].values)
+            dsyngas_dsyngas_ratio = DiagonalJacobianBlock(
+                self.production[f'{LiquidFuelTechno.energy_name} ({self.product_unit})'].values *
+                dsyngas_needs_dsyngas_ratio / self.costs_details_sg_techno['efficiency'].values *
+                self.cost_details['syngas_needs_for_FT'].values / self.cost_details['efficiency'].values)
 
             capex_grad = self.compute_dcapex_dsyngas_ratio()
             dprodenergy_dsyngas_ratio = self.compute_dprod_dfluegas(
@@ -1125,15 +951,10 @@ class FischerTropsch(LiquidFuelTechno):
 
             delectricity_dsyngas_ratio = self.compute_delec_consumption_dsyngas_ratio(
                 dprodenergy_dsyngas_ratio)
-            delec_dsyngas_ratio = delectricity_dsyngas_ratio + np.identity(len(self.years)) * (
-                                                                                                          -1.0 * self.syngas_ratio_techno.slope_elec_demand *
-                                                                                                          self.cost_details[
-                                                                                                              'syngas_needs_for_FT'] *
-                                                                                                          self.production[
-                                                                                                              f'{LiquidFuelTechno.energy_name} ({self.product_unit})'] /
-                                                                                                          self.cost_details[
-                                                                                                              'efficiency']).to_numpy()[
-                                                                                              :, np.newaxis]
+            delec_dsyngas_ratio = delectricity_dsyngas_ratio + DiagonalJacobianBlock(
+                -1.0 * self.syngas_ratio_techno.slope_elec_demand * self.cost_details['syngas_needs_for_FT'] *
+                self.production[f'{LiquidFuelTechno.energy_name} ({self.product_unit})'] /
+                self.cost_details['efficiency'])
             # now syngas is in % grad is divided by 100
             return {f'{CarbonCapture.name} ({GlossaryEnergy.mass_unit})': dco2_cons_dsyngas_ratio / 100.0,
                     f'{Syngas.name} ({self.product_unit})': dsyngas_dsyngas_ratio / 100.0,
@@ -1152,40 +973,31 @@ class FischerTropsch(LiquidFuelTechno):
 
             # syngas component
             dsyngas_needs_dsyngas_ratio = self.syngas_ratio_techno_wgs.compute_dsyngas_needs_dsyngas_ratio()
-            dsyngas_dsyngas_ratio_wgs = np.identity(len(self.years)) * (self.production[
-                                                                            f'{LiquidFuelTechno.energy_name} ({self.product_unit})'].values * dsyngas_needs_dsyngas_ratio *
-                                                                        self.cost_details[
-                                                                            'syngas_needs_for_FT'].values /
-                                                                        self.cost_details['efficiency'].values /
-                                                                        self.syngas_ratio_techno_wgs.cost_details[
-                                                                            'efficiency'].values)
+            dsyngas_dsyngas_ratio_wgs = DiagonalJacobianBlock(
+                self.production[f'{LiquidFuelTechno.energy_name} ({self.product_unit})'].values *
+                dsyngas_needs_dsyngas_ratio * self.cost_details['syngas_needs_for_FT'].values /
+                self.cost_details['efficiency'].values / self.syngas_ratio_techno_wgs.cost_details['efficiency'].values)
 
             # water component
             dwater_needs_dsyngas_ratio = self.syngas_ratio_techno_wgs.compute_dwater_needs_dsyngas_ratio()
-            dwater_dsyngas_ratio_wgs = np.identity(len(self.years)) * (self.production[
-                                                                           f'{LiquidFuelTechno.energy_name} ({self.product_unit})'].values * dwater_needs_dsyngas_ratio *
-                                                                       self.cost_details['syngas_needs_for_FT'].values /
-                                                                       self.cost_details['efficiency'].values /
-                                                                       self.syngas_ratio_techno_wgs.cost_details[
-                                                                           'efficiency'].values)
+            dwater_dsyngas_ratio_wgs = DiagonalJacobianBlock(
+                self.production[f'{LiquidFuelTechno.energy_name} ({self.product_unit})'].values *
+                dwater_needs_dsyngas_ratio * self.cost_details['syngas_needs_for_FT'].values /
+                self.cost_details['efficiency'].values / self.syngas_ratio_techno_wgs.cost_details['efficiency'].values)
 
             # RWGS
             dco2_needs_dsyngas_ratio = self.syngas_ratio_techno_rwgs.compute_dco2_needs_dsyngas_ratio()
-            dco2_cons_dsyngas_ratio_rwgs = np.identity(len(self.years)) * (dco2_needs_dsyngas_ratio * self.production[
-                f'{LiquidFuelTechno.energy_name} ({self.product_unit})'].values /
-                                                                           self.costs_details_sg_techno[
-                                                                               'efficiency'].values * self.cost_details[
-                                                                               'syngas_needs_for_FT'].values /
-                                                                           self.cost_details['efficiency'].values)
+            dco2_cons_dsyngas_ratio_rwgs = DiagonalJacobianBlock(
+                dco2_needs_dsyngas_ratio *
+                self.production[f'{LiquidFuelTechno.energy_name} ({self.product_unit})'].values /
+                self.costs_details_sg_techno['efficiency'].values * self.cost_details['syngas_needs_for_FT'].values /
+                self.cost_details['efficiency'].values)
 
             dsyngas_needs_dsyngas_ratio = self.syngas_ratio_techno_rwgs.compute_dsyngas_needs_dsyngas_ratio()
-            dsyngas_dsyngas_ratio_rwgs = np.identity(len(self.years)) * (self.production[
-                                                                             f'{LiquidFuelTechno.energy_name} ({self.product_unit})'].values * dsyngas_needs_dsyngas_ratio *
-                                                                         self.cost_details[
-                                                                             'syngas_needs_for_FT'].values /
-                                                                         self.cost_details['efficiency'].values /
-                                                                         self.syngas_ratio_techno.cost_details[
-                                                                             'efficiency'].values)
+            dsyngas_dsyngas_ratio_rwgs = DiagonalJacobianBlock(
+                self.production[f'{LiquidFuelTechno.energy_name} ({self.product_unit})'].values *
+                dsyngas_needs_dsyngas_ratio * self.cost_details['syngas_needs_for_FT'].values /
+                self.cost_details['efficiency'].values / self.syngas_ratio_techno.cost_details['efficiency'].values)
 
             capex_grad = self.compute_dcapex_dsyngas_ratio()
             dprodenergy_dsyngas_ratio = self.compute_dprod_dfluegas(
@@ -1193,15 +1005,10 @@ class FischerTropsch(LiquidFuelTechno):
 
             delectricity_dsyngas_ratio = self.compute_delec_consumption_dsyngas_ratio(
                 dprodenergy_dsyngas_ratio)
-            delec_dsyngas_ratio_rwgs = delectricity_dsyngas_ratio + np.identity(len(self.years)) * (
-                                                                                                               -1.0 * self.syngas_ratio_techno.slope_elec_demand *
-                                                                                                               self.cost_details[
-                                                                                                                   'syngas_needs_for_FT'] *
-                                                                                                               self.production[
-                                                                                                                   f'{LiquidFuelTechno.energy_name} ({self.product_unit})'] /
-                                                                                                               self.cost_details[
-                                                                                                                   'efficiency']).to_numpy()[
-                                                                                                   :, np.newaxis]
+            delec_dsyngas_ratio_rwgs = delectricity_dsyngas_ratio + DiagonalJacobianBlock(
+                -1.0 * self.syngas_ratio_techno.slope_elec_demand * self.cost_details['syngas_needs_for_FT'] *
+                self.production[f'{LiquidFuelTechno.energy_name} ({self.product_unit})'] /
+                self.cost_details['efficiency'])
 
             if 'complex128' in [dsyngas_dsyngas_ratio_rwgs.dtype, dsyngas_dsyngas_ratio_wgs.dtype,
                                 delec_dsyngas_ratio_rwgs.dtype]:
@@ -1209,30 +1016,15 @@ class FischerTropsch(LiquidFuelTechno):
             else:
                 arr_type = 'float64'
 
-            dsyngas_dsyngas_ratio = np.zeros(
-                (len(self.years), len(self.years)), dtype=arr_type)
-            dwater_dsyngas_ratio = np.zeros(
-                (len(self.years), len(self.years)), dtype=arr_type)
-            dco2_dsyngas_ratio = np.zeros(
-                (len(self.years), len(self.years)), dtype=arr_type)
-            delec_dsyngas_ratio = np.zeros(
-                (len(self.years), len(self.years)), dtype=arr_type)
-
-            for i in range(self.year_end - self.year_start + 1):
-                if self.syngas_ratio[i] < self.needed_syngas_ratio:
-                    # RWGS
-                    dsyngas_dsyngas_ratio[i,
-                    :] = dsyngas_dsyngas_ratio_rwgs[i, :]
-                    dco2_dsyngas_ratio[i,
-                    :] = dco2_cons_dsyngas_ratio_rwgs[i, :]
-                    delec_dsyngas_ratio[i, :] = delec_dsyngas_ratio_rwgs[i, :]
-
-                else:
-                    dsyngas_dsyngas_ratio[i,
-                    :] = dsyngas_dsyngas_ratio_wgs[i, :]
-                    dwater_dsyngas_ratio[i, :] = dwater_dsyngas_ratio_wgs[i, :]
-            #                     delec_dsyngas_ratio[i,
-            #                                         :] = delec_dsyngas_ratio_wgs[i, :]
+            rwgs_years = self.syngas_ratio < self.needed_syngas_ratio
+            dsyngas_dsyngas_ratio = DiagonalJacobianBlock(np.where(
+                rwgs_years, dsyngas_dsyngas_ratio_rwgs.diagonal, dsyngas_dsyngas_ratio_wgs.diagonal).astype(arr_type))
+            dwater_dsyngas_ratio = DiagonalJacobianBlock(
+                np.where(rwgs_years, 0.0, dwater_dsyngas_ratio_wgs.diagonal).astype(arr_type))
+            dco2_dsyngas_ratio = DiagonalJacobianBlock(
+                np.where(rwgs_years, dco2_cons_dsyngas_ratio_rwgs.diagonal, 0.0).astype(arr_type))
+            delec_dsyngas_ratio = np.where(
+                rwgs_years[:, np.newaxis], delec_dsyngas_ratio_rwgs, 0.0).astype(arr_type)
             # now syngas is in % grad is divided by 100
             return {f'{CarbonCapture.name} ({GlossaryEnergy.mass_unit})': dco2_dsyngas_ratio / 100.0,
                     f'{Syngas.name} ({self.product_unit})': dsyngas_dsyngas_ratio / 100.0,
@@ -24,6 +24,7 @@ from sostrades_core.tools.post_processing.charts.two_axes_instanciated_chart imp
     TwoAxesInstanciatedChart,
 )
 
+from energy_models.core.jacobian_blocks import DiagonalJacobianBlock
 from energy_models.core.stream_type.energy_models.gaseous_hydrogen import (
     GaseousHydrogen,
 )
@@ -263,7 +264,7 @@ class FischerTropschDiscipline(LiquidFuelTechnoDiscipline):
             self.set_partial_derivative_for_other_types(
                 (GlossaryEnergy.TechnoPricesValue, self.techno_name),
                 (GlossaryEnergy.CO2TaxesValue, GlossaryEnergy.CO2Tax),
-                dtechno_prices_dCO2_taxes.values * np.identity(len(self.techno_model.years)))
+                DiagonalJacobianBlock(dtechno_prices_dCO2_taxes.values))
 
         for resource, value in grad_dict_resources.items():
             self.set_partial_derivative_for_other_types(
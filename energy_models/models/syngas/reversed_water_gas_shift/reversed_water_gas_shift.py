@@ -19,10 +19,6 @@ import numpy as np
 
 from energy_models.core.stream_type.carbon_models.carbon_capture import CarbonCapture
 from energy_models.core.stream_type.carbon_models.carbon_dioxyde import CO2
-from energy_models.core.stream_type.carbon_models.carbon_monoxyde import CO
-from energy_models.core.stream_type.energy_models.gaseous_hydrogen import (
-    GaseousHydrogen,
-)
 from energy_models.core.stream_type.energy_models.syngas import (
     compute_calorific_value as compute_syngas_calorific_value,
 )
@@ -31,6 +27,12 @@ from energy_models.core.stream_type.energy_models.syngas import (
 )
 from energy_models.core.stream_type.resources_models.water import Water
 from energy_models.core.techno_type.base_techno_models.syngas_techno import SyngasTechno
+from energy_models.core.techno_type.syngas_ratio_sensitivity import (
+    compute_dcapex_dsyngas_ratio,
+    compute_linear_interpolant,
+    compute_syngas_ratio_sensitivity,
+    is_syngas_ratio_sensitivity_up_to_date,
+)
 from energy_models.glossaryenergy import GlossaryEnergy
 
 
@@ -46,6 +48,7 @@ class RWGS(SyngasTechno):
         self.available_power = None
         self.slope_capex: float = 0.0
         self.slope_elec_demand: float = 0.0
+        self.syngas_ratio_sensitivity = None
 
     def configure_parameters(self, inputs_dict):
 
@@ -97,91 +100,38 @@ class RWGS(SyngasTechno):
         initial_syngas_ratio = 0.0
         delta_syngas_ratio = final_syngas_ratio - initial_syngas_ratio
 
-        self.slope_capex = (
-                                   capex_list[0] - capex_list[1]) / (delta_syngas_ratio[0] - delta_syngas_ratio[1])
-        b = capex_list[0] - self.slope_capex * delta_syngas_ratio[0]
-
-        def func_capex(delta_sg_ratio):
-            return self.slope_capex * delta_sg_ratio + b
-
-        # func_capex = sc.interp1d(delta_sg_ratio, capex_list,
-        #                         kind='linear', fill_value='extrapolate')
-
-        # func_capex = sc.interp1d(delta_syngas_ratio, capex_list,
-        #                         kind='linear', fill_value='extrapolate')
-
-        capex_init = func_capex(
-            self.needed_syngas_ratio - self.syngas_ratio[0])
+        self.slope_capex, b = compute_linear_interpolant(delta_syngas_ratio, capex_list)
+        capex_init = self.slope_capex * (self.needed_syngas_ratio - self.syngas_ratio[0]) + b
 
         return capex_init
 
+    def get_syngas_ratio_sensitivity(self, syngas_ratio=None):
+        '''
+        Molar balances of the transformation and their derivatives wrt the syngas ratio, computed once for all years
+        '''
+        if syngas_ratio is None:
+            syngas_ratio = self.syngas_ratio
+        if not is_syngas_ratio_sensitivity_up_to_date(self.syngas_ratio_sensitivity, syngas_ratio,
+                                                      self.needed_syngas_ratio):
+            self.syngas_ratio_sensitivity = compute_syngas_ratio_sensitivity(syngas_ratio, self.needed_syngas_ratio)
+        return self.syngas_ratio_sensitivity
+
     def compute_dcapex_dsyngas_ratio(self):
 
         capex_init = self.check_capex_unity(
             self.techno_infos_dict)
-
-        if 'complex128' in [type(self.initial_production), type(self.slope_capex), capex_init.dtype,
-                            self.cost_details[GlossaryEnergy.InvestValue].values.dtype]:
-            arr_type = 'complex128'
-        else:
-            arr_type = 'float64'
-        capex_grad = np.zeros(
-            (len(self.years), len(self.years)), dtype=arr_type)
-
         expo_factor = self.compute_expo_factor(
             self.techno_infos_dict)
+        invest_list = np.maximum(0.0, self.cost_details[GlossaryEnergy.InvestValue].values)
 
-        dqlist = []
-        qlist = []
-        invest_sum = self.initial_production * capex_init
-        dinvest_sum = -1.0 * self.initial_production * self.slope_capex
-        capex_year = capex_init
-        capex_grad[0][0] = -self.slope_capex
-        invest_list = self.cost_details[GlossaryEnergy.InvestValue].values
-        if min(invest_list.real) < 0:
-            invest_list = np.maximum(0.0, invest_list)
-        for i, invest in enumerate(invest_list):
-
-            if invest_sum.real < 10.0 or i == 0.0:
-                capex_year = capex_init
-                capex_grad[i][0] = - self.slope_capex
-
-            else:
-
-                q = ((invest_sum + invest) / invest_sum) ** (-expo_factor)
-
-                #                 dq = -expo_factor * ((invest_sum + invest) / invest_sum) ** (-expo_factor -
-                # 1.0) * (-dinvest_sum * invest / (invest_sum * invest_sum))
-                dq = dinvest_sum * expo_factor * invest * \
-                     q / (invest_sum * (invest_sum + invest))
-                if q.real < 0.95:
-                    dq = 0.05 * np.exp(q - 0.9) * dq
-                    q = 0.9 + 0.05 * np.exp(q - 0.9)
-
-                dqlist.append(dq)
-                qlist.append(q)
-
-                capex_grad[i][0] = q * capex_grad[i - 1][0] + dq * capex_year
-
-                capex_year = capex_year * q
-            invest_sum += invest
-
-        if 'maximum_learning_capex_ratio' in self.techno_infos_dict:
-            maximum_learning_capex_ratio = self.techno_infos_dict['maximum_learning_capex_ratio']
-        else:
-            maximum_learning_capex_ratio = 0.9
-
-        # dcapex = maximum_learning_capex_ratio*dcapex_init + (1.0 - maximum_learning_capex_ratio)*dcapex
-        capex_grad = maximum_learning_capex_ratio * capex_grad[0][0] * np.insert(
-            np.zeros((len(self.years), len(self.years) - 1)), 0, np.ones(len(self.years)), axis=1) + \
-                     (1.0 - maximum_learning_capex_ratio) * capex_grad
-        return capex_grad
+        return compute_dcapex_dsyngas_ratio(
+            invest_list, capex_init, -self.slope_capex, self.initial_production,
+            -1.0 * self.initial_production * self.slope_capex, expo_factor,
+            self.techno_infos_dict.get('maximum_learning_capex_ratio', 0.9))
 
     def compute_dprod_dsyngas_ratio(self, capex_list, invest_list, invest_before_year_start, techno_dict,
                                     dcapexdsyngas):
 
-        # dpprod_dpfluegas = np.zeros(dcapexdfluegas.shape())
-
         dprod_dcapex = self.compute_dprod_dcapex(
             capex_list, invest_list, techno_dict, invest_before_year_start)
         # dprod_dfluegas = dpprod_dpfluegas + dprod_dcapex * dcapexdfluegas
@@ -189,13 +139,8 @@ class RWGS(SyngasTechno):
             arr_type = 'complex128'
         else:
             arr_type = 'float64'
-        dprod_dfluegas = np.zeros(dprod_dcapex.shape, dtype=arr_type)
-        for line in range(dprod_dcapex.shape[0]):
-            for column in range(dprod_dcapex.shape[1]):
-                dprod_dfluegas[line, column] = np.matmul(
-                    dprod_dcapex[line, :], dcapexdsyngas[:, column])
 
-        return dprod_dfluegas
+        return np.matmul(dprod_dcapex, dcapexdsyngas).astype(arr_type)
 
     def compute_drwgs_dsyngas_ratio(self):
 
@@ -306,30 +251,7 @@ class RWGS(SyngasTechno):
         return dco2_price_dsyngas_ratio
 
     def compute_dco2_needs_dsyngas_ratio(self):
-        mol_H2 = 1.0
-
-        mol_CO2_up = - self.syngas_ratio * (1.0 + self.needed_syngas_ratio)
-        dmol_CO2_up = - (1.0 + self.needed_syngas_ratio)
-
-        mol_CO2_down = (1.0 + self.syngas_ratio)
-        dmol_CO2_down = 1.0
-
-        dmol_CO2_dsyngas_ratio = (
-                                         dmol_CO2_up * mol_CO2_down - dmol_CO2_down * mol_CO2_up) / mol_CO2_down ** 2
-
-        co2_data = CO2.data_energy_dict
-
-        # needed syngas_ratio could be 0 in this case syngas is H2
-        needed_syngas_molar_mass = compute_syngas_molar_mass(
-            self.needed_syngas_ratio)
-        needed_calorific_value = compute_syngas_calorific_value(
-            self.needed_syngas_ratio)
-
-        dco2_needs_dsyngas_ratio = dmol_CO2_dsyngas_ratio * co2_data['molar_mass'] / \
-                                   (mol_H2 * needed_syngas_molar_mass *
-                                    needed_calorific_value)
-
-        return dco2_needs_dsyngas_ratio
+        return self.get_syngas_ratio_sensitivity()['rwgs_dco2_needs']
 
     def compute_dprice_RWGS_dsyngas_ratio(self):
         efficiency = self.compute_efficiency()
@@ -383,19 +305,9 @@ class RWGS(SyngasTechno):
         initial_syngas_ratio = 0.0
         delta_syngas_ratio = final_syngas_ratio - initial_syngas_ratio
 
-        self.slope_elec_demand = (elec_demand[0] - elec_demand[1]) / \
-                                 (delta_syngas_ratio[0] - delta_syngas_ratio[1])
-        b = elec_demand[0] - self.slope_elec_demand * delta_syngas_ratio[0]
-
-        def func_elec_demand(syngas_ratio):
-            return self.slope_elec_demand * syngas_ratio + b
-
-        # func_elec_demand = sc.interp1d(delta_syngas_ratio, elec_demand,
-        # kind='linear', fill_value='extrapolate')
+        self.slope_elec_demand, b = compute_linear_interpolant(delta_syngas_ratio, elec_demand)
 
-        elec_demand = func_elec_demand(
-            self.needed_syngas_ratio - self.syngas_ratio)
-        return elec_demand
+        return self.slope_elec_demand * (self.needed_syngas_ratio - self.syngas_ratio) + b
 
     def compute_resources_needs(self):
         self.cost_details[f"{GlossaryEnergy.CO2Resource}_needs"] = self.get_theoretical_co2_needs() / self.cost_details['efficiency']
@@ -484,97 +396,10 @@ class RWGS(SyngasTechno):
         c = (r2-r1)/(1+r1)
         d = r2 - r1(1+r2)/(1+r1)
         '''
-        mol_syngas_in = (1.0 + self.needed_syngas_ratio) / \
-                        (1.0 + syngas_ratio)
-        mol_syngas_out = 1.0
-
-        syngas_molar_mass_in = compute_syngas_molar_mass(syngas_ratio)
-        syngas_calorific_value_in = compute_syngas_calorific_value(
-            syngas_ratio)
-
-        # needed syngas_ratio could be 0 in this case syngas is H2
-        syngas_molar_mass_out = compute_syngas_molar_mass(
-            self.needed_syngas_ratio)
-        calorific_value_out = compute_syngas_calorific_value(
-            self.needed_syngas_ratio)
-
-        syngas_needs = mol_syngas_in * syngas_molar_mass_in * syngas_calorific_value_in / \
-                       (mol_syngas_out * syngas_molar_mass_out *
-                        calorific_value_out)
-
-        return syngas_needs
+        return self.get_syngas_ratio_sensitivity(syngas_ratio)['rwgs_syngas_needs']
 
     def compute_dsyngas_needs_dsyngas_ratio(self):
-
-        #############
-
-        dmol_syngas_in_dsyngas_ratio = - \
-                                           (1.0 + self.needed_syngas_ratio) / (1.0 + self.syngas_ratio) ** 2
-
-        ####
-
-        # syngas_molar_mass_in (self.syngas_ratio * CO.data_energy_dict['molar_mass'] +
-        # Hydrogen.data_energy_dict['molar_mass']) / (1.0 + self.syngas_ratio)
-        syngas_molar_mass_in_up = (self.syngas_ratio * CO.data_energy_dict['molar_mass'] +
-                                   GaseousHydrogen.data_energy_dict['molar_mass'])
-
-        dsyngas_molar_mass_in_up_dsynags_ratio = CO.data_energy_dict['molar_mass']
-
-        syngas_molar_mass_in_down = (1.0 + self.syngas_ratio)
-
-        dsyngas_molar_mass_in_down_dsyngas_ratio = 1.0
-
-        dsyngas_molar_mass_in_dsyngas_ratio = (dsyngas_molar_mass_in_up_dsynags_ratio * syngas_molar_mass_in_down -
-                                               syngas_molar_mass_in_up * dsyngas_molar_mass_in_down_dsyngas_ratio) / syngas_molar_mass_in_down ** 2
-
-        ######
-        # (syngas_ratio * CO.data_energy_dict['molar_mass'] * CO.data_energy_dict['calorific_value'] +
-        # Hydrogen.data_energy_dict['molar_mass'] *
-        # Hydrogen.data_energy_dict['calorific_value']) /
-        # (Hydrogen.data_energy_dict['molar_mass'] + syngas_ratio *
-        # CO.data_energy_dict['molar_mass'])
-
-        syngas_calorific_value_in_up = (
-                self.syngas_ratio * CO.data_energy_dict['molar_mass'] * CO.data_energy_dict['calorific_value'] +
-                GaseousHydrogen.data_energy_dict['molar_mass'] * GaseousHydrogen.data_energy_dict[
-                    'calorific_value'])
-
-        dsyngas_calorific_value_in_up_dsyngas_ratio = CO.data_energy_dict[
-                                                          'molar_mass'] * CO.data_energy_dict['calorific_value']
-
-        syngas_calorific_value_in_down = (
-                GaseousHydrogen.data_energy_dict['molar_mass'] + self.syngas_ratio * CO.data_energy_dict['molar_mass'])
-
-        dsyngas_calorific_value_in_down_dsyngas_ratio = CO.data_energy_dict['molar_mass']
-
-        dsyngas_calorific_value_in_dysngas_ratio = (
-                                                           dsyngas_calorific_value_in_up_dsyngas_ratio * syngas_calorific_value_in_down -
-                                                           syngas_calorific_value_in_up * dsyngas_calorific_value_in_down_dsyngas_ratio) / syngas_calorific_value_in_down ** 2
-
-        ########
-
-        mol_syngas_in = (1.0 + self.needed_syngas_ratio) / \
-                        (1.0 + self.syngas_ratio)
-        mol_syngas_out = 1.0
-
-        syngas_molar_mass_in = compute_syngas_molar_mass(self.syngas_ratio)
-        syngas_calorific_value_in = compute_syngas_calorific_value(
-            self.syngas_ratio)
-
-        # needed syngas_ratio could be 0 in this case syngas is H2
-        syngas_molar_mass_out = compute_syngas_molar_mass(
-            self.needed_syngas_ratio)
-        calorific_value_out = compute_syngas_calorific_value(
-            self.needed_syngas_ratio)
-
-        dsyngas_needs_dsyngas_ratio = (
-                                              dmol_syngas_in_dsyngas_ratio * syngas_molar_mass_in * syngas_calorific_value_in + mol_syngas_in *
-                                              dsyngas_molar_mass_in_dsyngas_ratio * syngas_calorific_value_in +
-                                              mol_syngas_in * syngas_molar_mass_in * dsyngas_calorific_value_in_dysngas_ratio) / (
-                                              mol_syngas_out * syngas_molar_mass_out *
-                                              calorific_value_out)
-
-        return dsyngas_needs_dsyngas_ratio
+        return self.get_syngas_ratio_sensitivity()['rwgs_dsyngas_needs']
 
     def get_theoretical_water_prod(self):
         ''' 
@@ -584,51 +409,10 @@ class RWGS(SyngasTechno):
         c = (r2-r1)/(1+r1)
         d = r2 - r1(1+r2)/(1+r1)
         '''
-
-        mol_H20 = (self.needed_syngas_ratio - self.syngas_ratio) / \
-                  (1.0 + self.syngas_ratio)
-        mol_H2 = 1.0
-
-        # needed syngas_ratio could be 0 in this case syngas is H2
-        needed_syngas_molar_mass = compute_syngas_molar_mass(
-            self.needed_syngas_ratio)
-        needed_calorific_value = compute_syngas_calorific_value(
-            self.needed_syngas_ratio)
-
-        water_data = Water.data_energy_dict
-        water_needs = mol_H20 * water_data['molar_mass'] / \
-                      (mol_H2 * needed_syngas_molar_mass *
-                       needed_calorific_value)
-
-        return water_needs
+        return self.get_syngas_ratio_sensitivity()['rwgs_water_prod']
 
     def compute_dwater_prod_dsynags_ratio(self):
-        mol_H20_up = (self.needed_syngas_ratio - self.syngas_ratio)
-
-        dmol_H20_up = -1.0
-
-        mol_H20_down = (1.0 + self.syngas_ratio)
-
-        dmol_H20_down = 1.0
-
-        dmol_H20_dsyngas_ratio = (
-                                         dmol_H20_up * mol_H20_down - dmol_H20_down * mol_H20_up) / mol_H20_down ** 2
-
-        mol_H2 = 1.0
-
-        # needed syngas_ratio could be 0 in this case syngas is H2
-        needed_syngas_molar_mass = compute_syngas_molar_mass(
-            self.needed_syngas_ratio)
-        needed_calorific_value = compute_syngas_calorific_value(
-            self.needed_syngas_ratio)
-
-        water_data = Water.data_energy_dict
-
-        dwater_needs_dsyngas_ratio = dmol_H20_dsyngas_ratio * water_data['molar_mass'] / \
-                                     (mol_H2 * needed_syngas_molar_mass *
-                                      needed_calorific_value)
-
-        return dwater_needs_dsyngas_ratio
+        return self.get_syngas_ratio_sensitivity()['rwgs_dwater_prod']
 
     def get_theoretical_co2_needs(self, unit='kg/kWh'):
         ''' 
@@ -638,26 +422,12 @@ class RWGS(SyngasTechno):
         c = (r2-r1)/(1+r1)
         d = r2 - r1(1+r2)/(1+r1)
         '''
-
-        mol_H2 = 1.0
-        mol_CO2 = self.needed_syngas_ratio - self.syngas_ratio * (1.0 + self.needed_syngas_ratio) / \
-                  (1.0 + self.syngas_ratio)
-
-        co2_data = CO2.data_energy_dict
-
-        # needed syngas_ratio could be 0 in this case syngas is H2
-        needed_syngas_molar_mass = compute_syngas_molar_mass(
-            self.needed_syngas_ratio)
-        needed_calorific_value = compute_syngas_calorific_value(
-            self.needed_syngas_ratio)
-
+        sensitivity = self.get_syngas_ratio_sensitivity()
         if unit == 'kg/kWh':
-            co2_needs = mol_CO2 * co2_data['molar_mass'] / \
-                        (mol_H2 * needed_syngas_molar_mass *
-                         needed_calorific_value)
+            co2_needs = sensitivity['rwgs_co2_needs']
         elif unit == 'kg/kg':
-            co2_needs = mol_CO2 * co2_data['molar_mass'] / \
-                        (mol_H2 * needed_syngas_molar_mass)
+            co2_needs = sensitivity['rwgs_mol_co2'] * CO2.data_energy_dict['molar_mass'] / \
+                        sensitivity['needed_molar_mass']
         else:
             raise Exception("The unit is not handled")
         return co2_needs
@@ -20,6 +20,7 @@ from sostrades_optimization_plugins.models.func_manager.func_manager_disc import
     FunctionManagerDisc,
 )
 
+from energy_models.glossaryenergy import GlossaryEnergy
 from energy_models.sos_processes.energy.MDA.energy_mix_optim_sub_process.usecase import (
     Study as subStudy,
 )
@@ -34,7 +35,8 @@ class Study(ClimateEconomicsStudyManager):
             file_path=__file__,
             execution_engine=None,
             run_usecase=False,
-            use_utilisation_ratio: bool = False
+            use_utilisation_ratio: bool = False,
+            year_end: int = GlossaryEnergy.YearEndDefault,
     ):
         super().__init__(
             file_path=file_path,
@@ -44,10 +46,12 @@ class Study(ClimateEconomicsStudyManager):
         self.optim_name = 'MDO'
         self.techno_dict = techno_dict_midway
         self.use_utilisation_ratio = use_utilisation_ratio
+        self.year_end = year_end
         self.test_post_procs = False
 
     def setup_usecase(self, study_folder_path=None):
-        data_usecase = subStudy(techno_dict=self.techno_dict, use_utilisation_ratio=self.use_utilisation_ratio)
+        data_usecase = subStudy(techno_dict=self.techno_dict, use_utilisation_ratio=self.use_utilisation_ratio,
+                                year_end=self.year_end)
         data_usecase.study_name = f'{self.study_name}.{self.optim_name}'
         data = data_usecase.setup_usecase()
 
@@ -19,10 +19,14 @@ from sostrades_core.tools.post_processing.plotly_native_charts.instantiated_plot
     InstantiatedPlotlyNativeChart,
 )
 
-from energy_models.glossaryenergy import GlossaryEnergy
+from energy_models.sos_processes.post_processing.post_proc_data_snapshot import (
+    PostProcessingSnapshot,
+)
 
 YEAR_COMPARISON = [2023, 2050]
 DECIMAL = 2
+# arrays of the post-processing snapshot used by the charts
+SNAPSHOT_ARRAYS = ('capex', 'opex', 'co2_tax', 'detailed_price')
 
 
 def post_processing_filters(execution_engine, namespace):
@@ -42,33 +46,23 @@ def post_processing_filters(execution_engine, namespace):
     return filters
 
 
-def get_techno_price_data(execution_engine, namespace, title, price_name, y_label):
+def get_techno_price_data(execution_engine, namespace, title, price_name, y_label, snapshot=None):
     '''
     Extracting Capex, Opex, CO2_Tax and total price from data manager for all technologies in the techno list
     '''
-
-    var_f_name = f"{namespace}.technologies_list"
-    techno_list = execution_engine.dm.get_value(var_f_name)
-
-    techno_price_data = {}
-
-    for techno in techno_list:
-        techno_prices_f_name = f"{namespace}.{techno}.techno_detailed_prices"  # "energy_detailed_techno_prices" for Hydrogen and Fuel
-        price_details = execution_engine.dm.get_value(techno_prices_f_name)
-        year_list = price_details[GlossaryEnergy.Years].tolist()
-        capex_list = price_details['CAPEX_Part'].tolist()
-        opex_list = price_details['OPEX_Part'].tolist()
-        CO2tax_list = price_details['CO2Tax_Part'].tolist()
-        energy_costs_List = price_details[techno].tolist()
-
-        if price_name == 'CAPEX_Part':
-            techno_price_data[techno] = capex_list
-        elif price_name == 'OPEX_Part':
-            techno_price_data[techno] = opex_list
-        elif price_name == 'CO2Tax_Part':
-            techno_price_data[techno] = CO2tax_list
-        else:
-            techno_price_data[techno] = energy_costs_List
+    if snapshot is None:
+        snapshot = PostProcessingSnapshot.from_stream(execution_engine, namespace, SNAPSHOT_ARRAYS)
+    year_list = snapshot.years.tolist()
+
+    if price_name == 'CAPEX_Part':
+        price_array = snapshot.capex
+    elif price_name == 'OPEX_Part':
+        price_array = snapshot.opex
+    elif price_name == 'CO2Tax_Part':
+        price_array = snapshot.co2_tax
+    else:
+        price_array = snapshot.detailed_price
+    techno_price_data = {techno: price_array[row].tolist() for row, (_, techno) in enumerate(snapshot.technos)}
 
     key_list = list(techno_price_data.keys())
     initial_y_values = []
@@ -143,22 +137,24 @@ def post_processings(execution_engine, namespace, filters):
     # ----
 
     split_title = namespace.split('.')
-    title = split_title[len(split_title) - 1] + ' Capex Price'
     energy = execution_engine.dm.get_disciplines_with_name(namespace)[0].discipline_wrapp.wrapper.energy_name
     if f'{energy} Capex value' in graphs_list:
-        capex_bar_slider_graph = get_techno_price_data(execution_engine, namespace, title, 'CAPEX_Part', 'Capex')
+        # the data of all the charts is read once from the data manager
+        snapshot = PostProcessingSnapshot.from_stream(execution_engine, namespace, SNAPSHOT_ARRAYS)
+
+        title = split_title[len(split_title) - 1] + ' Capex Price'
+        capex_bar_slider_graph = get_techno_price_data(execution_engine, namespace, title, 'CAPEX_Part', 'Capex',
+                                                       snapshot=snapshot)
         instanciated_charts.append(capex_bar_slider_graph)
 
-    title = split_title[len(split_title) - 1] + ' Opex Price'
-    energy = execution_engine.dm.get_disciplines_with_name(namespace)[0].discipline_wrapp.wrapper.energy_name
-    if f'{energy} Capex value' in graphs_list:
-        opex_bar_slider_graph = get_techno_price_data(execution_engine, namespace, title, 'OPEX_Part', 'Opex')
+        title = split_title[len(split_title) - 1] + ' Opex Price'
+        opex_bar_slider_graph = get_techno_price_data(execution_engine, namespace, title, 'OPEX_Part', 'Opex',
+                                                      snapshot=snapshot)
         instanciated_charts.append(opex_bar_slider_graph)
 
-    title = split_title[len(split_title) - 1] + ' Total Price'
-    energy = execution_engine.dm.get_disciplines_with_name(namespace)[0].discipline_wrapp.wrapper.energy_name
-    if f'{energy} Capex value' in graphs_list:
-        total_price_slider_graph = get_techno_price_data(execution_engine, namespace, title, 'Total_Price', 'Price')
+        title = split_title[len(split_title) - 1] + ' Total Price'
+        total_price_slider_graph = get_techno_price_data(execution_engine, namespace, title, 'Total_Price', 'Price',
+                                                         snapshot=snapshot)
         instanciated_charts.append(total_price_slider_graph)
 
     return instanciated_charts
@@ -0,0 +1,183 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+import numpy as np
+import pandas as pd
+
+from energy_models.glossaryenergy import GlossaryEnergy
+
+# (techno x year) arrays of the snapshot
+SNAPSHOT_ARRAYS = ['production', 'stream_production', 'invest', 'price', 'price_wotaxes',
+                   'capex', 'opex', 'co2_tax', 'detailed_price',
+                   'co2_per_use', 'co2_from_production', 'co2_per_kwh']
+# arrays read from the detailed prices of the technos with their column, None for the column of the techno
+DETAILED_PRICES_COLUMNS = {'capex': 'CAPEX_Part', 'opex': 'OPEX_Part', 'co2_tax': 'CO2Tax_Part', 'detailed_price': None}
+# arrays read from the detailed CO2 emissions of the technos
+CO2_ARRAYS = ['co2_per_use', 'co2_from_production', 'co2_per_kwh']
+
+
+def compute_co2_per_use(data_fuel_dict, nb_years):
+    '''
+    CO2 emitted by the use of the stream produced by a technology in kg/kWh
+    '''
+    co2_per_use = np.zeros(nb_years)
+    if GlossaryEnergy.CO2PerUse in data_fuel_dict and 'high_calorific_value' in data_fuel_dict:
+        if data_fuel_dict['CO2_per_use_unit'] == 'kg/kg':
+            co2_per_use = np.ones(nb_years) * data_fuel_dict[GlossaryEnergy.CO2PerUse] / data_fuel_dict[
+                'high_calorific_value']
+        elif data_fuel_dict['CO2_per_use_unit'] == 'kg/kWh':
+            co2_per_use = np.ones(nb_years) * data_fuel_dict[GlossaryEnergy.CO2PerUse]
+    return co2_per_use
+
+
+class PostProcessingSnapshot:
+    """
+    Data of the technologies of some streams, read in a single pass on the data manager
+    and shared by all the charts of a post-processing request.
+    The data is stored in (techno x year) arrays with a row for each (stream, techno) of technos,
+    the technos of a stream being contiguous rows
+    """
+
+    def __init__(self, execution_engine, discipline, stream_namespaces, arrays=SNAPSHOT_ARRAYS):
+        '''
+        :param discipline: discipline the post-processing is attached to
+        :param stream_namespaces: dict {stream name: namespace of the stream discipline}
+        :param arrays: names of the arrays of SNAPSHOT_ARRAYS to read, the other ones are None,
+            the other emissions are read with the CO2 arrays
+        '''
+        unknown_arrays = [array_name for array_name in arrays if array_name not in SNAPSHOT_ARRAYS]
+        if unknown_arrays:
+            raise Exception(f'Unknown post-processing snapshot arrays {unknown_arrays}')
+        dm = execution_engine.dm
+        self.discipline = discipline
+        self.years = np.arange(self.discipline.get_sosdisc_inputs(GlossaryEnergy.YearStart),
+                               self.discipline.get_sosdisc_inputs(GlossaryEnergy.YearEnd) + 1)
+        self.streams = list(stream_namespaces)
+        self.technos = []
+        self.stream_slices = {}
+        self.other_emission_types = []
+
+        rows = {array_name: [] for array_name in SNAPSHOT_ARRAYS if array_name in arrays}
+        read_co2_emissions = any(array_name in rows for array_name in CO2_ARRAYS)
+        other_emissions_rows = []
+        for stream, stream_namespace in stream_namespaces.items():
+            first_row = len(self.technos)
+            if 'stream_production' in rows:
+                stream_production = dm.get_value(f'{stream_namespace}.energy_production_detailed')
+            for techno in dm.get_value(f'{stream_namespace}.{GlossaryEnergy.techno_list}'):
+                techno_disc = dm.get_disciplines_with_name(f'{stream_namespace}.{techno}')[0]
+                self.technos.append((stream, techno))
+
+                if 'production' in rows:
+                    rows['production'].append(
+                        techno_disc.get_sosdisc_outputs(GlossaryEnergy.TechnoProductionValue)[
+                            f'{stream} ({GlossaryEnergy.energy_unit})'].values *
+                        techno_disc.get_sosdisc_inputs('scaling_factor_techno_production'))
+                if 'stream_production' in rows:
+                    rows['stream_production'].append(
+                        stream_production[f'{stream} {techno} ({GlossaryEnergy.energy_unit})'].values)
+                if 'invest' in rows:
+                    rows['invest'].append(
+                        techno_disc.get_sosdisc_inputs(GlossaryEnergy.InvestLevelValue)[GlossaryEnergy.InvestValue].values *
+                        techno_disc.get_sosdisc_inputs('scaling_factor_invest_level'))
+
+                if 'price' in rows or 'price_wotaxes' in rows:
+                    techno_prices = techno_disc.get_sosdisc_outputs(GlossaryEnergy.TechnoPricesValue)
+                    if 'price' in rows:
+                        rows['price'].append(techno_prices[techno].values)
+                    if 'price_wotaxes' in rows:
+                        rows['price_wotaxes'].append(techno_prices[f'{techno}_wotaxes'].values)
+                if any(array_name in rows for array_name in DETAILED_PRICES_COLUMNS):
+                    detailed_prices = techno_disc.get_sosdisc_outputs(GlossaryEnergy.TechnoDetailedPricesValue)
+                    for array_name, column in DETAILED_PRICES_COLUMNS.items():
+                        if array_name in rows:
+                            rows[array_name].append(detailed_prices[techno if column is None else column].values)
+
+                if read_co2_emissions:
+                    carbon_emissions = techno_disc.get_sosdisc_outputs('CO2_emissions_detailed')
+                    if techno not in carbon_emissions or 'production' not in carbon_emissions:
+                        raise Exception(f'Error occured for the definition of the CO2 emissions of {techno}')
+                    co2_per_use = compute_co2_per_use(techno_disc.get_sosdisc_inputs('data_fuel_dict'),
+                                                      len(carbon_emissions[GlossaryEnergy.Years]))
+                    if 'co2_per_use' in rows:
+                        rows['co2_per_use'].append(co2_per_use)
+                    if 'co2_from_production' in rows:
+                        rows['co2_from_production'].append(carbon_emissions['production'].values)
+                    if 'co2_per_kwh' in rows:
+                        rows['co2_per_kwh'].append(co2_per_use + carbon_emissions[techno].values)
+
+                    other_emissions = {emission_type: carbon_emissions[emission_type].values
+                                       for emission_type in carbon_emissions.columns
+                                       if emission_type not in [GlossaryEnergy.Years, 'production', techno]}
+                    self.other_emission_types += [emission_type for emission_type in other_emissions
+                                                  if emission_type not in self.other_emission_types]
+                    other_emissions_rows.append(other_emissions)
+            self.stream_slices[stream] = slice(first_row, len(self.technos))
+
+        shape = (len(self.technos), len(self.years))
+        for array_name in SNAPSHOT_ARRAYS:
+            setattr(self, array_name,
+                    np.array(rows[array_name], dtype=float).reshape(shape) if array_name in rows else None)
+        self.other_emissions = {}
+        for emission_type in self.other_emission_types:
+            self.other_emissions[emission_type] = np.zeros(shape)
+            for row, other_emissions in enumerate(other_emissions_rows):
+                if emission_type in other_emissions:
+                    self.other_emissions[emission_type][row] = other_emissions[emission_type]
+
+    @classmethod
+    def from_stream(cls, execution_engine, namespace, arrays=SNAPSHOT_ARRAYS):
+        '''
+        Snapshot of the technologies of the stream discipline at namespace
+        '''
+        discipline = execution_engine.dm.get_disciplines_with_name(namespace)[0]
+        return cls(execution_engine, discipline, {discipline.discipline_wrapp.wrapper.energy_name: namespace}, arrays)
+
+    @classmethod
+    def from_energy_mix(cls, execution_engine, namespace, arrays=SNAPSHOT_ARRAYS):
+        '''
+        Snapshot of the technologies of all the streams of the energy mix discipline at namespace,
+        biomass_dry has no technologies list in the energy mix
+        '''
+        discipline = execution_engine.dm.get_disciplines_with_name(namespace)[0]
+        stream_namespaces = {energy: f'{namespace}.{energy}'
+                             for energy in discipline.get_sosdisc_inputs(GlossaryEnergy.energy_list)
+                             if GlossaryEnergy.biomass_dry not in f'{namespace}.{energy}'}
+        return cls(execution_engine, discipline, stream_namespaces, arrays)
+
+    def get_year_index(self, year):
+        '''
+        Column of a year in the arrays of the snapshot
+        '''
+        return int(np.flatnonzero(self.years == year)[0])
+
+    def get_stream_technos(self, stream):
+        '''
+        Technologies of a stream, in the order of their rows
+        '''
+        return [techno for _, techno in self.technos[self.stream_slices[stream]]]
+
+    def get_multilevel_df(self, columns_by_array, stream=None):
+        '''
+        Dataframe with a (energy, techno) multilevel index and a row of arrays for each techno
+        :param columns_by_array: dict {dataframe column: (techno x year) array}
+        :param stream: only keep the technos of this stream if not None
+        '''
+        rows = range(len(self.technos)) if stream is None else range(len(self.technos))[self.stream_slices[stream]]
+        technos = [self.technos[row] for row in rows]
+        records = [[techno_array[row] for techno_array in columns_by_array.values()] + list(self.technos[row])
+                   for row in rows]
+        return pd.DataFrame(records, index=pd.MultiIndex.from_tuples(technos, names=['energy', 'techno']),
+                            columns=list(columns_by_array) + ['energy', 'technology'], dtype=object)
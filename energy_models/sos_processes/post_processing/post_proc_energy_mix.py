@@ -13,6 +13,7 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 '''
+import numpy as np
 from plotly import figure_factory as ff
 from sostrades_core.tools.post_processing.charts.chart_filter import ChartFilter
 from sostrades_core.tools.post_processing.plotly_native_charts.instantiated_plotly_native_chart import (
@@ -22,10 +23,14 @@ from sostrades_core.tools.post_processing.tables.instanciated_table import (
     InstanciatedTable,
 )
 
-from energy_models.glossaryenergy import GlossaryEnergy
+from energy_models.sos_processes.post_processing.post_proc_data_snapshot import (
+    PostProcessingSnapshot,
+)
 
 YEAR_COMPARISON = [2023, 2050]
 DECIMAL = 2
+# arrays of the post-processing snapshot used by the charts
+SNAPSHOT_ARRAYS = ('capex', 'opex', 'co2_tax', 'detailed_price', 'stream_production')
 
 
 def post_processing_filters(execution_engine, namespace):
@@ -56,37 +61,15 @@ def get_figures_table(table, title):
     return new_chart
 
 
-def get_techno_comparision_data(execution_engine, namespace, year):
+def get_techno_comparision_data(execution_engine, namespace, year, snapshot=None):
     '''
     Extracting Capex, Opex, CO2_Tax and total price from data manager for all technologies in the techno list
     '''
+    if snapshot is None:
+        snapshot = PostProcessingSnapshot.from_energy_mix(execution_engine, namespace, SNAPSHOT_ARRAYS)
+    i_year = snapshot.get_year_index(year)
 
     table_list = []
-    disc = execution_engine.dm.get_disciplines_with_name(namespace)
-    disc_input = disc[0].get_sosdisc_inputs()
-    energy_list = disc_input[GlossaryEnergy.energy_list]
-
-    techno_list = []
-    EnergyDict = {}
-    techno_production_dict = {}
-    for energ in energy_list:
-        var_f_name = f"{namespace}.{energ}.technologies_list"
-        var_energyproduction_name = f"{namespace}.{energ}.energy_production_detailed"
-
-        if GlossaryEnergy.biomass_dry not in var_f_name:
-            EnergyDict[f"{energ}"] = {}
-            loc_techno_list = execution_engine.dm.get_value(var_f_name)
-            result = [f"{energ}." + direction for direction in loc_techno_list]
-            techno_list.extend(result)
-            EnergyDict[f"{energ}"]['TechnoName'] = loc_techno_list
-            loc_energyproduction_df = execution_engine.dm.get_value(var_energyproduction_name)
-            production_filtereddata = loc_energyproduction_df[loc_energyproduction_df[GlossaryEnergy.Years] == year]
-            for col in production_filtereddata.columns:
-                if col != GlossaryEnergy.Years:
-                    production_techno_name = col.replace(energ, '').replace('(TWh)', '').strip()
-                    prod_value = production_filtereddata[col].iloc[0]
-                    techno_production_dict[production_techno_name] = prod_value
-
     capex_list = []
     opex_list = []
     CO2tax_list = []
@@ -99,30 +82,18 @@ def get_techno_comparision_data(execution_engine, namespace, year):
     average_CO2tax_list = []
     average_energy_costs_List = []
 
-    for energyname in EnergyDict.keys():
-        total_stream_production = 0
-        capex_average_price = 0
-        opex_average_price = 0
-        CO2tax_average_price = 0
-        energy_average_price = 0
+    for energyname in snapshot.streams:
+        rows = snapshot.stream_slices[energyname]
         energy_name_list.append(energyname)
+        techno_name_list.extend(snapshot.get_stream_technos(energyname))
 
-        for techno in EnergyDict[energyname]['TechnoName']:
-            techno_prices_f_name = f"{namespace}.{energyname}.{techno}.techno_detailed_prices"  # "energy_detailed_techno_prices" for Hydrogen and Fuel
-            price_details = execution_engine.dm.get_value(techno_prices_f_name)
-            techno_name_list.append(techno)
-            filtereddata = price_details[price_details[GlossaryEnergy.Years] == year]
-            capex_price = filtereddata['CAPEX_Part'].iloc[0]
-            opex_price = filtereddata['OPEX_Part'].iloc[0]
-            CO2tax_price = filtereddata['CO2Tax_Part'].iloc[0]
-            price = filtereddata[techno].iloc[0]
-
-            total_stream_production = total_stream_production + techno_production_dict[techno]
-            capex_average_price = capex_average_price + capex_price * techno_production_dict[techno]
-            opex_average_price = opex_average_price + opex_price * techno_production_dict[techno]
-            CO2tax_average_price = CO2tax_average_price + CO2tax_price * techno_production_dict[techno]
-            energy_average_price = energy_average_price + price * techno_production_dict[techno]
+        capex_prices = snapshot.capex[rows, i_year]
+        opex_prices = snapshot.opex[rows, i_year]
+        CO2tax_prices = snapshot.co2_tax[rows, i_year]
+        prices = snapshot.detailed_price[rows, i_year]
+        techno_productions = snapshot.stream_production[rows, i_year]
 
+        for capex_price, opex_price, CO2tax_price, price in zip(capex_prices, opex_prices, CO2tax_prices, prices):
             capex_price_percentage = capex_price * 100 / price
             opex_price_percentage = opex_price * 100 / price
             CO2tax_price_percentage = CO2tax_price * 100 / price
@@ -134,11 +105,12 @@ def get_techno_comparision_data(execution_engine, namespace, year):
                 str(round(CO2tax_price, DECIMAL)) + ' (' + str(round(CO2tax_price_percentage, DECIMAL)) + '%)')
             energy_costs_List.append(round(price, DECIMAL))
 
+        total_stream_production = techno_productions.sum()
         if total_stream_production != 0:
-            average_capex_value = capex_average_price / total_stream_production
-            average_opex_value = opex_average_price / total_stream_production
-            average_CO2tax_value = CO2tax_average_price / total_stream_production
-            average_price_value = energy_average_price / total_stream_production
+            average_capex_value = np.dot(capex_prices, techno_productions) / total_stream_production
+            average_opex_value = np.dot(opex_prices, techno_productions) / total_stream_production
+            average_CO2tax_value = np.dot(CO2tax_prices, techno_productions) / total_stream_production
+            average_price_value = np.dot(prices, techno_productions) / total_stream_production
 
             average_capex_price_percentage = average_capex_value * 100 / average_price_value
             average_opex_price_percentage = average_opex_value * 100 / average_price_value
@@ -200,8 +172,10 @@ def post_processings(execution_engine, namespace, filters):
         absolute_value_table = []
         average_value_table = []
         if f'{energy} Figures table' in graphs_list:  #
+            # the data of both years is read once from the data manager
+            snapshot = PostProcessingSnapshot.from_energy_mix(execution_engine, namespace, SNAPSHOT_ARRAYS)
             for year in YEAR_COMPARISON:
-                new_table = get_techno_comparision_data(execution_engine, namespace, year)
+                new_table = get_techno_comparision_data(execution_engine, namespace, year, snapshot=snapshot)
                 # new_table = get_figures_table(price_comparision_table_data, str(year))
                 absolute_value_table.append(new_table[0])
                 average_value_table.append(new_table[1])
@@ -28,6 +28,9 @@ from sostrades_core.tools.post_processing.tables.instanciated_table import (
 )
 
 from energy_models.glossaryenergy import GlossaryEnergy
+from energy_models.sos_processes.post_processing.post_proc_data_snapshot import (
+    PostProcessingSnapshot,
+)
 
 YEAR_COMPARISON = [2023, 2050]
 DECIMAL = 2
@@ -64,27 +67,24 @@ def get_figures_table(table, title):
     return new_chart
 
 
-def get_comparision_data(execution_engine, namespace, year):
+def get_comparision_data(execution_engine, namespace, year, snapshot=None):
     '''
     Extracting Capex, Opex, CO2_Tax and total price from data manager for all technologies in the techno list
     '''
-
-    var_f_name = f"{namespace}.technologies_list"
-    techno_list = execution_engine.dm.get_value(var_f_name)
+    if snapshot is None:
+        snapshot = PostProcessingSnapshot.from_stream(execution_engine, namespace)
+    techno_list = [techno for _, techno in snapshot.technos]
+    i_year = snapshot.get_year_index(year)
 
     capex_list = []
     opex_list = []
     CO2tax_list = []
     energy_costs_List = []
-    for techno in techno_list:
-        techno_prices_f_name = f"{namespace}.{techno}.techno_detailed_prices"  # "energy_detailed_techno_prices" for Hydrogen and Fuel
-        price_details = execution_engine.dm.get_value(techno_prices_f_name)
-
-        filtereddata = price_details[price_details[GlossaryEnergy.Years] == year]  # Filtering data for a year of 2023
-        capex_price = filtereddata['CAPEX_Part'].iloc[0]
-        opex_price = filtereddata['OPEX_Part'].iloc[0]
-        CO2tax_price = filtereddata['CO2Tax_Part'].iloc[0]
-        price = filtereddata[techno].iloc[0]
+    for row in range(len(techno_list)):
+        capex_price = snapshot.capex[row, i_year]
+        opex_price = snapshot.opex[row, i_year]
+        CO2tax_price = snapshot.co2_tax[row, i_year]
+        price = snapshot.detailed_price[row, i_year]
 
         capex_price_percentage = capex_price * 100 / price
         opex_price_percentage = opex_price * 100 / price
@@ -124,35 +124,41 @@ def post_processings(execution_engine, namespace, filters):
     # ----
 
     energy = execution_engine.dm.get_disciplines_with_name(namespace)[0].discipline_wrapp.wrapper.energy_name
+    if not any(chart in graphs_list for chart in [f'{energy} Figures table', f'{energy} CO2 intensity',
+                                                  f'{energy} CO2 breakdown sankey']):
+        return instanciated_charts
+    # the data of all the charts is read once from the data manager
+    snapshot = PostProcessingSnapshot.from_stream(execution_engine, namespace)
+
     if f'{energy} Figures table' in graphs_list:
         for year in YEAR_COMPARISON:
-            new_table = get_comparision_data(execution_engine, namespace, year)
+            new_table = get_comparision_data(execution_engine, namespace, year, snapshot=snapshot)
             # new_table = get_figures_table(price_comparision_table_data, str(year))
             instanciated_charts.append(new_table)
 
     if f'{energy} CO2 intensity' in graphs_list:
         chart_name = f'{energy} CO2 intensity summary'
         new_chart = get_chart_green_technologies(
-            execution_engine, namespace, energy_name=energy, chart_name=chart_name)
+            execution_engine, namespace, energy_name=energy, chart_name=chart_name, snapshot=snapshot)
         if new_chart is not None:
             instanciated_charts.append(new_chart)
 
         chart_name = f'{energy} CO2 intensity by years'
         new_chart = get_chart_green_technologies(
-            execution_engine, namespace, energy_name=energy, chart_name=chart_name, summary=False)
+            execution_engine, namespace, energy_name=energy, chart_name=chart_name, summary=False, snapshot=snapshot)
         if new_chart is not None:
             instanciated_charts.append(new_chart)
     # ---
     if f'{energy} CO2 breakdown sankey' in graphs_list:
         chart_name = f'{energy} CO2 breakdown sankey summary'
         new_chart = get_chart_Energy_CO2_breakdown_sankey(
-            execution_engine, namespace, energy_name=energy, chart_name=chart_name)
+            execution_engine, namespace, energy_name=energy, chart_name=chart_name, snapshot=snapshot)
         if new_chart is not None:
             instanciated_charts.append(new_chart)
 
         chart_name = f'{energy} CO2 breakdown sankey by years'
         new_chart = get_chart_Energy_CO2_breakdown_sankey(
-            execution_engine, namespace, energy_name=energy, chart_name=chart_name, summary=False)
+            execution_engine, namespace, energy_name=energy, chart_name=chart_name, summary=False, snapshot=snapshot)
         if new_chart is not None:
             instanciated_charts.append(new_chart)
 
@@ -160,54 +166,41 @@ def post_processings(execution_engine, namespace, filters):
 
 
 def get_chart_green_technologies(execution_engine, namespace, energy_name, chart_name='Technologies CO2 intensity',
-                                 summary=True):
+                                 summary=True, snapshot=None):
     '''! Function to create the green_techno/_energy scatter chart
     @param execution_engine: Execution engine object from which the data is gathered
     @param namespace: String containing the namespace to access the data
     @param chart_name:String, title of the post_proc
     @param energy_name:String, name of the energy that the technologies produce
     @param summary:Boolean, switch from summary (True) to detailed by years via sliders (False)
+    @param snapshot: PostProcessingSnapshot of the stream, read from the data manager if None
 
     @return new_chart: InstantiatedPlotlyNativeChart Scatter plot
     '''
 
     # Prepare data
-    multilevel_df, years = get_multilevel_df(
-        execution_engine, namespace, columns=['price_per_kWh', 'price_per_kWh_wotaxes',
-                                              'CO2_per_kWh', 'production', GlossaryEnergy.InvestValue])
+    if snapshot is None:
+        snapshot = PostProcessingSnapshot.from_stream(execution_engine, namespace)
+    years = snapshot.years
+    # technos that produce the selected energy
+    rows = snapshot.stream_slices.get(energy_name, slice(0, 0))
+    label = snapshot.technos[rows]
+    CO2_taxes = snapshot.discipline.get_sosdisc_inputs(GlossaryEnergy.CO2TaxesValue)[GlossaryEnergy.CO2Tax].values
     # Create Figure
     fig = go.Figure()
     # Get min and max CO2 emissions for colorscale and max of production for
     # marker size
-    array_of_cmin, array_of_cmax, array_of_pmax, array_of_pintmax = [], [], [], []
-    for (array_c, array_p) in multilevel_df[['CO2_per_kWh', 'production']].values:
-        array_of_cmin += [array_c.min()]
-        array_of_cmax += [array_c.max()]
-        array_of_pmax += [array_p.max()]
-        array_of_pintmax += [array_p.sum()]
-    cmin, cmax = np.min(array_of_cmin), np.max(array_of_cmax)
-    pmax, pintmax = np.max(array_of_pmax), np.max(array_of_pintmax)
+    cmin, cmax = np.min(snapshot.co2_per_kwh.min(axis=1)), np.max(snapshot.co2_per_kwh.max(axis=1))
+    pmax, pintmax = np.max(snapshot.production.max(axis=1)), np.max(snapshot.production.sum(axis=1))
     if summary:
         # Create a graph to aggregate the informations on all years
-        price_per_kWh, price_per_kWh_wotaxes, CO2_per_kWh, label, production, invest, total_CO2 = [
-        ], [], [], [], [], [], []
-        energy_disc = execution_engine.dm.get_disciplines_with_name(namespace)[
-            0]
-        CO2_taxes, CO2_taxes_array = energy_disc.get_sosdisc_inputs(GlossaryEnergy.CO2TaxesValue)[
-            GlossaryEnergy.CO2Tax].values, []
-        for i, row in multilevel_df.iterrows():
-            # skip techno that do not produce the selected energy
-            if i[0] != energy_name:
-                continue
-            price_per_kWh += [np.mean(row['price_per_kWh']), ]
-            price_per_kWh_wotaxes += [np.mean(row['price_per_kWh_wotaxes']), ]
-            CO2_per_kWh += [np.mean(row['CO2_per_kWh']), ]
-            label += [i, ]
-            production += [np.sum(row['production']), ]
-            invest += [np.sum(row[GlossaryEnergy.InvestValue]), ]
-            total_CO2 += [np.sum(row['CO2_per_kWh'] *
-                                 row['production']), ]
-            CO2_taxes_array += [np.mean(CO2_taxes), ]
+        price_per_kWh = list(np.mean(snapshot.price[rows], axis=1))
+        price_per_kWh_wotaxes = list(np.mean(snapshot.price_wotaxes[rows], axis=1))
+        CO2_per_kWh = list(np.mean(snapshot.co2_per_kwh[rows], axis=1))
+        production = list(np.sum(snapshot.production[rows], axis=1))
+        invest = list(np.sum(snapshot.invest[rows], axis=1))
+        total_CO2 = list(np.sum(snapshot.co2_per_kwh[rows] * snapshot.production[rows], axis=1))
+        CO2_taxes_array = [np.mean(CO2_taxes)] * len(label)
         customdata = [label, price_per_kWh, CO2_per_kWh,
                       production, invest, total_CO2, CO2_taxes_array,
                       price_per_kWh_wotaxes]
@@ -239,25 +232,13 @@ def get_chart_green_technologies(execution_engine, namespace, energy_name, chart
             ################
             # -technology level-#
             ################
-            price_per_kWh, price_per_kWh_wotaxes, CO2_per_kWh, label, production, invest, total_CO2 = [
-            ], [], [], [], [], [], []
-            energy_disc = execution_engine.dm.get_disciplines_with_name(namespace)[
-                0]
-            CO2_taxes, CO2_taxes_array = energy_disc.get_sosdisc_inputs(GlossaryEnergy.CO2TaxesValue)[
-                GlossaryEnergy.CO2Tax].values, []
-            for i, row in multilevel_df.iterrows():
-                # skip techno that do not produce the selected energy
-                if i[0] != energy_name:
-                    continue
-                price_per_kWh += [row['price_per_kWh'][i_year], ]
-                price_per_kWh_wotaxes += [row['price_per_kWh_wotaxes'][i_year], ]
-                CO2_per_kWh += [row['CO2_per_kWh'][i_year], ]
-                label += [i, ]
-                production += [row['production'][i_year], ]
-                invest += [row[GlossaryEnergy.InvestValue][i_year], ]
-                total_CO2 += [row['CO2_per_kWh'][i_year] *
-                              row['production'][i_year], ]
-                CO2_taxes_array += [CO2_taxes[i_year], ]
+            price_per_kWh = list(snapshot.price[rows, i_year])
+            price_per_kWh_wotaxes = list(snapshot.price_wotaxes[rows, i_year])
+            CO2_per_kWh = list(snapshot.co2_per_kwh[rows, i_year])
+            production = list(snapshot.production[rows, i_year])
+            invest = list(snapshot.invest[rows, i_year])
+            total_CO2 = list(snapshot.co2_per_kwh[rows, i_year] * snapshot.production[rows, i_year])
+            CO2_taxes_array = [CO2_taxes[i_year]] * len(label)
             customdata = [label, price_per_kWh, CO2_per_kWh,
                           production, invest, total_CO2, CO2_taxes_array,
                           price_per_kWh_wotaxes]
@@ -311,7 +292,7 @@ def get_chart_green_technologies(execution_engine, namespace, energy_name, chart
     return new_chart
 
 
-def get_multilevel_df(execution_engine, namespace, columns=None):
+def get_multilevel_df(execution_engine, namespace, columns=None, snapshot=None):
     '''! Function to create the dataframe with all the data necessary for the graphs in a multilevel [energy, technologies]
     @param execution_engine: Current execution engine object, from which the data is extracted
     @param namespace: Namespace at which the data can be accessed
@@ -319,79 +300,28 @@ def get_multilevel_df(execution_engine, namespace, columns=None):
     @return multilevel_df: Dataframe
     :param columns:
     :type columns:
+    :param snapshot: PostProcessingSnapshot of the stream, read from the data manager if None
     '''
+    if snapshot is None:
+        snapshot = PostProcessingSnapshot.from_stream(execution_engine, namespace)
     # Construct a DataFrame to organize the data on two levels: energy and
     # techno
-    idx = pd.MultiIndex.from_tuples([], names=['energy', 'techno'])
-    multilevel_df = pd.DataFrame(
-        index=idx,
-        columns=['production', GlossaryEnergy.InvestValue, 'CO2_per_kWh', 'price_per_kWh', 'price_per_kWh_wotaxes'])
-    energy_list = [execution_engine.dm.get_disciplines_with_name(namespace)[
-                       0].discipline_wrapp.wrapper.energy_name]
-    total_carbon_emissions = None
-    for energy in energy_list:
-        energy_disc = execution_engine.dm.get_disciplines_with_name(
-            f'{namespace}')[0]
-        techno_list = energy_disc.get_sosdisc_inputs(GlossaryEnergy.techno_list)
-        for techno in techno_list:
-            techno_disc = execution_engine.dm.get_disciplines_with_name(
-                f'{namespace}.{techno}')[0]
-            production_techno = techno_disc.get_sosdisc_outputs(
-                GlossaryEnergy.TechnoProductionValue)[f'{energy} ({GlossaryEnergy.energy_unit})'].values * \
-                                techno_disc.get_sosdisc_inputs(
-                                    'scaling_factor_techno_production')
-            invest_techno = techno_disc.get_sosdisc_inputs(GlossaryEnergy.InvestLevelValue)[
-                                GlossaryEnergy.InvestValue].values * \
-                            techno_disc.get_sosdisc_inputs('scaling_factor_invest_level')
-            # Calculate total CO2 emissions
-            data_fuel_dict = techno_disc.get_sosdisc_inputs('data_fuel_dict')
-            carbon_emissions = techno_disc.get_sosdisc_outputs(
-                'CO2_emissions_detailed')
-            CO2_per_use = np.zeros(
-                len(carbon_emissions[GlossaryEnergy.Years]))
-            if GlossaryEnergy.CO2PerUse in data_fuel_dict and 'high_calorific_value' in data_fuel_dict:
-                if data_fuel_dict['CO2_per_use_unit'] == 'kg/kg':
-                    CO2_per_use = np.ones(
-                        len(carbon_emissions[GlossaryEnergy.Years])) * data_fuel_dict[GlossaryEnergy.CO2PerUse] / data_fuel_dict[
-                                      'high_calorific_value']
-                elif data_fuel_dict['CO2_per_use_unit'] == 'kg/kWh':
-                    CO2_per_use = np.ones(
-                        len(carbon_emissions[GlossaryEnergy.Years])) * data_fuel_dict[GlossaryEnergy.CO2PerUse]
-            for emission_type in carbon_emissions:
-                if emission_type == techno:
-                    total_carbon_emissions = CO2_per_use + \
-                                             carbon_emissions[techno].values
-            if total_carbon_emissions is None:
-                raise Exception("Error occured for the definition of the variable total_carbon_emissions")
-            CO2_per_kWh_techno = total_carbon_emissions
-            # Data for scatter plot
-            price_per_kWh_techno = techno_disc.get_sosdisc_outputs(GlossaryEnergy.TechnoPricesValue)[
-                f'{techno}'].values
-            price_per_kWh_wotaxes_techno = techno_disc.get_sosdisc_outputs(GlossaryEnergy.TechnoPricesValue)[
-                f'{techno}_wotaxes'].values
-            idx = pd.MultiIndex.from_tuples(
-                [(f'{energy}', f'{techno}')], names=['energy', 'techno'])
-            columns_techno = ['energy', 'technology',
-                              'production', GlossaryEnergy.InvestValue,
-                              'CO2_per_kWh', 'price_per_kWh',
-                              'price_per_kWh_wotaxes']
-            techno_df = pd.DataFrame([(energy, techno, production_techno, invest_techno, CO2_per_kWh_techno,
-                                       price_per_kWh_techno, price_per_kWh_wotaxes_techno)],
-                                     index=idx, columns=columns_techno)
-            multilevel_df = pd.concat([multilevel_df, techno_df])
-
-    years = np.arange(energy_disc.get_sosdisc_inputs(
-        GlossaryEnergy.YearStart), energy_disc.get_sosdisc_inputs(GlossaryEnergy.YearEnd) + 1, 1)
+    multilevel_df = snapshot.get_multilevel_df({'production': snapshot.production,
+                                                GlossaryEnergy.InvestValue: snapshot.invest,
+                                                'CO2_per_kWh': snapshot.co2_per_kwh,
+                                                'price_per_kWh': snapshot.price,
+                                                'price_per_kWh_wotaxes': snapshot.price_wotaxes})
 
     # If columns is not None, return a subset of multilevel_df with selected
     # columns
     if columns is not None and isinstance(columns, list):
         multilevel_df = pd.DataFrame(multilevel_df[columns])
 
-    return multilevel_df, years
+    return multilevel_df, snapshot.years
 
 
-def get_chart_Energy_CO2_breakdown_sankey(execution_engine, namespace, chart_name, energy_name, summary=True):
+def get_chart_Energy_CO2_breakdown_sankey(execution_engine, namespace, chart_name, energy_name, summary=True,
+                                          snapshot=None):
     '''! Function to create the CO2 breakdown Sankey diagram
     @param execution_engine: Execution engine object from which the data is gathered
     @param namespace: String containing the namespace to access the data
@@ -401,11 +331,12 @@ def get_chart_Energy_CO2_breakdown_sankey(execution_engine, namespace, chart_nam
     @return new_chart: InstantiatedPlotlyNativeChart a Sankey Diagram
     :param summary:
     :type summary:
+    :param snapshot: PostProcessingSnapshot of the stream, read from the data manager if None
     '''
 
     # Prepare data
     multilevel_df, years = get_CO2_breakdown_multilevel_df(
-        execution_engine, namespace)
+        execution_engine, namespace, snapshot=snapshot)
     technologies_list = list(multilevel_df.loc[energy_name].index.values)
     other_emission_type = [col for col in multilevel_df.columns if col not in [
         'energy', 'technology', 'production', 'CO2_from_production', GlossaryEnergy.CO2PerUse, 'CO2_after_use']]
@@ -643,91 +574,23 @@ def get_chart_Energy_CO2_breakdown_sankey(execution_engine, namespace, chart_nam
     return new_chart
 
 
-def get_CO2_breakdown_multilevel_df(execution_engine, namespace):
+def get_CO2_breakdown_multilevel_df(execution_engine, namespace, snapshot=None):
     '''! Function to create the dataframe with all the data necessary for the CO2 breakdown graphs in a multilevel [energy, technologies]
     @param execution_engine: Current execution engine object, from which the data is extracted
     @param namespace: Namespace at which the data can be accessed
+    @param snapshot: PostProcessingSnapshot of the stream, read from the data manager if None
 
     @return multilevel_df: Dataframe
     '''
-
-    energy_disc = execution_engine.dm.get_disciplines_with_name(namespace)[0].discipline_wrapp.wrapper
-    energy_list = [energy_disc.energy_name]
-
-    years = np.arange(energy_disc.get_sosdisc_inputs(
-        GlossaryEnergy.YearStart), energy_disc.get_sosdisc_inputs(GlossaryEnergy.YearEnd) + 1, 1)
+    if snapshot is None:
+        snapshot = PostProcessingSnapshot.from_stream(execution_engine, namespace)
     # Construct a DataFrame to organize the data on two levels: energy and
-    # techno
-    idx = pd.MultiIndex.from_tuples([], names=['energy', 'techno'])
-    columns = ['production', 'CO2_from_production',
-               GlossaryEnergy.CO2PerUse, 'CO2_after_use']
-    # Gather all the possible emission types
-    other_emission_type = []
-    for energy in energy_list:
-        techno_list = energy_disc.get_sosdisc_inputs(GlossaryEnergy.techno_list)
-        for techno in techno_list:
-            techno_disc = execution_engine.dm.get_disciplines_with_name(
-                f'{namespace}.{techno}')[0]
-            carbon_emissions = techno_disc.get_sosdisc_outputs(
-                'CO2_emissions_detailed')
-            other_emission_type += [col for col in carbon_emissions.columns if col not in [
-                GlossaryEnergy.Years, 'production', techno]]
-    other_emission_type = list(set(other_emission_type))
-    columns += [f'CO2_from_{other_emission}_consumption' for other_emission in other_emission_type]
-    multilevel_df = pd.DataFrame(
-        index=idx,
-        columns=columns)
-    total_carbon_emissions = None
-    CO2_from_production = None
-    for energy in energy_list:
-        energy_disc = execution_engine.dm.get_disciplines_with_name(
-            f'{namespace}')[0]
-        techno_list = energy_disc.get_sosdisc_inputs(GlossaryEnergy.techno_list)
-        for techno in techno_list:
-            techno_disc = execution_engine.dm.get_disciplines_with_name(
-                f'{namespace}.{techno}')[0]
-            production_techno = techno_disc.get_sosdisc_outputs(
-                GlossaryEnergy.TechnoProductionValue)[f'{energy} ({GlossaryEnergy.energy_unit})'].values * \
-                                techno_disc.get_sosdisc_inputs(
-                                    'scaling_factor_techno_production')
-            # Calculate total CO2 emissions
-            data_fuel_dict = techno_disc.get_sosdisc_inputs('data_fuel_dict')
-            carbon_emissions = techno_disc.get_sosdisc_outputs(
-                'CO2_emissions_detailed')
-            CO2_per_use = np.zeros(
-                len(carbon_emissions[GlossaryEnergy.Years]))
-            if GlossaryEnergy.CO2PerUse in data_fuel_dict and 'high_calorific_value' in data_fuel_dict:
-                if data_fuel_dict['CO2_per_use_unit'] == 'kg/kg':
-                    CO2_per_use = np.ones(
-                        len(carbon_emissions[GlossaryEnergy.Years])) * data_fuel_dict[GlossaryEnergy.CO2PerUse] / data_fuel_dict[
-                                      'high_calorific_value']
-                elif data_fuel_dict['CO2_per_use_unit'] == 'kg/kWh':
-                    CO2_per_use = np.ones(
-                        len(carbon_emissions[GlossaryEnergy.Years])) * data_fuel_dict[GlossaryEnergy.CO2PerUse]
-            CO2_from_other_consumption = dict(
-                zip([f'CO2_from_{other_emission}_consumption' for other_emission in other_emission_type],
-                    [np.zeros(len(years)) for _ in other_emission_type]))
-            for emission_type in carbon_emissions:
-                if emission_type == GlossaryEnergy.Years:
-                    continue
-                elif emission_type == 'production':
-                    CO2_from_production = carbon_emissions[emission_type].values
-                elif emission_type == techno:
-                    total_carbon_emissions = CO2_per_use + \
-                                             carbon_emissions[techno].values
-                else:
-                    CO2_from_other_consumption[f'CO2_from_{emission_type}_consumption'] = carbon_emissions[
-                        emission_type].values
-            if total_carbon_emissions is None or CO2_from_production is None:
-                raise Exception("Error occured for the definition of the variable total_carbon_emissions or CO2_from_production")
-            CO2_after_use = total_carbon_emissions
-            idx = pd.MultiIndex.from_tuples(
-                [(f'{energy}', f'{techno}')], names=['energy', 'techno'])
-            columns_techno = ['energy', 'technology', 'production', 'CO2_from_production',
-                              GlossaryEnergy.CO2PerUse, 'CO2_after_use'] + list(CO2_from_other_consumption.keys())
-            techno_df = pd.DataFrame([[energy, techno, production_techno, CO2_from_production, CO2_per_use,
-                                       CO2_after_use] + list(CO2_from_other_consumption.values())],
-                                     index=idx, columns=columns_techno)
-            multilevel_df = pd.concat([multilevel_df, techno_df])
-
-    return multilevel_df, years
+    # techno, with a column for all the possible emission types
+    columns_by_array = {'production': snapshot.production,
+                        'CO2_from_production': snapshot.co2_from_production,
+                        GlossaryEnergy.CO2PerUse: snapshot.co2_per_use,
+                        'CO2_after_use': snapshot.co2_per_kwh}
+    for other_emission in snapshot.other_emission_types:
+        columns_by_array[f'CO2_from_{other_emission}_consumption'] = snapshot.other_emissions[other_emission]
+
+    return snapshot.get_multilevel_df(columns_by_array), snapshot.years
@@ -13,7 +13,6 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 '''
-import numpy as np
 import pandas as pd
 from plotly import graph_objects as go
 from sostrades_core.tools.post_processing.charts.chart_filter import ChartFilter
@@ -21,10 +20,14 @@ from sostrades_core.tools.post_processing.plotly_native_charts.instantiated_plot
     InstantiatedPlotlyNativeChart,
 )
 
-from energy_models.glossaryenergy import GlossaryEnergy
+from energy_models.sos_processes.post_processing.post_proc_data_snapshot import (
+    PostProcessingSnapshot,
+)
 
 YEAR_COMPARISON = [2023, 2050]
 DECIMAL = 2
+# arrays of the post-processing snapshot used by the charts
+SNAPSHOT_ARRAYS = ('capex', 'detailed_price', 'co2_per_kwh', 'stream_production')
 
 
 def post_processing_filters(execution_engine, namespace):
@@ -44,7 +47,7 @@ def post_processing_filters(execution_engine, namespace):
     return filters
 
 
-def get_techno_price_filter_data(execution_engine, namespace, title, price_name, y_label):
+def get_techno_price_filter_data(execution_engine, namespace, title, price_name, y_label, snapshot=None):
     '''
     Extracting Capex, Opex, CO2_Tax and total price from data manager for all technologies in the techno list
     title = string
@@ -53,88 +56,17 @@ def get_techno_price_filter_data(execution_engine, namespace, title, price_name,
     '''
 
     filtered_production_technology = 15
-    disc = execution_engine.dm.get_disciplines_with_name(namespace)
-    disc_input = disc[0].get_sosdisc_inputs()
-    energy_list = disc_input[GlossaryEnergy.energy_list]
-    techno_list = []
-    EnergyDict = {}
-    year_list = []
-    energy_name_list = []
-    var_energyproduction_all_energy_df = pd.DataFrame(columns=[GlossaryEnergy.Years])
-    y_incre = 0
-    for energ in energy_list:
-        var_f_name = f"{namespace}.{energ}.technologies_list"
-        var_energyproduction_name = f"{namespace}.{energ}.energy_production_detailed"
-        # biomass_dry not having techno list and other than biomass we are extracting energy list
-        if GlossaryEnergy.biomass_dry not in var_f_name:
-            EnergyDict[f"{energ}"] = {}
-            loc_techno_list = execution_engine.dm.get_value(var_f_name)
-            result = [f"{energ}." + direction for direction in loc_techno_list]
-            techno_list.extend(result)
-            EnergyDict[f"{energ}"]['TechnoName'] = loc_techno_list
-            var_energyproduction_df = execution_engine.dm.get_value(var_energyproduction_name)
-            if y_incre == 0:
-                var_energyproduction_all_energy_df = var_energyproduction_df.copy()
-                var_energyproduction_all_energy_df.columns = var_energyproduction_all_energy_df.columns.str.replace(
-                    energ + " ", energ + ".").str.replace(" (TWh)", "")
-            else:
-                var_energyproduction_all_energy_df = var_energyproduction_all_energy_df.merge(var_energyproduction_df)
-                var_energyproduction_all_energy_df.columns = var_energyproduction_all_energy_df.columns.str.replace(
-                    energ + " ", energ + ".").str.replace(" (TWh)", "")  #(r" \(.*\)", "")
-                # FIXME: r" is raw string not regex, need to use re.sub
-            y_incre += 1
-
-    techno_name_list = []
-    techno_price_filter_data = {}
-    co2_intensity = {}
-    co2_all_years = []
-    total_carbon_emissions = None
-    # looping energies
-    for energyname in EnergyDict.keys():
-        energy_name_list.append(energyname)
-
-        # looping technos for each energies
-        for techno in EnergyDict[energyname]['TechnoName']:
-            # extracting price data from techno_detailed_prices
-            techno_prices_f_name = f"{namespace}.{energyname}.{techno}.techno_detailed_prices"
-            techno_disc = execution_engine.dm.get_disciplines_with_name(f'{namespace}.{energyname}.{techno}')[0]
-            price_details = execution_engine.dm.get_value(techno_prices_f_name)
-
-            techno_name_list.append(techno)
-            year_list = price_details[GlossaryEnergy.Years].tolist()
-            capex_list = price_details['CAPEX_Part'].tolist()
-            energy_costs_List = price_details[techno].tolist()
-
-            # based on price name we are extracting price data
-            if price_name == 'CAPEX_Part':
-                techno_price_filter_data[energyname + '.' + techno] = capex_list
-            else:
-                techno_price_filter_data[energyname + '.' + techno] = energy_costs_List
-
-            # Calculate total CO2 intensity
-            data_fuel_dict = techno_disc.get_sosdisc_inputs('data_fuel_dict')
-            carbon_emissions = techno_disc.get_sosdisc_outputs('CO2_emissions_detailed')
-            CO2_per_use = np.zeros(len(year_list))
-
-            if GlossaryEnergy.CO2PerUse in data_fuel_dict and 'high_calorific_value' in data_fuel_dict:
-                if data_fuel_dict['CO2_per_use_unit'] == 'kg/kg':
-                    CO2_per_use = np.ones(
-                        len(year_list)) * data_fuel_dict[GlossaryEnergy.CO2PerUse] / data_fuel_dict[
-                                      'high_calorific_value']
-                elif data_fuel_dict['CO2_per_use_unit'] == 'kg/kWh':
-                    CO2_per_use = np.ones(
-                        len(year_list)) * data_fuel_dict[GlossaryEnergy.CO2PerUse]
-            for emission_type in carbon_emissions:
-                if emission_type == techno:
-                    total_carbon_emissions = CO2_per_use + \
-                                             carbon_emissions[techno].values
-            if total_carbon_emissions is None:
-                raise Exception("Error occured for the definition of the variable total_carbon_emissions")
-            CO2_per_kWh_techno = total_carbon_emissions
-            # Getting data for particular year
-            co2_intensity[energyname + '.' + techno] = CO2_per_kWh_techno.tolist()
-            # Getting the co2 data for all the years
-            co2_all_years.extend(co2_intensity[energyname + '.' + techno])
+    if snapshot is None:
+        snapshot = PostProcessingSnapshot.from_energy_mix(execution_engine, namespace, SNAPSHOT_ARRAYS)
+    year_list = snapshot.years.tolist()
+
+    # based on price name we are extracting price data
+    price_array = snapshot.capex if price_name == 'CAPEX_Part' else snapshot.detailed_price
+    techno_keys = [energyname + '.' + techno for energyname, techno in snapshot.technos]
+    techno_price_filter_data = dict(zip(techno_keys, price_array))
+    co2_intensity = dict(zip(techno_keys, snapshot.co2_per_kwh))
+    production = dict(zip(techno_keys, snapshot.stream_production))
+    co2_min, co2_max = snapshot.co2_per_kwh.min(), snapshot.co2_per_kwh.max()
 
     # Gathering trace for all the years
     fig = go.Figure()
@@ -148,7 +80,7 @@ def get_techno_price_filter_data(execution_engine, namespace, title, price_name,
         for key in techno_price_filter_data.keys():
             y_values.append(techno_price_filter_data[key][i])
             co2_values.append(co2_intensity[key][i])
-            production_values.append(var_energyproduction_all_energy_df[key][i])
+            production_values.append(production[key][i])
         # creating dictionary to get all technos, prices and CO2
         data_dict = {'techno': key_list, 'y_values': y_values,
                      'co2': co2_values, 'production': production_values}
@@ -172,7 +104,7 @@ def get_techno_price_filter_data(execution_engine, namespace, title, price_name,
             marker=dict(
                 # set color equal to a variable
                 color=co2_values,
-                cmin=min(co2_all_years), cmax=max(co2_all_years),
+                cmin=co2_min, cmax=co2_max,
                 # one of plotly color scales
                 colorscale='RdYlGn_r',
                 # enable color scale
@@ -232,18 +164,18 @@ def post_processings(execution_engine, namespace, filters):
     # Sometimes wrapper object is None, TODO Need to find another way to find energy_name
     wrapper_type = execution_engine.dm.get_disciplines_with_name(namespace)[0].discipline_wrapp.wrapper
     if wrapper_type is not None:
-        energy = execution_engine.dm.get_disciplines_with_name(namespace)[0].discipline_wrapp.wrapper.energy_name
+        energy = wrapper_type.energy_name
         if f'{energy} Price data of all technologies' in graphs_list:
+            # the data of both charts is read once from the data manager
+            snapshot = PostProcessingSnapshot.from_energy_mix(execution_engine, namespace, SNAPSHOT_ARRAYS)
             capex_bar_slider_graph = get_techno_price_filter_data(execution_engine, namespace,
                                                                   '15 Most Producing Technologies Capex', 'CAPEX_Part',
-                                                                  'Capex')
+                                                                  'Capex', snapshot=snapshot)
             instanciated_charts.append(capex_bar_slider_graph)
 
-        energy = execution_engine.dm.get_disciplines_with_name(namespace)[0].discipline_wrapp.wrapper.energy_name
-        if f'{energy} Price data of all technologies' in graphs_list:
             total_price_bar_slider_graph = get_techno_price_filter_data(execution_engine, namespace,
                                                                         '15 Most Producing Technologies Price',
-                                                                        'PRICE_Part', 'Price')
+                                                                        'PRICE_Part', 'Price', snapshot=snapshot)
             instanciated_charts.append(total_price_bar_slider_graph)
 
     return instanciated_charts
@@ -0,0 +1,148 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+import argparse
+import json
+import os
+from os.path import join
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+TECHNO_DATA_FOLDERS = ["techno_invests", "techno_production_historic", "techno_factories_age"]
+DEFAULT_DATA_ENERGY_FOLDER = join(Path(__file__).parents[1], "data_energy")
+# path of the bundle file, by default in the user cache folder so that the installed package is never written
+BUNDLE_PATH_ENV_VAR = "ENERGY_MODELS_TECHNO_DATA_BUNDLE"
+DEFAULT_BUNDLE_PATH = os.environ.get(BUNDLE_PATH_ENV_VAR, join(
+    os.environ.get("XDG_CACHE_HOME", join(os.path.expanduser("~"), ".cache")), "energy_models",
+    "techno_data_bundle.npy"))
+
+
+class TechnoDataBundle:
+    """
+    Binary bundle of the techno csv files of data_energy, built by the explicit build step
+    python -m energy_models.techno_data_bundle [--bundle-path <path>] [--data-energy-folder <path>]
+    The bundle is a single file, published with one rename so that a reader never sees a partial bundle :
+        - a .npy array with the numeric columns of all csv files, one after the other, read through memory mapping
+        - followed by the json index (folder, formatted techno name) -> rows of each column in the array
+          (or values of the text columns) and the signature (size, modification time) of all csv files
+    The bundle is only loaded at runtime : if it is missing or if the csv files have changed since its build,
+    load returns None and the csv files are read.
+    """
+
+    def __init__(self, bundle_path: str):
+        with open(bundle_path, "rb") as bundle_file:
+            version = np.lib.format.read_magic(bundle_file)
+            read_array_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else \
+                np.lib.format.read_array_header_2_0
+            shape, _, dtype = read_array_header(bundle_file)
+            offset = bundle_file.tell()
+            bundle_file.seek(offset + int(np.prod(shape)) * dtype.itemsize)
+            self.index = json.loads(bundle_file.read().decode())
+        self.values = np.memmap(bundle_path, dtype=dtype, mode="r", offset=offset, shape=shape) if np.prod(shape) > 0 \
+            else np.zeros(shape, dtype=dtype)
+
+    @classmethod
+    def load(cls, bundle_path: str = DEFAULT_BUNDLE_PATH, data_energy_folder: str = DEFAULT_DATA_ENERGY_FOLDER):
+        """
+        Bundle stored at bundle_path, None if it has not been built or if it is stale
+        The freshness of the bundle is checked once, against the signature of the csv files of data_energy_folder
+        """
+        if not os.path.isfile(bundle_path):
+            return None
+        bundle = cls(bundle_path)
+        if bundle.index["signature"] != get_techno_data_signature(data_energy_folder):
+            return None
+        return bundle
+
+    def get_dataframe(self, path_to_csv: str):
+        """
+        Dataframe of the csv file as read by pd.read_csv, None if the csv file is not in the bundle
+        """
+        folder, file_name = os.path.split(path_to_csv)
+        entry = self.index["files"].get(os.path.basename(folder), {}).get(file_name)
+        if entry is None:
+            return None
+
+        columns = {}
+        for column in entry["columns"]:
+            if "values" in column:
+                columns[column["name"]] = np.array(column["values"], dtype=object)
+            else:
+                start = column["start"]
+                columns[column["name"]] = np.array(self.values[start:start + entry["nb_rows"]]).astype(column["dtype"])
+        return pd.DataFrame(columns)
+
+
+def get_techno_csv_paths(folder: str):
+    """
+    Paths of the non empty csv files of a techno data folder, empty csv files are not techno data
+    """
+    return [join(folder, file_name) for file_name in sorted(os.listdir(folder))
+            if file_name.endswith(".csv") and os.path.getsize(join(folder, file_name)) > 0]
+
+
+def get_techno_data_signature(data_energy_folder: str = DEFAULT_DATA_ENERGY_FOLDER):
+    """
+    Folder, names, sizes and modification times of all the csv files of the techno data folders
+    """
+    signature = {"data_energy_folder": os.path.abspath(data_energy_folder)}
+    for folder in TECHNO_DATA_FOLDERS:
+        with os.scandir(join(data_energy_folder, folder)) as entries:
+            file_stats = [(entry.name, entry.stat()) for entry in entries if entry.name.endswith(".csv")]
+        signature[folder] = sorted([name, file_stat.st_size, file_stat.st_mtime_ns] for name, file_stat in file_stats)
+    return signature
+
+
+def build_techno_data_bundle(data_energy_folder: str = DEFAULT_DATA_ENERGY_FOLDER,
+                             bundle_path: str = DEFAULT_BUNDLE_PATH):
+    """
+    Build step of the bundle : pack all the non empty csv files of the techno data folders of data_energy
+    The bundle is written under a temporary name then renamed, so that a bundle being built is never read
+    """
+    signature = get_techno_data_signature(data_energy_folder)
+    files = {}
+    values = []
+    nb_values = 0
+    for folder in TECHNO_DATA_FOLDERS:
+        files[folder] = {}
+        for path_to_csv in get_techno_csv_paths(join(data_energy_folder, folder)):
+            df = pd.read_csv(path_to_csv)
+            columns = []
+            for name in df.columns:
+                if pd.api.types.is_numeric_dtype(df[name]):
+                    columns.append({"name": name, "dtype": str(df[name].dtype), "start": nb_values})
+                    values.append(df[name].values.astype(np.float64))
+                    nb_values += len(df)
+                else:
+                    columns.append({"name": name, "values": df[name].tolist()})
+            files[folder][os.path.basename(path_to_csv)] = {"nb_rows": len(df), "columns": columns}
+
+    bundle_folder = os.path.dirname(os.path.abspath(bundle_path))
+    os.makedirs(bundle_folder, exist_ok=True)
+    tmp_path = f"{bundle_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as bundle_file:
+        np.save(bundle_file, np.concatenate(values) if values else np.zeros(0))
+        bundle_file.write(json.dumps({"signature": signature, "files": files}).encode())
+    os.replace(tmp_path, bundle_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the binary bundle of the techno csv files of data_energy")
+    parser.add_argument("--bundle-path", default=DEFAULT_BUNDLE_PATH)
+    parser.add_argument("--data-energy-folder", default=DEFAULT_DATA_ENERGY_FOLDER)
+    arguments = parser.parse_args()
+    build_techno_data_bundle(arguments.data_energy_folder, arguments.bundle_path)
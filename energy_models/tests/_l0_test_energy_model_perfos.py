@@ -18,12 +18,14 @@ import cProfile
 import pstats
 import unittest
 from io import StringIO
+from os.path import dirname, join
 from pathlib import Path
 from shutil import rmtree
 from time import sleep
 
 from sostrades_core.execution_engine.execution_engine import ExecutionEngine
 
+from energy_models.core.discipline_instrumentation import discipline_instrumentation
 from energy_models.sos_processes.energy.MDA.energy_process_v0_mda.usecase import Study
 
 
@@ -68,10 +70,15 @@ class TestModelPerfo(unittest.TestCase):
 
         self.ee.load_study_from_input_dict(full_values_dict)
 
+        discipline_instrumentation.reset()
+        discipline_instrumentation.enable(trace_allocations=False)
         profil = cProfile.Profile()
         profil.enable()
         self.ee.execute()
         profil.disable()
+        discipline_instrumentation.disable()
+        # wall time of each discipline and phase
+        print(discipline_instrumentation.get_summary().head(30).to_string())
         result = StringIO()
 
         ps = pstats.Stats(profil, stream=result)
@@ -82,13 +89,9 @@ class TestModelPerfo(unittest.TestCase):
         result = 'ncalls' + result.split('ncalls')[-1]
         result = '\n'.join([','.join(line.rstrip().split(None, 5))
                             for line in result.split('\n')])
-
-
-#
-#         with open(join(dirname(__file__), 'performances', 'energy_models_perfos.csv'), 'w+') as f:
-#             #f = open(result.rsplit('.')[0] + '.csv', 'w')
-#             f.write(result)
-#             f.close()
+        # profile of the current code, the snapshot is not versioned (see the benchmark baseline for the gating)
+        with open(join(dirname(__file__), 'performances', 'energy_models_perfos.csv'), 'w') as f:
+            f.write(result)
 
 
 if '__main__' == __name__:
@@ -0,0 +1,111 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from energy_models.core.ccus.ccus import (
+    CCUS,
+    compute_carbon_storage_limited_by_capture_gt_and_der,
+)
+from energy_models.glossaryenergy import GlossaryEnergy
+
+
+class CCUSStorageLimitedTestCase(unittest.TestCase):
+    """
+    Fused carbon storage limited by capture kernel of the CCUS model test class
+    """
+
+    def setUp(self):
+        '''
+        Initialize data needed for testing
+        '''
+        self.years = np.arange(2020, 2031)
+        nb_years = len(self.years)
+        rng = np.random.default_rng(0)
+        self.kernel_inputs = {'carbon_capture_prod_mt': rng.uniform(0., 1., nb_years),
+                              'carbon_storage_prod_mt': rng.uniform(0., 1., nb_years),
+                              'carbon_capture_from_energy_mix_gt': rng.uniform(0., 1., nb_years),
+                              'co2_emissions_needed_by_energy_mix_gt': rng.uniform(0., 1., nb_years),
+                              'co2_for_food_mt': np.zeros(nb_years),
+                              'scaling_factor_energy_prod': 1e3}
+        # carbon to be stored equal to the storage on the first years
+        self.kernel_inputs['carbon_capture_prod_mt'][:2] = [0.25, 0.5]
+        self.kernel_inputs['carbon_capture_from_energy_mix_gt'][:2] = [0.5, 0.25]
+        self.kernel_inputs['carbon_storage_prod_mt'][:2] = 0.75
+
+    def test_01_derivatives(self):
+        outputs, storage_limited_der = compute_carbon_storage_limited_by_capture_gt_and_der(**self.kernel_inputs)
+        carbon_storage_limited_by_capture_gt = outputs[1]
+        self.assertEqual(set(storage_limited_der), set(self.kernel_inputs) - {'scaling_factor_energy_prod'})
+
+        # the derivative of the minimum is split between the carbon to be stored and the storage when they are equal
+        np.testing.assert_array_equal(storage_limited_der['carbon_capture_from_energy_mix_gt'][:2], [0.5, 0.5])
+        np.testing.assert_array_equal(storage_limited_der['carbon_storage_prod_mt'][:2], [0.5, 0.5])
+        np.testing.assert_array_equal(storage_limited_der['co2_emissions_needed_by_energy_mix_gt'], 0.)
+
+        # finite differences out of the ties
+        step = 1e-7
+        for input_name in ['carbon_capture_prod_mt', 'carbon_storage_prod_mt', 'carbon_capture_from_energy_mix_gt']:
+            kernel_inputs = dict(self.kernel_inputs)
+            kernel_inputs[input_name] = kernel_inputs[input_name] + step
+            outputs_step, _ = compute_carbon_storage_limited_by_capture_gt_and_der(**kernel_inputs)
+            np.testing.assert_allclose((outputs_step[1][2:] - carbon_storage_limited_by_capture_gt[2:]) / step,
+                                       storage_limited_der[input_name][2:], rtol=1e-5, atol=1e-8)
+
+    def test_02_cached_kernel(self):
+        inputs_dict = {GlossaryEnergy.YearStart: self.years[0],
+                       GlossaryEnergy.YearEnd: self.years[-1],
+                       'scaling_factor_energy_production': self.kernel_inputs['scaling_factor_energy_prod'],
+                       f'{GlossaryEnergy.carbon_capture}.{GlossaryEnergy.EnergyProductionValue}': pd.DataFrame(
+                           {GlossaryEnergy.Years: self.years,
+                            GlossaryEnergy.carbon_capture: self.kernel_inputs['carbon_capture_prod_mt']}),
+                       f'{GlossaryEnergy.carbon_storage}.{GlossaryEnergy.EnergyProductionValue}': pd.DataFrame(
+                           {GlossaryEnergy.Years: self.years,
+                            GlossaryEnergy.carbon_storage: self.kernel_inputs['carbon_storage_prod_mt']}),
+                       'carbon_capture_from_energy_mix': pd.DataFrame(
+                           {GlossaryEnergy.Years: self.years,
+                            f'{GlossaryEnergy.carbon_capture} from energy mix (Gt)':
+                                self.kernel_inputs['carbon_capture_from_energy_mix_gt']}),
+                       'co2_emissions_needed_by_energy_mix': pd.DataFrame(
+                           {GlossaryEnergy.Years: self.years,
+                            f'{GlossaryEnergy.carbon_capture} needed by energy mix (Gt)':
+                                self.kernel_inputs['co2_emissions_needed_by_energy_mix_gt']})}
+        model = CCUS(GlossaryEnergy.ccus_type)
+        model.configure_parameters(inputs_dict)
+        model.compute_co2_emissions()
+        storage_limited = model.storage_limited
+
+        # the gradient reads the result of the compute
+        gradients = model.grad_co2_emissions_ccus_Gt()
+        self.assertIs(model.storage_limited, storage_limited)
+        np.testing.assert_array_equal(
+            gradients[f'{GlossaryEnergy.carbon_storage}.{GlossaryEnergy.EnergyProductionValue}'][0][1],
+            storage_limited[1]['carbon_storage_prod_mt'])
+        np.testing.assert_array_equal(
+            model.outputs_dict['co2_emissions_ccus_Gt'][f'{GlossaryEnergy.carbon_storage} Limited by capture (Gt)'],
+            storage_limited[0][1])
+
+        # the kernel is evaluated again when an input changes
+        inputs_dict['carbon_capture_from_energy_mix'] = inputs_dict['carbon_capture_from_energy_mix'] * 2.
+        model.configure_parameters(inputs_dict)
+        model.grad_co2_emissions_ccus_Gt()
+        self.assertIsNot(model.storage_limited, storage_limited)
+
+
+if __name__ == "__main__":
+    unittest.main()
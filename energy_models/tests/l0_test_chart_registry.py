@@ -0,0 +1,138 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+import unittest
+
+import numpy as np
+import pandas as pd
+from sostrades_core.tools.post_processing.charts.chart_filter import ChartFilter
+
+from energy_models.core.chart_registry import (
+    CHARTS_FILTER_KEY,
+    ChartDeclaration,
+    ChartRegistry,
+    LazyChartsMixin,
+)
+
+
+class PricesDiscipline(LazyChartsMixin):
+    chart_registry = ChartRegistry([
+        ChartDeclaration('Prices', 'get_chart_prices', dependencies=('margin',), filter_keys=('price_unit',)),
+        ChartDeclaration('Production', 'get_chart_production'),
+        ChartDeclaration(None, 'get_chart_flow'),
+    ])
+
+    def __init__(self):
+        self.inputs = {'margin': pd.DataFrame({'margin': np.full(3, 110.)})}
+        self.outputs = {'prices': pd.DataFrame({'prices': np.arange(3.)})}
+        self.built_charts = []
+
+    def get_data_in(self):
+        return self.inputs
+
+    def get_sosdisc_inputs(self, key):
+        return self.inputs[key]
+
+    def get_sosdisc_outputs(self):
+        return self.outputs
+
+    def get_chart_prices(self, price_unit_list):
+        self.built_charts.append('Prices')
+        return [f'Prices in {price_unit}' for price_unit in price_unit_list]
+
+    def get_chart_production(self):
+        self.built_charts.append('Production')
+        return 'Production'
+
+    def get_chart_flow(self):
+        self.built_charts.append('Flow')
+        return None
+
+
+class ProductionDiscipline(PricesDiscipline):
+    chart_registry = PricesDiscipline.chart_registry.extend([
+        ChartDeclaration('Emissions', 'get_chart_emissions'),
+    ])
+
+    def get_chart_emissions(self):
+        return 'Emissions'
+
+
+class ChartRegistryTestCase(unittest.TestCase):
+    """
+    Lazy post-processing charts of the disciplines test class
+    """
+
+    def setUp(self):
+        '''
+        Initialize data needed for testing
+        '''
+        self.discipline = PricesDiscipline()
+        self.default_filter_values = {'price_unit': ['$/MWh']}
+
+    def get_filters(self, chart_list, price_unit_list=('$/MWh',)):
+        return [ChartFilter('Charts', chart_list, chart_list, CHARTS_FILTER_KEY),
+                ChartFilter('Price unit', ['$/MWh', '$/t'], list(price_unit_list), 'price_unit')]
+
+    def test_01_requested_charts(self):
+        # without filters, the charts are built with the default filter values
+        charts = self.discipline.get_lazy_charts(None, self.default_filter_values)
+        self.assertEqual(charts, [])
+        self.assertEqual(self.discipline.built_charts, ['Flow'])
+
+        charts = self.discipline.get_lazy_charts(self.get_filters(['Production']))
+        self.assertEqual(charts, ['Production'])
+        self.assertEqual(self.discipline.built_charts, ['Flow', 'Production'])
+
+        charts = self.discipline.get_lazy_charts(self.get_filters(['Production', 'Prices'], ['$/MWh', '$/t']))
+        self.assertEqual(charts, ['Prices in $/MWh', 'Prices in $/t', 'Production'])
+
+        # the registry of a subclass keeps the charts of its parent first
+        self.assertEqual([declaration.name for declaration in ProductionDiscipline.chart_registry.declarations],
+                         ['Prices', 'Production', None, 'Emissions'])
+        self.assertEqual(len(PricesDiscipline.chart_registry.declarations), 3)
+        charts = ProductionDiscipline().get_lazy_charts(self.get_filters(['Emissions', 'Prices']))
+        self.assertEqual(charts, ['Prices in $/MWh', 'Emissions'])
+
+    def test_02_charts_cache(self):
+        filters = self.get_filters(['Prices', 'Production'])
+        charts = self.discipline.get_lazy_charts(filters)
+        self.assertEqual(self.discipline.get_lazy_charts(filters), charts)
+        self.assertEqual(self.discipline.built_charts, ['Prices', 'Production', 'Flow'])
+
+        # new filter values build a new chart
+        self.discipline.get_lazy_charts(self.get_filters(['Prices'], ['$/t']))
+        self.assertEqual(self.discipline.built_charts[3:], ['Prices'])
+
+        # a change of a dependency only builds again the charts depending on it
+        self.discipline.built_charts = []
+        self.discipline.inputs['margin'] = self.discipline.inputs['margin'] * 1.2
+        self.discipline.get_lazy_charts(filters)
+        self.assertEqual(self.discipline.built_charts, ['Prices'])
+
+        # a change of the outputs builds again all the charts
+        self.discipline.built_charts = []
+        self.discipline.outputs['prices'] = self.discipline.outputs['prices'] + 1.
+        self.discipline.get_lazy_charts(filters)
+        self.assertEqual(self.discipline.built_charts, ['Prices', 'Production', 'Flow'])
+
+        self.discipline.built_charts = []
+        self.discipline.clear_charts_cache()
+        self.discipline.get_lazy_charts(filters)
+        self.assertEqual(self.discipline.built_charts, ['Prices', 'Production', 'Flow'])
+
+
+if __name__ == "__main__":
+    unittest.main()
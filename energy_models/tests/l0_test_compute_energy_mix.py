@@ -18,15 +18,43 @@ import unittest
 
 import numpy as np
 import pandas as pd
+import scipy.sparse as sp
 from sostrades_core.execution_engine.execution_engine import ExecutionEngine
 from sostrades_core.tools.post_processing.post_processing_factory import (
     PostProcessingFactory,
 )
 
 from energy_models.core.energy_mix.energy_mix import EnergyMix
+from energy_models.core.jacobian_blocks import JacobianBlocksTape
 from energy_models.glossaryenergy import GlossaryEnergy
 
 
+class JacobianBlocksRecorder(JacobianBlocksTape):
+    """
+    Tape keeping all the jacobian blocks set by compute_sos_jacobian, as given to the full jacobian
+    """
+
+    def __init__(self):
+        super().__init__({})
+        self.blocks = {}
+
+    def has_output(self, *outputs):
+        return True
+
+    def record(self, y_key_column, x_key_column, value):
+        self.blocks[(y_key_column, x_key_column)] = value
+
+
+def to_dense_block(block, nb_lines):
+    '''
+    Dense 2D array of a jacobian block, 1-D blocks being rows of scalar outputs or columns of scalar inputs
+    '''
+    block = block.toarray() if sp.issparse(block) else np.asarray(block)
+    if block.ndim == 1:
+        block = block[np.newaxis, :] if nb_lines == 1 else block[:, np.newaxis]
+    return block
+
+
 class EnergyMixTestCase(unittest.TestCase):
     """
     ENergyMix test class
@@ -388,6 +416,94 @@ class EnergyMixTestCase(unittest.TestCase):
         self.assertListEqual(list(zero_line), list(
             all_demand['coal_resource'].values))
 
+    def test_05_energy_mix_vjp_vs_jacobian(self):
+        """
+        Vector jacobian product of the energy mix discipline vs the transpose of its full jacobian times the cotangents
+        """
+        name = 'Test'
+        model_name = 'EnergyMix'
+        ee = ExecutionEngine(name)
+        ns_dict = {'ns_public': f'{name}',
+                   'ns_hydrogen': f'{name}',
+                   GlossaryEnergy.NS_WITNESS: f'{name}',
+                   'ns_methane': f'{name}',
+                   'ns_energy_study': f'{name}',
+                   GlossaryEnergy.NS_ENERGY_MIX: f'{name}.{model_name}',
+                   GlossaryEnergy.NS_FUNCTIONS: f'{name}.{model_name}',
+                   'ns_resource': f'{name}.{model_name}.resource',
+                   GlossaryEnergy.NS_CCS: f'{name}.{model_name}',
+                   'ns_energy': f'{name}.{model_name}'}
+        ee.ns_manager.add_ns_def(ns_dict)
+
+        mod_path = 'energy_models.core.energy_mix.energy_mix_disc.Energy_Mix_Discipline'
+        builder = ee.factory.get_builder_from_module(model_name, mod_path)
+
+        ee.factory.set_builders_to_coupling_builder(builder)
+
+        ee.configure()
+
+        inputs_dict = {f'{name}.{GlossaryEnergy.YearStart}': self.year_start,
+                       f'{name}.{GlossaryEnergy.YearEnd}': self.year_end,
+                       f'{name}.{GlossaryEnergy.energy_list}': self.energy_list,
+                       f'{name}.{GlossaryEnergy.ccs_list}': [],
+                       f'{name}.{model_name}.{GlossaryEnergy.hydrogen}.{GlossaryEnergy.gaseous_hydrogen}.{GlossaryEnergy.StreamConsumptionValue}': self.consumption_hydro,
+                       f'{name}.{model_name}.{GlossaryEnergy.hydrogen}.{GlossaryEnergy.gaseous_hydrogen}.{GlossaryEnergy.StreamConsumptionWithoutRatioValue}': self.consumption_hydro,
+                       f'{name}.{model_name}.{GlossaryEnergy.hydrogen}.{GlossaryEnergy.gaseous_hydrogen}.{GlossaryEnergy.EnergyProductionValue}': self.production_hydro,
+                       f'{name}.{model_name}.{GlossaryEnergy.hydrogen}.{GlossaryEnergy.gaseous_hydrogen}.{GlossaryEnergy.StreamProductionWithoutRatioValue}': self.production_hydro,
+                       f'{name}.{model_name}.{GlossaryEnergy.hydrogen}.{GlossaryEnergy.gaseous_hydrogen}.{GlossaryEnergy.StreamPricesValue}': self.prices_hydro,
+                       f'{name}.{model_name}.{GlossaryEnergy.hydrogen}.{GlossaryEnergy.gaseous_hydrogen}.{GlossaryEnergy.CO2PerUse}': pd.DataFrame(
+                           {GlossaryEnergy.Years: self.years, GlossaryEnergy.CO2PerUse: 0.1}),
+                       f'{name}.{model_name}.{GlossaryEnergy.hydrogen}.{GlossaryEnergy.gaseous_hydrogen}.{GlossaryEnergy.CO2EmissionsValue}': pd.DataFrame(
+                           {GlossaryEnergy.Years: self.years, f'{GlossaryEnergy.hydrogen}.{GlossaryEnergy.gaseous_hydrogen}': 0.0}),
+                       f'{name}.{model_name}.{GlossaryEnergy.hydrogen}.{GlossaryEnergy.gaseous_hydrogen}.{GlossaryEnergy.LandUseRequiredValue}': self.land_use_required_mock,
+                       f'{name}.{model_name}.{GlossaryEnergy.methane}.{GlossaryEnergy.StreamConsumptionValue}': self.consumption,
+                       f'{name}.{model_name}.{GlossaryEnergy.methane}.{GlossaryEnergy.EnergyTypeCapitalDfValue}': self.energy_type_capital,
+                       f'{name}.{model_name}.{GlossaryEnergy.hydrogen}.{GlossaryEnergy.gaseous_hydrogen}.{GlossaryEnergy.EnergyTypeCapitalDfValue}': self.energy_type_capital,
+                       f'{name}.{model_name}.{GlossaryEnergy.methane}.{GlossaryEnergy.StreamConsumptionWithoutRatioValue}': self.consumption,
+                       f'{name}.{model_name}.{GlossaryEnergy.methane}.{GlossaryEnergy.EnergyProductionValue}': self.production,
+                       f'{name}.{model_name}.{GlossaryEnergy.methane}.{GlossaryEnergy.StreamProductionWithoutRatioValue}': self.production,
+                       f'{name}.{model_name}.{GlossaryEnergy.methane}.{GlossaryEnergy.StreamPricesValue}': self.cost_details,
+                       f'{name}.{model_name}.{GlossaryEnergy.methane}.{GlossaryEnergy.CO2PerUse}': pd.DataFrame(
+                           {GlossaryEnergy.Years: self.years, GlossaryEnergy.CO2PerUse: 0.2}),
+                       f'{name}.{model_name}.{GlossaryEnergy.methane}.{GlossaryEnergy.CO2EmissionsValue}': pd.DataFrame(
+                           {GlossaryEnergy.Years: self.years, GlossaryEnergy.methane: 0.0}),
+                       f'{name}.{model_name}.{GlossaryEnergy.methane}.{GlossaryEnergy.LandUseRequiredValue}': self.land_use_required_mock,
+                       f'{name}.{GlossaryEnergy.CO2TaxesValue}': self.co2_taxes,
+                       f'{name}.{model_name}.liquid_hydrogen_percentage': self.liquid_hydrogen_percentage,
+                       f'{name}.{model_name}.{GlossaryEnergy.TargetEnergyProductionValue}': self.target_production
+                       }
+
+        ee.load_study_from_input_dict(inputs_dict)
+
+        ee.execute()
+
+        disc = ee.dm.get_disciplines_with_name(f'{name}.{model_name}')[0].discipline_wrapp.wrapper
+        # full jacobian at the inputs of the execution
+        recorder = JacobianBlocksRecorder()
+        disc.jacobian_blocks_tape = recorder
+        disc.compute_sos_jacobian()
+        disc.jacobian_blocks_tape = None
+
+        nb_years = len(self.years)
+        rng = np.random.default_rng(0)
+        cotangents = {(GlossaryEnergy.EnergyMeanPriceValue, GlossaryEnergy.EnergyPriceValue): rng.uniform(-1., 1., nb_years),
+                      (GlossaryEnergy.EnergyMeanPriceObjectiveValue,): rng.uniform(-1., 1., 1),
+                      ('energy_prices_after_tax', GlossaryEnergy.methane): rng.uniform(-1., 1., nb_years),
+                      (GlossaryEnergy.EnergyProductionValue, GlossaryEnergy.TotalProductionValue): rng.uniform(-1., 1., nb_years)}
+        reference_gradients = {}
+        for (y_key_column, x_key_column), block in recorder.blocks.items():
+            if y_key_column in cotangents:
+                cotangent = cotangents[y_key_column]
+                product = cotangent @ to_dense_block(block, len(cotangent))
+                reference_gradients[x_key_column] = reference_gradients.get(x_key_column, 0.) + product
+
+        gradients = disc.vjp(cotangents)
+        self.assertIsNone(disc.jacobian_blocks_tape)
+        self.assertEqual(set(gradients), set(reference_gradients))
+        for x_key_column, reference_gradient in reference_gradients.items():
+            np.testing.assert_allclose(np.ravel(gradients[x_key_column]), np.ravel(reference_gradient),
+                                       rtol=1e-12, atol=1e-14, err_msg=str(x_key_column))
+
 
 if '__main__' == __name__:
     cls = EnergyMixTestCase()
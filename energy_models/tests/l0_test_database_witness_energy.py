@@ -0,0 +1,123 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+import os
+import tempfile
+import unittest
+from os.path import join
+
+import pandas as pd
+
+from energy_models.database_witness_energy import DatabaseWitnessEnergy
+from energy_models.glossaryenergy import GlossaryEnergy
+from energy_models.techno_data_bundle import build_techno_data_bundle
+
+
+class DatabaseWitnessEnergyTestCase(unittest.TestCase):
+    """
+    Historical data of the technos parsed once and answered from memory
+    """
+
+    def setUp(self):
+        DatabaseWitnessEnergy.clear_techno_data_cache()
+        self.techno_data_bundle_path = DatabaseWitnessEnergy.techno_data_bundle_path
+
+    def tearDown(self):
+        DatabaseWitnessEnergy.clear_techno_data_cache()
+        DatabaseWitnessEnergy.techno_data_bundle_path = self.techno_data_bundle_path
+
+    def test_01_csv_parsed_once(self):
+        techno_name = GlossaryEnergy.WindOnshore
+        invest_2020 = DatabaseWitnessEnergy.get_techno_invest(techno_name, year=2020)
+        invest_df = DatabaseWitnessEnergy.get_techno_invest_df(techno_name)
+        invest_before_year_start, heavy_collected_data = DatabaseWitnessEnergy.get_techno_invest_before_year_start(
+            techno_name, year_start=2020, construction_delay=3)
+        for _ in range(10):
+            self.assertEqual(DatabaseWitnessEnergy.get_techno_invest(techno_name, year=2020), invest_2020)
+            self.assertIs(DatabaseWitnessEnergy.get_techno_invest_before_year_start(
+                techno_name, year_start=2020, construction_delay=3)[1], heavy_collected_data)
+            DatabaseWitnessEnergy.get_techno_prod(techno_name, year=2019)
+            DatabaseWitnessEnergy.get_techno_age_distrib_factor(techno_name, year=2020)
+        # one csv file parsed in each folder
+        self.assertEqual(len(DatabaseWitnessEnergy.techno_data_cache), 3)
+
+        reference_df = pd.read_csv(os.path.join(DatabaseWitnessEnergy.invest_before_year_start_folder,
+                                                'windonshore.csv'))
+        self.assertEqual(invest_2020, reference_df.loc[reference_df['years'] == 2020, 'invest'].values[0])
+        self.assertListEqual(list(invest_before_year_start['invest'].values),
+                             list(reference_df.loc[reference_df['years'] < 2020, 'invest'].values))
+        self.assertEqual(len(invest_df), len(reference_df))
+
+    def test_02_answers_are_not_shared(self):
+        techno_name = GlossaryEnergy.WindOnshore
+        invest_df = DatabaseWitnessEnergy.get_techno_invest_df(techno_name)
+        invest_df['invest'] = 0.0
+        self.assertFalse((DatabaseWitnessEnergy.get_techno_invest_df(techno_name)['invest'] == 0.0).all())
+        # the formatted name is used as index
+        self.assertEqual(DatabaseWitnessEnergy.get_techno_prod('windonshore', year=2019)[0],
+                         DatabaseWitnessEnergy.get_techno_prod(techno_name, year=2019)[0])
+
+    def test_03_preload_and_invalidation(self):
+        DatabaseWitnessEnergy.preload_techno_data()
+        nb_csv_files = 0
+        for folder in [DatabaseWitnessEnergy.invest_before_year_start_folder,
+                       DatabaseWitnessEnergy.techno_production_historic_folder,
+                       DatabaseWitnessEnergy.techno_age_distrib_folder]:
+            nb_csv_files += len([file_name for file_name in os.listdir(folder) if file_name.endswith('.csv') and
+                                 os.path.getsize(os.path.join(folder, file_name)) > 0])
+        self.assertEqual(len(DatabaseWitnessEnergy.techno_data_cache), nb_csv_files)
+        DatabaseWitnessEnergy.get_techno_prod(GlossaryEnergy.Nuclear, year=2020)
+        self.assertEqual(len(DatabaseWitnessEnergy.techno_data_cache), nb_csv_files)
+        self.assertEqual(len(DatabaseWitnessEnergy.techno_query_cache), 1)
+
+        DatabaseWitnessEnergy.clear_techno_data_cache()
+        self.assertEqual(len(DatabaseWitnessEnergy.techno_data_cache), 0)
+        self.assertEqual(len(DatabaseWitnessEnergy.techno_query_cache), 0)
+        DatabaseWitnessEnergy.get_techno_prod(GlossaryEnergy.Nuclear, year=2020)
+        self.assertEqual(len(DatabaseWitnessEnergy.techno_data_cache), 1)
+
+    def test_04_read_from_bundle(self):
+        techno_name = GlossaryEnergy.WindOnshore
+        reference_df = pd.read_csv(join(DatabaseWitnessEnergy.invest_before_year_start_folder, 'windonshore.csv'))
+        with tempfile.TemporaryDirectory() as tmp_folder:
+            # without bundle the csv files are read, no bundle is written
+            DatabaseWitnessEnergy.techno_data_bundle_path = join(tmp_folder, 'techno_data_bundle.npy')
+            DatabaseWitnessEnergy.get_techno_data(
+                DatabaseWitnessEnergy.invest_before_year_start_folder, techno_name, "G$", "invest")
+            self.assertIsNone(DatabaseWitnessEnergy.techno_data_bundle)
+            self.assertFalse(os.path.isfile(DatabaseWitnessEnergy.techno_data_bundle_path))
+
+            # once the bundle is built, the csv files are read in the bundle
+            DatabaseWitnessEnergy.clear_techno_data_cache()
+            build_techno_data_bundle(bundle_path=DatabaseWitnessEnergy.techno_data_bundle_path)
+            df, collected_data = DatabaseWitnessEnergy.get_techno_data(
+                DatabaseWitnessEnergy.invest_before_year_start_folder, techno_name, "G$", "invest")
+            self.assertIsNotNone(DatabaseWitnessEnergy.techno_data_bundle)
+            pd.testing.assert_frame_equal(df, reference_df)
+
+            # the collected data is built from the dataframe of the bundle
+            self.assertIs(collected_data.value, df)
+            self.assertEqual(collected_data.get_value_at_year(2020),
+                             reference_df.loc[reference_df['years'] == 2020, 'invest'].values[0])
+            self.assertFalse(collected_data.is_available_at_year(1900))
+            invest_before_year_start, _ = DatabaseWitnessEnergy.get_techno_invest_before_year_start(
+                techno_name, year_start=2023, construction_delay=3)
+            pd.testing.assert_frame_equal(invest_before_year_start, reference_df.loc[
+                (reference_df['years'] >= 2020) & (reference_df['years'] <= 2022)])
+            # the bundle file is memory mapped, it is released before the temporary folder is removed
+            DatabaseWitnessEnergy.clear_techno_data_cache()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+import json
+import tempfile
+import unittest
+from os.path import join
+
+import numpy as np
+import pandas as pd
+
+from energy_models.core.discipline_instrumentation import (
+    SUMMARY_COLUMNS,
+    InstrumentedDisciplineMixin,
+    discipline_instrumentation,
+)
+
+
+class BaseDiscipline(InstrumentedDisciplineMixin):
+    def __init__(self, sos_name):
+        self.sos_name = sos_name
+        self.output = None
+
+    def run(self):
+        self.output = np.ones(1_000_000)
+
+    def compute_sos_jacobian(self):
+        return np.zeros(10)
+
+
+class ChildDiscipline(BaseDiscipline):
+    def run(self):
+        super().run()
+        self.output = self.output * 2.0
+
+    def get_post_processing_list(self, filters=None):
+        return []
+
+
+class DisciplineInstrumentationTestCase(unittest.TestCase):
+    """
+    Instrumentation of the discipline phases test class
+    """
+
+    def setUp(self):
+        '''
+        Start from an empty and disabled instrumentation
+        '''
+        discipline_instrumentation.disable()
+        discipline_instrumentation.reset()
+
+    def tearDown(self):
+        discipline_instrumentation.disable()
+        discipline_instrumentation.reset()
+
+    def test_01_records_per_discipline_and_phase(self):
+        base = BaseDiscipline('Test.base')
+        child = ChildDiscipline('Test.child')
+        base.run()
+        self.assertEqual(discipline_instrumentation.records, {})
+
+        discipline_instrumentation.enable()
+        for _ in range(3):
+            child.run()
+            child.compute_sos_jacobian()
+        base.run()
+        child.get_post_processing_list()
+        discipline_instrumentation.disable()
+
+        summary = discipline_instrumentation.get_summary()
+        self.assertEqual(list(summary.columns), SUMMARY_COLUMNS)
+        calls = summary.set_index(['discipline', 'phase'])['calls'].to_dict()
+        # the super().run() call of the child is part of its run phase
+        self.assertEqual(calls, {('Test.child', 'run'): 3, ('Test.child', 'compute_sos_jacobian'): 3,
+                                 ('Test.base', 'run'): 1, ('Test.child', 'post_processing'): 1})
+        child_run = summary.loc[(summary['discipline'] == 'Test.child') & (summary['phase'] == 'run')].iloc[0]
+        self.assertEqual(child_run['class'], 'ChildDiscipline')
+        self.assertAlmostEqual(child_run['mean_time_s'], child_run['total_time_s'] / 3)
+        self.assertLessEqual(child_run['max_time_s'], child_run['total_time_s'])
+        # two arrays of 8 MB live at the same time in the child run
+        self.assertGreaterEqual(child_run['peak_allocated_bytes'], 2 * 8_000_000)
+        self.assertTrue(summary['total_time_s'].is_monotonic_decreasing)
+
+    def test_02_nested_phases_allocations(self):
+        discipline_instrumentation.enable()
+        with discipline_instrumentation.record('outer', 'Outer', 'run'):
+            ChildDiscipline('inner').run()
+        discipline_instrumentation.disable()
+        summary = discipline_instrumentation.get_summary().set_index('discipline')
+        # the peak of the inner discipline is also a peak of the outer one
+        self.assertGreaterEqual(summary.loc['outer', 'peak_allocated_bytes'],
+                                summary.loc['inner', 'peak_allocated_bytes'])
+
+        discipline_instrumentation.reset()
+        discipline_instrumentation.enable(trace_allocations=False)
+        ChildDiscipline('inner').run()
+        self.assertEqual(discipline_instrumentation.get_summary()['peak_allocated_bytes'].tolist(), [0])
+
+    def test_03_export(self):
+        discipline_instrumentation.enable(trace_allocations=False)
+        ChildDiscipline('Test.child').run()
+        BaseDiscipline('Test.base').compute_sos_jacobian()
+        summary = discipline_instrumentation.get_summary()
+        with tempfile.TemporaryDirectory() as export_dir:
+            discipline_instrumentation.export_summary(join(export_dir, 'summary.csv'))
+            pd.testing.assert_frame_equal(pd.read_csv(join(export_dir, 'summary.csv')), summary)
+            discipline_instrumentation.export_summary(join(export_dir, 'summary.json'))
+            with open(join(export_dir, 'summary.json')) as summary_file:
+                self.assertEqual(json.load(summary_file), summary.to_dict(orient='records'))
+
+
+    def test_04_enabled_by_input(self):
+        discipline_instrumentation.set_enabled_by_input(True)
+        self.assertTrue(discipline_instrumentation.enabled)
+        self.assertTrue(discipline_instrumentation.export_registered)
+        ChildDiscipline('Test.child').run()
+        discipline_instrumentation.set_enabled_by_input(False)
+        self.assertFalse(discipline_instrumentation.enabled)
+        ChildDiscipline('Test.child').run()
+        self.assertEqual(discipline_instrumentation.get_summary()['calls'].tolist(), [1])
+
+        # a recording enabled without the input is not disabled by its default value
+        discipline_instrumentation.enable(trace_allocations=False)
+        discipline_instrumentation.set_enabled_by_input(False)
+        self.assertTrue(discipline_instrumentation.enabled)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+import unittest
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from energy_models.core.energy_ghg_emissions.energy_ghg_emissions import (
+    EnergyGHGEmissions,
+)
+from energy_models.glossaryenergy import GlossaryEnergy
+
+
+class EnergyGHGEmissionsTensorTestCase(unittest.TestCase):
+    """
+    Stacked (ghg x stream x year) emissions of the EnergyGHGEmissions model test class
+    """
+
+    def setUp(self):
+        '''
+        Initialize data needed for testing
+        '''
+        self.years = np.arange(2020, 2031)
+        self.energy_list = [GlossaryEnergy.methane, GlossaryEnergy.electricity]
+        self.ccs_list = [GlossaryEnergy.carbon_capture]
+        nb_years = len(self.years)
+        rng = np.random.default_rng(0)
+        self.ghg_list = EnergyGHGEmissions.GHG_TYPE_LIST
+
+        self.inputs_dict = {GlossaryEnergy.YearStart: self.years[0],
+                            GlossaryEnergy.YearEnd: self.years[-1],
+                            GlossaryEnergy.energy_list: self.energy_list,
+                            GlossaryEnergy.ccs_list: self.ccs_list,
+                            'scaling_factor_energy_production': 1e3,
+                            'scaling_factor_energy_consumption': 1e3,
+                            'GHG_global_warming_potential20': {'CO2': 1., 'CH4': 85., 'N2O': 290.},
+                            'GHG_global_warming_potential100': {'CO2': 1., 'CH4': 28., 'N2O': 265.},
+                            'co2_emissions_ccus_Gt': pd.DataFrame(
+                                {GlossaryEnergy.Years: self.years,
+                                 'carbon_storage Limited by capture (Gt)': rng.uniform(0., 1., nb_years)}),
+                            'co2_emissions_needed_by_energy_mix': pd.DataFrame(
+                                {GlossaryEnergy.Years: self.years,
+                                 'carbon_capture needed by energy mix (Gt)': rng.uniform(0., 1., nb_years)})}
+        net_production = {GlossaryEnergy.Years: self.years}
+        for energy in self.energy_list:
+            for ghg in self.ghg_list:
+                self.inputs_dict[f'{energy}.{ghg}_per_use'] = pd.DataFrame(
+                    {GlossaryEnergy.Years: self.years, f'{ghg}_per_use': rng.uniform(0., 1., nb_years)})
+            net_production[f'production {energy} ({GlossaryEnergy.energy_unit})'] = rng.uniform(1., 50., nb_years)
+        # negative and zero net productions of methane
+        net_production[f'production {GlossaryEnergy.methane} ({GlossaryEnergy.energy_unit})'][:3] = [-1., 0., 0.]
+        self.inputs_dict[GlossaryEnergy.StreamProductionDetailedValue] = pd.DataFrame(net_production)
+
+        self.inputs_dict[f'{GlossaryEnergy.methane}.{GlossaryEnergy.EnergyProductionValue}'] = pd.DataFrame(
+            {GlossaryEnergy.Years: self.years, GlossaryEnergy.methane: rng.uniform(0., 1., nb_years),
+             'CH4 (Mt)': rng.uniform(0., 1., nb_years), 'CO2 from Flue Gas (Mt)': rng.uniform(0., 1., nb_years)})
+        self.inputs_dict[f'{GlossaryEnergy.electricity}.{GlossaryEnergy.EnergyProductionValue}'] = pd.DataFrame(
+            {GlossaryEnergy.Years: self.years, GlossaryEnergy.electricity: rng.uniform(0., 1., nb_years),
+             'N2O (Mt)': rng.uniform(0., 1., nb_years)})
+        self.inputs_dict[f'{GlossaryEnergy.carbon_capture}.{GlossaryEnergy.EnergyProductionValue}'] = pd.DataFrame(
+            {GlossaryEnergy.Years: self.years, 'carbon_capture (Mt)': rng.uniform(0., 1., nb_years),
+             'CO2 from Flue Gas (Mt)': rng.uniform(0., 1., nb_years)})
+        for energy in self.energy_list:
+            self.inputs_dict[f'{energy}.{GlossaryEnergy.StreamConsumptionValue}'] = pd.DataFrame(
+                {GlossaryEnergy.Years: self.years, 'carbon_capture (Mt)': rng.uniform(0., 1., nb_years)})
+
+        self.model = EnergyGHGEmissions(EnergyGHGEmissions.name)
+        self.model.configure_parameters(self.inputs_dict)
+        self.model.configure_parameters_update(self.inputs_dict)
+        self.model.compute_ghg_emissions()
+
+    def test_01_ghg_emissions_dataframes(self):
+        production_dict = self.model.ghg_production_dict
+        self.assertEqual(list(production_dict['CO2'].columns),
+                         [GlossaryEnergy.Years, f'{GlossaryEnergy.methane} CO2 from Flue Gas (Mt)',
+                          f'{GlossaryEnergy.methane} CO2 by use (Mt)', f'{GlossaryEnergy.electricity} CO2 by use (Mt)',
+                          f'{GlossaryEnergy.carbon_capture} carbon_capture (Mt)',
+                          f'{GlossaryEnergy.carbon_capture} CO2 from Flue Gas (Mt)'])
+        self.assertEqual(list(production_dict['CH4'].columns),
+                         [GlossaryEnergy.Years, f'{GlossaryEnergy.methane} CH4 (Mt)',
+                          f'{GlossaryEnergy.methane} CH4 by use (Mt)', f'{GlossaryEnergy.electricity} CH4 by use (Mt)'])
+
+        # emissions by use are zero for a negative net production
+        methane_by_use = production_dict['CO2'][f'{GlossaryEnergy.methane} CO2 by use (Mt)'].values
+        self.assertEqual(methane_by_use[0], 0.)
+        np.testing.assert_allclose(methane_by_use[3:], self.inputs_dict[f'{GlossaryEnergy.methane}.CO2_per_use'][
+            'CO2_per_use'].values[3:] * self.inputs_dict[GlossaryEnergy.StreamProductionDetailedValue][
+            f'production {GlossaryEnergy.methane} ({GlossaryEnergy.energy_unit})'].values[3:])
+
+        # the total of each GHG is the sum of the columns of its dataframe, except CO2 which adds sources and sinks
+        for ghg in ['CH4', 'N2O']:
+            np.testing.assert_allclose(self.model.ghg_total_emissions[f'Total {ghg} emissions'].values,
+                                       production_dict[ghg].drop(GlossaryEnergy.Years, axis=1).sum(axis=1).values / 1e3)
+        sum_sinks = self.inputs_dict['co2_emissions_ccus_Gt'].iloc[:, 1].values + \
+                    self.inputs_dict['co2_emissions_needed_by_energy_mix'].iloc[:, 1].values + \
+                    self.model.CO2_sinks_Gt.iloc[:, 1].values
+        np.testing.assert_allclose(
+            self.model.ghg_total_emissions['Total CO2 emissions'].values,
+            self.model.CO2_sources_Gt.drop(GlossaryEnergy.Years, axis=1).sum(axis=1).values +
+            self.model.ghg_sources['Total CO2 by use (Mt)'].values / 1e3 - sum_sinks)
+        self.assertEqual(list(self.model.ghg_total_emissions.columns),
+                         [GlossaryEnergy.Years, 'Total CO2 emissions', 'Total N2O emissions', 'Total CH4 emissions'])
+        np.testing.assert_allclose(self.model.gwp_emissions['CH4_20'].values,
+                                   self.model.ghg_total_emissions['Total CH4 emissions'].values * 85.)
+
+    def test_02_grad_total_ghg_emissions(self):
+        dtot_ghg_emissions = self.model.compute_grad_total_ghg_emissions(
+            self.inputs_dict[GlossaryEnergy.StreamProductionDetailedValue])
+        self.assertEqual(dtot_ghg_emissions.shape, (len(self.ghg_list), len(self.energy_list), len(self.years)))
+        ighg = self.ghg_list.index('CH4')
+        methane_per_use = self.inputs_dict[f'{GlossaryEnergy.methane}.CH4_per_use']['CH4_per_use'].values
+        # the gradient is zero for a negative net production and the per use factor when it is equal to zero
+        np.testing.assert_array_equal(dtot_ghg_emissions[ighg, 0, :3], [0., methane_per_use[1], methane_per_use[2]])
+
+        # finite differences of the total CH4 emissions wrt the net production of electricity
+        step = 1e-4
+        column = f'production {GlossaryEnergy.electricity} ({GlossaryEnergy.energy_unit})'
+        total_ch4 = self.model.ghg_total_emissions['Total CH4 emissions'].values
+        self.inputs_dict[GlossaryEnergy.StreamProductionDetailedValue][column] += step
+        self.model.configure_parameters_update(self.inputs_dict)
+        self.model.compute_ghg_emissions()
+        np.testing.assert_allclose((self.model.ghg_total_emissions['Total CH4 emissions'].values - total_ch4) / step,
+                                   dtot_ghg_emissions[ighg, 1] / 1e3, rtol=1e-6, atol=1e-10)
+
+    def test_03_complex_step(self):
+        # complex steps on the direct GHG productions are propagated to the total emissions
+        step = 1e-30
+        column = 'CH4 (Mt)'
+        production_key = f'{GlossaryEnergy.methane}.{GlossaryEnergy.EnergyProductionValue}'
+        total_ch4 = self.model.ghg_total_emissions['Total CH4 emissions'].values
+        self.inputs_dict[production_key] = self.inputs_dict[production_key].astype({column: complex})
+        self.inputs_dict[production_key][column] += 1j * step
+        self.model.configure_parameters(self.inputs_dict)
+        self.model.configure_parameters_update(self.inputs_dict)
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', np.ComplexWarning)
+            self.model.compute_ghg_emissions()
+        total_ch4_complex = self.model.ghg_total_emissions['Total CH4 emissions'].values
+        np.testing.assert_allclose(total_ch4_complex.real, total_ch4)
+        # the scaling factor of the productions compensates the Mt to Gt conversion
+        np.testing.assert_allclose(total_ch4_complex.imag / step, 1.)
+        np.testing.assert_allclose(self.model.gwp_emissions['CH4_20'].values.imag / step, 85.)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,188 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+import unittest
+
+import numpy as np
+import pandas as pd
+from climateeconomics.sos_wrapping.sos_wrapping_agriculture.agriculture.agriculture_mix_disc import (
+    AgricultureMixDiscipline,
+)
+
+from energy_models.core.energy_mix.energy_mix import EnergyMix
+from energy_models.glossaryenergy import GlossaryEnergy
+
+# outputs of the energy mix model compared between the incremental and the full compute
+OUTPUT_ATTRIBUTES = ['production', 'production_raw', 'mix_weights', 'price_by_energy', 'land_use_required',
+                     'energy_mean_price', 'net_positive_consumable_energy_production', 'consumable_energy_df',
+                     'total_prod_minus_min_prod_constraint_df', 'constraint_liquid_hydrogen',
+                     'constraint_solid_fuel_elec', 'syngas_prod_objective', 'syngas_prod_constraint',
+                     'all_streams_demand_ratio', 'ratio_objective', 'resources_demand', 'resources_demand_woratio',
+                     'co2_emissions_needed_by_energy_mix', 'carbon_capture_from_energy_mix', 'energy_capital',
+                     'emissions_by_energy', 'total_carbon_emissions', 'carbon_emissions_after_use',
+                     'target_production_constraint', 'energy_mean_price_objective', 'non_use_capital_constraint_df',
+                     'non_use_capital_obj', 'non_use_capital_obj_by_stream']
+
+
+class EnergyMixIncrementalComputeTestCase(unittest.TestCase):
+    """
+    Incremental compute of the energy mix model vs a full compute
+    """
+
+    def setUp(self):
+        '''
+        Initialize the inputs of the energy mix model
+        '''
+        self.years = np.arange(GlossaryEnergy.YearStartDefault, GlossaryEnergy.YearEndDefault + 1)
+        nb_years = len(self.years)
+        rng = np.random.default_rng(0)
+        self.energy_list = [GlossaryEnergy.methane, GlossaryEnergy.electricity,
+                            f'{GlossaryEnergy.hydrogen}.{GlossaryEnergy.gaseous_hydrogen}', GlossaryEnergy.syngas,
+                            f'{GlossaryEnergy.fuel}.{GlossaryEnergy.liquid_fuel}', GlossaryEnergy.biomass_dry,
+                            GlossaryEnergy.solid_fuel]
+        ccs_list = [GlossaryEnergy.carbon_capture, GlossaryEnergy.carbon_storage]
+        streams = self.energy_list + ccs_list
+
+        self.inputs = {GlossaryEnergy.YearStart: self.years[0], GlossaryEnergy.YearEnd: self.years[-1],
+                       GlossaryEnergy.energy_list: self.energy_list, GlossaryEnergy.ccs_list: ccs_list,
+                       'minimum_energy_production': 1e4, 'production_threshold': 1e-3,
+                       'scaling_factor_energy_production': 1e3, 'scaling_factor_energy_consumption': 1e3,
+                       'solid_fuel_elec_percentage': 0.75, 'solid_fuel_elec_constraint_ref': 1e4,
+                       'liquid_hydrogen_percentage': np.ones(nb_years) * 0.1, 'liquid_hydrogen_constraint_ref': 1e3,
+                       'syngas_prod_ref': 1e4, 'syngas_prod_constraint_limit': 1e4, 'ratio_ref': 100.,
+                       'heat_losses_percentage': 5., 'tol_constraint_non_use_capital_energy': 0.05,
+                       'ref_constraint_non_use_capital_energy': 0.3,
+                       'period_tol_power_non_use_capital_constraint': 2.,
+                       'total_prod_minus_min_prod_constraint_ref': 1e4,
+                       GlossaryEnergy.CO2TaxesValue: pd.DataFrame(
+                           {GlossaryEnergy.Years: self.years, GlossaryEnergy.CO2Tax: np.linspace(50., 500., nb_years)}),
+                       GlossaryEnergy.EnergyMeanPriceObjectiveRefValue: 100.,
+                       GlossaryEnergy.TargetEnergyProductionValue: pd.DataFrame(
+                           {GlossaryEnergy.Years: self.years,
+                            GlossaryEnergy.TargetEnergyProductionValue: np.ones(nb_years) * 1e5}),
+                       GlossaryEnergy.TargetProductionConstraintRefValue: 1e4,
+                       'exp_min': True, 'incremental_compute': True}
+        for stream in streams:
+            other_streams = [other for other in streams if other != stream][:3]
+            consumption = {f'{other} ({EnergyMix.stream_class_dict[other].unit})': rng.uniform(0., 5., nb_years)
+                           for other in other_streams}
+            consumption['natural_gas_resource (Mt)'] = rng.uniform(0., 1., nb_years)
+            consumption[f'{GlossaryEnergy.carbon_capture} (Mt)'] = rng.uniform(0., 1., nb_years)
+            self.inputs.update({
+                f'{stream}.{GlossaryEnergy.StreamPricesValue}': pd.DataFrame(
+                    {GlossaryEnergy.Years: self.years, stream: rng.uniform(20., 100., nb_years)}),
+                f'{stream}.{GlossaryEnergy.EnergyProductionValue}': pd.DataFrame(
+                    {GlossaryEnergy.Years: self.years, stream: rng.uniform(1., 50., nb_years),
+                     f'{GlossaryEnergy.carbon_capture} (Mt)': rng.uniform(0., 1., nb_years)}),
+                f'{stream}.{GlossaryEnergy.StreamConsumptionValue}': pd.DataFrame(
+                    {GlossaryEnergy.Years: self.years, **consumption}),
+                f'{stream}.{GlossaryEnergy.StreamConsumptionWithoutRatioValue}': pd.DataFrame(
+                    {GlossaryEnergy.Years: self.years, **{key: value * 1.1 for key, value in consumption.items()}}),
+                f'{stream}.{GlossaryEnergy.LandUseRequiredValue}': pd.DataFrame(
+                    {GlossaryEnergy.Years: self.years, f'{stream} (Gha)': rng.uniform(0., 1., nb_years)}),
+                f'{stream}.{GlossaryEnergy.CO2EmissionsValue}': pd.DataFrame(
+                    {GlossaryEnergy.Years: self.years, stream: rng.uniform(0., 1., nb_years)}),
+                f'{stream}.{GlossaryEnergy.CO2PerUse}': pd.DataFrame(
+                    {GlossaryEnergy.Years: self.years, GlossaryEnergy.CO2PerUse: rng.uniform(0., 1., nb_years)}),
+                f'{stream}.losses_percentage': 1.})
+            capital_namespace = AgricultureMixDiscipline.name if stream == GlossaryEnergy.biomass_dry else stream
+            self.inputs[f'{capital_namespace}.{GlossaryEnergy.EnergyTypeCapitalDfValue}'] = pd.DataFrame(
+                {GlossaryEnergy.Years: self.years, GlossaryEnergy.Capital: rng.uniform(10., 20., nb_years),
+                 GlossaryEnergy.NonUseCapital: rng.uniform(0., 1., nb_years)})
+
+    def compute_energy_mix(self, inputs, energy_mix=None):
+        if energy_mix is None:
+            energy_mix = EnergyMix('EnergyMix')
+            energy_mix.configure(inputs)
+        energy_mix.compute(dict(inputs))
+        return energy_mix
+
+    def assert_outputs_equal(self, energy_mix, energy_mix_ref):
+        for attribute in OUTPUT_ATTRIBUTES:
+            value, value_ref = getattr(energy_mix, attribute), getattr(energy_mix_ref, attribute)
+            if isinstance(value_ref, pd.DataFrame):
+                pd.testing.assert_frame_equal(value, value_ref, obj=attribute)
+            elif isinstance(value_ref, dict):
+                self.assertEqual(value.keys(), value_ref.keys(), attribute)
+                for key in value_ref:
+                    np.testing.assert_allclose(value[key], value_ref[key], rtol=1e-12, err_msg=attribute)
+            else:
+                np.testing.assert_allclose(value, value_ref, rtol=1e-12, err_msg=attribute)
+
+    def test_01_incremental_compute_vs_full_compute(self):
+        energy_mix = self.compute_energy_mix(self.inputs)
+        self.assertEqual(energy_mix.compute_report['skipped_steps'], [])
+
+        for key, stream in [(f'{GlossaryEnergy.methane}.{GlossaryEnergy.StreamPricesValue}', GlossaryEnergy.methane),
+                            (f'{GlossaryEnergy.electricity}.{GlossaryEnergy.EnergyProductionValue}',
+                             GlossaryEnergy.electricity),
+                            (f'{GlossaryEnergy.biomass_dry}.{GlossaryEnergy.CO2EmissionsValue}',
+                             GlossaryEnergy.biomass_dry)]:
+            self.inputs[key] = self.inputs[key].copy()
+            self.inputs[key][stream] = self.inputs[key][stream] * 1.1
+            self.compute_energy_mix(self.inputs, energy_mix)
+            self.assertNotEqual(energy_mix.compute_report['skipped_steps'], [])
+            for streams in energy_mix.compute_report['patched_streams'].values():
+                self.assertEqual(streams, [stream])
+
+            full_inputs = dict(self.inputs, incremental_compute=False)
+            self.assert_outputs_equal(energy_mix, self.compute_energy_mix(full_inputs))
+
+    def test_02_compute_report_skipped_steps(self):
+        energy_mix = self.compute_energy_mix(self.inputs)
+        all_steps = [step_name for step_name, _ in EnergyMix.compute_steps]
+        self.assertEqual(energy_mix.compute_report['computed_steps'], all_steps)
+
+        # unchanged inputs : all the sub-steps are skipped
+        self.compute_energy_mix(self.inputs, energy_mix)
+        self.assertEqual(energy_mix.compute_report['skipped_steps'], all_steps)
+        self.assertEqual(energy_mix.compute_report['computed_steps'], [])
+
+        # change of the land use of a stream : only its aggregation is computed
+        key = f'{GlossaryEnergy.methane}.{GlossaryEnergy.LandUseRequiredValue}'
+        self.inputs[key] = self.inputs[key].copy()
+        self.inputs[key][f'{GlossaryEnergy.methane} (Gha)'] = self.inputs[key][f'{GlossaryEnergy.methane} (Gha)'] * 2.
+        self.compute_energy_mix(self.inputs, energy_mix)
+        self.assertEqual(energy_mix.compute_report['computed_steps'], ['aggregate_land_use_required'])
+        self.assertEqual(energy_mix.compute_report['skipped_steps'],
+                         [step_name for step_name in all_steps if step_name != 'aggregate_land_use_required'])
+
+        # change of an input not specific to a stream : all the sub-steps are computed
+        self.inputs['production_threshold'] = 2e-3
+        self.compute_energy_mix(self.inputs, energy_mix)
+        self.assertEqual(energy_mix.compute_report['computed_steps'], all_steps)
+        self.assertEqual(energy_mix.compute_report['skipped_steps'], [])
+
+    def test_03_gradient_tape_without_incremental_compute(self):
+        self.inputs['incremental_compute'] = False
+        energy_mix = self.compute_energy_mix(self.inputs)
+        # no fingerprint of the inputs without the incremental compute
+        self.assertIsNone(energy_mix.gradient_tape['inputs_fingerprints'])
+
+        # same input values : the tape of the last compute is reused
+        compute_report = energy_mix.compute_report
+        energy_mix.get_gradient_tape(dict(self.inputs))
+        self.assertIs(energy_mix.compute_report, compute_report)
+
+        # new input value : the compute is done again
+        key = f'{GlossaryEnergy.methane}.{GlossaryEnergy.StreamPricesValue}'
+        self.inputs[key] = self.inputs[key].copy()
+        energy_mix.get_gradient_tape(dict(self.inputs))
+        self.assertIsNot(energy_mix.compute_report, compute_report)
+        self.assertIs(energy_mix.gradient_tape['inputs'][key], self.inputs[key])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+import tempfile
+import unittest
+from os.path import join
+
+import pandas as pd
+
+from energy_models.core.discipline_instrumentation import SUMMARY_COLUMNS
+from energy_models.glossaryenergy import GlossaryEnergy
+from energy_models.models.electricity.solar_pv.solar_pv_disc import SolarPvDiscipline
+from energy_models.tests.performances.energy_models_benchmarks import (
+    compare_with_baseline,
+    extract_discipline_metrics,
+    extract_unit_metrics,
+    get_discipline_categories,
+    get_techno_dict,
+    load_results,
+    save_results,
+)
+
+
+class EnergyModelsBenchmarksTestCase(unittest.TestCase):
+    """
+    Metrics and regression gating of the energy models benchmarks test class
+    """
+
+    def setUp(self):
+        '''
+        Baseline of two benchmark cases
+        '''
+        self.baseline = {'energy_process_v0_mda.small.2050': {'mda_execution': 10.0, 'techno_compute_mean': 0.002},
+                         'energy_mix_optim_process.midway.2050': {'optim_iteration': 60.0}}
+
+    def test_01_regression_gating(self):
+        results = {'energy_process_v0_mda.small.2050': {'mda_execution': 11.0, 'techno_compute_mean': 0.004},
+                   'energy_mix_optim_process.midway.2050': {'optim_iteration': 80.0, 'new_metric': 1.0},
+                   'energy_process_v0_mda.small.2100': {'mda_execution': 30.0}}
+        comparison, regressions = compare_with_baseline(results, self.baseline, threshold=0.2, min_seconds=0.005)
+        # the techno compute is twice slower but by less than min_seconds, metrics and cases not in baseline are ignored
+        self.assertEqual(len(comparison), 3)
+        self.assertEqual(comparison['regression'].tolist(), [False, False, True])
+        self.assertEqual(len(regressions), 1)
+        self.assertIn('energy_mix_optim_process.midway.2050 optim_iteration', regressions[0])
+
+        _, regressions = compare_with_baseline(results, self.baseline, threshold=0.5)
+        self.assertEqual(regressions, [])
+        _, regressions = compare_with_baseline({'energy_process_v0_mda.small.2050': {'error': 'KeyError: x'}},
+                                               self.baseline)
+        self.assertEqual(regressions, ['energy_process_v0_mda.small.2050 fails : KeyError: x'])
+
+    def test_02_discipline_metrics(self):
+        categories = get_discipline_categories()
+        self.assertEqual(categories[SolarPvDiscipline.__name__], 'techno')
+        self.assertEqual(categories['Energy_Mix_Discipline'], 'energy_mix')
+
+        summary = pd.DataFrame([['Bench.electricity.SolarPv', 'SolarPvDiscipline', 'run', 4, 0.4, 0.1, 0.2, 0],
+                                ['Bench.electricity.Other', 'TechnoDiscipline', 'run', 2, 0.6, 0.3, 0.4, 0],
+                                ['Bench.electricity', 'StreamDiscipline', 'run', 4, 0.2, 0.05, 0.1, 0],
+                                ['Bench.EnergyMix', 'Energy_Mix_Discipline', 'compute_sos_jacobian', 1, 2., 2., 2., 0],
+                                ['Bench.EnergyMix', 'Energy_Mix_Discipline', 'configure', 3, 3., 1., 1., 0],
+                                ['Bench.FunctionsManager', 'FunctionManagerDisc', 'run', 4, 0.1, 0.025, 0.1, 0]],
+                               columns=SUMMARY_COLUMNS)
+        metrics = extract_discipline_metrics(summary)
+        self.assertEqual(set(metrics), {'techno_compute_mean', 'techno_compute_max', 'stream_aggregation_mean',
+                                        'stream_aggregation_max', 'energy_mix_gradient_mean',
+                                        'energy_mix_gradient_max'})
+        self.assertAlmostEqual(metrics['techno_compute_mean'], 0.2)
+        self.assertAlmostEqual(metrics['techno_compute_max'], 0.3)
+        self.assertAlmostEqual(metrics['energy_mix_gradient_mean'], 2.)
+
+        # one discipline per category in the energy_disciplines cases
+        unit_metrics = extract_unit_metrics(summary.drop(index=1))
+        self.assertEqual(unit_metrics, {'techno_compute': 0.1, 'stream_aggregation': 0.05, 'energy_mix_gradient': 2.})
+
+    def test_03_results_files(self):
+        self.assertIs(get_techno_dict('default'), GlossaryEnergy.DEFAULT_TECHNO_DICT)
+        self.assertEqual(len(get_techno_dict('small')), 5)
+        with tempfile.TemporaryDirectory() as results_dir:
+            self.assertEqual(load_results(join(results_dir, 'missing.json')), {})
+            save_results(self.baseline, join(results_dir, 'baseline.json'))
+            self.assertEqual(load_results(join(results_dir, 'baseline.json')), self.baseline)
+
+
+if __name__ == "__main__":
+    unittest.main()
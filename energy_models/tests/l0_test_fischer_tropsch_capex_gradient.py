@@ -0,0 +1,107 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+import unittest
+from functools import reduce
+from operator import mul
+
+import numpy as np
+import pandas as pd
+
+from energy_models.glossaryenergy import GlossaryEnergy
+from energy_models.models.liquid_fuel.fischer_tropsch.fischer_tropsch import (
+    FischerTropsch,
+)
+
+
+def reference_compute_dcapex_dsyngas_ratio(techno, slope_capex):
+    '''
+    Former computation of the capex gradient of FischerTropsch, with the leave one out lists of each year
+    '''
+    invest_sum = 0.0
+    capex_init = techno.check_capex_unity(techno.techno_infos_dict)
+    expo_factor = techno.compute_expo_factor(techno.techno_infos_dict)
+    invest_list = techno.cost_details[GlossaryEnergy.InvestValue].values
+    capex_grad = np.zeros((len(techno.years), len(techno.years)), dtype=invest_list.dtype)
+    maximum_learning_capex_ratio = techno.techno_infos_dict['maximum_learning_capex_ratio']
+    dqlist = []
+    qlist = []
+    for i, invest in enumerate(invest_list):
+        if i == 0:
+            capex_grad[0][0] = 1000 * slope_capex
+            invest_sum = techno.initial_production * capex_init
+        else:
+            dinvest_sum = techno.initial_production * slope_capex
+            q = ((invest_sum + invest) / invest_sum) ** (-expo_factor)
+            qlist.append(q)
+            dq = -expo_factor * ((invest_sum + invest) / invest_sum) ** (-expo_factor - 1.0) * (
+                -dinvest_sum * invest / (invest_sum * invest_sum))
+            dqlist.append(dq)
+            q_product = reduce(mul, qlist)
+            qlistmod = []
+            for k in range(0, i):
+                qlistmod.extend([qlist[:k] + qlist[k + 1:]])
+            if qlistmod == [[]]:
+                productlist = [0]
+            else:
+                productlist = [reduce(mul, ql) for ql in qlistmod]
+            prod_mul = sum([a * b for a, b in zip(productlist, dqlist)])
+            capex_grad[i][0] = capex_grad[0][0] * q_product + capex_init * prod_mul
+        invest_sum += invest
+
+    return maximum_learning_capex_ratio * capex_grad[0][0] * np.insert(
+        np.zeros((len(techno.years), len(techno.years) - 1)), 0, np.ones(len(techno.years)), axis=1) + \
+        (1.0 - maximum_learning_capex_ratio) * capex_grad
+
+
+class FTCapexGradientTestCase(unittest.TestCase):
+    """
+    Capex gradient wrt the syngas ratio of the Fischer Tropsch test class
+    """
+
+    def setUp(self):
+        '''
+        Initialize data needed for testing
+        '''
+        self.rng = np.random.default_rng(3)
+        self.slope_capex = 0.7
+
+    def setup_techno(self, nb_years, dtype=np.float64):
+        techno = FischerTropsch('FischerTropsch')
+        techno.techno_infos_dict = {'Capex_init': 1.2, 'Capex_init_unit': '$/kWh', 'learning_rate': 0.2,
+                                    'maximum_learning_capex_ratio': 0.9}
+        techno.years = np.arange(2020, 2020 + nb_years)
+        techno.initial_production = 40.
+        invest = self.rng.uniform(1., 5., nb_years).astype(dtype)
+        if dtype == np.complex128:
+            invest[nb_years // 2] += 1j * 1e-30
+        techno.cost_details = pd.DataFrame({GlossaryEnergy.Years: techno.years, GlossaryEnergy.InvestValue: invest})
+        return techno
+
+    def test_01_capex_gradient_vs_leave_one_out_lists(self):
+        for nb_years in [2, 31, 81, 200]:
+            for dtype in [np.float64, np.complex128]:
+                techno = self.setup_techno(nb_years, dtype)
+                for slope_capex in [0.0, self.slope_capex]:
+                    capex_grad = techno.compute_dcapex_dsyngas_ratio(slope_capex)
+                    reference = reference_compute_dcapex_dsyngas_ratio(techno, slope_capex)
+                    self.assertEqual(capex_grad.dtype, dtype)
+                    np.testing.assert_allclose(capex_grad, reference, rtol=1e-12, atol=1e-15)
+        # the gradient does not depend on the syngas ratio without slope
+        np.testing.assert_array_equal(techno.compute_dcapex_dsyngas_ratio(), 0.)
+
+
+if __name__ == "__main__":
+    unittest.main()
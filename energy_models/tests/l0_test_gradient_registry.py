@@ -0,0 +1,99 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from energy_models.core.gradient_registry import (
+    CO2_PER_USE,
+    CONSUMPTION,
+    PRODUCTION,
+    GradientKey,
+    GradientRegistry,
+    get_consumer_ns_streams,
+)
+from energy_models.core.jacobian_blocks import DiagonalJacobianBlock
+from energy_models.glossaryenergy import GlossaryEnergy
+
+
+class GradientRegistryTestCase(unittest.TestCase):
+    """
+    Gradient registry of the CO2 emissions models test class
+    """
+
+    def setUp(self):
+        '''
+        Initialize data needed for testing
+        '''
+        self.nb_years = 11
+        self.registry = GradientRegistry()
+        self.registry.add('captured (Mt)', GlossaryEnergy.methane, PRODUCTION, np.ones(self.nb_years),
+                          column='carbon_capture (Mt)')
+        self.registry.add('captured (Mt)', GlossaryEnergy.syngas, PRODUCTION, np.full(self.nb_years, 2.),
+                          column='carbon_capture (Mt)')
+        self.registry.add('needed (Mt)', GlossaryEnergy.methane, CONSUMPTION, np.full(self.nb_years, 3.),
+                          column='carbon_capture (Mt)')
+        self.registry.add('Total CO2 by use (Gt)', GlossaryEnergy.methane, CO2_PER_USE,
+                          np.linspace(0., 1., self.nb_years))
+
+    def test_01_combine(self):
+        self.registry.combine('to be stored (Mt)', [('captured (Mt)', 1.), ('needed (Mt)', -1.)])
+        self.assertEqual(len(self.registry), 7)
+        methane_key = GradientKey('to be stored (Mt)', GlossaryEnergy.methane, PRODUCTION, 'carbon_capture (Mt)')
+        np.testing.assert_array_equal(self.registry[methane_key], np.ones(self.nb_years))
+        np.testing.assert_array_equal(
+            self.registry[methane_key._replace(input=CONSUMPTION)], np.full(self.nb_years, -3.))
+        self.assertIn(methane_key._replace(stream=GlossaryEnergy.syngas), self.registry)
+        # the combined gradients do not change the original ones
+        np.testing.assert_array_equal(self.registry[methane_key._replace(output='captured (Mt)')],
+                                      np.ones(self.nb_years))
+
+    def test_02_input_blocks(self):
+        consumption = pd.DataFrame({f'{GlossaryEnergy.methane} ({GlossaryEnergy.energy_unit})': np.ones(3)})
+        consumer_ns_streams = get_consumer_ns_streams(
+            {GlossaryEnergy.electricity: consumption, GlossaryEnergy.biomass_dry: consumption},
+            lambda stream: 'Agriculture.Mix' if stream == GlossaryEnergy.biomass_dry else stream)
+        self.assertEqual(consumer_ns_streams[f'{GlossaryEnergy.methane} ({GlossaryEnergy.energy_unit})'],
+                         [GlossaryEnergy.electricity, 'Agriculture.Mix'])
+
+        key = GradientKey('captured (Mt)', GlossaryEnergy.syngas, PRODUCTION, 'carbon_capture (Mt)')
+        [(x_key_column, block)] = self.registry.get_input_blocks(key, GlossaryEnergy.syngas, consumer_ns_streams,
+                                                                 1e3, 1e2)
+        self.assertEqual(x_key_column,
+                         (f'{GlossaryEnergy.syngas}.{GlossaryEnergy.EnergyProductionValue}', 'carbon_capture (Mt)'))
+        self.assertIsInstance(block, DiagonalJacobianBlock)
+        np.testing.assert_array_equal(np.asarray(block), np.identity(self.nb_years) * 1e3 * 2. / 1e3)
+
+        key = GradientKey('Total CO2 by use (Gt)', GlossaryEnergy.methane, CO2_PER_USE)
+        [(x_key_column, block)] = self.registry.get_input_blocks(key, GlossaryEnergy.methane, consumer_ns_streams,
+                                                                 1e3, 1e2)
+        self.assertEqual(x_key_column, (f'{GlossaryEnergy.methane}.{GlossaryEnergy.CO2PerUse}', GlossaryEnergy.CO2PerUse))
+        np.testing.assert_array_equal(block.diagonal, np.linspace(0., 1., self.nb_years) / 1e3)
+
+        # gradient wrt the consumption of the stream by all its consumers
+        self.registry.add('Total CO2 by use (Gt)', GlossaryEnergy.methane, CONSUMPTION, np.ones(self.nb_years))
+        blocks = self.registry.get_input_blocks(key._replace(input=CONSUMPTION), GlossaryEnergy.methane,
+                                                consumer_ns_streams, 1e3, 1e2)
+        self.assertEqual([x_key_column for x_key_column, _ in blocks],
+                         [(f'{ns_stream}.{GlossaryEnergy.StreamConsumptionValue}',
+                           f'{GlossaryEnergy.methane} ({GlossaryEnergy.energy_unit})')
+                          for ns_stream in [GlossaryEnergy.electricity, 'Agriculture.Mix']])
+        np.testing.assert_array_equal(blocks[0][1].diagonal, np.full(self.nb_years, 0.1))
+
+
+if __name__ == "__main__":
+    unittest.main()
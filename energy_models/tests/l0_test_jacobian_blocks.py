@@ -0,0 +1,142 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+import unittest
+
+import numpy as np
+import scipy.sparse as sp
+
+from energy_models.core.jacobian_blocks import (
+    DiagonalJacobianBlock,
+    JacobianBlocksTape,
+    to_jacobian_value,
+    vector_jacobian_product,
+)
+
+
+class JacobianBlocksTestCase(unittest.TestCase):
+    """
+    Diagonal jacobian blocks must give the same results as the dense matrices they replace
+    """
+
+    def setUp(self):
+        '''
+        Initialize data needed for testing
+        '''
+        self.rng = np.random.default_rng(1)
+        self.nb_years = 31
+        self.diagonal = self.rng.uniform(-1., 1., self.nb_years)
+        self.block = DiagonalJacobianBlock(self.diagonal)
+        self.dense = np.diag(self.diagonal)
+
+    def assert_same_as_dense(self, block_result, dense_result, is_diagonal=True):
+        self.assertEqual(isinstance(block_result, DiagonalJacobianBlock), is_diagonal)
+        np.testing.assert_allclose(np.asarray(block_result), dense_result, rtol=1e-14)
+
+    def test_01_products_keep_diagonal(self):
+        vect = self.rng.uniform(1., 2., self.nb_years)
+        matrix = self.rng.uniform(1., 2., (self.nb_years, self.nb_years))
+        identity = DiagonalJacobianBlock.identity(self.nb_years)
+        for other in [3.5, np.float64(2.), vect, vect[:, np.newaxis], np.split(vect, self.nb_years), matrix]:
+            self.assert_same_as_dense(self.block * other, self.dense * np.asarray(other))
+            self.assert_same_as_dense(other * self.block, np.asarray(other) * self.dense)
+        self.assert_same_as_dense(self.block / 4., self.dense / 4.)
+        self.assert_same_as_dense(-self.block, -self.dense)
+        self.assert_same_as_dense(2. * identity * 100. * vect / 3., 2. * np.identity(self.nb_years) * 100. * vect / 3.)
+        self.assert_same_as_dense(self.block * identity, self.dense * np.identity(self.nb_years))
+
+    def test_02_sums_and_matrix_products(self):
+        other_block = DiagonalJacobianBlock(self.rng.uniform(1., 2., self.nb_years))
+        other_dense = np.asarray(other_block)
+        matrix = self.rng.uniform(1., 2., (self.nb_years, self.nb_years))
+        self.assert_same_as_dense(self.block + other_block, self.dense + other_dense)
+        self.assert_same_as_dense(self.block - other_block, self.dense - other_dense)
+        self.assert_same_as_dense(self.block + matrix, self.dense + matrix, is_diagonal=False)
+        self.assert_same_as_dense(0.5 - self.block, 0.5 - self.dense, is_diagonal=False)
+        # scalar minus diagonal is dense but its elementwise product with a diagonal is diagonal again
+        self.assert_same_as_dense((0.5 - self.block) * other_block, (0.5 - self.dense) * other_dense)
+        self.assert_same_as_dense(self.block @ other_block, self.dense @ other_dense)
+        self.assert_same_as_dense(self.block @ matrix, self.dense @ matrix, is_diagonal=False)
+        row = self.rng.uniform(1., 2., (1, self.nb_years))
+        self.assert_same_as_dense(row @ self.block, row @ self.dense, is_diagonal=False)
+
+    def test_03_reductions(self):
+        np.testing.assert_allclose(np.mean(self.block, axis=0), np.mean(self.dense, axis=0))
+        np.testing.assert_allclose(self.block.sum(axis=0), self.dense.sum(axis=0))
+        np.testing.assert_allclose(self.block.sum(), self.dense.sum())
+        np.testing.assert_allclose(self.block[0], self.dense[0])
+
+    def test_04_conversion_at_the_boundary(self):
+        # SoSWrapp assigns the jacobian values in dense slices
+        dense_value = to_jacobian_value(self.block)
+        self.assertIsInstance(dense_value, np.ndarray)
+        np.testing.assert_array_equal(dense_value, self.dense)
+        jacobian = np.zeros((2 * self.nb_years, self.nb_years))
+        jacobian[self.nb_years:, :] = dense_value
+        np.testing.assert_array_equal(jacobian[self.nb_years:, :], self.dense)
+        complex_block = DiagonalJacobianBlock(self.diagonal + 1j * 1e-30)
+        self.assertEqual(to_jacobian_value(complex_block).dtype, np.complex128)
+        self.assertIs(to_jacobian_value(self.dense), self.dense)
+
+    def test_05_csr_arrays_as_sp_diags(self):
+        diagonal = self.diagonal.copy()
+        diagonal[[0, 5, 6, self.nb_years - 1]] = 0.
+        for values in [diagonal, np.zeros(self.nb_years), diagonal + 1j * 1e-30]:
+            sparse_value = DiagonalJacobianBlock(values).to_sparse()
+            reference = sp.diags(values, format='csr')
+            self.assertEqual(sparse_value.format, 'csr')
+            self.assertEqual(sparse_value.dtype, reference.dtype)
+            np.testing.assert_array_equal(sparse_value.indptr, reference.indptr)
+            np.testing.assert_array_equal(sparse_value.indices, reference.indices)
+            np.testing.assert_array_equal(sparse_value.data, reference.data)
+
+    def test_06_vector_jacobian_products(self):
+        cotangent = self.rng.uniform(-1., 1., self.nb_years)
+        matrix = self.rng.uniform(1., 2., (self.nb_years, self.nb_years))
+        for block, dense in [(self.block, self.dense), (self.dense, self.dense), (matrix, matrix),
+                             (self.block.to_sparse(), self.dense)]:
+            np.testing.assert_allclose(vector_jacobian_product(block, cotangent), cotangent @ dense, rtol=1e-14)
+        # 1-D blocks are the row of a scalar output or the column of a scalar input
+        np.testing.assert_allclose(vector_jacobian_product(self.diagonal, [2.]), 2. * self.diagonal)
+        np.testing.assert_allclose(vector_jacobian_product(self.diagonal, cotangent), [cotangent @ self.diagonal])
+
+    def test_07_tape_contracts_recorded_outputs(self):
+        matrix = self.rng.uniform(1., 2., (self.nb_years, self.nb_years))
+        cotangent = self.rng.uniform(-1., 1., self.nb_years)
+        tape = JacobianBlocksTape({('prod', 'a'): cotangent})
+        self.assertTrue(tape.has_output('price', 'prod'))
+        self.assertFalse(tape.has_output('price'))
+        tape.record(('prod', 'a'), ('x', 'a'), matrix)
+        tape.record(('prod', 'a'), ('x', 'a'), self.block)
+        tape.record(('prod', 'a'), ('y', 'a'), self.block.to_sparse())
+        tape.record(('price', 'a'), ('y', 'a'), matrix)
+        # only the products with the cotangents are kept
+        self.assertEqual(len(tape.products), 2)
+        self.assertEqual(tape.products[(('prod', 'a'), ('x', 'a'))].shape, (self.nb_years,))
+        gradients = tape.vjp()
+        # the last block set overwrites the previous one and outputs without cotangent are ignored
+        np.testing.assert_allclose(gradients[('x', 'a')], cotangent @ self.dense, rtol=1e-14)
+        np.testing.assert_allclose(gradients[('y', 'a')], cotangent @ self.dense, rtol=1e-14)
+
+        other_cotangent = self.rng.uniform(-1., 1., self.nb_years)
+        tape = JacobianBlocksTape({('prod', 'a'): cotangent, ('price', 'a'): other_cotangent})
+        tape.record(('prod', 'a'), ('x', 'a'), self.block)
+        tape.record(('price', 'a'), ('x', 'a'), matrix)
+        gradients = tape.vjp()
+        np.testing.assert_allclose(gradients[('x', 'a')], cotangent @ self.dense + other_cotangent @ matrix, rtol=1e-14)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+import unittest
+
+import numpy as np
+
+from energy_models.core.techno_type.learning_curve import (
+    compute_dlearning_curve_dinvest,
+    compute_learning_curve,
+    compute_learning_curve_capex,
+)
+
+
+def compute_capex_yearly_loop(invest_list, capex_init, initial_production, expo_factor, data_config):
+    '''
+    Reference year by year implementation of the learning curve on capex
+    '''
+    capacity_factor_list = None
+    if 'capacity_factor_at_year_end' in data_config and 'capacity_factor' in data_config:
+        capacity_factor_list = np.linspace(data_config['capacity_factor'],
+                                           data_config['capacity_factor_at_year_end'],
+                                           len(invest_list))
+    capex_calc_list = []
+    invest_sum = initial_production * capex_init
+    capex_year = capex_init
+    for i, invest in enumerate(invest_list):
+        if invest_sum.real < 10.0 or i == 0:
+            capex_year = capex_init
+        else:
+            ratio_basis = (invest_sum + invest) / invest_sum
+            if capacity_factor_list is not None:
+                ratio_basis = ratio_basis * (capacity_factor_list[i] / data_config['capacity_factor'])
+            if ratio_basis.real < 0.0:
+                ratio_basis = np.complex128(ratio_basis)
+            ratio_invest = ratio_basis ** (-expo_factor)
+            if ratio_invest.real < 0.95:
+                ratio_invest = 0.9 + 0.05 * np.exp(ratio_invest - 0.9)
+            capex_year = capex_year * ratio_invest
+        capex_calc_list.append(capex_year)
+        invest_sum += invest
+
+    maximum_learning_capex_ratio = data_config.get('maximum_learning_capex_ratio', 0.9)
+    return capex_init * (maximum_learning_capex_ratio + (
+            1.0 - maximum_learning_capex_ratio) * np.array(capex_calc_list) / capex_init)
+
+
+class LearningCurveTestCase(unittest.TestCase):
+    """
+    Vectorized learning curve test class
+    """
+
+    def setUp(self):
+        '''
+        Initialize data needed for testing
+        '''
+        self.rng = np.random.default_rng(42)
+        self.capex_init = 500.
+        self.data_config = {'learning_rate': 0.2}
+        self.expo_factor = -np.log(1.0 - self.data_config['learning_rate']) / np.log(2.0)
+
+    def check_against_yearly_loop(self, invest_list, initial_production, data_config):
+        capex_ref = compute_capex_yearly_loop(invest_list, self.capex_init, initial_production,
+                                              self.expo_factor, data_config)
+        capex, _ = compute_learning_curve_capex(invest_list, self.capex_init, initial_production,
+                                                self.expo_factor, data_config)
+        np.testing.assert_allclose(capex, capex_ref, rtol=1e-12)
+
+    def test_01_learning_curve_vs_yearly_loop(self):
+        for nb_years in [31, 81, 200]:
+            invest_list = self.rng.uniform(0., 5000., nb_years)
+            self.check_against_yearly_loop(invest_list, 10., self.data_config)
+            # no initial production and small investments : capex is reset to capex_init for the first years
+            invest_list[:10] = 1e-3
+            self.check_against_yearly_loop(invest_list, 0., self.data_config)
+
+    def test_02_learning_curve_with_capacity_factor(self):
+        data_config = dict(self.data_config, capacity_factor=0.3, capacity_factor_at_year_end=0.4,
+                           maximum_learning_capex_ratio=0.5)
+        invest_list = self.rng.uniform(0., 5000., 81)
+        self.check_against_yearly_loop(invest_list, 10., data_config)
+
+    def test_03_learning_curve_complex(self):
+        invest_list = self.rng.uniform(0., 5000., 31) + 1j * 1e-30
+        self.check_against_yearly_loop(invest_list, 10., self.data_config)
+        # negative basis switches the computation to complex numbers
+        invest_list = self.rng.uniform(0., 5000., 31)
+        invest_list[10] = -1e6
+        capex, _ = compute_learning_curve_capex(invest_list, self.capex_init, 10., self.expo_factor, self.data_config)
+        self.assertEqual(capex.dtype, np.complex128)
+        self.check_against_yearly_loop(invest_list, 10., self.data_config)
+
+    def test_04_no_learning(self):
+        capex, learning_curve = compute_learning_curve_capex(np.ones(31), self.capex_init, 10., 0.0,
+                                                             {'learning_rate': 0.0})
+        np.testing.assert_allclose(capex, self.capex_init)
+        self.assertIsNone(learning_curve)
+
+    def test_05_dcapex_dinvest_vs_complex_step(self):
+        step = 1e-30
+        for initial_production, nb_years in [(10., 31), (0., 81)]:
+            invest_list = self.rng.uniform(0., 5000., nb_years)
+            # small invests to get reset years and floored ratios
+            invest_list[:5] = 1e-3
+            invest_list[20] = 1e6
+            learning_curve = compute_learning_curve(invest_list, self.capex_init, initial_production,
+                                                    self.expo_factor)
+            dcapex_dinvest = compute_dlearning_curve_dinvest(learning_curve)
+            self.assertTrue(np.all(np.triu(dcapex_dinvest, 1) == 0.0))
+            for j in range(nb_years):
+                invest_complex = invest_list.astype('complex128')
+                invest_complex[j] += 1j * step
+                capex_complex = compute_learning_curve(invest_complex, self.capex_init, initial_production,
+                                                       self.expo_factor)['capex_year']
+                np.testing.assert_allclose(dcapex_dinvest[:, j], capex_complex.imag / step,
+                                           rtol=1e-10, atol=1e-14)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,191 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from energy_models.glossaryenergy import GlossaryEnergy
+from energy_models.sos_processes.post_processing.post_proc_data_snapshot import (
+    PostProcessingSnapshot,
+)
+
+
+class Wrapper:
+    def __init__(self, energy_name):
+        self.energy_name = energy_name
+
+
+class DisciplineWrapp:
+    def __init__(self, energy_name):
+        self.wrapper = Wrapper(energy_name)
+
+
+class Discipline:
+    def __init__(self, name, inputs, outputs, energy_name=None):
+        self.name = name
+        self.inputs = inputs
+        self.outputs = outputs
+        self.discipline_wrapp = DisciplineWrapp(energy_name)
+        self.read_keys = set()
+
+    def get_sosdisc_inputs(self, key):
+        self.read_keys.add(key)
+        return self.inputs[key]
+
+    def get_sosdisc_outputs(self, key):
+        self.read_keys.add(key)
+        return self.outputs[key]
+
+
+class DataManager:
+    def __init__(self):
+        self.disciplines = {}
+        self.values = {}
+        self.nb_disciplines_lookups = 0
+
+    def add_discipline(self, discipline):
+        self.disciplines[discipline.name] = discipline
+        for var_dict in [discipline.inputs, discipline.outputs]:
+            for key, value in var_dict.items():
+                self.values[f'{discipline.name}.{key}'] = value
+
+    def get_disciplines_with_name(self, name):
+        self.nb_disciplines_lookups += 1
+        return [self.disciplines[name]]
+
+    def get_value(self, name):
+        return self.values[name]
+
+
+class ExecutionEngine:
+    def __init__(self):
+        self.dm = DataManager()
+
+
+class PostProcessingSnapshotTestCase(unittest.TestCase):
+    """
+    Single pass data extraction of the post-processings test class
+    """
+
+    def setUp(self):
+        '''
+        Initialize data needed for testing
+        '''
+        self.years = np.arange(2020, 2051)
+        nb_years = len(self.years)
+        rng = np.random.default_rng(0)
+        self.namespace = 'Test.EnergyMix'
+        self.streams = {GlossaryEnergy.methane: ['FossilGas', 'Methanation'],
+                        f'{GlossaryEnergy.hydrogen}.{GlossaryEnergy.gaseous_hydrogen}': ['SMR']}
+        self.ee = ExecutionEngine()
+        for stream, techno_list in self.streams.items():
+            stream_namespace = f'{self.namespace}.{stream}'
+            production_detailed = {GlossaryEnergy.Years: self.years}
+            for techno in techno_list:
+                production = rng.uniform(0., 5., nb_years)
+                production_detailed[f'{stream} {techno} ({GlossaryEnergy.energy_unit})'] = production * 1e3
+                carbon_emissions = {GlossaryEnergy.Years: self.years, 'production': rng.uniform(0., .1, nb_years),
+                                    techno: rng.uniform(0., .5, nb_years)}
+                if techno == 'Methanation':
+                    carbon_emissions[GlossaryEnergy.electricity] = rng.uniform(0., .2, nb_years)
+                price = rng.uniform(10., 50., nb_years)
+                inputs = {'scaling_factor_techno_production': 1e3, 'scaling_factor_invest_level': 1e3,
+                          GlossaryEnergy.InvestLevelValue: pd.DataFrame(
+                              {GlossaryEnergy.Years: self.years, GlossaryEnergy.InvestValue: rng.uniform(0., 3., nb_years)}),
+                          'data_fuel_dict': {GlossaryEnergy.CO2PerUse: 2.75, 'CO2_per_use_unit': 'kg/kg',
+                                             'high_calorific_value': 15.} if techno == 'FossilGas' else {}}
+                outputs = {GlossaryEnergy.TechnoProductionValue: pd.DataFrame(
+                    {GlossaryEnergy.Years: self.years, f'{stream} ({GlossaryEnergy.energy_unit})': production}),
+                    GlossaryEnergy.TechnoPricesValue: pd.DataFrame(
+                        {GlossaryEnergy.Years: self.years, techno: price, f'{techno}_wotaxes': price * 0.9}),
+                    GlossaryEnergy.TechnoDetailedPricesValue: pd.DataFrame(
+                        {GlossaryEnergy.Years: self.years, 'CAPEX_Part': price * 0.5, 'OPEX_Part': price * 0.3,
+                         'CO2Tax_Part': price * 0.2, techno: price}),
+                    'CO2_emissions_detailed': pd.DataFrame(carbon_emissions)}
+                self.ee.dm.add_discipline(Discipline(f'{stream_namespace}.{techno}', inputs, outputs))
+            self.ee.dm.add_discipline(Discipline(
+                stream_namespace, {GlossaryEnergy.techno_list: techno_list, GlossaryEnergy.YearStart: 2020,
+                                   GlossaryEnergy.YearEnd: 2050},
+                {'energy_production_detailed': pd.DataFrame(production_detailed)}, energy_name=stream))
+        self.ee.dm.add_discipline(Discipline(
+            self.namespace, {GlossaryEnergy.energy_list: list(self.streams) + [GlossaryEnergy.biomass_dry],
+                             GlossaryEnergy.YearStart: 2020, GlossaryEnergy.YearEnd: 2050}, {}))
+
+    def test_01_energy_mix_snapshot(self):
+        snapshot = PostProcessingSnapshot.from_energy_mix(self.ee, self.namespace)
+        # a single lookup of each discipline
+        self.assertEqual(self.ee.dm.nb_disciplines_lookups, 4)
+        self.assertEqual(snapshot.streams, list(self.streams))
+        self.assertEqual(snapshot.technos, [(GlossaryEnergy.methane, 'FossilGas'),
+                                            (GlossaryEnergy.methane, 'Methanation'),
+                                            (f'{GlossaryEnergy.hydrogen}.{GlossaryEnergy.gaseous_hydrogen}', 'SMR')])
+        self.assertEqual(snapshot.get_stream_technos(GlossaryEnergy.methane), ['FossilGas', 'Methanation'])
+        self.assertEqual(snapshot.capex.shape, (3, len(self.years)))
+        self.assertEqual(snapshot.get_year_index(2050), len(self.years) - 1)
+
+        methanation_disc = self.ee.dm.disciplines[f'{self.namespace}.{GlossaryEnergy.methane}.Methanation']
+        np.testing.assert_array_equal(
+            snapshot.production[1],
+            methanation_disc.outputs[GlossaryEnergy.TechnoProductionValue][
+                f'{GlossaryEnergy.methane} ({GlossaryEnergy.energy_unit})'].values * 1e3)
+        np.testing.assert_allclose(snapshot.stream_production[1], snapshot.production[1])
+        np.testing.assert_array_equal(snapshot.detailed_price[1],
+                                      methanation_disc.outputs[GlossaryEnergy.TechnoPricesValue]['Methanation'].values)
+
+        # CO2 per use from the data_fuel_dict and emissions from the consumption of other streams
+        np.testing.assert_allclose(snapshot.co2_per_use[0], 2.75 / 15.)
+        np.testing.assert_array_equal(snapshot.co2_per_use[1:], 0.)
+        fossil_gas_emissions = self.ee.dm.disciplines[
+            f'{self.namespace}.{GlossaryEnergy.methane}.FossilGas'].outputs['CO2_emissions_detailed']
+        np.testing.assert_allclose(snapshot.co2_per_kwh[0], fossil_gas_emissions['FossilGas'].values + 2.75 / 15.)
+        self.assertEqual(snapshot.other_emission_types, [GlossaryEnergy.electricity])
+        np.testing.assert_array_equal(snapshot.other_emissions[GlossaryEnergy.electricity][[0, 2]], 0.)
+
+    def test_02_stream_multilevel_df(self):
+        namespace = f'{self.namespace}.{GlossaryEnergy.methane}'
+        snapshot = PostProcessingSnapshot.from_stream(self.ee, namespace)
+        self.assertEqual(snapshot.streams, [GlossaryEnergy.methane])
+
+        multilevel_df = snapshot.get_multilevel_df({'production': snapshot.production,
+                                                    'CO2_per_kWh': snapshot.co2_per_kwh})
+        self.assertEqual(list(multilevel_df.columns), ['production', 'CO2_per_kWh', 'energy', 'technology'])
+        self.assertEqual(list(multilevel_df.loc[GlossaryEnergy.methane].index), ['FossilGas', 'Methanation'])
+        np.testing.assert_array_equal(multilevel_df.loc[(GlossaryEnergy.methane, 'Methanation')]['CO2_per_kWh'],
+                                      snapshot.co2_per_kwh[1])
+
+    def test_03_snapshot_arrays_selection(self):
+        full_snapshot = PostProcessingSnapshot.from_energy_mix(self.ee, self.namespace)
+        for discipline in self.ee.dm.disciplines.values():
+            discipline.read_keys.clear()
+        arrays = ('capex', 'opex', 'co2_tax', 'detailed_price')
+        snapshot = PostProcessingSnapshot.from_energy_mix(self.ee, self.namespace, arrays)
+        for array_name in arrays:
+            np.testing.assert_array_equal(getattr(snapshot, array_name), getattr(full_snapshot, array_name))
+        for array_name in ['production', 'stream_production', 'invest', 'price', 'co2_per_kwh']:
+            self.assertIsNone(getattr(snapshot, array_name))
+        self.assertEqual(snapshot.other_emission_types, [])
+
+        # only the detailed prices of the technos are read
+        methanation_disc = self.ee.dm.disciplines[f'{self.namespace}.{GlossaryEnergy.methane}.Methanation']
+        self.assertEqual(methanation_disc.read_keys, {GlossaryEnergy.TechnoDetailedPricesValue})
+
+        with self.assertRaises(Exception):
+            PostProcessingSnapshot.from_energy_mix(self.ee, self.namespace, ('capex', 'lcoe'))
+
+
+if __name__ == "__main__":
+    unittest.main()
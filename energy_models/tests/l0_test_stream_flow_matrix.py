@@ -0,0 +1,95 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from energy_models.core.energy_mix.stream_flow_matrix import StreamFlowMatrix
+from energy_models.glossaryenergy import GlossaryEnergy
+
+
+class StreamFlowMatrixTestCase(unittest.TestCase):
+    """
+    Consumption flows between streams stacked once vs the scan of the consumption columns of each stream
+    """
+
+    def setUp(self):
+        '''
+        Initialize random consumptions of the streams of the default techno dict
+        '''
+        self.rng = np.random.default_rng(11)
+        self.years = np.arange(GlossaryEnergy.YearStartDefault, GlossaryEnergy.YearEndDefault + 1)
+        self.streams = list(GlossaryEnergy.DEFAULT_TECHNO_DICT.keys())
+        self.resources = ['natural_gas_resource', 'uranium_resource', 'coal_resource']
+        self.consumed_columns = {stream: f'{stream} ({GlossaryEnergy.unit_dicts[stream]})' for stream in self.streams}
+        self.consumed_columns.update({resource: f'{resource} (Mt)' for resource in self.resources})
+        self.consumption_dict = {}
+        for stream in self.streams:
+            columns = self.rng.choice(list(self.consumed_columns.values()) + ['other (Mt)'], 6, replace=False)
+            self.consumption_dict[stream] = pd.DataFrame(
+                {GlossaryEnergy.Years: self.years,
+                 **{column: self.rng.uniform(0., 100., len(self.years)) for column in columns}})
+
+    def scan_consumption(self, consumed, consumers):
+        '''
+        Reference : consumption of consumed by the consumers scanning their consumption columns
+        '''
+        consumption = np.zeros(len(self.years))
+        for consumer in consumers:
+            if self.consumed_columns[consumed] in self.consumption_dict[consumer].columns:
+                consumption = np.sum(
+                    [consumption, self.consumption_dict[consumer][self.consumed_columns[consumed]].values], axis=0)
+        return consumption
+
+    def test_01_flows_vs_scan(self):
+        flow_matrix = StreamFlowMatrix(self.streams, self.consumed_columns, self.consumption_dict)
+        flows = flow_matrix.stack(self.consumption_dict)
+        self.assertEqual(flows.values.shape, (len(self.streams), len(self.consumed_columns), len(self.years)))
+
+        ccus_streams = [GlossaryEnergy.carbon_capture, GlossaryEnergy.carbon_storage]
+        energies = [stream for stream in self.streams if stream not in ccus_streams]
+        for consumers in [self.streams, energies, ccus_streams]:
+            consumptions = flows.sum_over_consumers(consumers)
+            for consumed in self.consumed_columns:
+                np.testing.assert_array_equal(consumptions[consumed], self.scan_consumption(consumed, consumers))
+
+        for consumed, column in self.consumed_columns.items():
+            consumers = [stream for stream in self.streams if column in self.consumption_dict[stream].columns]
+            self.assertListEqual(flow_matrix.get_consumers(consumed), consumers)
+            for stream in self.streams:
+                self.assertEqual(flow_matrix.has_flow(stream, consumed), stream in consumers)
+
+    def test_02_signature_and_complex_flows(self):
+        flow_matrix = StreamFlowMatrix(self.streams, self.consumed_columns, self.consumption_dict)
+        consumer = self.streams[0]
+        column = self.consumption_dict[consumer].columns[1]
+        consumed = [name for name, consumed_column in self.consumed_columns.items() if consumed_column == column]
+
+        # same columns with new values : the index is still valid
+        self.consumption_dict[consumer][column] = self.consumption_dict[consumer][column].values + 1j * 1e-30
+        self.assertEqual(StreamFlowMatrix.get_signature(self.consumption_dict), flow_matrix.signature)
+        consumptions = flow_matrix.stack(self.consumption_dict).sum_over_consumers()
+        for name, consumption in consumptions.items():
+            self.assertEqual(np.iscomplexobj(consumption), name in consumed)
+
+        # new column : the index has to be built again
+        self.consumption_dict[consumer]['new_column (TWh)'] = 1.
+        self.assertNotEqual(StreamFlowMatrix.get_signature(self.consumption_dict), flow_matrix.signature)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,216 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+import unittest
+from copy import deepcopy
+
+import numpy as np
+import pandas as pd
+
+from energy_models.core.stream_type.base_stream import BaseStream
+from energy_models.glossaryenergy import GlossaryEnergy
+
+
+def compute_prod_element_by_element(production_by_techno, elements_dict, exp_min, min_prod, years):
+    '''
+    Reference implementation of the smoothed productions and their derivatives element by element
+    '''
+    prod_total_for_mix_weight = np.zeros(len(years))
+    prod_element_dict = {}
+    dprod_element_dict = {}
+    for key, value in elements_dict.items():
+        prod_element_dict[key] = deepcopy(production_by_techno[value].values)
+        dprod_element_dict[key] = np.ones(len(prod_element_dict[key]))
+        if exp_min:
+            if prod_element_dict[key].min() < min_prod:
+                prod_element_dict[key][prod_element_dict[key] < -200.0 * min_prod] = -200.0 * min_prod
+                dprod_element_dict[key][prod_element_dict[key] < min_prod] = np.real(np.exp(
+                    prod_element_dict[key][prod_element_dict[key] < min_prod] / min_prod) * np.exp(-1) / 10.0)
+                prod_element_dict[key] = np.maximum(
+                    min_prod / 10.0 * (9.0 + np.exp(np.minimum(prod_element_dict[key], min_prod) / min_prod)
+                                       * np.exp(-1)), prod_element_dict[key])
+        else:
+            dprod_element_dict[key][prod_element_dict[key] < min_prod] = 0.0
+            prod_element_dict[key][prod_element_dict[key] < min_prod] = 0.0
+        prod_total_for_mix_weight = prod_total_for_mix_weight + prod_element_dict[key]
+    if not exp_min:
+        prod_total_for_mix_weight[prod_total_for_mix_weight == 0.0] = min_prod
+    return prod_element_dict, dprod_element_dict, prod_total_for_mix_weight
+
+
+def compute_grad_element_by_element(production_by_techno, elements_dict, exp_min, min_prod, years):
+    '''
+    Reference implementation of the gradients of the mix weights wrt the productions element by element
+    '''
+    prod_element_dict, dprod_element_dict, prod_total_for_mix_weight = compute_prod_element_by_element(
+        production_by_techno, elements_dict, exp_min, min_prod, years)
+    grad_element_mix_vs_prod = {}
+    for element in elements_dict.keys():
+        grad_element_mix_vs_prod[f'{element}'] = dprod_element_dict[element] * (
+                prod_total_for_mix_weight - prod_element_dict[element]) / prod_total_for_mix_weight ** 2
+        for element_other in elements_dict.keys():
+            if element_other != element:
+                grad_element_mix_vs_prod[f'{element} {element_other}'] = -dprod_element_dict[element] * \
+                                                                         prod_element_dict[element_other] / \
+                                                                         prod_total_for_mix_weight ** 2
+    return grad_element_mix_vs_prod
+
+
+class StreamMixWeightsTestCase(unittest.TestCase):
+    """
+    Fused computation of the mix weights of a stream vs the element by element computation
+    """
+
+    def setUp(self):
+        '''
+        Initialize a stream with 12 technos, some of them with productions below min_prod
+        '''
+        self.rng = np.random.default_rng(10)
+        self.years = np.arange(GlossaryEnergy.YearStartDefault, GlossaryEnergy.YearEndDefault + 1)
+        self.stream = BaseStream('stream')
+        self.stream.unit = 'TWh'
+        self.stream.year_start = GlossaryEnergy.YearStartDefault
+        self.stream.year_end = GlossaryEnergy.YearEndDefault
+        self.stream.reload_df()
+        self.stream.subelements_list = [f'techno_{i}' for i in range(12)]
+        self.elements_dict = {element: f'stream {element} (TWh)' for element in self.stream.subelements_list}
+
+        productions = self.rng.uniform(0., 100., (12, len(self.years)))
+        # technos with a production below min_prod on some years, negative or null on some years
+        productions[1, :20] = self.rng.uniform(-1e-3, 1e-3, 20)
+        productions[2, 10:] = 1e-5
+        productions[3] = 0.
+        productions[4, :5] = -1.
+        # all technos below min_prod on some years for the cutoff
+        productions[:, -3:] = 1e-4
+        self.stream.production_by_techno = pd.DataFrame(
+            {GlossaryEnergy.Years: self.years,
+             **{column: production for column, production in zip(self.elements_dict.values(), productions)}})
+        for element in self.stream.subelements_list:
+            self.stream.sub_prices[element] = self.rng.uniform(10., 200., len(self.years))
+            self.stream.sub_prices_wo_taxes[element] = self.rng.uniform(10., 200., len(self.years))
+
+    def compute_price_element_by_element(self, exp_min):
+        '''
+        Reference implementation of the prices and mix weights of the stream (before the placeholder price)
+        '''
+        prod_element, _, prod_total_for_mix_weight = compute_prod_element_by_element(
+            self.stream.production_by_techno, self.elements_dict, exp_min, self.stream.min_prod, self.years)
+        total_prices = pd.DataFrame({GlossaryEnergy.Years: self.years, 'stream': 0., 'stream_wotaxes': 0.})
+        mix_weights = pd.DataFrame({GlossaryEnergy.Years: self.years})
+        for element in self.stream.subelements_list:
+            mix_weight = prod_element[element] / prod_total_for_mix_weight
+            mix_weight[mix_weight < 1e-3] = 0.0
+            total_prices['stream'] += self.stream.sub_prices[element] * mix_weight
+            total_prices['stream_wotaxes'] += self.stream.sub_prices_wo_taxes[element] * mix_weight
+            mix_weights[element] = mix_weight * 100.
+        return total_prices, mix_weights
+
+    def compute_cutoff_price_year_by_year(self):
+        '''
+        Reference implementation of the placeholder price of the cutoff year by year
+        '''
+        total_prices, mix_weights = self.compute_price_element_by_element(exp_min=False)
+        sub_prices = self.stream.sub_prices
+        for year in total_prices[GlossaryEnergy.Years].values:
+            if np.real(total_prices.loc[total_prices[GlossaryEnergy.Years] == year]['stream'].values) == 0.0:
+                year_techno_prices = sub_prices[self.stream.subelements_list].loc[
+                    sub_prices[GlossaryEnergy.Years] == year]
+                min_techno_price = min(val for val in year_techno_prices.values[0] if val > 0.0)
+                min_techno_name = [name for name in year_techno_prices.columns if
+                                   year_techno_prices[name].values == min_techno_price][0]
+                for element in self.stream.subelements_list:
+                    mix_weights.loc[mix_weights[GlossaryEnergy.Years] == year,
+                                    element] = 100. if element == min_techno_name else 0.0
+                total_prices.loc[total_prices[GlossaryEnergy.Years] == year, 'stream'] = min_techno_price
+                total_prices.loc[total_prices[GlossaryEnergy.Years] == year, 'stream_wotaxes'] = \
+                    self.stream.sub_prices_wo_taxes[min_techno_name]
+        return total_prices, mix_weights
+
+    def test_01_fused_vs_element_by_element(self):
+        for exp_min in [True, False]:
+            grad_element_mix_vs_prod = self.stream.compute_grad_element_mix_vs_prod(
+                self.stream.production_by_techno, self.elements_dict, exp_min=exp_min, min_prod=self.stream.min_prod)
+            reference_grad = compute_grad_element_by_element(
+                self.stream.production_by_techno, self.elements_dict, exp_min, self.stream.min_prod, self.years)
+            self.assertListEqual(list(grad_element_mix_vs_prod.keys()), list(reference_grad.keys()))
+            for key, reference_value in reference_grad.items():
+                np.testing.assert_array_equal(grad_element_mix_vs_prod[key], reference_value)
+
+        # prices with exp_min, the element by element sum of the prices is kept
+        self.stream.compute_price(exp_min=True)
+        total_prices, mix_weights = self.compute_price_element_by_element(exp_min=True)
+        pd.testing.assert_frame_equal(self.stream.total_prices, total_prices, check_exact=True)
+        pd.testing.assert_frame_equal(self.stream.mix_weights, mix_weights, check_exact=True)
+
+    def test_02_complex_step(self):
+        production_by_techno = self.stream.production_by_techno.copy()
+        for column in list(self.elements_dict.values())[:3]:
+            production_by_techno[column] = production_by_techno[column].values + 1j * 1e-30
+        grad_element_mix_vs_prod = self.stream.compute_grad_element_mix_vs_prod(
+            production_by_techno, self.elements_dict, exp_min=True, min_prod=self.stream.min_prod)
+        reference_grad = compute_grad_element_by_element(
+            production_by_techno, self.elements_dict, True, self.stream.min_prod, self.years)
+        # real productions are stacked as complex : exp and products may differ by one ulp
+        for key, reference_value in reference_grad.items():
+            np.testing.assert_allclose(grad_element_mix_vs_prod[key], reference_value, rtol=1e-14, atol=0.)
+        self.assertEqual(self.stream.mix_weights_cache['dprod'].dtype, np.float64)
+
+    def test_03_cache_reused_by_gradients(self):
+        self.stream.compute_price(exp_min=True)
+        mix_weights_data = self.stream.mix_weights_cache
+        self.assertIsNone(mix_weights_data['grad_mix_weights'])
+        grad_element_mix_vs_prod = self.stream.compute_grad_element_mix_vs_prod(
+            self.stream.production_by_techno, self.elements_dict, exp_min=True, min_prod=self.stream.min_prod)
+        self.assertIs(self.stream.mix_weights_cache, mix_weights_data)
+        grad_mix_weights = mix_weights_data['grad_mix_weights']
+        self.assertEqual(grad_mix_weights.shape, (12, 12, len(self.years)))
+        self.assertTrue(np.shares_memory(grad_element_mix_vs_prod['techno_0 techno_1'], grad_mix_weights))
+
+        # new productions or options invalidate the cache
+        self.stream.compute_grad_element_mix_vs_prod(
+            self.stream.production_by_techno, self.elements_dict, exp_min=False, min_prod=self.stream.min_prod)
+        self.assertIsNot(self.stream.mix_weights_cache, mix_weights_data)
+        mix_weights_data = self.stream.mix_weights_cache
+        self.stream.production_by_techno[self.elements_dict['techno_5']] *= 2.
+        self.stream.compute_price(exp_min=False)
+        self.assertIsNot(self.stream.mix_weights_cache, mix_weights_data)
+
+    def test_04_cutoff_placeholder_price(self):
+        # null or negative prices are not used as placeholder
+        self.stream.sub_prices.loc[self.stream.sub_prices.index[-2:], 'techno_7'] = 0.
+        self.stream.sub_prices.loc[self.stream.sub_prices.index[-1], 'techno_8'] = -5.
+        self.stream.compute_price(exp_min=False)
+        total_prices, mix_weights = self.compute_cutoff_price_year_by_year()
+        pd.testing.assert_frame_equal(self.stream.total_prices, total_prices, check_exact=True)
+        pd.testing.assert_frame_equal(self.stream.mix_weights, mix_weights, check_exact=True)
+        self.assertTrue((self.stream.mix_weights[self.stream.subelements_list].values[-3:].sum(axis=1) == 100.).all())
+
+        self.stream.sub_prices.loc[self.stream.sub_prices.index[-1], self.stream.subelements_list] = 0.
+        with self.assertRaises(Exception):
+            self.stream.compute_price(exp_min=False)
+
+    def test_05_cutoff_every_other_year(self):
+        # null production every other year : placeholder price for half of the years
+        for column in self.elements_dict.values():
+            self.stream.production_by_techno.loc[self.stream.production_by_techno.index[::2], column] = 0.
+        self.stream.compute_price(exp_min=False)
+        total_prices, mix_weights = self.compute_cutoff_price_year_by_year()
+        pd.testing.assert_frame_equal(self.stream.total_prices, total_prices, check_exact=True)
+        pd.testing.assert_frame_equal(self.stream.mix_weights, mix_weights, check_exact=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
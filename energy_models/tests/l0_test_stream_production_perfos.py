@@ -0,0 +1,103 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from energy_models.core.stream_type.base_stream import BaseStream
+from energy_models.glossaryenergy import GlossaryEnergy
+
+
+def compute_production_column_by_column(stream, sub_production_dict, sub_consumption_dict):
+    '''
+    Reference implementation growing the dataframes column by column
+    '''
+    base_df = pd.DataFrame({GlossaryEnergy.Years: stream.years})
+    production = base_df.copy(deep=True)
+    consumption = base_df.copy(deep=True)
+    production_by_techno = base_df.copy(deep=True)
+    production[f'{stream.name}'] = 0.
+    for element in stream.subelements_list:
+        production_by_techno[f'{stream.name} {element} ({stream.unit})'] = sub_production_dict[
+            element][f'{stream.name} ({stream.unit})'].values
+        production[f'{stream.name}'] += production_by_techno[f'{stream.name} {element} ({stream.unit})'].values
+        for elem, prod in sub_production_dict[element].items():
+            if elem != f'{stream.name} ({stream.unit})' and elem != GlossaryEnergy.Years:
+                if elem in production:
+                    production[elem] += prod.values
+                else:
+                    production[elem] = prod.values
+        for elem, cons in sub_consumption_dict[element].items():
+            if elem != GlossaryEnergy.Years:
+                if elem in consumption:
+                    consumption[elem] += cons.values
+                else:
+                    consumption[elem] = cons.values
+    return production, consumption, production_by_techno
+
+
+class StreamProductionPerfoTestCase(unittest.TestCase):
+    """
+    Aggregation of the techno productions and consumptions of the streams of the default techno dict
+    """
+
+    def setUp(self):
+        '''
+        Initialize data needed for testing : random productions and consumptions for each techno of each stream
+        '''
+        self.rng = np.random.default_rng(9)
+        self.years = np.arange(GlossaryEnergy.YearStartDefault, GlossaryEnergy.YearEndDefault + 1)
+        self.byproducts = [f'{GlossaryEnergy.carbon_capture} (Mt)', f'{GlossaryEnergy.WaterResource} (Mt)',
+                           f'{GlossaryEnergy.methane} (TWh)', 'CH4 (Mt)', 'N2O (Mt)', 'heat (TWh)']
+        self.streams = []
+        for stream_name, stream_dict in GlossaryEnergy.DEFAULT_TECHNO_DICT.items():
+            stream = BaseStream(stream_name)
+            stream.unit = 'TWh'
+            stream.years = self.years
+            stream.subelements_list = stream_dict['value']
+            sub_production_dict = {}
+            sub_consumption_dict = {}
+            for element in stream.subelements_list:
+                sub_production_dict[element] = self.random_dataframe(
+                    [f'{stream.name} ({stream.unit})'] + list(self.rng.choice(self.byproducts, 2, replace=False)))
+                sub_consumption_dict[element] = self.random_dataframe(
+                    list(self.rng.choice(self.byproducts, 3, replace=False)))
+            self.streams.append((stream, sub_production_dict, sub_consumption_dict))
+
+    def random_dataframe(self, columns):
+        return pd.DataFrame({GlossaryEnergy.Years: self.years,
+                             **{column: self.rng.uniform(0., 100., len(self.years)) for column in columns}})
+
+    def test_01_aggregation_vs_column_by_column(self):
+        for stream, sub_production_dict, sub_consumption_dict in self.streams:
+            for output, reference_output in zip(
+                    stream.compute_production(sub_production_dict, sub_consumption_dict),
+                    compute_production_column_by_column(stream, sub_production_dict, sub_consumption_dict)):
+                pd.testing.assert_frame_equal(output, reference_output, check_exact=True)
+
+        # complex step on a single techno keeps the other columns real
+        stream, sub_production_dict, sub_consumption_dict = self.streams[0]
+        element = stream.subelements_list[0]
+        sub_production_dict[element][f'{stream.name} ({stream.unit})'] = \
+            sub_production_dict[element][f'{stream.name} ({stream.unit})'].values + 1j * 1e-30
+        production, consumption, _ = stream.compute_production(sub_production_dict, sub_consumption_dict)
+        self.assertEqual(production[stream.name].dtype, np.complex128)
+        self.assertEqual(consumption[consumption.columns[1]].dtype, np.float64)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+import unittest
+
+import numpy as np
+
+from energy_models.core.techno_type.syngas_ratio_sensitivity import (
+    compute_dcapex_dsyngas_ratio,
+    compute_linear_interpolant,
+    compute_syngas_ratio_sensitivity,
+    is_syngas_ratio_sensitivity_up_to_date,
+)
+
+
+def reference_dcapex_dsyngas_ratio(invest_list, capex_init, dcapex_init, initial_production, dinvest_sum,
+                                   expo_factor, maximum_learning_capex_ratio, differentiated_invests):
+    '''
+    Former year by year computation of the capex gradient of RWGS and WGS
+    '''
+    nb_years = len(invest_list)
+    capex_grad = np.zeros((nb_years, nb_years), dtype=np.result_type(invest_list, capex_init))
+    invest_sum = initial_production * capex_init
+    capex_year = capex_init
+    for i, invest in enumerate(invest_list):
+        if invest_sum.real < 10.0 or i == 0:
+            capex_year = capex_init
+            capex_grad[i][0] = dcapex_init
+        else:
+            q = ((invest_sum + invest) / invest_sum) ** (-expo_factor)
+            dq = dinvest_sum * expo_factor * invest * q / (invest_sum * (invest_sum + invest)) \
+                if differentiated_invests[i] else 0.0
+            if q.real < 0.95:
+                dq = 0.05 * np.exp(q - 0.9) * dq
+                q = 0.9 + 0.05 * np.exp(q - 0.9)
+            capex_grad[i][0] = q * capex_grad[i - 1][0] + dq * capex_year
+            capex_year = capex_year * q
+        invest_sum += invest
+
+    capex_grad[:, 0] = maximum_learning_capex_ratio * dcapex_init + (1.0 - maximum_learning_capex_ratio) * \
+                       capex_grad[:, 0]
+    return capex_grad
+
+
+class SyngasRatioSensitivityTestCase(unittest.TestCase):
+    """
+    Syngas ratio sensitivity shared by FischerTropsch, RWGS and WGS test class
+    """
+
+    def setUp(self):
+        '''
+        Initialize data needed for testing
+        '''
+        self.rng = np.random.default_rng(5)
+        self.nb_years = 81
+
+    def test_01_derivatives_against_complex_step(self):
+        step = 1e-30
+        for syngas_ratio, needed_syngas_ratio in [(np.linspace(0., 0.9, self.nb_years), 1.0),
+                                                  (np.linspace(1.1, 3., self.nb_years), 1.0),
+                                                  (np.linspace(0.1, 2., self.nb_years), 0.)]:
+            sensitivity = compute_syngas_ratio_sensitivity(syngas_ratio, needed_syngas_ratio)
+            perturbed = compute_syngas_ratio_sensitivity(syngas_ratio + 1j * step, needed_syngas_ratio)
+            for name in ['rwgs_syngas_needs', 'rwgs_water_prod', 'rwgs_co2_needs', 'wgs_syngas_needs',
+                         'wgs_water_needs', 'wgs_co2_prod']:
+                np.testing.assert_allclose(sensitivity[name.replace('_', '_d', 1)], perturbed[name].imag / step,
+                                           rtol=1e-10, atol=1e-14, err_msg=name)
+
+    def test_02_cache_and_interpolant(self):
+        syngas_ratio = np.linspace(0.1, 2., self.nb_years)
+        sensitivity = compute_syngas_ratio_sensitivity(syngas_ratio, 1.0)
+        self.assertTrue(is_syngas_ratio_sensitivity_up_to_date(sensitivity, syngas_ratio.copy(), 1.0))
+        self.assertFalse(is_syngas_ratio_sensitivity_up_to_date(sensitivity, syngas_ratio, 0.5))
+        self.assertFalse(is_syngas_ratio_sensitivity_up_to_date(sensitivity, syngas_ratio * 1.01, 1.0))
+        self.assertFalse(is_syngas_ratio_sensitivity_up_to_date(None, syngas_ratio, 1.0))
+
+        slope, intercept = compute_linear_interpolant(np.array([0.5, 2.]), np.array([100., 40.]))
+        self.assertAlmostEqual(slope, -40.)
+        self.assertAlmostEqual(intercept, 120.)
+
+    def test_03_capex_gradient_against_year_by_year_computation(self):
+        # learning from the first year, reset years of a small cumulated investment and floored learning ratios
+        cases = [(self.rng.uniform(1., 5., self.nb_years), 20.),
+                 (np.concatenate((np.full(10, 0.5), self.rng.uniform(1., 5., self.nb_years - 10))), 0.5),
+                 (np.concatenate((self.rng.uniform(1., 5., 10), np.full(self.nb_years - 10, 500.))), 20.)]
+        for invest_list, initial_production in cases:
+            for dtype in [np.float64, np.complex128]:
+                invest = invest_list.astype(dtype)
+                capex_init = 2.5 + 1j * 1e-30 if dtype == np.complex128 else 2.5
+                differentiated_invests = self.rng.uniform(0., 1., self.nb_years) > 0.2
+                args = (invest, capex_init, 0.3, initial_production, initial_production * 0.3, 0.2, 0.8)
+                capex_grad = compute_dcapex_dsyngas_ratio(*args, differentiated_invests=differentiated_invests)
+                reference = reference_dcapex_dsyngas_ratio(*args, differentiated_invests)
+                self.assertEqual(capex_grad.dtype, dtype)
+                np.testing.assert_allclose(capex_grad, reference, rtol=1e-12, atol=1e-15)
+                np.testing.assert_allclose(
+                    compute_dcapex_dsyngas_ratio(*args),
+                    reference_dcapex_dsyngas_ratio(*args, np.ones(self.nb_years, dtype=bool)), rtol=1e-12, atol=1e-15)
+
+
+if __name__ == "__main__":
+    unittest.main()
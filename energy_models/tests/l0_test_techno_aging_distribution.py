@@ -0,0 +1,120 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from energy_models.core.techno_type.techno_type import TechnoType
+from energy_models.glossaryenergy import GlossaryEnergy
+
+
+def compute_age_distrib_prod_df_reference(techno):
+    '''
+    Reference long dataframe of the aging distribution (one line per year and age)
+    '''
+    prod_col = f'distrib_prod ({techno.product_unit})'
+    len_years = len(techno.years)
+    prod_from_invest = techno.compute_prod_from_invest()['prod_from_invest'].values
+    new_prod_aged = pd.DataFrame({
+        GlossaryEnergy.Years: np.concatenate([techno.years + age for age in range(len_years)]),
+        'age': np.repeat(np.arange(len_years), len_years).astype(float),
+        prod_col: np.tile(prod_from_invest, len_years)})
+    initial_ages = techno.initial_age_distrib['age'].values
+    old_prod_aged = pd.DataFrame({
+        GlossaryEnergy.Years: np.repeat(techno.years, len(initial_ages)),
+        'age': np.concatenate([initial_ages + i for i in range(len_years)]),
+        prod_col: np.tile(techno.initial_age_distrib['distrib'].values * techno.initial_production / 100.0,
+                          len_years)})
+    age_distrib_prod_df = pd.concat([new_prod_aged, old_prod_aged], ignore_index=True)
+    return age_distrib_prod_df.loc[(age_distrib_prod_df['age'] < techno.lifetime) &
+                                   (age_distrib_prod_df[GlossaryEnergy.Years] <= techno.year_end) &
+                                   (age_distrib_prod_df[prod_col] != 0.0)]
+
+
+class TechnoAgingDistributionTestCase(unittest.TestCase):
+    """
+    Vintage matrix of the techno production vs the dataframe aging distribution
+    """
+
+    def setup_techno(self, nb_years, lifetime, construction_delay, initial_production):
+        rng = np.random.default_rng(nb_years)
+        techno = TechnoType('techno')
+        techno.energy_name = 'energy'
+        techno.product_unit = 'TWh'
+        techno.year_start = 2020
+        techno.year_end = 2020 + nb_years - 1
+        techno.years = np.arange(techno.year_start, techno.year_end + 1)
+        techno.lifetime = int(lifetime)
+        techno.construction_delay = construction_delay
+        techno.initial_production = initial_production
+        techno.initial_age_distrib_distrib_factor = 0.9
+        techno.compute_initial_age_distribution()
+        # the factories of age int(lifetime) are kept for a non integer lifetime
+        techno.lifetime = lifetime
+        techno.cost_details = pd.DataFrame({GlossaryEnergy.Years: techno.years,
+                                            GlossaryEnergy.InvestValue: rng.uniform(0., 100., nb_years),
+                                            'Capex_techno': rng.uniform(100., 200., nb_years)})
+        techno.invest_before_ystart = pd.DataFrame(
+            {GlossaryEnergy.InvestValue: rng.uniform(0., 10., construction_delay)})
+        techno.production_detailed = pd.DataFrame({GlossaryEnergy.Years: techno.years})
+        return techno
+
+    def test_01_vintage_matrix_vs_dataframe(self):
+        for nb_years, lifetime, construction_delay, initial_production in [(31, 25, 3, 10.), (81, 30, 0, 5.),
+                                                                             (200, 45, 5, 0.), (51, 22.5, 2, 8.)]:
+            techno = self.setup_techno(nb_years, lifetime, construction_delay, initial_production)
+            techno.compute_primary_energy_production()
+            reference_df = compute_age_distrib_prod_df_reference(techno)
+
+            reference_prod = reference_df.groupby(GlossaryEnergy.Years)['distrib_prod (TWh)'].sum()
+            np.testing.assert_allclose(techno.production_detailed['energy (TWh)'].values,
+                                       reference_prod.reindex(techno.years, fill_value=0.0).values, rtol=1e-12)
+
+            techno.production_woratio = techno.production_detailed
+            reference_age_x_prod = (reference_df['age'] * reference_df['distrib_prod (TWh)']).groupby(
+                reference_df[GlossaryEnergy.Years]).sum().reindex(techno.years, fill_value=0.0).values
+            np.testing.assert_allclose(techno.get_mean_age_over_years()['mean age'].values,
+                                       reference_age_x_prod / techno.production_detailed['energy (TWh)'].values,
+                                       rtol=1e-12)
+
+            # lazy dataframe view of the vintage matrix
+            age_distrib_prod_df = techno.age_distrib_prod_df
+            self.assertIs(techno.age_distrib_prod_df, age_distrib_prod_df)
+            pd.testing.assert_frame_equal(
+                age_distrib_prod_df[[GlossaryEnergy.Years, 'age', 'distrib_prod (TWh)']].reset_index(drop=True),
+                reference_df.sort_values([GlossaryEnergy.Years, 'age']).reset_index(drop=True),
+                check_dtype=False)
+
+    def test_02_prod_from_invest_without_invest_before_year_start(self):
+        techno = self.setup_techno(31, 25, 3, 10.)
+        techno.invest_before_ystart = pd.DataFrame({GlossaryEnergy.InvestValue: np.array([])})
+        prod_from_invest_df = techno.compute_prod_from_invest()
+
+        # only the invests from year start, available after the construction delay
+        nb_years = len(techno.years) - techno.construction_delay
+        np.testing.assert_array_equal(prod_from_invest_df[GlossaryEnergy.Years].values,
+                                      techno.years[:nb_years] + techno.construction_delay)
+        np.testing.assert_allclose(prod_from_invest_df['prod_from_invest'].values,
+                                   techno.cost_details[GlossaryEnergy.InvestValue].values[:nb_years] /
+                                   techno.cost_details['Capex_techno'].values[:nb_years])
+
+        techno.compute_primary_energy_production()
+        np.testing.assert_array_equal(techno.production_detailed['energy (TWh)'].values > 0., True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+import os
+import shutil
+import tempfile
+import unittest
+from os.path import join
+from pathlib import Path
+
+import pandas as pd
+
+from energy_models.techno_data_bundle import (
+    TECHNO_DATA_FOLDERS,
+    TechnoDataBundle,
+    build_techno_data_bundle,
+)
+
+
+class TechnoDataBundleTestCase(unittest.TestCase):
+    """
+    Binary bundle of the techno csv files vs the csv files
+    """
+
+    def setUp(self):
+        '''
+        Copy of the techno csv files of data_energy in a temporary folder
+        '''
+        self.tmp_folder = tempfile.mkdtemp()
+        for folder in TECHNO_DATA_FOLDERS:
+            shutil.copytree(join(Path(__file__).parents[2], 'data_energy', folder), join(self.tmp_folder, folder))
+        self.bundle_path = join(self.tmp_folder, 'cache', 'techno_data_bundle.npy')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_folder)
+
+    def get_csv_paths(self):
+        for folder in TECHNO_DATA_FOLDERS:
+            for file_name in sorted(os.listdir(join(self.tmp_folder, folder))):
+                path_to_csv = join(self.tmp_folder, folder, file_name)
+                if file_name.endswith('.csv') and os.path.getsize(path_to_csv) > 0:
+                    yield path_to_csv
+
+    def test_01_bundle_vs_csv(self):
+        self.assertIsNone(TechnoDataBundle.load(self.bundle_path, self.tmp_folder))
+        build_techno_data_bundle(self.tmp_folder, self.bundle_path)
+        # the bundle is published as a single file
+        self.assertEqual(sorted(os.listdir(os.path.dirname(self.bundle_path))), ['techno_data_bundle.npy'])
+        bundle = TechnoDataBundle.load(self.bundle_path, self.tmp_folder)
+        nb_csv_files = 0
+        for path_to_csv in self.get_csv_paths():
+            pd.testing.assert_frame_equal(bundle.get_dataframe(path_to_csv), pd.read_csv(path_to_csv))
+            nb_csv_files += 1
+        self.assertGreater(nb_csv_files, 200)
+        self.assertIsNone(bundle.get_dataframe(join(self.tmp_folder, 'techno_invests', 'unknown_techno.csv')))
+
+    def test_02_stale_bundle(self):
+        build_techno_data_bundle(self.tmp_folder, self.bundle_path)
+        self.assertIsNotNone(TechnoDataBundle.load(self.bundle_path, self.tmp_folder))
+
+        # a modified or a new csv file makes the bundle stale, it is not loaded until the next build
+        path_to_csv = join(self.tmp_folder, 'techno_invests', 'windonshore.csv')
+        with open(path_to_csv, 'a') as csv_file:
+            csv_file.write('2024,,150\n')
+        self.assertIsNone(TechnoDataBundle.load(self.bundle_path, self.tmp_folder))
+        build_techno_data_bundle(self.tmp_folder, self.bundle_path)
+        bundle = TechnoDataBundle.load(self.bundle_path, self.tmp_folder)
+        pd.testing.assert_frame_equal(bundle.get_dataframe(path_to_csv), pd.read_csv(path_to_csv))
+
+        shutil.copy(path_to_csv, join(self.tmp_folder, 'techno_invests', 'new_techno.csv'))
+        self.assertIsNone(TechnoDataBundle.load(self.bundle_path, self.tmp_folder))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+import unittest
+
+import numpy as np
+from sostrades_core.tools.base_functions.exp_min import compute_dfunc_with_exp_min
+
+from energy_models.core.techno_type.techno_type import TechnoType
+
+
+def compute_dprod_dinvest_elementwise(techno, capex_list, invest_list, invest_before_year_start,
+                                      dcapex_list_dinvest_list):
+    '''
+    Reference column by column / element by element assembly of the production vs invest gradient
+    '''
+    nb_years = len(capex_list)
+    dprod_list_dinvest_list = np.zeros((nb_years, nb_years))
+    dprod_list_dcapex_list = np.zeros((nb_years, nb_years))
+    for i in range(nb_years):
+        dpprod_dpinvest = compute_dfunc_with_exp_min(np.array([invest_list[i]]), techno.min_value_invest)[0][0] / \
+                          capex_list[i]
+        len_non_zeros = min(max(0, nb_years - techno.construction_delay - i), techno.lifetime)
+        first_len_zeros = min(i + techno.construction_delay, nb_years)
+        last_len_zeros = max(0, nb_years - len_non_zeros - first_len_zeros)
+        is_invest_negative = max(np.sign(invest_list[i] + np.finfo(float).eps), 0.0)
+        dprod_list_dinvest_list[:, i] = np.hstack((np.zeros(first_len_zeros),
+                                                   np.ones(len_non_zeros) * dpprod_dpinvest * is_invest_negative,
+                                                   np.zeros(last_len_zeros)))
+        dprod_list_dcapex_list[:, i] = np.hstack((np.zeros(first_len_zeros),
+                                                  np.ones(len_non_zeros) * (- invest_list[i] / capex_list[i] ** 2),
+                                                  np.zeros(last_len_zeros)))
+    for index, invest in enumerate(invest_before_year_start):
+        len_non_zeros = min(techno.lifetime, nb_years - index)
+        dprod_list_dcapex_list[:, 0] += np.hstack((np.zeros(index),
+                                                   np.ones(len_non_zeros) * (- invest / capex_list[0] ** 2),
+                                                   np.zeros(nb_years - index - len_non_zeros)))
+
+    dcapex_list_dinvest_list_withexp = dcapex_list_dinvest_list * compute_dfunc_with_exp_min(
+        invest_list, techno.min_value_invest)
+    dprod_dinvest = np.zeros((nb_years, nb_years))
+    for line in range(nb_years):
+        for column in range(nb_years):
+            dprod_dinvest[line, column] = dprod_list_dinvest_list[line, column] + \
+                                          np.matmul(dprod_list_dcapex_list[line, :],
+                                                    dcapex_list_dinvest_list_withexp[:, column])
+    return dprod_dinvest
+
+
+class TechnoGradientsPerfoTestCase(unittest.TestCase):
+    """
+    Vectorized techno production vs invest gradient test class
+    """
+
+    def setUp(self):
+        '''
+        Initialize data needed for testing
+        '''
+        self.rng = np.random.default_rng(0)
+        self.techno = TechnoType('techno')
+        self.techno.lifetime = 25
+        self.techno.construction_delay = 3
+
+    def test_01_dprod_dinvest_vs_elementwise(self):
+        for nb_years in [31, 81]:
+            capex_list = self.rng.uniform(100., 200., nb_years)
+            invest_list = self.rng.uniform(0., 100., nb_years)
+            invest_before_year_start = self.rng.uniform(0., 50., self.techno.construction_delay)
+            dcapex_dinvest = np.tril(self.rng.uniform(0., 1., (nb_years, nb_years)))
+
+            np.testing.assert_allclose(
+                self.techno.compute_dprod_dinvest(capex_list, invest_list, invest_before_year_start, {},
+                                                  dcapex_dinvest),
+                compute_dprod_dinvest_elementwise(self.techno, capex_list, invest_list, invest_before_year_start,
+                                                  dcapex_dinvest),
+                rtol=1e-12, atol=1e-15)
+
+
+if __name__ == "__main__":
+    unittest.main()
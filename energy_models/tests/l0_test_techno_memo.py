@@ -0,0 +1,139 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from energy_models.core.fingerprint import compute_inputs_fingerprint
+from energy_models.core.techno_type.techno_memo import TechnoMemo
+from energy_models.core.techno_type.techno_type import TechnoType
+from energy_models.glossaryenergy import GlossaryEnergy
+
+
+class TechnoMemoTestCase(unittest.TestCase):
+    """
+    Memo of the techno sub-computations test class
+    """
+
+    def setUp(self):
+        '''
+        Initialize data needed for testing
+        '''
+        self.rng = np.random.default_rng(7)
+        self.nb_years = 31
+
+    def setup_techno(self, memo_max_size):
+        techno = TechnoType('techno')
+        techno.memo = TechnoMemo(memo_max_size)
+        techno.energy_name = 'energy'
+        techno.product_unit = 'TWh'
+        techno.year_start = 2020
+        techno.year_end = 2020 + self.nb_years - 1
+        techno.years = np.arange(techno.year_start, techno.year_end + 1)
+        techno.lifetime = 35
+        techno.construction_delay = 3
+        techno.initial_production = 50.
+        techno.initial_age_distrib_distrib_factor = 0.9
+        techno.techno_infos_dict = {'learning_rate': 0.2, 'Capex_init': 1000., 'Capex_init_unit': '$/MWh',
+                                    'efficiency': 0.4, 'efficiency_max': 0.6, 'techno_evo_eff': 'yes',
+                                    'techno_evo_time': 10, 'WACC': 0.1}
+        techno.cost_details = pd.DataFrame({GlossaryEnergy.Years: techno.years})
+        return techno
+
+    def compute_sub_computations(self, techno, invest_list):
+        techno.compute_initial_age_distribution()
+        techno.compute_initial_plants_historical_prod()
+        efficiency = techno.compute_efficiency()
+        capex = np.array(techno.compute_capex(invest_list, techno.techno_infos_dict))
+        dcapex_dinvest = techno.compute_dcapex_dinvest(invest_list, techno.techno_infos_dict)
+        dprod_dinvest = techno.compute_dprod_dinvest(capex, invest_list, np.array([1., 2., 3.]),
+                                                     techno.techno_infos_dict, dcapex_dinvest)
+        return [techno.initial_age_distrib, techno.initial_plants_historical_prod, efficiency, capex,
+                dcapex_dinvest, dprod_dinvest, techno.compute_capital_recovery_factor(techno.techno_infos_dict),
+                techno.compute_expo_factor(techno.techno_infos_dict)]
+
+    def test_01_lru_eviction(self):
+        memo = TechnoMemo(2)
+        calls = []
+
+        def compute(value):
+            calls.append(value)
+            return np.array([value])
+
+        for value in [1., 2., 1., 3., 1., 2.]:
+            self.assertEqual(memo.get_or_compute('f', (value,), lambda: compute(value))[0], value)
+        # 2 is evicted by 3 since 1 has been used more recently
+        self.assertEqual(calls, [1., 2., 3., 2.])
+        self.assertEqual((memo.nb_hits, memo.nb_misses), (2, 4))
+        self.assertEqual(len(memo.values), 2)
+
+        # a memoized array is not modified through the returned copy
+        memo.get_or_compute('f', (1.,), lambda: compute(1.))[0] = 10.
+        self.assertEqual(memo.get_or_compute('f', (1.,), lambda: compute(1.))[0], 1.)
+
+        memo.clear()
+        self.assertEqual((len(memo.values), memo.nb_hits, memo.nb_misses), (0, 0, 0))
+        self.assertIs(TechnoMemo(0).get_or_compute('f', (1.,), lambda: calls), calls)
+
+    def test_02_fingerprint(self):
+        values = self.rng.uniform(0., 1., 2000)
+        changed_values = values.copy()
+        changed_values[1000] += 1e-12
+        self.assertNotEqual(compute_inputs_fingerprint(({'values': values},)),
+                            compute_inputs_fingerprint(({'values': changed_values},)))
+        self.assertNotEqual(compute_inputs_fingerprint((pd.Series(values),)),
+                            compute_inputs_fingerprint((pd.Series(changed_values),)))
+        self.assertEqual(compute_inputs_fingerprint(({'a': 1, 'b': values},)),
+                         compute_inputs_fingerprint(({'b': values.copy(), 'a': 1},)))
+        self.assertNotEqual(compute_inputs_fingerprint((values,)),
+                            compute_inputs_fingerprint((values.astype(np.complex128),)))
+
+    def test_03_memoized_sub_computations(self):
+        self.assertGreater(TechnoType('techno').memo.max_size, 0)
+
+        techno = self.setup_techno(32)
+        reference_techno = self.setup_techno(0)
+        invest_lists = [self.rng.uniform(0., 500., self.nb_years) for _ in range(3)]
+        # line search like sequence of invests
+        for invest_list in invest_lists + invest_lists[::-1]:
+            results = self.compute_sub_computations(techno, invest_list)
+            references = self.compute_sub_computations(reference_techno, invest_list)
+            for result, reference in zip(results, references):
+                if isinstance(reference, pd.DataFrame):
+                    pd.testing.assert_frame_equal(result, reference)
+                else:
+                    np.testing.assert_array_equal(result, reference)
+            np.testing.assert_array_equal(techno.dprod_list_dcapex_list, reference_techno.dprod_list_dcapex_list)
+            np.testing.assert_array_equal(techno.learning_curve['capex_year'],
+                                          reference_techno.learning_curve['capex_year'])
+        # only the invest dependent sub-computations are computed for each new invest
+        self.assertEqual(techno.memo.nb_misses, 5 + 3 * 3)
+        # the expo factor is also read by the capex and its gradient
+        self.assertEqual(techno.memo.nb_hits, 6 * 10 - techno.memo.nb_misses)
+
+        # a change of the techno parameters is a new computation
+        techno.lifetime = 30
+        reference_techno.lifetime = 30
+        techno.techno_infos_dict['efficiency_max'] = 0.7
+        reference_techno.techno_infos_dict['efficiency_max'] = 0.7
+        for result, reference in zip(self.compute_sub_computations(techno, invest_lists[0]),
+                                     self.compute_sub_computations(reference_techno, invest_lists[0])):
+            np.testing.assert_array_equal(np.asarray(result), np.asarray(reference))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+import unittest
+
+from energy_models.tests.performances.energy_models_benchmarks import (
+    BASELINE_FILE,
+    compare_with_baseline,
+    get_case_name,
+    load_results,
+    run_benchmarks,
+)
+
+
+class EnergyModelsBenchmarksRegressionTest(unittest.TestCase):
+    """
+    Performance regression gating of the energy processes on the benchmark baseline
+    The baseline is machine dependent, it is generated with
+        python -m energy_models.tests.performances.energy_models_benchmarks --update-baseline
+    """
+
+    def check_regression(self, process_name):
+        baseline = load_results(BASELINE_FILE)
+        case_name = get_case_name(process_name, 'small', 2050)
+        # baselines are machine dependent and none is committed, the gating needs a baseline of the machine
+        if case_name not in baseline:
+            self.skipTest(f'No baseline for {case_name} in {BASELINE_FILE}, generate it on this machine with '
+                          f'python -m energy_models.tests.performances.energy_models_benchmarks --update-baseline')
+        results = run_benchmarks([process_name], ['small'], [2050], repeat=2)
+        comparison, regressions = compare_with_baseline(results, baseline)
+        print(comparison.to_string())
+        self.assertEqual(regressions, [])
+
+    def test_01_energy_process_mda_regression(self):
+        self.check_regression('energy_process_v0_mda')
+
+    def test_02_energy_disciplines_regression(self):
+        self.check_regression('energy_disciplines')
+
+
+if __name__ == "__main__":
+    unittest.main()
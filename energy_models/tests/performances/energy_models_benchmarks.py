@@ -0,0 +1,348 @@
+'''
+Copyright 2024 Capgemini
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+import argparse
+import json
+import platform
+import sys
+import time
+from datetime import datetime
+from os.path import dirname, isfile, join
+
+import numpy as np
+import pandas as pd
+from sostrades_core.execution_engine.execution_engine import ExecutionEngine
+
+from energy_models.core.discipline_instrumentation import discipline_instrumentation
+from energy_models.core.energy_mix.energy_mix_disc import Energy_Mix_Discipline
+from energy_models.core.stream_type.stream_disc import StreamDiscipline
+from energy_models.core.techno_type.techno_disc import TechnoDiscipline
+from energy_models.glossaryenergy import GlossaryEnergy
+from energy_models.sos_processes.energy.MDA.energy_process_v0_mda.usecase import (
+    Study as MDAStudy,
+)
+from energy_models.sos_processes.energy.MDO.energy_mix_optim_process.usecase import (
+    Study as OptimStudy,
+)
+from energy_models.sos_processes.techno_dict.data.techno_dicts import (
+    load_dict,
+    techno_dict_midway,
+)
+
+# Benchmarks of the energy processes at several horizons and techno dicts, with a regression gating on a baseline :
+#     python -m energy_models.tests.performances.energy_models_benchmarks --update-baseline
+#     python -m energy_models.tests.performances.energy_models_benchmarks --threshold 0.2
+# The discipline timings (techno compute and jacobian, stream aggregation, energy mix forward and gradient)
+# are taken from the discipline instrumentation of the process executions.
+# The energy_disciplines cases time one techno, one stream and the energy mix alone, each one executed and
+# linearized on its inputs of the MDA, so that their timings are not mixed with the rest of the process
+
+BASELINE_FILE = join(dirname(__file__), 'energy_models_benchmarks_baseline.json')
+# a metric regresses if it is slower than the baseline by more than the threshold (relative)
+DEFAULT_REGRESSION_THRESHOLD = 0.25
+# and by more than this duration in seconds, the timer noise of the shortest metrics is ignored
+MIN_REGRESSION_SECONDS = 0.005
+
+BENCHMARK_HORIZONS = [2050, 2100]
+BENCHMARK_TECHNO_DICTS = {
+    'small': 'techno_dict_2024-07-15 Jul39_5technos_5streams.json',
+    'midway': 'techno_dict_midway',
+    'default': 'DEFAULT_TECHNO_DICT',
+}
+# process executions of the benchmark, each one gives its execution time and the discipline metrics of its phases,
+# energy_disciplines gives the metrics of disciplines executed alone
+BENCHMARK_PROCESSES = ['energy_process_v0_mda', 'energy_mix_optim_process', 'energy_disciplines']
+# the optim process builds its technos from techno_dict_midway
+PROCESS_TECHNO_DICTS = {'energy_mix_optim_process': ['midway']}
+STUDY_NAME = 'Bench'
+
+
+def get_techno_dict(techno_dict_name):
+    '''
+    Techno dict of the benchmark from its name in BENCHMARK_TECHNO_DICTS
+    '''
+    techno_dict = BENCHMARK_TECHNO_DICTS[techno_dict_name]
+    if techno_dict == 'techno_dict_midway':
+        return techno_dict_midway
+    if techno_dict == 'DEFAULT_TECHNO_DICT':
+        return GlossaryEnergy.DEFAULT_TECHNO_DICT
+    return load_dict(techno_dict)
+
+
+def get_case_name(process_name, techno_dict_name, year_end):
+    return f'{process_name}.{techno_dict_name}.{year_end}'
+
+
+def get_discipline_categories():
+    '''
+    Benchmark category of each discipline class name : techno, stream or energy_mix
+    '''
+    categories = {Energy_Mix_Discipline.__name__: 'energy_mix'}
+    for base_class, category in [(TechnoDiscipline, 'techno'), (StreamDiscipline, 'stream')]:
+        classes = [base_class]
+        while classes:
+            discipline_class = classes.pop()
+            categories[discipline_class.__name__] = category
+            classes.extend(discipline_class.__subclasses__())
+    return categories
+
+
+def extract_discipline_metrics(summary):
+    '''
+    Discipline metrics from an instrumentation summary, mean and max over the disciplines of a category
+    of their mean time per call in seconds
+    '''
+    categories = get_discipline_categories()
+    metric_names = {('techno', 'run'): 'techno_compute',
+                    ('techno', 'compute_sos_jacobian'): 'techno_jacobian',
+                    ('stream', 'run'): 'stream_aggregation',
+                    ('stream', 'compute_sos_jacobian'): 'stream_jacobian',
+                    ('energy_mix', 'run'): 'energy_mix_forward',
+                    ('energy_mix', 'compute_sos_jacobian'): 'energy_mix_gradient'}
+    summary = summary.assign(category=summary['class'].map(categories))
+    metrics = {}
+    for (category, phase), phase_summary in summary.groupby(['category', 'phase']):
+        if (category, phase) in metric_names:
+            metric_name = metric_names[(category, phase)]
+            metrics[f'{metric_name}_mean'] = float(phase_summary['mean_time_s'].mean())
+            metrics[f'{metric_name}_max'] = float(phase_summary['mean_time_s'].max())
+    return metrics
+
+
+def extract_unit_metrics(summary):
+    '''
+    Metrics of the energy_disciplines cases from an instrumentation summary with one discipline per category,
+    mean time per call in seconds of its compute and jacobian
+    '''
+    return {metric_name[:-len('_mean')]: value for metric_name, value in extract_discipline_metrics(summary).items()
+            if metric_name.endswith('_mean')}
+
+
+def configure_study(process_repo, process_name, **process_kwargs):
+    '''
+    Execution engine with the process configured
+    '''
+    execution_engine = ExecutionEngine(STUDY_NAME)
+    builder = execution_engine.factory.get_builder_from_process(process_repo, process_name, **process_kwargs)
+    execution_engine.factory.set_builders_to_coupling_builder(builder)
+    execution_engine.configure()
+    return execution_engine
+
+
+def get_usecase_values(study):
+    '''
+    Input values of a usecase in one dict
+    '''
+    study.study_name = STUDY_NAME
+    values_dict = {}
+    for usecase_values_dict in study.setup_usecase():
+        values_dict.update(usecase_values_dict)
+    return values_dict
+
+
+def configure_mda_study(techno_dict, year_end):
+    '''
+    Execution engine of energy_process_v0_mda with the usecase values loaded
+    '''
+    execution_engine = configure_study('energy_models.sos_processes.energy.MDA', 'energy_process_v0_mda',
+                                       techno_dict=techno_dict)
+    values_dict = get_usecase_values(MDAStudy(year_end=year_end, techno_dict=techno_dict,
+                                              execution_engine=execution_engine))
+    execution_engine.load_study_from_input_dict(values_dict)
+    return execution_engine
+
+
+def run_disciplines_benchmark(techno_dict, year_end, nb_calls=5):
+    '''
+    Execute the MDA once, then execute and linearize nb_calls times the first techno, the first stream and the
+    energy mix on their inputs of the MDA, with the instrumentation enabled
+    @return: dict of metrics in seconds, mean time per call of the compute and jacobian of each discipline
+    '''
+    execution_engine = configure_mda_study(techno_dict, year_end)
+    execution_engine.execute()
+
+    base_classes = [TechnoDiscipline, StreamDiscipline, Energy_Mix_Discipline]
+    benchmarked_disciplines = {}
+    for proxy_discipline in execution_engine.factory.proxy_disciplines:
+        for base_class in base_classes:
+            if isinstance(proxy_discipline.mdo_discipline_wrapp.wrapper, base_class) and \
+                    base_class not in benchmarked_disciplines:
+                benchmarked_disciplines[base_class] = proxy_discipline.mdo_discipline_wrapp
+    missing_classes = [base_class.__name__ for base_class in base_classes if base_class not in benchmarked_disciplines]
+    if missing_classes:
+        raise Exception(f'No discipline of class {missing_classes} in the process')
+
+    discipline_instrumentation.reset()
+    discipline_instrumentation.enable(trace_allocations=False)
+    try:
+        for mdo_discipline_wrapp in benchmarked_disciplines.values():
+            mdo_discipline = mdo_discipline_wrapp.mdo_discipline
+            input_names = mdo_discipline.get_input_data_names()
+            input_data = {name: value for name, value in mdo_discipline.local_data.items() if name in input_names}
+            for _ in range(nb_calls):
+                # each call is a new computation : no cached outputs or jacobian, no memoized techno computations
+                if mdo_discipline.cache is not None:
+                    mdo_discipline.cache.clear()
+                if isinstance(mdo_discipline_wrapp.wrapper, TechnoDiscipline):
+                    mdo_discipline_wrapp.wrapper.techno_model.memo.clear()
+                mdo_discipline.linearize(input_data, True)
+    finally:
+        discipline_instrumentation.disable()
+    metrics = extract_unit_metrics(discipline_instrumentation.get_summary())
+    discipline_instrumentation.reset()
+    return metrics
+
+
+def run_process_benchmark(process_name, techno_dict, year_end):
+    '''
+    Execute the process once with the instrumentation enabled
+    @return: dict of metrics in seconds, the execution time of the process and the discipline metrics
+    '''
+    if process_name == 'energy_disciplines':
+        return run_disciplines_benchmark(techno_dict, year_end)
+    if process_name == 'energy_process_v0_mda':
+        execution_engine = configure_mda_study(techno_dict, year_end)
+        execution_time_name = 'mda_execution'
+    elif process_name == 'energy_mix_optim_process':
+        execution_engine = configure_study('energy_models.sos_processes.energy.MDO', process_name)
+        study = OptimStudy(execution_engine=execution_engine, year_end=year_end)
+        values_dict = get_usecase_values(study)
+        # one iteration : an MDA and the gradients of all disciplines
+        values_dict[f'{STUDY_NAME}.{study.optim_name}.max_iter'] = 1
+        execution_engine.load_study_from_input_dict(values_dict)
+        execution_time_name = 'optim_iteration'
+    else:
+        raise Exception(f'Unknown benchmark process {process_name}')
+
+    discipline_instrumentation.reset()
+    discipline_instrumentation.enable(trace_allocations=False)
+    try:
+        start_time = time.perf_counter()
+        execution_engine.execute()
+        execution_time = time.perf_counter() - start_time
+    finally:
+        discipline_instrumentation.disable()
+    metrics = {execution_time_name: execution_time}
+    metrics.update(extract_discipline_metrics(discipline_instrumentation.get_summary()))
+    discipline_instrumentation.reset()
+    return metrics
+
+
+def run_benchmarks(processes=None, techno_dict_names=None, horizons=None, repeat=1):
+    '''
+    Run the benchmark cases, the minimum over the repetitions is kept for each metric
+    @return: dict {case name: {metric name: seconds}}, a case that fails gets {'error': message}
+    '''
+    results = {}
+    for process_name in processes or BENCHMARK_PROCESSES:
+        for techno_dict_name in techno_dict_names or list(BENCHMARK_TECHNO_DICTS):
+            if techno_dict_name not in PROCESS_TECHNO_DICTS.get(process_name, BENCHMARK_TECHNO_DICTS):
+                continue
+            for year_end in horizons or BENCHMARK_HORIZONS:
+                case_name = get_case_name(process_name, techno_dict_name, year_end)
+                try:
+                    runs = [run_process_benchmark(process_name, get_techno_dict(techno_dict_name), year_end)
+                            for _ in range(repeat)]
+                    results[case_name] = {metric: min(run[metric] for run in runs) for metric in runs[0]}
+                except Exception as error:
+                    results[case_name] = {'error': f'{type(error).__name__}: {error}'}
+                print(f'{case_name} : {results[case_name]}')
+    return results
+
+
+def compare_with_baseline(results, baseline_results, threshold=DEFAULT_REGRESSION_THRESHOLD,
+                          min_seconds=MIN_REGRESSION_SECONDS):
+    '''
+    Compare benchmark results with the baseline ones, cases and metrics missing in the baseline are not compared
+    @return: comparison dataframe (one line per case and metric) and the list of regression messages
+    '''
+    rows = []
+    regressions = []
+    for case_name, metrics in results.items():
+        if case_name not in baseline_results:
+            continue
+        baseline_metrics = baseline_results[case_name]
+        if 'error' in metrics and 'error' not in baseline_metrics:
+            regressions.append(f'{case_name} fails : {metrics["error"]}')
+            continue
+        for metric, value in metrics.items():
+            if metric == 'error' or metric not in baseline_metrics:
+                continue
+            baseline_value = baseline_metrics[metric]
+            ratio = value / baseline_value if baseline_value > 0. else np.inf
+            is_regression = value > baseline_value * (1. + threshold) and value - baseline_value > min_seconds
+            rows.append([case_name, metric, baseline_value, value, ratio, is_regression])
+            if is_regression:
+                regressions.append(f'{case_name} {metric} : {value:.4f} s vs {baseline_value:.4f} s in baseline '
+                                   f'(x{ratio:.2f}, threshold {threshold:.0%})')
+    comparison = pd.DataFrame(rows, columns=['case', 'metric', 'baseline_s', 'current_s', 'ratio', 'regression'])
+    return comparison, regressions
+
+
+def save_results(results, file_path):
+    '''
+    Save benchmark results as json with the versions of the environment they were obtained with
+    '''
+    content = {'metadata': {'date': datetime.now().isoformat(timespec='seconds'),
+                            'python': platform.python_version(),
+                            'platform': platform.platform(),
+                            'numpy': np.__version__,
+                            'pandas': pd.__version__},
+               'results': results}
+    with open(file_path, 'w') as results_file:
+        json.dump(content, results_file, indent=1, sort_keys=True)
+
+
+def load_results(file_path):
+    '''
+    Results of a json file written by save_results, empty if the file does not exist
+    '''
+    if not isfile(file_path):
+        return {}
+    with open(file_path) as results_file:
+        return json.load(results_file)['results']
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Benchmarks of the energy processes with regression gating')
+    parser.add_argument('--processes', nargs='+', choices=BENCHMARK_PROCESSES)
+    parser.add_argument('--techno-dicts', nargs='+', choices=list(BENCHMARK_TECHNO_DICTS))
+    parser.add_argument('--horizons', nargs='+', type=int)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_REGRESSION_THRESHOLD)
+    parser.add_argument('--output', help='json file where the results of the run are saved')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='store the results in the baseline instead of comparing them')
+    args = parser.parse_args(args)
+
+    results = run_benchmarks(args.processes, args.techno_dicts, args.horizons, args.repeat)
+    if args.output:
+        save_results(results, args.output)
+    if args.update_baseline:
+        baseline_results = load_results(args.baseline)
+        baseline_results.update(results)
+        save_results(baseline_results, args.baseline)
+        return 0
+
+    comparison, regressions = compare_with_baseline(results, load_results(args.baseline), args.threshold)
+    print(comparison.to_string())
+    for regression in regressions:
+        print(f'REGRESSION {regression}')
+    return 1 if regressions else 0
+
+
+if '__main__' == __name__:
+    sys.exit(main())